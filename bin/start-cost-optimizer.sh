@@ -34,4 +34,6 @@ echo "Starting daemon..."
 echo ""
 
 cd "$PROJECT_DIR"
+# Raiz do projeto no sys.path: as métricas via SSH usam src.infrastructure
+export PYTHONPATH="$PROJECT_DIR${PYTHONPATH:+:$PYTHONPATH}"
 python3 services/cost_optimizer.py
@@ -41,12 +41,21 @@ Examples:
     dumont-pack /workspace -o workspace.dumont
     dumont-pack /workspace --chunk-size 128  # 128 MB chunks
     dumont-pack /workspace -o backup.dumont -v  # verbose
+    dumont-pack /workspace -o backup.dumont -j 8  # 8 compression processes
+    dumont-pack /workspace -o backup.dumont --adaptive  # compressor chosen by content
         """
     )
     parser.add_argument('source', help='Directory to snapshot')
     parser.add_argument('-o', '--output', required=True, help='Output .dumont file')
     parser.add_argument('--chunk-size', type=int, default=64,
                         help='Chunk size in MB (default: 64)')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='Compression processes (default: all CPU cores)')
+    parser.add_argument('--pack-threshold', type=int, default=1024,
+                        help='Pack files smaller than this (KB) into shared chunks, 0 disables (default: 1024)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Choose the compressor per chunk by sampling its content '
+                             '(skips incompressible data regardless of extension)')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='Verbose output')
 
@@ -73,11 +82,17 @@ Examples:
     print(f"Files: {file_count}")
     print(f"Total size: {format_size(total_size)}")
     print(f"Chunk size: {args.chunk_size} MB")
+    print(f"Workers: {args.workers or os.cpu_count()}")
     print()
 
     # Create snapshot service
     chunk_size = args.chunk_size * 1024 * 1024
-    service = SnapshotService(chunk_size=chunk_size)
+    service = SnapshotService(
+        chunk_size=chunk_size,
+        workers=args.workers,
+        pack_threshold=args.pack_threshold * 1024,
+        adaptive=args.adaptive,
+    )
 
     # Progress tracking
     start_time = time.time()
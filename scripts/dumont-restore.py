@@ -6,6 +6,7 @@ Usage:
     dumont-restore snapshot.dumont /workspace
     dumont-restore snapshot.dumont /workspace --gpu  # Use GPU decompression
     dumont-restore snapshot.dumont --info  # Show snapshot info
+    dumont-restore https://host/snap.dumont /workspace --only src/ --only '*.json'
 
 Features:
     - GPU-accelerated decompression (with nvCOMP)
@@ -84,13 +85,18 @@ Examples:
                         help='Show snapshot information')
     parser.add_argument('--list', action='store_true',
                         help='List files in snapshot')
+    parser.add_argument('--only', action='append', metavar='PATTERN',
+                        help='Restore only matching paths (glob or directory, repeatable)')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='Decompression threads (default: all CPU cores)')
     parser.add_argument('-v', '--verbose', action='store_true',
                         help='Verbose output')
 
     args = parser.parse_args()
 
     # Validate snapshot file
-    if not os.path.isfile(args.snapshot):
+    is_url = args.snapshot.startswith(('http://', 'https://'))
+    if not is_url and not os.path.isfile(args.snapshot):
         print(f"Error: Snapshot file not found: {args.snapshot}", file=sys.stderr)
         sys.exit(1)
 
@@ -113,6 +119,22 @@ Examples:
         parser.print_help()
         sys.exit(1)
 
+    # Selective restore (works for local files and http(s) URLs)
+    if args.only:
+        service = SnapshotService()
+        print(f"Restoring {', '.join(args.only)} from {args.snapshot}...")
+        try:
+            result = service.restore_paths(args.snapshot, args.only, args.target, workers=args.workers)
+        except Exception as e:
+            print(f"\nError restoring snapshot: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Files restored:   {result['files_restored']}")
+        print(f"Chunks read:      {result['chunks_processed']}/{result['chunks_total']}")
+        print(f"Data restored:    {format_size(result['bytes_original'])} "
+              f"(read {format_size(result['bytes_read'])})")
+        print(f"Time:             {result['elapsed_seconds']:.1f}s")
+        return
+
     service = SnapshotService()
     info = service.get_snapshot_info(args.snapshot)
 
@@ -174,6 +196,7 @@ Examples:
             args.snapshot,
             args.target,
             use_gpu=use_gpu,
+            workers=args.workers,
             progress_callback=progress_callback if args.verbose else None
         )
     except Exception as e:
@@ -49,9 +49,9 @@ class InstanceMetrics:
     """Métricas de utilização de instância (GPU + CPU)"""
     gpu_utilization: float = 0.0  # 0-100% (0 se não tiver GPU)
     cpu_utilization: float = 0.0  # 0-100%
-    memory_used: float      # GB
-    memory_total: float     # GB
-    temperature: float      # Celsius
+    memory_used: float = 0.0      # GB
+    memory_total: float = 0.0     # GB
+    temperature: float = 0.0      # Celsius
     timestamp: datetime = field(default_factory=datetime.now)
     
     @property
@@ -62,6 +62,10 @@ class InstanceMetrics:
         return (self.memory_used / self.memory_total) * 100
 
 
+# Nome usado pelos providers (métricas via nvidia-smi)
+GpuMetrics = InstanceMetrics
+
+
 @dataclass
 class Instance:
     """Representa uma instância de GPU em qualquer provider"""
@@ -164,19 +168,20 @@ class VastAiProvider(GpuProvider):
         if not instance.ip_address:
             return None
         
+        from src.infrastructure.providers.ssh_pool import get_ssh_pool
+
         try:
             # Executa nvidia-smi via SSH
-            proc = await asyncio.create_subprocess_exec(
-                "ssh", "-o", "StrictHostKeyChecking=no", "-o", "ConnectTimeout=5",
-                f"root@{instance.ip_address}",
+            result = await get_ssh_pool().arun(
+                instance.ip_address, 22,
                 "nvidia-smi --query-gpu=utilization.gpu,memory.used,memory.total,temperature.gpu --format=csv,noheader,nounits",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                user="root",
+                timeout=10,
+                connect_timeout=5
             )
-            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=10)
             
-            if proc.returncode == 0:
-                parts = stdout.decode().strip().split(",")
+            if result.returncode == 0:
+                parts = result.stdout.strip().split(",")
                 if len(parts) >= 4:
                     return GpuMetrics(
                         gpu_utilization=float(parts[0].strip()),
@@ -331,18 +336,19 @@ class TensorDockProvider(GpuProvider):
         if not instance.ip_address:
             return None
         
+        from src.infrastructure.providers.ssh_pool import get_ssh_pool
+
         try:
-            proc = await asyncio.create_subprocess_exec(
-                "ssh", "-o", "StrictHostKeyChecking=no", "-o", "ConnectTimeout=5",
-                f"user@{instance.ip_address}",
+            result = await get_ssh_pool().arun(
+                instance.ip_address, 22,
                 "nvidia-smi --query-gpu=utilization.gpu,memory.used,memory.total,temperature.gpu --format=csv,noheader,nounits",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                user="user",
+                timeout=10,
+                connect_timeout=5
             )
-            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=10)
             
-            if proc.returncode == 0:
-                parts = stdout.decode().strip().split(",")
+            if result.returncode == 0:
+                parts = result.stdout.strip().split(",")
                 if len(parts) >= 4:
                     return GpuMetrics(
                         gpu_utilization=float(parts[0].strip()),
@@ -87,7 +87,7 @@ async def receive_agent_status(request: AgentStatusRequest):
         elif request.gpu_utilization is not None:
             gpu_utilization = request.gpu_utilization
         
-        logger.info(
+        logger.debug(
             f"Agent heartbeat: instance={instance_id}, status={request.status}, "
             f"gpu_util={gpu_utilization:.1f}%"
         )
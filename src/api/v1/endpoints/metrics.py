@@ -31,6 +31,7 @@ from ....models.metrics import (
     CostEfficiencyRanking,
     PricePrediction,
 )
+from ....modules.market.rollups import RESOLUTION_RAW, choose_resolution, query_price_series
 from ..dependencies import require_auth
 
 router = APIRouter(
@@ -47,7 +48,12 @@ async def get_market_snapshots(
         None,
         description="Tipo: on-demand, interruptible, bid"
     ),
-    hours: int = Query(24, ge=1, le=168, description="Horas de histórico"),
+    hours: int = Query(24, ge=1, le=2160, description="Horas de histórico"),
+    resolution: Optional[str] = Query(
+        None,
+        regex="^(raw|1h|1d)$",
+        description="raw, 1h ou 1d (padrão: a mais grossa que atende o intervalo)"
+    ),
     limit: int = Query(100, le=1000, description="Limite de resultados"),
 ):
     """
@@ -55,10 +61,40 @@ async def get_market_snapshots(
 
     Dados agregados por GPU e tipo de máquina.
     Útil para visualizar tendências de preço ao longo do tempo.
+    Intervalos longos são servidos pelos rollups horários/diários.
     """
     db = get_session_factory()()
     try:
         start_time = datetime.utcnow() - timedelta(hours=hours)
+        resolution = resolution or choose_resolution(start_time)
+
+        if resolution != RESOLUTION_RAW:
+            points = query_price_series(
+                db, start_time,
+                gpu_name=gpu_name,
+                machine_type=machine_type,
+                resolution=resolution,
+                limit=limit,
+            )
+            return [
+                MarketSnapshotResponse(
+                    timestamp=p['timestamp'].isoformat(),
+                    gpu_name=p['gpu_name'],
+                    machine_type=p['machine_type'],
+                    min_price=p['min_price'],
+                    max_price=p['max_price'],
+                    avg_price=p['avg_price'],
+                    percentile_25=p['percentile_25'],
+                    percentile_75=p['percentile_75'],
+                    total_offers=p['total_offers'],
+                    available_gpus=p['available_gpus'],
+                    avg_reliability=p['avg_reliability'],
+                    resolution=resolution,
+                    samples=p['samples'],
+                )
+                for p in points
+            ]
+
         query = db.query(MarketSnapshot).filter(
             MarketSnapshot.timestamp >= start_time
         )
@@ -81,6 +117,8 @@ async def get_market_snapshots(
                 max_price=r.max_price,
                 avg_price=r.avg_price,
                 median_price=r.median_price,
+                percentile_25=r.percentile_25,
+                percentile_75=r.percentile_75,
                 total_offers=r.total_offers,
                 available_gpus=r.available_gpus,
                 verified_offers=r.verified_offers or 0,
@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from ...schemas.spot.prediction import SpotPricePredictionItem, SpotPricePredictionResponse
 from .....config.database import SessionLocal
 from .....models.metrics import MarketSnapshot
+from .....modules.market.rollups import RESOLUTION_HOUR, query_price_series
 
 router = APIRouter(tags=["Spot Prediction"])
 
@@ -24,31 +25,37 @@ async def get_spot_price_prediction(gpu_name: str):
     db = SessionLocal()
     try:
         week_ago = datetime.utcnow() - timedelta(days=7)
-        snapshots = db.query(MarketSnapshot).filter(
+        latest = db.query(MarketSnapshot.avg_price).filter(
             MarketSnapshot.gpu_name == gpu_name,
             MarketSnapshot.machine_type == "interruptible",
             MarketSnapshot.timestamp >= week_ago,
-        ).order_by(MarketSnapshot.timestamp.desc()).all()
+        ).order_by(MarketSnapshot.timestamp.desc()).first()
 
-        current_price = snapshots[0].avg_price if snapshots else 0.5
+        current_price = latest.avg_price if latest else 0.5
 
-        # Agrupar por hora
-        hour_prices = {i: [] for i in range(24)}
-        for snap in snapshots:
-            hour = snap.timestamp.hour
-            if snap.avg_price:
-                hour_prices[hour].append(snap.avg_price)
+        # Agrupar por hora (rollups horários: ~168 linhas em vez de ~2000 snapshots)
+        hour_prices = {i: [0.0, 0] for i in range(24)}
+        for point in query_price_series(
+            db, week_ago,
+            gpu_name=gpu_name,
+            machine_type="interruptible",
+            resolution=RESOLUTION_HOUR,
+        ):
+            if point['avg_price']:
+                agg = hour_prices[point['timestamp'].hour]
+                agg[0] += point['avg_price'] * point['samples']
+                agg[1] += point['samples']
 
         predictions = []
         lowest_price = float('inf')
         best_hour = 0
 
         for hour in range(24):
-            prices = hour_prices[hour]
-            if prices:
-                predicted = sum(prices) / len(prices)
-                confidence = min(1.0, len(prices) / 20)
-                availability = len(prices) * 3
+            price_sum, samples = hour_prices[hour]
+            if samples:
+                predicted = price_sum / samples
+                confidence = min(1.0, samples / 20)
+                availability = samples * 3
             else:
                 # Estimar baseado em padrões típicos
                 if 2 <= hour <= 6:
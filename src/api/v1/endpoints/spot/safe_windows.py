@@ -8,7 +8,7 @@ from datetime import datetime, timedelta
 
 from ...schemas.spot.safe_windows import SafeSpotWindowItem, SafeSpotWindowsResponse
 from .....config.database import SessionLocal
-from .....models.metrics import MarketSnapshot
+from .....modules.market.rollups import RESOLUTION_HOUR, query_price_series
 from .constants import DAY_NAMES
 
 router = APIRouter(tags=["Spot Safe Windows"])
@@ -25,33 +25,37 @@ async def get_safe_spot_windows(gpu_name: str):
     db = SessionLocal()
     try:
         week_ago = datetime.utcnow() - timedelta(days=7)
-        snapshots = db.query(MarketSnapshot).filter(
-            MarketSnapshot.gpu_name == gpu_name,
-            MarketSnapshot.machine_type == "interruptible",
-            MarketSnapshot.timestamp >= week_ago,
-        ).all()
+        points = query_price_series(
+            db, week_ago,
+            gpu_name=gpu_name,
+            machine_type="interruptible",
+            resolution=RESOLUTION_HOUR,
+        )
 
-        # Agrupar por hora e dia
+        # Agrupar por hora e dia (pesos = snapshots agregados em cada rollup)
         hour_data = {}
 
-        for snap in snapshots:
-            hour = snap.timestamp.hour
-            day = DAY_NAMES[snap.timestamp.weekday()]
+        for point in points:
+            hour = point['timestamp'].hour
+            day = DAY_NAMES[point['timestamp'].weekday()]
             key = (hour, day)
 
             if key not in hour_data:
-                hour_data[key] = {"prices": [], "reliability": []}
+                hour_data[key] = {"price_sum": 0.0, "reliability_sum": 0.0, "samples": 0}
 
-            hour_data[key]["prices"].append(snap.avg_price or 0)
-            hour_data[key]["reliability"].append(snap.avg_reliability or 0.7)
+            samples = point['samples']
+            hour_data[key]["price_sum"] += (point['avg_price'] or 0) * samples
+            hour_data[key]["reliability_sum"] += (point['avg_reliability'] or 0.7) * samples
+            hour_data[key]["samples"] += samples
 
         windows = []
         for (hour, day), data in hour_data.items():
-            avg_price = sum(data["prices"]) / len(data["prices"]) if data["prices"] else 0
-            avg_reliability = sum(data["reliability"]) / len(data["reliability"]) if data["reliability"] else 0.7
+            samples = data["samples"]
+            avg_price = data["price_sum"] / samples if samples else 0
+            avg_reliability = data["reliability_sum"] / samples if samples else 0.7
 
             interruption_rate = 1 - avg_reliability
-            availability = min(1.0, len(data["prices"]) / 24)
+            availability = min(1.0, samples / 24)
 
             if interruption_rate < 0.05 and availability > 0.5:
                 rec = "highly_recommended"
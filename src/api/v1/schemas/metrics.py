@@ -16,7 +16,9 @@ class MarketSnapshotResponse(BaseModel):
     min_price: float
     max_price: float
     avg_price: float
-    median_price: float
+    median_price: Optional[float] = None  # Só em snapshots brutos
+    percentile_25: Optional[float] = None
+    percentile_75: Optional[float] = None
     total_offers: int
     available_gpus: int
     verified_offers: int = 0
@@ -26,6 +28,8 @@ class MarketSnapshotResponse(BaseModel):
     min_cost_per_tflops: Optional[float] = None
     avg_cost_per_tflops: Optional[float] = None
     region_distribution: Optional[Dict[str, int]] = None
+    resolution: str = "raw"  # raw, 1h, 1d
+    samples: int = 1  # Snapshots agregados no ponto
 
     class Config:
         from_attributes = True
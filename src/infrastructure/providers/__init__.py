@@ -2,6 +2,8 @@
 Infrastructure providers (concrete implementations of repository interfaces)
 """
 from .vast_provider import VastProvider
+from .vast_client import VastClient, get_vast_client
+from .ssh_pool import SSHPool, get_ssh_pool
 from .restic_provider import ResticProvider
 from .user_storage import FileUserRepository
 from .gcp_provider import GCPProvider, GCPInstanceConfig
@@ -10,7 +12,8 @@ from .skypilot_provider import SkyPilotProvider, get_skypilot_provider
 from .finetune_storage import FineTuneJobStorage, get_finetune_storage
 
 __all__ = [
-    'VastProvider', 'ResticProvider', 'FileUserRepository',
+    'VastProvider', 'VastClient', 'get_vast_client', 'SSHPool', 'get_ssh_pool',
+    'ResticProvider', 'FileUserRepository',
     'GCPProvider', 'GCPInstanceConfig', 'DemoProvider',
     'SkyPilotProvider', 'get_skypilot_provider',
     'FineTuneJobStorage', 'get_finetune_storage',
@@ -0,0 +1,505 @@
+"""
+SSH connection pool
+
+Commands to GPU/CPU hosts share one OpenSSH master connection per
+(user, host, port, key) through ControlMaster multiplexing:
+- the first command to a host opens a background master (ssh -M -N -f);
+  every later command opens a channel on it, so it costs one round trip
+  instead of a TCP connect + key exchange
+- idle masters close themselves after SSH_POOL_IDLE_TIMEOUT
+  (ControlPersist) and are dropped from the pool by evict_idle()
+- a master that died (host rebooted or replaced) is detected with
+  `ssh -O check` / exit 255 and reopened on the next command; when a
+  master can't be opened the command connects directly, and so do the
+  following ones for a short backoff instead of retrying the master
+- per-host and global limits on concurrent commands, shared by threads and
+  event loops, so a burst against hundreds of machines queues instead of
+  forking hundreds of ssh processes
+- run() for threads and arun() for asyncio, both returning
+  subprocess.CompletedProcess and raising subprocess.TimeoutExpired like
+  subprocess.run
+"""
+import os
+import time
+import shlex
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+SSH_POOL_IDLE_TIMEOUT = int(os.getenv("SSH_POOL_IDLE_TIMEOUT", "300"))
+# sshd's default MaxSessions is 10 channels per connection
+SSH_POOL_MAX_PER_HOST = int(os.getenv("SSH_POOL_MAX_PER_HOST", "8"))
+SSH_POOL_MAX_TOTAL = int(os.getenv("SSH_POOL_MAX_TOTAL", "64"))
+
+# A master that failed to open is not retried for this long (direct connections meanwhile)
+MASTER_RETRY_BACKOFF = 15.0
+# Masters are re-checked with `ssh -O check` at most this often
+MASTER_CHECK_INTERVAL = 30.0
+SWEEP_INTERVAL = 60.0
+
+SSH_BASE_OPTIONS = [
+    "-o", "StrictHostKeyChecking=no",
+    "-o", "UserKnownHostsFile=/dev/null",
+    "-o", "LogLevel=ERROR",
+    "-o", "BatchMode=yes",
+    "-o", "ServerAliveInterval=15",
+    "-o", "ServerAliveCountMax=3",
+]
+
+PoolKey = Tuple[str, str, int, Optional[str]]
+
+
+class _SharedLimit:
+    """
+    Counting semaphore usable from threads (`with`) and from any event loop
+    (`async with`), so both paths draw on the same slots.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._used = 0
+        self._cond = threading.Condition()
+        self._async_waiters: "deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]" = deque()
+
+    def acquire(self):
+        with self._cond:
+            while self._used >= self.limit:
+                self._cond.wait()
+            self._used += 1
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._used < self.limit:
+                    self._used += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._cond:
+                    try:
+                        self._async_waiters.remove((loop, waiter))
+                    except ValueError:
+                        # Already woken for a free slot: pass the wakeup on
+                        self._wake_async_locked()
+                raise
+
+    def release(self):
+        with self._cond:
+            self._used -= 1
+            # Wake one waiter of each kind; whoever loses the race waits again
+            self._cond.notify()
+            self._wake_async_locked()
+
+    def _wake_async_locked(self):
+        while self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+                return
+            except RuntimeError:
+                continue  # loop closed
+
+    @property
+    def in_use(self) -> int:
+        with self._cond:
+            return self._used
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+@dataclass
+class _Master:
+    """One multiplexed connection and its bookkeeping"""
+    key: PoolKey
+    control_path: str
+    slots: _SharedLimit
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    active: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    last_checked: float = 0.0
+    failed_at: float = 0.0
+
+
+class SSHPool:
+    """
+    Process-wide pool of multiplexed SSH connections.
+
+    Usage (threads):
+        result = get_ssh_pool().run(host, port, "nvidia-smi", timeout=30)
+
+    Usage (asyncio):
+        result = await get_ssh_pool().arun(host, port, "nvidia-smi", timeout=30)
+    """
+
+    def __init__(
+        self,
+        control_dir: Optional[str] = None,
+        idle_timeout: int = SSH_POOL_IDLE_TIMEOUT,
+        max_per_host: int = SSH_POOL_MAX_PER_HOST,
+        max_total: int = SSH_POOL_MAX_TOTAL,
+    ):
+        # Unix socket paths are limited to ~100 chars: short dir, hashed names
+        self.control_dir = control_dir or os.path.join(tempfile.gettempdir(), f"dumont-ssh-{os.getuid()}")
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+        self.idle_timeout = idle_timeout
+        self.max_per_host = max_per_host
+        self.max_total = max_total
+
+        self._masters: Dict[PoolKey, _Master] = {}
+        self._lock = threading.Lock()
+        self._total_slots = _SharedLimit(max_total)
+        self._last_sweep = time.monotonic()
+        self._stats: Dict[str, int] = defaultdict(int)
+
+    # ==================== CONNECTIONS ====================
+
+    @staticmethod
+    def make_key(host: str, port: int, user: str = "root", key_path: Optional[str] = None) -> PoolKey:
+        return (user, host, int(port), os.path.expanduser(key_path) if key_path else None)
+
+    def _master(self, key: PoolKey) -> _Master:
+        with self._lock:
+            master = self._masters.get(key)
+            if master is None:
+                digest = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+                master = self._masters[key] = _Master(
+                    key=key,
+                    control_path=os.path.join(self.control_dir, digest),
+                    slots=_SharedLimit(self.max_per_host),
+                )
+            return master
+
+    @staticmethod
+    def _base_args(key: PoolKey, connect_timeout: int) -> List[str]:
+        user, host, port, key_path = key
+        args = ["ssh", *SSH_BASE_OPTIONS, "-o", f"ConnectTimeout={connect_timeout}", "-p", str(port)]
+        if key_path:
+            args.extend(["-i", key_path])
+        return args
+
+    def _control_args(self, master: _Master) -> List[str]:
+        return ["-o", f"ControlPath={master.control_path}", "-o", "ControlMaster=no"]
+
+    def _check(self, master: _Master) -> bool:
+        """`ssh -O check`: the master process is alive and answering on its socket"""
+        user, host, _, _ = master.key
+        try:
+            result = subprocess.run(
+                ["ssh", "-o", f"ControlPath={master.control_path}", "-O", "check", f"{user}@{host}"],
+                stdin=subprocess.DEVNULL, capture_output=True, timeout=5,
+            )
+            return result.returncode == 0
+        except (OSError, subprocess.SubprocessError):
+            return False
+
+    def _ensure_master(self, master: _Master, connect_timeout: int) -> bool:
+        """
+        Open the master connection if needed.
+
+        Returns:
+            True if commands can go through the master, False to connect
+            directly (the master could not be opened, now or recently)
+        """
+        with master.lock:
+            now = time.monotonic()
+            if os.path.exists(master.control_path):
+                if now - master.last_checked < MASTER_CHECK_INTERVAL:
+                    return True
+                if self._check(master):
+                    master.last_checked = now
+                    return True
+                self._close_master(master)
+
+            if now - master.failed_at < MASTER_RETRY_BACKOFF:
+                return False
+
+            user, host, _, _ = master.key
+            args = self._base_args(master.key, connect_timeout) + [
+                "-M", "-N", "-f",
+                "-o", f"ControlPath={master.control_path}",
+                "-o", f"ControlPersist={self.idle_timeout}",
+                f"{user}@{host}",
+            ]
+            try:
+                # -f backgrounds after authentication; the daemon must not hold our pipes
+                result = subprocess.run(
+                    args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL, timeout=connect_timeout + 10,
+                )
+                opened = result.returncode == 0 and os.path.exists(master.control_path)
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.debug(f"SSH master to {host}:{master.key[2]} failed: {e}")
+                opened = False
+
+            if not opened:
+                master.failed_at = now
+                self._stats["master_failures"] += 1
+                logger.debug(f"SSH master to {host}:{master.key[2]} unavailable, connecting directly")
+                return False
+
+            master.last_checked = now
+            master.failed_at = 0.0
+            self._stats["masters_opened"] += 1
+            logger.debug(f"SSH master opened to {user}@{host}:{master.key[2]}")
+            return True
+
+    def _close_master(self, master: _Master):
+        user, host, _, _ = master.key
+        try:
+            subprocess.run(
+                ["ssh", "-o", f"ControlPath={master.control_path}", "-O", "exit", f"{user}@{host}"],
+                stdin=subprocess.DEVNULL, capture_output=True, timeout=5,
+            )
+        except (OSError, subprocess.SubprocessError):
+            pass
+        try:
+            os.unlink(master.control_path)
+        except OSError:
+            pass
+        master.last_checked = 0.0
+
+    def _command_args(self, key: PoolKey, master: _Master, command: str, use_master: bool, connect_timeout: int) -> List[str]:
+        args = self._base_args(key, connect_timeout)
+        if use_master:
+            args.extend(self._control_args(master))
+        user, host, _, _ = key
+        args.extend([f"{user}@{host}", command])
+        return args
+
+    def _after_command(self, master: _Master, use_master: bool, returncode: int):
+        master.last_used = time.monotonic()
+        self._stats["commands"] += 1
+        if not use_master:
+            self._stats["direct"] += 1
+        elif returncode == 255:
+            # ssh-level failure: don't trust this master until it checks out again
+            master.last_checked = 0.0
+
+    # ==================== SYNC ====================
+
+    def run(
+        self,
+        host: str,
+        port: int,
+        command: str,
+        user: str = "root",
+        key_path: Optional[str] = None,
+        timeout: Optional[float] = None,
+        input: Optional[str] = None,
+        connect_timeout: int = 10,
+        text: bool = True,
+    ) -> subprocess.CompletedProcess:
+        """
+        Run a command on host:port over the pooled connection.
+
+        Raises:
+            subprocess.TimeoutExpired: command exceeded timeout
+        """
+        key = self.make_key(host, port, user, key_path)
+        master = self._master(key)
+        use_master = self._ensure_master(master, connect_timeout)
+        args = self._command_args(key, master, command, use_master, connect_timeout)
+
+        with master.slots, self._total_slots:
+            with self._lock:
+                master.active += 1
+            try:
+                result = subprocess.run(
+                    args,
+                    input=input,
+                    stdin=subprocess.DEVNULL if input is None else None,
+                    capture_output=True,
+                    text=text,
+                    timeout=timeout,
+                )
+            finally:
+                with self._lock:
+                    master.active -= 1
+
+        self._after_command(master, use_master, result.returncode)
+        if self._sweep_due():
+            self.evict_idle()
+        return result
+
+    def ssh_command(
+        self,
+        host: str,
+        port: int,
+        user: str = "root",
+        key_path: Optional[str] = None,
+        connect_timeout: int = 10,
+    ) -> str:
+        """`ssh ...` string reusing the pooled connection, for rsync -e"""
+        key = self.make_key(host, port, user, key_path)
+        master = self._master(key)
+        args = self._base_args(key, connect_timeout)
+        if self._ensure_master(master, connect_timeout):
+            args.extend(self._control_args(master))
+        return " ".join(shlex.quote(arg) for arg in args)
+
+    # ==================== ASYNC ====================
+
+    @staticmethod
+    async def _kill(proc: asyncio.subprocess.Process):
+        """Kill and reap a command (the wait is shielded: a second cancellation still reaps it)"""
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        await asyncio.shield(proc.wait())
+
+    async def arun(
+        self,
+        host: str,
+        port: int,
+        command: str,
+        user: str = "root",
+        key_path: Optional[str] = None,
+        timeout: Optional[float] = None,
+        input: Optional[str] = None,
+        connect_timeout: int = 10,
+        text: bool = True,
+    ) -> subprocess.CompletedProcess:
+        """Async run(); opening a master runs in the default executor"""
+        key = self.make_key(host, port, user, key_path)
+        master = self._master(key)
+        loop = asyncio.get_running_loop()
+        use_master = await loop.run_in_executor(None, self._ensure_master, master, connect_timeout)
+        args = self._command_args(key, master, command, use_master, connect_timeout)
+
+        data = input.encode() if isinstance(input, str) else input
+        async with master.slots, self._total_slots:
+            with self._lock:
+                master.active += 1
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *args,
+                    stdin=subprocess.PIPE if data is not None else subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
+                try:
+                    stdout, stderr = await asyncio.wait_for(proc.communicate(data), timeout)
+                except asyncio.TimeoutError:
+                    await self._kill(proc)
+                    raise subprocess.TimeoutExpired(args, timeout)
+                except BaseException:
+                    # Cancelled (or interrupted): don't leave the ssh process behind
+                    await self._kill(proc)
+                    raise
+            finally:
+                with self._lock:
+                    master.active -= 1
+
+        if text:
+            stdout = stdout.decode(errors="replace")
+            stderr = stderr.decode(errors="replace")
+        self._after_command(master, use_master, proc.returncode)
+        if self._sweep_due():
+            # Closing masters blocks on `ssh -O exit`: keep it off the event loop
+            loop.run_in_executor(None, self.evict_idle)
+        return subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
+
+    # ==================== MAINTENANCE ====================
+
+    def _sweep_due(self) -> bool:
+        """True (once per SWEEP_INTERVAL) when the caller should run evict_idle()"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep < SWEEP_INTERVAL:
+                return False
+            self._last_sweep = now
+            return True
+
+    def evict_idle(self, max_idle: Optional[float] = None) -> int:
+        """
+        Close masters with no command for max_idle seconds (default: idle_timeout).
+
+        Returns:
+            Number of masters evicted
+        """
+        max_idle = self.idle_timeout if max_idle is None else max_idle
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                m for m in self._masters.values()
+                if m.active == 0 and now - m.last_used >= max_idle
+            ]
+            for master in idle:
+                del self._masters[master.key]
+        for master in idle:
+            if os.path.exists(master.control_path):
+                self._close_master(master)
+        if idle:
+            logger.debug(f"SSH pool: evicted {len(idle)} idle connections")
+        return len(idle)
+
+    def close(self, host: str, port: int, user: str = "root", key_path: Optional[str] = None):
+        """Close the pooled connection to a host (e.g. instance destroyed)"""
+        key = self.make_key(host, port, user, key_path)
+        with self._lock:
+            master = self._masters.pop(key, None)
+        if master and os.path.exists(master.control_path):
+            self._close_master(master)
+
+    def close_all(self):
+        with self._lock:
+            masters = list(self._masters.values())
+            self._masters.clear()
+        for master in masters:
+            if os.path.exists(master.control_path):
+                self._close_master(master)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            masters = list(self._masters.values())
+        return {
+            "hosts": len(masters),
+            "connected": sum(1 for m in masters if os.path.exists(m.control_path)),
+            "active_commands": sum(m.active for m in masters),
+            **self._stats,
+        }
+
+
+_pool: Optional[SSHPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ssh_pool() -> SSHPool:
+    """Process-wide SSH pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SSHPool()
+        return _pool
@@ -0,0 +1,592 @@
+"""
+Vast.ai HTTP client
+
+One pooled client per API key, shared by VastProvider and the warm-pool
+services, with:
+- keep-alive connection pools (requests.Session for sync callers, one
+  aiohttp.ClientSession per event loop for async callers)
+- a process-wide token-bucket rate limiter shared by both faces
+- retries with full-jitter backoff (429 always, 5xx/connection errors only
+  for idempotent methods), honoring Retry-After
+- per-endpoint latency metrics (get_metrics)
+- a short-TTL /bundles cache with single-flight loading (search_bundles),
+  invalidated per offer when an offer is rented (invalidate_offer)
+"""
+import os
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ...core.constants import VAST_API_URL, VAST_DEFAULT_TIMEOUT
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+logger = logging.getLogger(__name__)
+
+
+# Vast.ai throttles per key/IP; defaults stay under the observed limits
+VAST_RATE_LIMIT_RPS = float(os.getenv("VAST_RATE_LIMIT_RPS", "5"))
+VAST_RATE_LIMIT_BURST = int(os.getenv("VAST_RATE_LIMIT_BURST", "10"))
+
+# Connections kept per host
+VAST_POOL_SIZE = 16
+
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+# Offer searches: identical queries within the TTL share one /bundles call
+VAST_OFFER_CACHE_TTL = float(os.getenv("VAST_OFFER_CACHE_TTL", "20"))
+OFFER_CACHE_MAX_ENTRIES = 256
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "DELETE"}
+RETRY_STATUSES = {500, 502, 503, 504}
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_name(method: str, path: str) -> str:
+    """Metrics key for a request: numeric path segments collapse to {id}"""
+    path = path.split("?", 1)[0].rstrip("/") or "/"
+    return f"{method.upper()} {_ID_SEGMENT.sub('/{id}', path)}"
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Retry-After when given, otherwise full jitter over an exponential window"""
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_CAP)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket.
+
+    Sync callers block in acquire(); async callers await acquire_async(),
+    which reserves a token under the lock and sleeps without blocking the loop.
+    """
+
+    def __init__(self, rate: float = VAST_RATE_LIMIT_RPS, burst: int = VAST_RATE_LIMIT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token (possibly going negative) and return how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+@dataclass
+class EndpointStats:
+    """Latency and outcome counters for one endpoint"""
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    recent_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=256))
+
+    def to_dict(self) -> Dict[str, Any]:
+        recent = sorted(self.recent_ms)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "avg_ms": round(self.total_ms / self.requests, 1) if self.requests else 0.0,
+            "p95_ms": round(recent[math.ceil(len(recent) * 0.95) - 1], 1) if recent else 0.0,
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+@dataclass
+class AsyncResponse:
+    """Body-read response from the async face (the aiohttp response is already released)"""
+    status: int
+    headers: Dict[str, str]
+    text: str
+
+    def json(self) -> Any:
+        return json.loads(self.text) if self.text else None
+
+
+# Result of a shared load whose leader was cancelled: a waiter loads instead
+_ABANDONED = object()
+
+
+class OfferCache:
+    """
+    Short-TTL cache of /bundles results keyed by normalized query.
+
+    Loads are single-flight: while a query is in flight, identical sync or
+    async searches wait on the same Future instead of issuing their own call.
+    If the caller running the load is cancelled, a waiter takes it over;
+    the cancellation itself is never shared.
+    Offers invalidated as consumed are dropped from cached results and
+    filtered out of results that were already in flight, for one TTL.
+    Cached offer dicts are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, ttl: float = VAST_OFFER_CACHE_TTL, max_entries: int = OFFER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._consumed: Dict[Any, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(path: str, params: Optional[Dict[str, Any]]) -> str:
+        """Same key for queries differing only in slash, param order or JSON key order"""
+        normalized = {}
+        for name, value in (params or {}).items():
+            if name == "q" and isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            normalized[name] = value
+        return f"{path.rstrip('/')}?{json.dumps(normalized, sort_keys=True, default=str)}"
+
+    def _lookup(self, key: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Future], bool]:
+        """(cached offers, in-flight future, caller is the leader) under the lock"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1], None, False
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return None, future, False
+            self.misses += 1
+            future = self._inflight[key] = Future()
+            return None, future, True
+
+    def _filter(self, offers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not self._consumed:
+            return list(offers)
+        return [o for o in offers if o.get("id") not in self._consumed]
+
+    def _finish(self, key: str, future: Future, offers: Optional[List[Dict[str, Any]]] = None,
+                error: Optional[BaseException] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None:
+                offers = self._filter(offers)
+                if self.ttl > 0:
+                    if len(self._entries) >= self.max_entries:
+                        self._evict()
+                    self._entries[key] = (time.monotonic() + self.ttl, offers)
+        if error is not None:
+            future.set_exception(error)
+            raise error
+        future.set_result(offers)
+        return list(offers)
+
+    def _abandon(self, key: str, future: Future):
+        """Leader cancelled (or interrupted): release the key and wake waiters to retry"""
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        future.set_result(_ABANDONED)
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def get_or_load(self, key: str, loader: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        while True:
+            offers, future, leader = self._lookup(key)
+            if offers is not None:
+                return list(offers)
+            if leader:
+                break
+            offers = future.result()
+            if offers is not _ABANDONED:
+                with self._lock:
+                    return self._filter(offers)
+        try:
+            offers = loader()
+        except Exception as e:
+            return self._finish(key, future, error=e)
+        except BaseException:
+            self._abandon(key, future)
+            raise
+        return self._finish(key, future, offers)
+
+    async def aget_or_load(self, key: str, loader: Callable[[], Any]) -> List[Dict[str, Any]]:
+        while True:
+            offers, future, leader = self._lookup(key)
+            if offers is not None:
+                return list(offers)
+            if leader:
+                break
+            # shield: a cancelled waiter must not cancel the shared Future
+            offers = await asyncio.shield(asyncio.wrap_future(future))
+            if offers is not _ABANDONED:
+                with self._lock:
+                    return self._filter(offers)
+        try:
+            offers = await loader()
+        except Exception as e:
+            return self._finish(key, future, error=e)
+        except BaseException:
+            # CancelledError (e.g. a wait_for timeout in race/failover) stays with this caller
+            self._abandon(key, future)
+            raise
+        return self._finish(key, future, offers)
+
+    def invalidate_offer(self, offer_id: Any):
+        """Drop a rented (or vanished) offer from every cached and in-flight result"""
+        now = time.monotonic()
+        with self._lock:
+            self._consumed = {oid: exp for oid, exp in self._consumed.items() if exp > now}
+            self._consumed[offer_id] = now + max(self.ttl, 1.0)
+            for key, (expires, offers) in list(self._entries.items()):
+                kept = [o for o in offers if o.get("id") != offer_id]
+                if len(kept) != len(offers):
+                    self._entries[key] = (expires, kept)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+# Shared by every client in the process: Vast limits by key and source IP
+_rate_limiter = RateLimiter()
+
+
+class VastClient:
+    """
+    Pooled Vast.ai API client.
+
+    Paths are relative to api_url ("/instances/123/"). Sync methods return
+    requests.Response and async methods return AsyncResponse; neither raises
+    on HTTP errors, so callers keep their own status handling.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_url: str = VAST_API_URL,
+        timeout: float = VAST_DEFAULT_TIMEOUT,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.api_key = api_key
+        self.api_url = api_url.rstrip("/")
+        self.timeout = timeout
+        self.headers = {
+            "Accept": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        }
+        self.rate_limiter = rate_limiter or _rate_limiter
+
+        self._session: Optional[requests.Session] = None
+        self._async_sessions: Dict[asyncio.AbstractEventLoop, "aiohttp.ClientSession"] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.offer_cache = OfferCache()
+
+    # ==================== SYNC ====================
+
+    @property
+    def session(self) -> requests.Session:
+        """Keep-alive session shared by all sync callers"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.headers.update(self.headers)
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=VAST_POOL_SIZE)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        timeout: Optional[float] = None,
+        retries: int = MAX_RETRIES,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Send a request through the shared session with rate limiting and retries.
+
+        Args:
+            retries: Retry budget (0 for probes that must fail fast)
+
+        Raises:
+            requests.RequestException: connection/timeout errors after retries
+        """
+        method = method.upper()
+        endpoint = endpoint_name(method, path)
+        url = f"{self.api_url}{path}"
+        retryable = method in IDEMPOTENT_METHODS
+
+        for attempt in range(retries + 1):
+            self.rate_limiter.acquire()
+            start = time.monotonic()
+            try:
+                resp = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(endpoint, start, error=True)
+                if not retryable or attempt == retries:
+                    raise
+                self._record_retry(endpoint)
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            self._record(endpoint, start, status=resp.status_code)
+            if attempt < retries and self._should_retry(resp.status_code, retryable):
+                self._record_retry(endpoint)
+                wait = backoff_delay(attempt, resp.headers.get("Retry-After"))
+                logger.debug(f"Vast.ai {endpoint} -> {resp.status_code}, retrying in {wait:.1f}s")
+                time.sleep(wait)
+                continue
+            return resp
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def put(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PUT", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", path, **kwargs)
+
+    def search_bundles(
+        self,
+        params: Dict[str, Any],
+        path: str = "/bundles/",
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Offer search (GET /bundles) through the offer cache.
+
+        Raises:
+            requests.HTTPError: non-2xx response (not cached)
+        """
+        def load() -> List[Dict[str, Any]]:
+            resp = self.get(path, params=params, timeout=timeout)
+            resp.raise_for_status()
+            data = resp.json()
+            return data.get("offers", []) if isinstance(data, dict) else data
+
+        return self.offer_cache.get_or_load(OfferCache.make_key(path, params), load)
+
+    def invalidate_offer(self, offer_id: Any):
+        """Call when an offer is rented or found gone so searches stop returning it"""
+        self.offer_cache.invalidate_offer(offer_id)
+
+    # ==================== ASYNC ====================
+
+    def _get_async_session(self) -> "aiohttp.ClientSession":
+        """aiohttp sessions are bound to a loop: keep one per running loop"""
+        if not HAS_AIOHTTP:
+            raise RuntimeError("aiohttp is required for async Vast.ai calls")
+        loop = asyncio.get_running_loop()
+        session = self._async_sessions.get(loop)
+        if session is None or session.closed:
+            with self._lock:
+                for other in [l for l in self._async_sessions if l.is_closed()]:
+                    del self._async_sessions[other]
+                session = aiohttp.ClientSession(
+                    headers=self.headers,
+                    connector=aiohttp.TCPConnector(limit_per_host=VAST_POOL_SIZE, keepalive_timeout=60),
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                )
+                self._async_sessions[loop] = session
+        return session
+
+    async def arequest(
+        self,
+        method: str,
+        path: str,
+        timeout: Optional[float] = None,
+        retries: int = MAX_RETRIES,
+        **kwargs,
+    ) -> AsyncResponse:
+        """
+        Async request through the loop's pooled session, same policy as request().
+
+        Raises:
+            aiohttp.ClientError / asyncio.TimeoutError: after retries
+        """
+        method = method.upper()
+        endpoint = endpoint_name(method, path)
+        url = f"{self.api_url}{path}"
+        retryable = method in IDEMPOTENT_METHODS
+        if timeout:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+
+        for attempt in range(retries + 1):
+            await self.rate_limiter.acquire_async()
+            session = self._get_async_session()
+            start = time.monotonic()
+            try:
+                async with session.request(method, url, **kwargs) as resp:
+                    result = AsyncResponse(status=resp.status, headers=dict(resp.headers), text=await resp.text())
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                self._record(endpoint, start, error=True)
+                if not retryable or attempt == retries:
+                    raise
+                self._record_retry(endpoint)
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            self._record(endpoint, start, status=result.status)
+            if attempt < retries and self._should_retry(result.status, retryable):
+                self._record_retry(endpoint)
+                await asyncio.sleep(backoff_delay(attempt, result.headers.get("Retry-After")))
+                continue
+            return result
+
+    async def aget(self, path: str, **kwargs) -> AsyncResponse:
+        return await self.arequest("GET", path, **kwargs)
+
+    async def aput(self, path: str, **kwargs) -> AsyncResponse:
+        return await self.arequest("PUT", path, **kwargs)
+
+    async def apost(self, path: str, **kwargs) -> AsyncResponse:
+        return await self.arequest("POST", path, **kwargs)
+
+    async def adelete(self, path: str, **kwargs) -> AsyncResponse:
+        return await self.arequest("DELETE", path, **kwargs)
+
+    async def asearch_bundles(
+        self,
+        params: Dict[str, Any],
+        path: str = "/bundles/",
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Async offer search through the same cache as search_bundles().
+
+        Raises:
+            RuntimeError: non-200 response (not cached)
+        """
+        async def load() -> List[Dict[str, Any]]:
+            resp = await self.aget(path, params=params, timeout=timeout)
+            if resp.status != 200:
+                raise RuntimeError(f"Vast.ai offer search failed: {resp.status} - {resp.text[:200]}")
+            data = resp.json()
+            return data.get("offers", []) if isinstance(data, dict) else data
+
+        return await self.offer_cache.aget_or_load(OfferCache.make_key(path, params), load)
+
+    async def aclose(self):
+        """Close the async session of the running loop"""
+        session = self._async_sessions.pop(asyncio.get_running_loop(), None)
+        if session and not session.closed:
+            await session.close()
+
+    # ==================== METRICS ====================
+
+    @staticmethod
+    def _should_retry(status: int, retryable: bool) -> bool:
+        # 429 means the request was not processed, so it is safe for any method
+        return status == 429 or (retryable and status in RETRY_STATUSES)
+
+    def _record(self, endpoint: str, start: float, status: Optional[int] = None, error: bool = False):
+        elapsed_ms = (time.monotonic() - start) * 1000
+        with self._lock:
+            stats = self._stats[endpoint]
+            stats.requests += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.recent_ms.append(elapsed_ms)
+            if status == 429:
+                stats.rate_limited += 1
+            if error or (status is not None and status >= 500):
+                stats.errors += 1
+
+    def _record_retry(self, endpoint: str):
+        with self._lock:
+            self._stats[endpoint].retries += 1
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint counters and latency (avg/p95/max ms over recent calls)"""
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in sorted(self._stats.items())}
+
+
+_clients: Dict[tuple, VastClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_vast_client(api_key: str, api_url: str = VAST_API_URL) -> VastClient:
+    """
+    Shared client for an API key (one connection pool per key and process).
+
+    Usage:
+        client = get_vast_client(api_key)
+        resp = client.get("/instances/", params={"owner": "me"})
+    """
+    key = (api_key, api_url.rstrip("/"))
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = VastClient(api_key, api_url)
+    return client
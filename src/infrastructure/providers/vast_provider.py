@@ -3,9 +3,12 @@ Vast.ai GPU Provider Implementation
 Implements IGpuProvider interface (Dependency Inversion Principle)
 """
 import json
+import time
 import logging
 import requests
-from typing import List, Optional, Dict, Any
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Set, Tuple
 from datetime import datetime
 
 from ...core.exceptions import (
@@ -20,6 +23,7 @@ from ...core.exceptions import (
 from ...core.constants import VAST_API_URL, VAST_DEFAULT_TIMEOUT
 from ...domain.repositories import IGpuProvider
 from ...domain.models import GpuOffer, Instance
+from .vast_client import get_vast_client
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +37,11 @@ class VastProvider(IGpuProvider):
     # Tipos de máquina suportados pelo VAST.ai
     MACHINE_TYPES = ["on-demand", "interruptible", "bid"]
 
+    # Market sweeps: concurrent requests to the API host
+    MARKET_FETCH_CONCURRENCY = 8
+    # Maior limit pedido numa query larga; GPUs são agrupadas para caber nele
+    MARKET_QUERY_MAX_LIMIT = 1000
+
     def __init__(self, api_key: str, api_url: str = VAST_API_URL, timeout: int = VAST_DEFAULT_TIMEOUT):
         """
         Initialize Vast provider
@@ -49,6 +58,19 @@ class VastProvider(IGpuProvider):
         self.api_url = api_url
         self.timeout = timeout
         self.headers = {"Authorization": f"Bearer {api_key}"}
+        # Pooled client shared with every other user of this key (rate limit, retries, metrics)
+        self.client = get_vast_client(api_key, api_url)
+
+    def _get_bundles(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        GET /bundles through the shared client's offer cache: identical
+        queries within a few seconds (concurrent deploys, failover right
+        after a market sweep) share one API call.
+
+        Returns:
+            Raw offer dicts (shared with the cache; do not mutate)
+        """
+        return self.client.search_bundles(params, timeout=self.timeout)
 
     def _handle_vast_error(self, response: requests.Response, context: str = "", offer_id: int = None) -> None:
         """
@@ -211,15 +233,7 @@ class VastProvider(IGpuProvider):
         }
 
         try:
-            resp = requests.get(
-                f"{self.api_url}/bundles",
-                params=params,
-                headers=self.headers,
-                timeout=self.timeout,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            offers_data = data.get("offers", []) if isinstance(data, dict) else data
+            offers_data = self._get_bundles(params)
 
             # Filter by region if specified
             if region:
@@ -306,15 +320,7 @@ class VastProvider(IGpuProvider):
             params["type"] = machine_type
 
         try:
-            resp = requests.get(
-                f"{self.api_url}/bundles",
-                params=params,
-                headers=self.headers,
-                timeout=self.timeout,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            offers_data = data.get("offers", []) if isinstance(data, dict) else data
+            offers_data = self._get_bundles(params)
 
             # Filtrar por região
             if region:
@@ -354,38 +360,124 @@ class VastProvider(IGpuProvider):
         """
         Busca dados de mercado completos para todas as GPUs e tipos.
 
+        Faz queries largas de /bundles por tipo de máquina (grupos de GPUs
+        cujo limite total cabe em MARKET_QUERY_MAX_LIMIT, em paralelo) e
+        particiona localmente por GPU. Se a resposta vier truncada (tamanho
+        == limite), as GPUs que podem ter ficado incompletas são buscadas
+        individualmente, também em paralelo.
+
         Args:
             gpus_to_monitor: Lista de GPUs para monitorar
             machine_types: Lista de tipos de máquina (padrão: todos)
             max_price: Preço máximo por hora
-            limit_per_query: Limite de resultados por query
+            limit_per_query: Limite de resultados por GPU/tipo
 
         Returns:
             Dict agrupado por "gpu_name:machine_type" -> List[GpuOffer]
         """
         machine_types = machine_types or self.MACHINE_TYPES
-        all_offers = {}
-
-        for gpu_name in gpus_to_monitor:
-            for machine_type in machine_types:
-                key = f"{gpu_name}:{machine_type}"
+        start = time.time()
+        all_offers = {
+            f"{gpu_name}:{machine_type}": []
+            for gpu_name in gpus_to_monitor
+            for machine_type in machine_types
+        }
+        backfill: List[Tuple[str, str]] = []
+
+        group_size = max(1, self.MARKET_QUERY_MAX_LIMIT // max(1, limit_per_query))
+        groups = [gpus_to_monitor[i:i + group_size] for i in range(0, len(gpus_to_monitor), group_size)]
+        queries = [(machine_type, group) for machine_type in machine_types for group in groups]
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.MARKET_FETCH_CONCURRENCY, len(queries)))) as pool:
+            futures = {
+                pool.submit(
+                    self._fetch_market_type, machine_type, group, max_price, limit_per_query
+                ): (machine_type, group)
+                for machine_type, group in queries
+            }
+            for future, (machine_type, group) in futures.items():
                 try:
-                    offers = self.search_offers_by_type(
+                    by_gpu, complete = future.result()
+                except Exception as e:
+                    logger.warning(f"Wide market query failed for {machine_type}, querying per GPU: {e}")
+                    backfill.extend((gpu_name, machine_type) for gpu_name in group)
+                    continue
+                for gpu_name in group:
+                    all_offers[f"{gpu_name}:{machine_type}"] = by_gpu.get(gpu_name, [])[:limit_per_query]
+                    if gpu_name not in complete:
+                        backfill.append((gpu_name, machine_type))
+
+        if backfill:
+            logger.debug(f"Backfilling {len(backfill)} GPU/type combinations")
+            with ThreadPoolExecutor(max_workers=self.MARKET_FETCH_CONCURRENCY) as pool:
+                futures = {
+                    pool.submit(
+                        self.search_offers_by_type,
                         machine_type=machine_type,
                         gpu_name=gpu_name,
                         max_price=max_price,
                         limit=limit_per_query,
-                    )
-                    all_offers[key] = offers
-                    logger.debug(f"Fetched {len(offers)} offers for {key}")
-                except Exception as e:
-                    logger.warning(f"Failed to fetch {key}: {e}")
-                    all_offers[key] = []
+                    ): f"{gpu_name}:{machine_type}"
+                    for gpu_name, machine_type in backfill
+                }
+                for future, key in futures.items():
+                    try:
+                        all_offers[key] = future.result()
+                        logger.debug(f"Fetched {len(all_offers[key])} offers for {key}")
+                    except Exception as e:
+                        logger.warning(f"Failed to fetch {key}: {e}")
 
         total = sum(len(v) for v in all_offers.values())
-        logger.info(f"Total market data fetched: {total} offers across {len(all_offers)} GPU/type combinations")
+        logger.info(f"Total market data fetched: {total} offers across {len(all_offers)} GPU/type combinations "
+                    f"in {time.time() - start:.1f}s")
         return all_offers
 
+    def _fetch_market_type(
+        self,
+        machine_type: str,
+        gpu_names: List[str],
+        max_price: float,
+        limit_per_gpu: int,
+    ) -> Tuple[Dict[str, List[GpuOffer]], Set[str]]:
+        """
+        Uma query de /bundles para várias GPUs de um tipo de máquina.
+
+        Returns:
+            Tuple (ofertas por GPU ordenadas por preço, GPUs com resultado completo)
+        """
+        # A API pode limitar abaixo do pedido: nunca pedir mais que o teto conhecido
+        limit = min(limit_per_gpu * len(gpu_names), self.MARKET_QUERY_MAX_LIMIT)
+        query = {
+            "rentable": {"eq": True},
+            "num_gpus": {"eq": 1},
+            "dph_total": {"lte": max_price},
+            "gpu_name": {"in": list(gpu_names)},
+        }
+        params = {"q": json.dumps(query), "order": "dph_total", "limit": limit}
+        if machine_type and machine_type != "all":
+            params["type"] = machine_type
+
+        offers_data = self._get_bundles(params)
+
+        wanted = set(gpu_names)
+        by_gpu: Dict[str, List[GpuOffer]] = defaultdict(list)
+        for offer_data in offers_data:
+            gpu_name = offer_data.get("gpu_name")
+            if gpu_name not in wanted:
+                continue
+            try:
+                by_gpu[gpu_name].append(self._parse_offer_extended(offer_data, machine_type or "on-demand"))
+            except Exception as e:
+                logger.warning(f"Failed to parse offer: {e}")
+
+        # Sorted by price: a truncated response holds every offer up to its last
+        # price, so only GPUs with fewer than limit_per_gpu offers may be missing some
+        if len(offers_data) < limit:
+            complete = wanted
+        else:
+            complete = {name for name in wanted if len(by_gpu[name]) >= limit_per_gpu}
+        return dict(by_gpu), complete
+
     def create_instance(
         self,
         offer_id: int,
@@ -428,14 +520,13 @@ class VastProvider(IGpuProvider):
             payload["label"] = label
 
         try:
-            url = f"{self.api_url}/asks/{offer_id}/"
-            logger.debug(f"create_instance: PUT {url}")
+            path = f"/asks/{offer_id}/"
+            logger.debug(f"create_instance: PUT {self.api_url}{path}")
             logger.debug(f"create_instance: payload={payload}")
 
-            resp = requests.put(
-                url,
+            resp = self.client.put(
+                path,
                 json=payload,
-                headers=self.headers,
                 timeout=self.timeout,
             )
 
@@ -453,11 +544,15 @@ class VastProvider(IGpuProvider):
                 raise VastAPIException("VAST.ai não retornou ID da instância. A oferta pode ter expirado.")
 
             logger.info(f"Created instance {instance_id}")
+            self.client.invalidate_offer(offer_id)
 
             # Get full instance details
             return self.get_instance(instance_id)
 
-        except (VastAPIException, OfferUnavailableException, InsufficientBalanceException):
+        except OfferUnavailableException:
+            self.client.invalidate_offer(offer_id)
+            raise
+        except (VastAPIException, InsufficientBalanceException):
             raise  # Re-raise our custom exceptions
         except requests.exceptions.Timeout:
             raise ServiceUnavailableException(
@@ -538,10 +633,9 @@ class VastProvider(IGpuProvider):
 
         try:
             # Usa endpoint /bids/ ao invés de /asks/
-            resp = requests.put(
-                f"{self.api_url}/bids/{offer_id}/",
+            resp = self.client.put(
+                f"/bids/{offer_id}/",
                 json=payload,
-                headers=self.headers,
                 timeout=self.timeout,
             )
 
@@ -555,10 +649,14 @@ class VastProvider(IGpuProvider):
                 raise VastAPIException("VAST.ai não retornou ID da instância spot. O bid pode ter sido rejeitado.")
 
             logger.info(f"Created SPOT instance {instance_id} with bid ${bid_price:.4f}/hr")
+            self.client.invalidate_offer(offer_id)
 
             return self.get_instance(instance_id)
 
-        except (VastAPIException, OfferUnavailableException, InsufficientBalanceException):
+        except OfferUnavailableException:
+            self.client.invalidate_offer(offer_id)
+            raise
+        except (VastAPIException, InsufficientBalanceException):
             raise
         except requests.exceptions.Timeout:
             raise ServiceUnavailableException(
@@ -617,24 +715,16 @@ class VastProvider(IGpuProvider):
             query["gpu_name"] = {"eq": gpu_name}
 
         try:
-            resp = requests.get(
-                f"{self.api_url}/bundles/",
-                params={
+            try:
+                raw_offers = self._get_bundles({
                     "q": json.dumps(query),
                     "order": "min_bid",  # Ordenar por preço (mais barato primeiro)
                     "type": "bid",  # Apenas ofertas que aceitam bid
-                },
-                headers=self.headers,
-                timeout=self.timeout,
-            )
-
-            if not resp.ok:
-                logger.warning(f"Failed to fetch interruptible offers: HTTP {resp.status_code}")
+                })
+            except requests.HTTPError as e:
+                logger.warning(f"Failed to fetch interruptible offers: HTTP {e.response.status_code}")
                 return []
 
-            data = resp.json()
-            raw_offers = data.get("offers", [])
-
             offers = []
             for offer_data in raw_offers:
                 try:
@@ -656,9 +746,8 @@ class VastProvider(IGpuProvider):
     def get_instance(self, instance_id: int) -> Instance:
         """Get instance details by ID"""
         try:
-            resp = requests.get(
-                f"{self.api_url}/instances/{instance_id}/",
-                headers=self.headers,
+            resp = self.client.get(
+                f"/instances/{instance_id}/",
                 timeout=self.timeout,
             )
 
@@ -716,10 +805,9 @@ class VastProvider(IGpuProvider):
     def list_instances(self) -> List[Instance]:
         """List all user instances"""
         try:
-            resp = requests.get(
-                f"{self.api_url}/instances/",
+            resp = self.client.get(
+                f"/instances/",
                 params={"owner": "me"},
-                headers=self.headers,
                 timeout=self.timeout,
             )
             resp.raise_for_status()
@@ -747,9 +835,8 @@ class VastProvider(IGpuProvider):
         """Destroy an instance"""
         logger.info(f"Destroying instance {instance_id}")
         try:
-            resp = requests.delete(
-                f"{self.api_url}/instances/{instance_id}/",
-                headers=self.headers,
+            resp = self.client.delete(
+                f"/instances/{instance_id}/",
                 timeout=self.timeout,
             )
             success = resp.status_code in [200, 204]
@@ -773,9 +860,8 @@ class VastProvider(IGpuProvider):
         """
         logger.info(f"Stopping instance {instance_id}")
         try:
-            resp = requests.put(
-                f"{self.api_url}/instances/{instance_id}/",
-                headers=self.headers,
+            resp = self.client.put(
+                f"/instances/{instance_id}/",
                 json={"state": "stopped"},
                 timeout=self.timeout,
             )
@@ -802,9 +888,8 @@ class VastProvider(IGpuProvider):
         """
         logger.info(f"Starting instance {instance_id}")
         try:
-            resp = requests.put(
-                f"{self.api_url}/instances/{instance_id}/",
-                headers=self.headers,
+            resp = self.client.put(
+                f"/instances/{instance_id}/",
                 json={"state": "running"},
                 timeout=self.timeout,
             )
@@ -832,9 +917,8 @@ class VastProvider(IGpuProvider):
     def get_balance(self) -> Dict[str, Any]:
         """Get account balance (not part of IGpuProvider, but useful)"""
         try:
-            resp = requests.get(
-                f"{self.api_url}/users/current/",
-                headers=self.headers,
+            resp = self.client.get(
+                f"/users/current/",
                 timeout=self.timeout,
             )
             resp.raise_for_status()
@@ -931,11 +1015,11 @@ class VastProvider(IGpuProvider):
 
         start = _time.time()
         try:
-            resp = requests.get(
-                f"{self.api_url}/bundles/",
+            resp = self.client.get(
+                f"/bundles/",
                 params={"q": json.dumps({"rentable": {"eq": True}}), "limit": 1},
-                headers=self.headers,
                 timeout=5,
+                retries=0,
             )
             latency = (_time.time() - start) * 1000
 
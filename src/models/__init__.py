@@ -2,7 +2,7 @@
 
 from .price_history import PriceHistory, PriceAlert
 from .instance_status import InstanceStatus, HibernationEvent
-from .metrics import MarketSnapshot, ProviderReliability, PricePrediction, CostEfficiencyRanking
+from .metrics import MarketSnapshot, MarketSnapshotRollup, ProviderReliability, PricePrediction, CostEfficiencyRanking
 from .machine_history import MachineAttempt, MachineBlacklist, MachineStats
 
 __all__ = [
@@ -12,6 +12,7 @@ __all__ = [
     'HibernationEvent',
     # Novos modelos de métricas expandidas
     'MarketSnapshot',
+    'MarketSnapshotRollup',
     'ProviderReliability',
     'PricePrediction',
     'CostEfficiencyRanking',
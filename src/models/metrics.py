@@ -3,14 +3,16 @@ Modelos expandidos para métricas de mercado VAST.ai.
 
 Inclui:
 - MarketSnapshot: Snapshots agregados por GPU + tipo de máquina
+- MarketSnapshotRollup: Agregações horárias/diárias dos snapshots
 - ProviderReliability: Histórico de confiabilidade por host
 - PricePrediction: Previsões de preço geradas por ML
 - CostEfficiencyRanking: Rankings de custo-benefício
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Index, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Index, Text, UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
+from typing import Optional
 from src.config.database import Base
 
 
@@ -65,6 +67,76 @@ class MarketSnapshot(Base):
         return f"<MarketSnapshot {self.gpu_name}:{self.machine_type} @ {self.timestamp}>"
 
 
+class MarketSnapshotRollup(Base):
+    """
+    Agregação de MarketSnapshot por hora ('1h') ou dia ('1d').
+
+    Mantida incrementalmente a cada snapshot salvo: guarda somas e contagem
+    para que médias possam ser combinadas sem reler os snapshots.
+    p25/p75 são a média dos percentis dos snapshots do bucket (percentis
+    exatos não são combináveis).
+    """
+    __tablename__ = "market_snapshot_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    resolution = Column(String(4), nullable=False)  # 1h, 1d
+    bucket_start = Column(DateTime, nullable=False)
+
+    # Identificação
+    gpu_name = Column(String(100), nullable=False)
+    machine_type = Column(String(20), nullable=False)
+
+    # Número de snapshots agregados
+    sample_count = Column(Integer, nullable=False, default=0)
+
+    # Preço
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
+    price_sum = Column(Float, nullable=False, default=0.0)  # Soma de avg_price
+    p25_sum = Column(Float, nullable=False, default=0.0)
+    p75_sum = Column(Float, nullable=False, default=0.0)
+
+    # Disponibilidade
+    offers_sum = Column(Integer, nullable=False, default=0)
+    available_gpus_sum = Column(Integer, nullable=False, default=0)
+
+    # Confiabilidade (snapshots sem avg_reliability não entram na contagem)
+    reliability_sum = Column(Float, nullable=False, default=0.0)
+    reliability_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('resolution', 'gpu_name', 'machine_type', 'bucket_start', name='uq_rollup_bucket'),
+        Index('idx_rollup_resolution_time', 'resolution', 'bucket_start'),
+    )
+
+    @property
+    def avg_price(self) -> float:
+        return self.price_sum / self.sample_count if self.sample_count else 0.0
+
+    @property
+    def percentile_25(self) -> float:
+        return self.p25_sum / self.sample_count if self.sample_count else 0.0
+
+    @property
+    def percentile_75(self) -> float:
+        return self.p75_sum / self.sample_count if self.sample_count else 0.0
+
+    @property
+    def avg_offers(self) -> float:
+        return self.offers_sum / self.sample_count if self.sample_count else 0.0
+
+    @property
+    def avg_available_gpus(self) -> float:
+        return self.available_gpus_sum / self.sample_count if self.sample_count else 0.0
+
+    @property
+    def avg_reliability(self) -> Optional[float]:
+        return self.reliability_sum / self.reliability_count if self.reliability_count else None
+
+    def __repr__(self):
+        return f"<MarketSnapshotRollup {self.resolution} {self.gpu_name}:{self.machine_type} @ {self.bucket_start}>"
+
+
 class ProviderReliability(Base):
     """
     Histórico de confiabilidade por provedor/host.
@@ -15,6 +15,8 @@ from dataclasses import dataclass, field
 from typing import Optional, Dict, Any, Callable, List
 from datetime import datetime
 
+from src.infrastructure.providers.ssh_pool import get_ssh_pool
+
 logger = logging.getLogger(__name__)
 
 
@@ -352,32 +354,21 @@ class JobExecutor:
         timeout: int = 3600,
         env_vars: Optional[Dict[str, str]] = None,
     ) -> Dict[str, Any]:
-        """Executa comando via SSH"""
-        import os
-
+        """Executa comando via SSH (conexão compartilhada do pool)"""
         # Construir comando com variáveis de ambiente
         full_command = command
         if env_vars:
             env_exports = " ".join([f'{k}="{v}"' for k, v in env_vars.items()])
             full_command = f"{env_exports} {command}"
 
-        ssh_key = os.path.expanduser(self.ssh_key_path)
-
         try:
-            result = subprocess.run(
-                [
-                    "ssh",
-                    "-i", ssh_key,
-                    "-o", "StrictHostKeyChecking=no",
-                    "-o", "UserKnownHostsFile=/dev/null",
-                    "-o", "ConnectTimeout=30",
-                    "-p", str(port),
-                    f"root@{host}",
-                    full_command,
-                ],
-                capture_output=True,
-                text=True,
+            result = get_ssh_pool().run(
+                host,
+                port,
+                full_command,
+                key_path=self.ssh_key_path,
                 timeout=timeout,
+                connect_timeout=30,
             )
 
             return {
@@ -7,6 +7,7 @@ Este módulo consolida toda a lógica de análise de mercado:
 - Monitoramento em tempo real (MarketMonitor)
 - Cálculo de economia (SavingsCalculator)
 - Estatísticas (StatisticsCalculator)
+- Rollups horários/diários e retenção de snapshots
 - Agente de background (MarketAgent)
 
 Uso:
@@ -57,6 +58,7 @@ from .statistics import (
     StatisticsCalculator,
     PriceStats,
     MarketStats,
+    OfferBatch,
     get_statistics_calculator,
 )
 
@@ -67,6 +69,14 @@ from .collector import (
     MACHINE_TYPES,
 )
 
+from .rollups import (
+    choose_resolution,
+    query_price_series,
+    record_snapshots,
+    apply_retention,
+    backfill_rollups,
+)
+
 from .agent import (
     MarketAgent,
     MarketMonitorAgent,  # Alias para compatibilidade
@@ -96,12 +106,19 @@ __all__ = [
     "StatisticsCalculator",
     "PriceStats",
     "MarketStats",
+    "OfferBatch",
     "get_statistics_calculator",
     # Collector (NEW)
     "MarketCollector",
     "get_collector",
     "DEFAULT_GPUS",
     "MACHINE_TYPES",
+    # Rollups
+    "choose_resolution",
+    "query_price_series",
+    "record_snapshots",
+    "apply_retention",
+    "backfill_rollups",
     # Agent (NEW)
     "MarketAgent",
     "MarketMonitorAgent",
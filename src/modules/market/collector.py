@@ -7,16 +7,20 @@ Responsável por:
 - Atualizar dados de provedores
 - Calcular rankings de eficiência
 - Tracking de estabilidade de ofertas
+- Rollups horários/diários e retenção dos snapshots
 """
 
 import logging
 import statistics as stats
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
 from collections import defaultdict
 from contextlib import contextmanager
 
-from .statistics import StatisticsCalculator, get_statistics_calculator
+import numpy as np
+
+from .statistics import StatisticsCalculator, OfferBatch, get_statistics_calculator
+from . import rollups
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +42,18 @@ DEFAULT_GPUS = [
 
 MACHINE_TYPES = ["on-demand", "interruptible", "bid"]
 
+# Rankings de eficiência salvos por ciclo
+TOP_RANKINGS = 1000
+
+# Tamanho dos lotes de IN (...) / INSERT em massa
+DB_BATCH_SIZE = 1000
+
+# Limite de parâmetros por statement em SQLite antigo (INSERT multi-linha)
+SQLITE_MAX_VARIABLES = 999
+
+# Intervalo entre execuções da retenção de snapshots
+RETENTION_INTERVAL = timedelta(hours=1)
+
 
 @contextmanager
 def get_db_session():
@@ -54,6 +70,93 @@ def get_db_session():
         db.close()
 
 
+def _batches(items: List[Any], size: int = DB_BATCH_SIZE):
+    """Divide uma lista em lotes para queries IN (...) e escritas em massa."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _load_detached(db, query, column, keys: List[Any]) -> List[Any]:
+    """
+    Carrega linhas com column IN keys (em lotes) e as desanexa da sessão.
+
+    Objetos desanexados podem ser alterados em memória sem gerar UPDATEs
+    individuais no commit; a escrita é feita depois em massa.
+    """
+    rows = []
+    for batch in _batches(keys):
+        rows.extend(query.filter(column.in_(batch)).all())
+    for row in rows:
+        db.expunge(row)
+    return rows
+
+
+def _column_values(obj: Any, include_pk: bool = False, skip_none: bool = False) -> Dict[str, Any]:
+    """
+    Valores das colunas de um modelo (para bulk insert/update).
+
+    Args:
+        include_pk: Incluir a chave primária (necessária para bulk_update_mappings)
+        skip_none: Omitir colunas None para que os defaults do modelo se apliquem
+    """
+    values = {}
+    for c in obj.__table__.columns:
+        if c.primary_key and not include_pk:
+            continue
+        value = getattr(obj, c.key)
+        if value is None and skip_none:
+            continue
+        values[c.key] = value
+    return values
+
+
+def _upsert(db, model, rows: List[Dict[str, Any]], key: str, existing: Dict[Any, Any],
+            keep: tuple = ()):
+    """
+    Grava rows com INSERT ... ON CONFLICT (key) DO UPDATE no dialeto da sessão.
+
+    PostgreSQL e SQLite têm upsert nativo; nos demais bancos as linhas já
+    carregadas (existing, por key) vão com bulk_update_mappings pela PK e
+    as novas com bulk_insert_mappings.
+
+    Args:
+        keep: Colunas preservadas em linhas existentes (além de key)
+    """
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        batch_size = DB_BATCH_SIZE
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        batch_size = max(1, min(DB_BATCH_SIZE, SQLITE_MAX_VARIABLES // len(rows[0])))
+    else:
+        pk = model.__table__.primary_key.columns.values()[0].key
+        updates = [
+            {**{k: v for k, v in row.items() if k not in keep}, pk: getattr(existing[row[key]], pk)}
+            for row in rows if row[key] in existing
+        ]
+        for batch in _batches(updates):
+            db.bulk_update_mappings(model, batch)
+        for batch in _batches([row for row in rows if row[key] not in existing]):
+            db.bulk_insert_mappings(model, batch)
+        return
+
+    for batch in _batches(rows, batch_size):
+        stmt = insert(model).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[getattr(model, key)],
+            set_={
+                column: stmt.excluded[column]
+                for column in batch[0]
+                if column != key and column not in keep
+            },
+        )
+        db.execute(stmt)
+
+
 class MarketCollector:
     """
     Coletor de dados de mercado GPU.
@@ -91,6 +194,7 @@ class MarketCollector:
 
         # Provider lazy-loaded
         self._vast_provider = None
+        self._last_retention: Optional[datetime] = None
 
     @property
     def vast_provider(self):
@@ -118,18 +222,24 @@ class MarketCollector:
             logger.warning("Nenhuma oferta coletada neste ciclo")
             return {}
 
+        # Colunas NumPy de todas as ofertas, usadas por snapshots e rankings
+        batch = OfferBatch.from_offers(all_offers)
+
         # 2. Salvar snapshots
-        self._save_market_snapshots(all_offers)
+        self._save_market_snapshots(all_offers, batch)
 
         # 3. Atualizar provedores
         self._update_provider_data(all_offers)
 
         # 4. Calcular rankings
-        self._calculate_efficiency_rankings(all_offers)
+        self._calculate_efficiency_rankings(all_offers, batch)
 
         # 5. Atualizar estabilidade
         self._update_offer_stability(all_offers)
 
+        # 6. Retenção de snapshots brutos
+        self._apply_retention()
+
         logger.info("Ciclo de monitoramento concluído")
         return all_offers
 
@@ -158,40 +268,42 @@ class MarketCollector:
             return []
 
     def _collect_market_data(self) -> Dict[str, List[Any]]:
-        """Coleta dados de todas GPUs e tipos."""
-        all_offers = {}
-        total_collected = 0
-
-        for gpu_name in self.gpus_to_monitor:
-            for machine_type in self.machine_types:
-                key = f"{gpu_name}:{machine_type}"
-                offers = self.collect_gpu(gpu_name, machine_type)
-                all_offers[key] = offers
-                total_collected += len(offers)
+        """Coleta dados de todas GPUs e tipos (queries largas em paralelo)."""
+        try:
+            all_offers = self.vast_provider.fetch_all_market_data(
+                gpus_to_monitor=self.gpus_to_monitor,
+                machine_types=self.machine_types,
+                max_price=100.0,
+                limit_per_query=200,
+            )
+        except Exception as e:
+            logger.warning(f"Falha ao coletar mercado: {e}")
+            return {}
 
-                if offers:
-                    min_price = min(o.dph_total for o in offers if o.dph_total)
-                    logger.debug(f"{key}: {len(offers)} ofertas, min=${min_price:.4f}/h")
+        total_collected = 0
+        for key, offers in all_offers.items():
+            total_collected += len(offers)
+            prices = [o.dph_total for o in offers if o.dph_total]
+            if prices:
+                logger.debug(f"{key}: {len(offers)} ofertas, min=${min(prices):.4f}/h")
 
         logger.info(f"Total coletado: {total_collected} ofertas em "
                    f"{len([k for k, v in all_offers.items() if v])} combinações")
         return all_offers
 
-    def _save_market_snapshots(self, all_offers: Dict[str, List[Any]]):
+    def _save_market_snapshots(self, all_offers: Dict[str, List[Any]], batch: Optional[OfferBatch] = None):
         """Salva snapshots agregados no banco de dados."""
         from src.models.metrics import MarketSnapshot
 
         try:
+            stats_by_group = self.stats_calc.calculate_batch_stats(batch or OfferBatch.from_offers(all_offers))
+
             with get_db_session() as db:
                 timestamp = datetime.utcnow()
-                snapshots_saved = 0
-
-                for key, offers in all_offers.items():
-                    if not offers:
-                        continue
+                snapshots = []
 
+                for key, market_stats in stats_by_group.items():
                     gpu_name, machine_type = key.split(":")
-                    market_stats = self.stats_calc.calculate_market_stats(offers)
 
                     snapshot = MarketSnapshot(
                         timestamp=timestamp,
@@ -215,16 +327,36 @@ class MarketCollector:
                         min_cost_per_gb_vram=market_stats.min_cost_per_gb_vram,
                         region_distribution=market_stats.region_distribution,
                     )
-                    db.add(snapshot)
-                    snapshots_saved += 1
+                    snapshots.append(snapshot)
 
-                logger.info(f"Salvos {snapshots_saved} snapshots de mercado")
+                db.add_all(snapshots)
+                rollups.record_snapshots(db, snapshots)
+
+                logger.info(f"Salvos {len(snapshots)} snapshots de mercado")
 
         except Exception as e:
             logger.error(f"Erro ao salvar snapshots: {e}")
 
+    def _apply_retention(self):
+        """Remove snapshots brutos antigos (no máximo uma vez por RETENTION_INTERVAL)."""
+        now = datetime.utcnow()
+        if self._last_retention and now - self._last_retention < RETENTION_INTERVAL:
+            return
+        self._last_retention = now
+
+        try:
+            with get_db_session() as db:
+                rollups.apply_retention(db)
+        except Exception as e:
+            logger.error(f"Erro na retenção de snapshots: {e}")
+
     def _update_provider_data(self, all_offers: Dict[str, List[Any]]):
-        """Atualiza dados de confiabilidade de provedores."""
+        """
+        Atualiza dados de confiabilidade de provedores.
+
+        Carrega todos os provedores do ciclo em uma query, aplica as mudanças
+        em memória e grava com INSERT ... ON CONFLICT (machine_id) em lotes.
+        """
         from src.models.metrics import ProviderReliability
 
         try:
@@ -236,18 +368,23 @@ class MarketCollector:
                         if offer.machine_id:
                             providers[offer.machine_id].append(offer)
 
-                providers_updated = 0
-                for machine_id, machine_offers in providers.items():
-                    provider = db.query(ProviderReliability).filter(
-                        ProviderReliability.machine_id == machine_id
-                    ).first()
+                existing = {
+                    p.machine_id: p
+                    for p in _load_detached(
+                        db, db.query(ProviderReliability),
+                        ProviderReliability.machine_id, list(providers),
+                    )
+                }
 
+                rows = []
+                for machine_id, machine_offers in providers.items():
+                    provider = existing.get(machine_id)
                     if not provider:
                         provider = ProviderReliability(
                             machine_id=machine_id,
-                            first_seen=datetime.utcnow()
+                            first_seen=datetime.utcnow(),
+                            times_unavailable=0,
                         )
-                        db.add(provider)
 
                     # Atualizar com dados mais recentes
                     latest = machine_offers[0]
@@ -290,9 +427,12 @@ class MarketCollector:
 
                     # Calcular scores
                     self._update_provider_scores(provider, latest)
-                    providers_updated += 1
+                    rows.append(_column_values(provider))
+
+                _upsert(db, ProviderReliability, rows, "machine_id", existing, keep=("first_seen",))
 
-                logger.info(f"Atualizados {providers_updated} provedores")
+                logger.info(f"Atualizados {len(rows)} provedores "
+                           f"({len(rows) - len(existing)} novos)")
 
         except Exception as e:
             logger.error(f"Erro ao atualizar provedores: {e}")
@@ -324,73 +464,75 @@ class MarketCollector:
         provider.performance_score = scores['performance_score']
         provider.reliability_score = scores['reliability_score']
 
-    def _calculate_efficiency_rankings(self, all_offers: Dict[str, List[Any]]):
-        """Calcula e salva rankings de custo-benefício."""
+    def _calculate_efficiency_rankings(self, all_offers: Dict[str, List[Any]], batch: Optional[OfferBatch] = None):
+        """
+        Calcula e salva rankings de custo-benefício.
+
+        Scores e ordenação são vetorizados; só as TOP_RANKINGS melhores
+        ofertas viram objetos do banco.
+        """
         from src.models.metrics import CostEfficiencyRanking
 
         try:
+            batch = batch or OfferBatch.from_offers(all_offers)
+            scores = self.stats_calc.calculate_efficiency_scores(batch)
+
+            # Só ofertas com TFLOPS e preço; ordem estável por score decrescente
+            eligible = np.flatnonzero((batch.total_flops > 0) & (batch.price > 0))
+            ranked = eligible[np.argsort(-scores[eligible], kind="stable")]
+
             with get_db_session() as db:
                 timestamp = datetime.utcnow()
                 all_ranked = []
+                gpu_rank_counts = defaultdict(int)
 
-                for key, offers in all_offers.items():
-                    gpu_name, machine_type = key.split(":")
+                # Todas as ofertas acima de uma oferta do top também estão no top,
+                # então o rank por GPU calculado só sobre ele é exato
+                for position, idx in enumerate(ranked[:TOP_RANKINGS]):
+                    offer = batch.offers[idx]
+                    gpu_name, machine_type = batch.groups[batch.group[idx]].split(":")
+                    gpu_rank_counts[gpu_name] += 1
 
-                    for offer in offers:
-                        if not offer.total_flops or offer.total_flops <= 0:
-                            continue
-                        if not offer.dph_total or offer.dph_total <= 0:
-                            continue
-
-                        score = self.stats_calc.calculate_efficiency_score(offer)
-
-                        ranking = CostEfficiencyRanking(
-                            timestamp=timestamp,
-                            offer_id=offer.id,
-                            gpu_name=gpu_name,
-                            machine_type=machine_type,
-                            dph_total=offer.dph_total,
-                            total_flops=offer.total_flops,
-                            gpu_ram=offer.gpu_ram,
-                            dlperf=offer.dlperf,
-                            gpu_mem_bw=offer.gpu_mem_bw,
-                            cost_per_tflops=offer.cost_per_tflops,
-                            cost_per_gb_vram=offer.cost_per_gb_vram,
-                            cost_per_dlperf=(offer.dph_total / offer.dlperf
-                                            if offer.dlperf and offer.dlperf > 0 else None),
-                            efficiency_score=score,
-                            reliability=offer.reliability,
-                            verified=offer.verified,
-                            geolocation=offer.geolocation,
-                            machine_id=offer.machine_id,
-                        )
-                        all_ranked.append(ranking)
-
-                # Ordenar e atribuir ranks
-                all_ranked.sort(key=lambda x: x.efficiency_score, reverse=True)
-                for i, ranking in enumerate(all_ranked):
-                    ranking.rank_overall = i + 1
-
-                # Rank por GPU
-                gpu_ranks = defaultdict(list)
-                for r in all_ranked:
-                    gpu_ranks[r.gpu_name].append(r)
-
-                for rankings in gpu_ranks.values():
-                    for i, r in enumerate(rankings):
-                        r.rank_in_gpu_class = i + 1
+                    ranking = CostEfficiencyRanking(
+                        timestamp=timestamp,
+                        offer_id=offer.id,
+                        gpu_name=gpu_name,
+                        machine_type=machine_type,
+                        dph_total=offer.dph_total,
+                        total_flops=offer.total_flops,
+                        gpu_ram=offer.gpu_ram,
+                        dlperf=offer.dlperf,
+                        gpu_mem_bw=offer.gpu_mem_bw,
+                        cost_per_tflops=offer.cost_per_tflops,
+                        cost_per_gb_vram=offer.cost_per_gb_vram,
+                        cost_per_dlperf=(offer.dph_total / offer.dlperf
+                                        if offer.dlperf and offer.dlperf > 0 else None),
+                        efficiency_score=float(scores[idx]),
+                        reliability=offer.reliability,
+                        verified=offer.verified,
+                        geolocation=offer.geolocation,
+                        machine_id=offer.machine_id,
+                        rank_overall=position + 1,
+                        rank_in_gpu_class=gpu_rank_counts[gpu_name],
+                    )
+                    all_ranked.append(ranking)
 
-                # Salvar top 1000
-                for ranking in all_ranked[:1000]:
-                    db.add(ranking)
+                db.add_all(all_ranked)
 
-                logger.info(f"Salvos {min(len(all_ranked), 1000)} rankings de eficiência")
+                logger.info(f"Salvos {len(all_ranked)} rankings de eficiência (de {len(ranked)} ofertas)")
 
         except Exception as e:
             logger.error(f"Erro ao calcular rankings: {e}")
 
     def _update_offer_stability(self, all_offers: Dict[str, List[Any]]):
-        """Atualiza estabilidade de ofertas."""
+        """
+        Atualiza estabilidade de ofertas.
+
+        Carrega as linhas relevantes (disponíveis antes ou vistas agora) em
+        poucas queries, aplica aparições/desaparecimentos em memória e grava
+        com bulk_update_mappings / bulk_insert_mappings.
+        """
+        from sqlalchemy import or_
         from src.models.machine_history import OfferStability
 
         try:
@@ -410,31 +552,36 @@ class MarketCollector:
                                 offer.geolocation
                             )
 
-                # Buscar anteriores
-                previously_available = db.query(OfferStability).filter(
-                    OfferStability.provider == "vast",
-                    OfferStability.is_available == True,
-                ).all()
-                previous_ids = {str(m.machine_id) for m in previously_available}
+                # Anteriores (disponíveis) + atuais, por machine_id
+                vast_rows = db.query(OfferStability).filter(OfferStability.provider == "vast")
+                loaded = vast_rows.filter(OfferStability.is_available == True).all()
+                for row in loaded:
+                    db.expunge(row)
+                previous_ids = {str(m.machine_id) for m in loaded}
+                loaded += _load_detached(
+                    db,
+                    vast_rows.filter(or_(OfferStability.is_available == False,
+                                         OfferStability.is_available.is_(None))),
+                    OfferStability.machine_id,
+                    sorted(current_ids - previous_ids),
+                )
+                by_machine = {}
+                for row in loaded:
+                    by_machine.setdefault(str(row.machine_id), row)
+
+                updated, created = [], []
 
                 # Desapareceram
                 disappeared = previous_ids - current_ids
                 for mid in disappeared:
-                    stability = db.query(OfferStability).filter(
-                        OfferStability.provider == "vast",
-                        OfferStability.machine_id == mid,
-                    ).first()
-                    if stability:
-                        stability.record_disappeared()
+                    stability = by_machine[mid]
+                    stability.record_disappeared()
+                    updated.append(stability)
 
                 # Apareceram
                 appeared = current_ids - previous_ids
                 for mid in appeared:
-                    stability = db.query(OfferStability).filter(
-                        OfferStability.provider == "vast",
-                        OfferStability.machine_id == mid,
-                    ).first()
-
+                    stability = by_machine.get(mid)
                     gpu_name, price, geo = machine_data.get(mid, (None, None, None))
 
                     if not stability:
@@ -443,23 +590,30 @@ class MarketCollector:
                             machine_id=mid,
                             gpu_name=gpu_name,
                             geolocation=geo,
+                            created_at=datetime.utcnow(),
                         )
-                        db.add(stability)
+                        created.append(stability)
+                    else:
+                        updated.append(stability)
 
                     stability.record_appeared(price=price, gpu_name=gpu_name, geolocation=geo)
 
                 # Ainda disponíveis
                 still_available = current_ids & previous_ids
+                now = datetime.utcnow()
                 for mid in still_available:
-                    stability = db.query(OfferStability).filter(
-                        OfferStability.provider == "vast",
-                        OfferStability.machine_id == mid,
-                    ).first()
-                    if stability:
-                        stability.last_seen_at = datetime.utcnow()
-                        gpu_name, price, geo = machine_data.get(mid, (None, None, None))
-                        if price:
-                            stability.price_per_hour = price
+                    stability = by_machine[mid]
+                    stability.last_seen_at = now
+                    gpu_name, price, geo = machine_data.get(mid, (None, None, None))
+                    if price:
+                        stability.price_per_hour = price
+                    stability.updated_at = now
+                    updated.append(stability)
+
+                for batch in _batches(updated):
+                    db.bulk_update_mappings(OfferStability, [_column_values(s, include_pk=True) for s in batch])
+                for batch in _batches(created):
+                    db.bulk_insert_mappings(OfferStability, [_column_values(s, skip_none=True) for s in batch])
 
                 # Log
                 unstable_count = db.query(OfferStability).filter(
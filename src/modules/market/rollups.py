@@ -0,0 +1,312 @@
+"""
+Market Rollups - Agregações horárias/diárias de MarketSnapshot
+
+Responsável por:
+- Manter rollups '1h' e '1d' incrementalmente a cada snapshot salvo
+- Retenção: apagar snapshots brutos (e rollups horários) antigos
+- Escolher a resolução mais grossa que atende um intervalo de consulta
+- Reconstruir rollups a partir dos snapshots brutos (backfill)
+
+Um gráfico de 90 dias lê ~90 linhas por GPU/tipo em vez de ~26 mil snapshots.
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Any, Tuple
+
+from sqlalchemy import case
+
+logger = logging.getLogger(__name__)
+
+
+RESOLUTION_RAW = "raw"
+RESOLUTION_HOUR = "1h"
+RESOLUTION_DAY = "1d"
+ROLLUP_RESOLUTIONS = (RESOLUTION_HOUR, RESOLUTION_DAY)
+
+# Retenção (dias). Rollups diários são mantidos indefinidamente.
+RAW_RETENTION_DAYS = int(os.getenv("MARKET_RAW_RETENTION_DAYS", "14"))
+HOURLY_RETENTION_DAYS = int(os.getenv("MARKET_HOURLY_RETENTION_DAYS", "180"))
+
+# Maior intervalo servido por cada resolução
+RAW_MAX_SPAN = timedelta(days=2)
+HOURLY_MAX_SPAN = timedelta(days=31)
+
+
+def bucket_start(timestamp: datetime, resolution: str) -> datetime:
+    """Início do bucket de um timestamp na resolução dada."""
+    hour = timestamp.replace(minute=0, second=0, microsecond=0)
+    if resolution == RESOLUTION_DAY:
+        return hour.replace(hour=0)
+    return hour
+
+
+def choose_resolution(start: datetime, end: Optional[datetime] = None) -> str:
+    """
+    Resolução mais grossa que atende o intervalo [start, end].
+
+    Snapshots brutos só para intervalos curtos dentro da retenção; rollups
+    horários até HOURLY_MAX_SPAN; acima disso (ou fora da retenção horária),
+    rollups diários.
+    """
+    now = datetime.utcnow()
+    span = (end or now) - start
+    if span <= RAW_MAX_SPAN and start >= now - timedelta(days=RAW_RETENTION_DAYS):
+        return RESOLUTION_RAW
+    if span <= HOURLY_MAX_SPAN and start >= now - timedelta(days=HOURLY_RETENTION_DAYS):
+        return RESOLUTION_HOUR
+    return RESOLUTION_DAY
+
+
+def _upsert_statement(db, table):
+    """INSERT ... ON CONFLICT do dialeto da sessão (PostgreSQL; SQLite em testes)."""
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(table)
+
+
+def _aggregate(snapshots: List[Any]) -> Dict[Tuple[str, datetime, str, str], Dict[str, Any]]:
+    """Agrega snapshots por (resolução, bucket, gpu, tipo)."""
+    buckets: Dict[Tuple[str, datetime, str, str], Dict[str, Any]] = {}
+    for snap in snapshots:
+        if snap.avg_price is None or snap.timestamp is None:
+            continue
+        for resolution in ROLLUP_RESOLUTIONS:
+            key = (resolution, bucket_start(snap.timestamp, resolution), snap.gpu_name, snap.machine_type)
+            row = buckets.get(key)
+            if row is None:
+                row = buckets[key] = {
+                    'resolution': resolution,
+                    'bucket_start': key[1],
+                    'gpu_name': snap.gpu_name,
+                    'machine_type': snap.machine_type,
+                    'sample_count': 0,
+                    'min_price': snap.min_price,
+                    'max_price': snap.max_price,
+                    'price_sum': 0.0,
+                    'p25_sum': 0.0,
+                    'p75_sum': 0.0,
+                    'offers_sum': 0,
+                    'available_gpus_sum': 0,
+                    'reliability_sum': 0.0,
+                    'reliability_count': 0,
+                }
+            row['sample_count'] += 1
+            row['min_price'] = min(row['min_price'], snap.min_price)
+            row['max_price'] = max(row['max_price'], snap.max_price)
+            row['price_sum'] += snap.avg_price
+            row['p25_sum'] += snap.percentile_25 if snap.percentile_25 is not None else snap.avg_price
+            row['p75_sum'] += snap.percentile_75 if snap.percentile_75 is not None else snap.avg_price
+            row['offers_sum'] += snap.total_offers or 0
+            row['available_gpus_sum'] += snap.available_gpus or 0
+            if snap.avg_reliability is not None:
+                row['reliability_sum'] += snap.avg_reliability
+                row['reliability_count'] += 1
+    return buckets
+
+
+def record_snapshots(db, snapshots: List[Any]) -> int:
+    """
+    Incorpora snapshots recém-criados aos rollups '1h' e '1d'.
+
+    Deve ser chamado na mesma sessão/transação que grava os snapshots.
+    Cada bucket é um único INSERT ... ON CONFLICT que soma contagens e
+    atualiza min/max, então ciclos concorrentes não perdem amostras.
+
+    Args:
+        db: Sessão SQLAlchemy
+        snapshots: Objetos MarketSnapshot (ou equivalentes com os mesmos campos)
+
+    Returns:
+        Número de buckets atualizados
+    """
+    from src.models.metrics import MarketSnapshotRollup
+
+    rows = list(_aggregate(snapshots).values())
+    if not rows:
+        return 0
+
+    table = MarketSnapshotRollup.__table__
+    stmt = _upsert_statement(db, table)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['resolution', 'gpu_name', 'machine_type', 'bucket_start'],
+        set_={
+            'sample_count': table.c.sample_count + excluded.sample_count,
+            'min_price': case((excluded.min_price < table.c.min_price, excluded.min_price), else_=table.c.min_price),
+            'max_price': case((excluded.max_price > table.c.max_price, excluded.max_price), else_=table.c.max_price),
+            'price_sum': table.c.price_sum + excluded.price_sum,
+            'p25_sum': table.c.p25_sum + excluded.p25_sum,
+            'p75_sum': table.c.p75_sum + excluded.p75_sum,
+            'offers_sum': table.c.offers_sum + excluded.offers_sum,
+            'available_gpus_sum': table.c.available_gpus_sum + excluded.available_gpus_sum,
+            'reliability_sum': table.c.reliability_sum + excluded.reliability_sum,
+            'reliability_count': table.c.reliability_count + excluded.reliability_count,
+        },
+    )
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def apply_retention(
+    db,
+    raw_days: int = RAW_RETENTION_DAYS,
+    hourly_days: int = HOURLY_RETENTION_DAYS,
+) -> Dict[str, int]:
+    """
+    Apaga snapshots brutos e rollups horários fora da janela de retenção.
+
+    Os dados continuam disponíveis nos rollups mais grossos, que são
+    mantidos a cada snapshot.
+
+    Returns:
+        Dict com linhas apagadas por tabela
+    """
+    from src.models.metrics import MarketSnapshot, MarketSnapshotRollup
+
+    now = datetime.utcnow()
+    raw_deleted = db.query(MarketSnapshot).filter(
+        MarketSnapshot.timestamp < now - timedelta(days=raw_days)
+    ).delete(synchronize_session=False)
+    hourly_deleted = db.query(MarketSnapshotRollup).filter(
+        MarketSnapshotRollup.resolution == RESOLUTION_HOUR,
+        MarketSnapshotRollup.bucket_start < now - timedelta(days=hourly_days),
+    ).delete(synchronize_session=False)
+
+    if raw_deleted or hourly_deleted:
+        logger.info(f"Retenção: {raw_deleted} snapshots e {hourly_deleted} rollups horários removidos")
+    return {'snapshots': raw_deleted, 'hourly_rollups': hourly_deleted}
+
+
+def backfill_rollups(db, start: datetime, end: Optional[datetime] = None, batch_size: int = 5000) -> int:
+    """
+    Reconstrói os rollups a partir dos snapshots brutos em [start, end).
+
+    O intervalo é alinhado a dias; rollups existentes nesse intervalo são
+    apagados e recalculados. Útil para popular a tabela a partir de
+    históricos gravados antes dos rollups.
+
+    Returns:
+        Número de snapshots processados
+    """
+    from src.models.metrics import MarketSnapshot, MarketSnapshotRollup
+
+    start = bucket_start(start, RESOLUTION_DAY)
+    end = bucket_start(end or datetime.utcnow(), RESOLUTION_DAY) + timedelta(days=1)
+
+    db.query(MarketSnapshotRollup).filter(
+        MarketSnapshotRollup.bucket_start >= start,
+        MarketSnapshotRollup.bucket_start < end,
+    ).delete(synchronize_session=False)
+
+    query = db.query(MarketSnapshot).filter(
+        MarketSnapshot.timestamp >= start,
+        MarketSnapshot.timestamp < end,
+    ).order_by(MarketSnapshot.timestamp)
+
+    processed = 0
+    pending = []
+    for snap in query.yield_per(batch_size):
+        pending.append(snap)
+        if len(pending) >= batch_size:
+            record_snapshots(db, pending)
+            processed += len(pending)
+            pending = []
+    if pending:
+        record_snapshots(db, pending)
+        processed += len(pending)
+
+    logger.info(f"Backfill de rollups: {processed} snapshots de {start} a {end}")
+    return processed
+
+
+def query_price_series(
+    db,
+    start: datetime,
+    end: Optional[datetime] = None,
+    gpu_name: Optional[str] = None,
+    machine_type: Optional[str] = None,
+    resolution: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Série de preços no intervalo, na resolução pedida ou escolhida por
+    choose_resolution.
+
+    Returns:
+        Lista (mais recente primeiro) de dicts com timestamp, resolution,
+        gpu_name, machine_type, min/max/avg_price, percentile_25/75,
+        total_offers, available_gpus, avg_reliability e samples
+        (snapshots agregados no ponto)
+    """
+    from src.models.metrics import MarketSnapshot, MarketSnapshotRollup
+
+    resolution = resolution or choose_resolution(start, end)
+
+    if resolution == RESOLUTION_RAW:
+        query = db.query(MarketSnapshot).filter(MarketSnapshot.timestamp >= start)
+        if end:
+            query = query.filter(MarketSnapshot.timestamp < end)
+        if gpu_name:
+            query = query.filter(MarketSnapshot.gpu_name == gpu_name)
+        if machine_type:
+            query = query.filter(MarketSnapshot.machine_type == machine_type)
+        query = query.order_by(MarketSnapshot.timestamp.desc())
+        if limit:
+            query = query.limit(limit)
+        return [
+            {
+                'timestamp': r.timestamp,
+                'resolution': RESOLUTION_RAW,
+                'gpu_name': r.gpu_name,
+                'machine_type': r.machine_type,
+                'min_price': r.min_price,
+                'max_price': r.max_price,
+                'avg_price': r.avg_price,
+                'percentile_25': r.percentile_25,
+                'percentile_75': r.percentile_75,
+                'total_offers': r.total_offers,
+                'available_gpus': r.available_gpus,
+                'avg_reliability': r.avg_reliability,
+                'samples': 1,
+            }
+            for r in query.all()
+        ]
+
+    if resolution not in ROLLUP_RESOLUTIONS:
+        raise ValueError(f"Resolução inválida: {resolution}")
+
+    query = db.query(MarketSnapshotRollup).filter(
+        MarketSnapshotRollup.resolution == resolution,
+        MarketSnapshotRollup.bucket_start >= bucket_start(start, resolution),
+    )
+    if end:
+        query = query.filter(MarketSnapshotRollup.bucket_start < end)
+    if gpu_name:
+        query = query.filter(MarketSnapshotRollup.gpu_name == gpu_name)
+    if machine_type:
+        query = query.filter(MarketSnapshotRollup.machine_type == machine_type)
+    query = query.order_by(MarketSnapshotRollup.bucket_start.desc())
+    if limit:
+        query = query.limit(limit)
+    return [
+        {
+            'timestamp': r.bucket_start,
+            'resolution': resolution,
+            'gpu_name': r.gpu_name,
+            'machine_type': r.machine_type,
+            'min_price': r.min_price,
+            'max_price': r.max_price,
+            'avg_price': r.avg_price,
+            'percentile_25': r.percentile_25,
+            'percentile_75': r.percentile_75,
+            'total_offers': round(r.avg_offers),
+            'available_gpus': round(r.avg_available_gpus),
+            'avg_reliability': r.avg_reliability,
+            'samples': r.sample_count,
+        }
+        for r in query.all()
+    ]
@@ -6,6 +6,10 @@ Consolida toda lógica de cálculo de estatísticas:
 - Performance (TFLOPS, DLPerf)
 - Eficiência (custo/TFLOPS)
 - Distribuição regional
+
+Para ciclos de coleta, OfferBatch converte todas as ofertas uma única vez em
+colunas NumPy; estatísticas de todos os grupos GPU:tipo e scores de
+eficiência são calculados de forma vetorizada.
 """
 
 import math
@@ -14,6 +18,8 @@ from typing import List, Dict, Optional, Any
 from collections import defaultdict
 from dataclasses import dataclass
 
+import numpy as np
+
 
 @dataclass
 class PriceStats:
@@ -63,6 +69,80 @@ class MarketStats:
             self.region_distribution = {}
 
 
+REGIONS = ["US", "EU", "ASIA", "OTHER"]
+
+
+@dataclass
+class OfferBatch:
+    """
+    Lote de ofertas em formato colunar (um array por atributo).
+
+    Valores ausentes viram 0 (ou False); os filtros "> 0" das estatísticas
+    os descartam como na versão por oferta.
+    """
+    offers: List[Any]
+    groups: List[str]           # Chaves dos grupos ("GPU:tipo")
+    group: np.ndarray           # Índice do grupo de cada oferta
+    price: np.ndarray
+    total_flops: np.ndarray
+    dlperf: np.ndarray
+    gpu_ram: np.ndarray
+    gpu_mem_bw: np.ndarray
+    reliability: np.ndarray
+    cost_per_tflops: np.ndarray
+    cost_per_gb_vram: np.ndarray
+    num_gpus: np.ndarray
+    verified: np.ndarray
+    region: np.ndarray          # Índice em REGIONS
+
+    def __len__(self) -> int:
+        return len(self.offers)
+
+    @classmethod
+    def from_offers(cls, grouped_offers: Dict[str, List[Any]]) -> 'OfferBatch':
+        """
+        Converte ofertas agrupadas em colunas.
+
+        Args:
+            grouped_offers: Dict "GPU:tipo" -> lista de ofertas
+
+        Returns:
+            OfferBatch com todas as ofertas, na ordem dos grupos
+        """
+        groups = list(grouped_offers)
+        offers = [o for key in groups for o in grouped_offers[key]]
+        group = np.repeat(np.arange(len(groups)), [len(grouped_offers[k]) for k in groups])
+
+        def column(attr: str, default: float = 0.0) -> np.ndarray:
+            return np.array([getattr(o, attr, default) or 0.0 for o in offers], dtype=np.float64)
+
+        region_cache: Dict[str, int] = {}
+        regions = np.empty(len(offers), dtype=np.int8)
+        for i, o in enumerate(offers):
+            geo = getattr(o, 'geolocation', '') or ''
+            code = region_cache.get(geo)
+            if code is None:
+                code = region_cache[geo] = REGIONS.index(StatisticsCalculator.classify_region(geo))
+            regions[i] = code
+
+        return cls(
+            offers=offers,
+            groups=groups,
+            group=group,
+            price=column('dph_total'),
+            total_flops=column('total_flops'),
+            dlperf=column('dlperf'),
+            gpu_ram=column('gpu_ram'),
+            gpu_mem_bw=column('gpu_mem_bw'),
+            reliability=column('reliability'),
+            cost_per_tflops=column('cost_per_tflops'),
+            cost_per_gb_vram=column('cost_per_gb_vram'),
+            num_gpus=column('num_gpus', 1),
+            verified=np.array([bool(getattr(o, 'verified', False)) for o in offers], dtype=bool),
+            region=regions,
+        )
+
+
 class StatisticsCalculator:
     """
     Calculadora de estatísticas de mercado GPU.
@@ -78,6 +158,11 @@ class StatisticsCalculator:
 
         # Score de eficiência
         score = calc.calculate_efficiency_score(offer)
+
+        # Ciclo de coleta: todos os grupos de uma vez
+        batch = OfferBatch.from_offers(all_offers)
+        stats_by_group = calc.calculate_batch_stats(batch)
+        scores = calc.calculate_efficiency_scores(batch)
     """
 
     # Regiões conhecidas para classificação
@@ -199,6 +284,134 @@ class StatisticsCalculator:
             region_distribution=dict(regions),
         )
 
+    @staticmethod
+    def calculate_batch_stats(batch: OfferBatch) -> Dict[str, MarketStats]:
+        """
+        Calcula MarketStats de todos os grupos do lote de uma vez.
+
+        Mesmos resultados de calculate_market_stats aplicado a cada grupo.
+
+        Args:
+            batch: Lote colunar (OfferBatch.from_offers)
+
+        Returns:
+            Dict "GPU:tipo" -> MarketStats (grupos vazios ficam de fora)
+        """
+        n_groups = len(batch.groups)
+        counts = np.bincount(batch.group, minlength=n_groups)
+
+        def positive_mean(values: np.ndarray):
+            mask = values > 0
+            n = np.bincount(batch.group[mask], minlength=n_groups)
+            total = np.bincount(batch.group[mask], weights=values[mask], minlength=n_groups)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return total / n, n
+
+        def positive_min(values: np.ndarray):
+            mask = values > 0
+            out = np.full(n_groups, np.inf)
+            np.minimum.at(out, batch.group[mask], values[mask])
+            return out
+
+        # Preços: ordenados por (grupo, preço) para percentis/mediana por grupo
+        price_mask = batch.price > 0
+        price_group = batch.group[price_mask]
+        prices = batch.price[price_mask]
+        order = np.lexsort((prices, price_group))
+        sorted_prices = prices[order]
+        n_prices = np.bincount(price_group, minlength=n_groups)
+        starts = np.concatenate(([0], np.cumsum(n_prices)[:-1]))
+        avg_price, _ = positive_mean(batch.price)
+        max_price = np.full(n_groups, -np.inf)
+        np.maximum.at(max_price, price_group, prices)
+
+        avg_reliability, n_rel = positive_mean(batch.reliability)
+        avg_flops, n_flops = positive_mean(batch.total_flops)
+        avg_dlperf, n_dlperf = positive_mean(batch.dlperf)
+        avg_bw, n_bw = positive_mean(batch.gpu_mem_bw)
+        avg_cost_tflops, n_cost_tflops = positive_mean(batch.cost_per_tflops)
+        min_cost_tflops = positive_min(batch.cost_per_tflops)
+        min_cost_vram = positive_min(batch.cost_per_gb_vram)
+        _, n_cost_vram = positive_mean(batch.cost_per_gb_vram)
+
+        available_gpus = np.bincount(batch.group, weights=batch.num_gpus, minlength=n_groups)
+        verified = np.bincount(batch.group[batch.verified], minlength=n_groups)
+        region_counts = np.bincount(
+            batch.group * len(REGIONS) + batch.region, minlength=n_groups * len(REGIONS)
+        ).reshape(n_groups, len(REGIONS))
+
+        def opt(values: np.ndarray, n: np.ndarray, g: int) -> Optional[float]:
+            return float(values[g]) if n[g] else None
+
+        results = {}
+        for g, key in enumerate(batch.groups):
+            if not counts[g]:
+                continue
+            n = int(n_prices[g])
+            group_prices = sorted_prices[starts[g]:starts[g] + n]
+            if n:
+                mid = n // 2
+                median = group_prices[mid] if n % 2 else (group_prices[mid - 1] + group_prices[mid]) / 2
+            results[key] = MarketStats(
+                min_price=float(group_prices[0]) if n else 0,
+                max_price=float(max_price[g]) if n else 0,
+                avg_price=float(avg_price[g]) if n else 0,
+                median_price=float(median) if n else 0,
+                p25=float(group_prices[n // 4]) if n >= 4 else None,
+                p75=float(group_prices[3 * n // 4]) if n >= 4 else None,
+                total_offers=int(counts[g]),
+                available_gpus=int(available_gpus[g]),
+                verified_offers=int(verified[g]),
+                avg_reliability=opt(avg_reliability, n_rel, g),
+                avg_total_flops=opt(avg_flops, n_flops, g),
+                avg_dlperf=opt(avg_dlperf, n_dlperf, g),
+                avg_gpu_mem_bw=opt(avg_bw, n_bw, g),
+                min_cost_per_tflops=opt(min_cost_tflops, n_cost_tflops, g),
+                avg_cost_per_tflops=opt(avg_cost_tflops, n_cost_tflops, g),
+                min_cost_per_gb_vram=opt(min_cost_vram, n_cost_vram, g),
+                region_distribution={
+                    REGIONS[r]: int(c) for r, c in enumerate(region_counts[g]) if c
+                },
+            )
+        return results
+
+    @staticmethod
+    def calculate_efficiency_scores(batch: OfferBatch) -> np.ndarray:
+        """
+        Scores de eficiência (0-100) de todas as ofertas do lote.
+
+        Mesma fórmula de calculate_efficiency_score, vetorizada.
+
+        Returns:
+            Array de scores, na ordem de batch.offers
+        """
+        score = np.zeros(len(batch))
+
+        # 1. Custo por TFLOPS (peso 35%)
+        cost = batch.cost_per_tflops
+        has_cost = cost > 0
+        log_cost = np.log10(np.where(has_cost, cost, 0) * 1000 + 1)
+        score += np.where(has_cost, np.maximum(0, 100 - log_cost * 30) * 0.35, 0)
+
+        # 2. Preço absoluto (peso 20%)
+        price = batch.price
+        score += np.where(price > 0, np.maximum(0, 100 - price * 100) * 0.20, 0)
+
+        # 3. Performance absoluta (peso 20%)
+        flops = batch.total_flops
+        score += np.where(flops > 0, np.minimum(100, flops * 1.5) * 0.12, 0)
+        dlperf = batch.dlperf
+        score += np.where(dlperf > 0, np.minimum(100, dlperf * 2) * 0.08, 0)
+
+        # 4. Reliability (peso 15%)
+        reliability = batch.reliability
+        score += np.where(reliability > 0, reliability * 100, 70) * 0.15
+
+        # 5. Verified bonus (peso 10%)
+        score += np.where(batch.verified, 10, 3)
+
+        return np.clip(score, 0, 100)
+
     @staticmethod
     def calculate_efficiency_score(offer: Any) -> float:
         """
@@ -21,6 +21,7 @@ from pathlib import Path
 from enum import Enum
 
 from .registry import ModelInfo, ModelRegistry, get_registry, ModelRuntime
+from src.infrastructure.providers.ssh_pool import get_ssh_pool
 
 logger = logging.getLogger(__name__)
 
@@ -407,21 +408,12 @@ PYEOF
         command: str,
         timeout: int = 30,
     ) -> subprocess.CompletedProcess:
-        """Executa comando via SSH"""
-        ssh_cmd = [
-            "ssh",
-            "-o", "StrictHostKeyChecking=no",
-            "-o", "UserKnownHostsFile=/dev/null",
-            "-o", "ConnectTimeout=10",
-            "-p", str(ssh_port),
-            f"{ssh_user}@{ssh_host}",
+        """Executa comando via SSH (conexão compartilhada do pool)"""
+        return get_ssh_pool().run(
+            ssh_host,
+            ssh_port,
             command,
-        ]
-
-        return subprocess.run(
-            ssh_cmd,
-            capture_output=True,
-            text=True,
+            user=ssh_user,
             timeout=timeout,
         )
 
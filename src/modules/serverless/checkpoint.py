@@ -32,6 +32,7 @@ from typing import Optional, Dict, List
 from dataclasses import dataclass
 
 from .config import get_settings
+from src.infrastructure.providers.ssh_pool import get_ssh_pool
 
 
 @dataclass
@@ -557,22 +558,14 @@ echo '{{"success": true, "checkpoint_id": "{checkpoint_id}"}}'
         timeout: int = 30,
         user: str = 'root'
     ) -> subprocess.CompletedProcess:
-        """Executa comando via SSH"""
-        ssh_cmd = [
-            'ssh',
-            '-o', 'StrictHostKeyChecking=no',
-            '-o', 'UserKnownHostsFile=/dev/null',
-            '-o', f'ConnectTimeout={self._settings.ssh_connect_timeout}',
-            '-p', str(ssh_port),
-            f'{user}@{ssh_host}',
-            command
-        ]
-
-        return subprocess.run(
-            ssh_cmd,
-            capture_output=True,
-            text=True,
-            timeout=timeout
+        """Executa comando via SSH (conexão compartilhada do pool)"""
+        return get_ssh_pool().run(
+            ssh_host,
+            ssh_port,
+            command,
+            user=user,
+            timeout=timeout,
+            connect_timeout=self._settings.ssh_connect_timeout
         )
 
 
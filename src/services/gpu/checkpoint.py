@@ -21,6 +21,8 @@ from typing import Optional, Dict, List, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 
+from src.infrastructure.providers.ssh_pool import get_ssh_pool
+
 
 @dataclass
 class GPUCheckpoint:
@@ -431,21 +433,12 @@ echo '{{"success": true, "path": "r2:{r2_bucket}/{checkpoint_id}.tar.gz"}}'
         timeout: int = 30,
         user: str = 'root'
     ) -> subprocess.CompletedProcess:
-        """Executa comando via SSH"""
-        ssh_cmd = [
-            'ssh',
-            '-o', 'StrictHostKeyChecking=no',
-            '-o', 'UserKnownHostsFile=/dev/null',
-            '-o', 'ConnectTimeout=10',
-            '-p', str(ssh_port),
-            f'{user}@{ssh_host}',
-            command
-        ]
-
-        return subprocess.run(
-            ssh_cmd,
-            capture_output=True,
-            text=True,
+        """Executa comando via SSH (conexão compartilhada do pool)"""
+        return get_ssh_pool().run(
+            ssh_host,
+            ssh_port,
+            command,
+            user=user,
             timeout=timeout
         )
 
@@ -0,0 +1,329 @@
+"""
+Fleet State Tracker - Estado de todas as instancias Vast.ai de uma API key
+
+Um unico poller por API key e processo:
+- Chama GET /instances/ uma vez por tick (em vez de um GET por instancia
+  por consumidor)
+- Compara com o tick anterior e publica eventos de mudanca
+  (running, ssh_ready, exited, gone, status_changed)
+- Entrega eventos em asyncio.Queue (consumidores async) ou queue.Queue
+  (consumidores em threads), filtrados por instance_id
+- Mantem o ultimo estado conhecido para leituras sem chamada a API
+
+O poller roda numa thread daemon enquanto houver assinantes, no menor
+intervalo pedido por eles (assinantes sem intervalo usam poll_interval).
+"""
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from src.infrastructure.providers.vast_client import get_vast_client
+
+logger = logging.getLogger(__name__)
+
+
+FLEET_POLL_INTERVAL = float(os.getenv("FLEET_POLL_INTERVAL", "2"))
+
+# Estados terminais: a instancia nao vai mais ficar pronta
+TERMINAL_STATUSES = {"exited", "error", "destroyed"}
+
+EVENT_RUNNING = "running"
+EVENT_SSH_READY = "ssh_ready"
+EVENT_EXITED = "exited"
+EVENT_GONE = "gone"
+EVENT_STATUS_CHANGED = "status_changed"
+
+
+@dataclass
+class FleetEvent:
+    """Mudanca de estado de uma instancia observada entre dois ticks"""
+    event: str
+    instance_id: int
+    status: Optional[str]
+    previous_status: Optional[str] = None
+    instance: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+
+def _is_ssh_ready(instance: Optional[Dict[str, Any]]) -> bool:
+    return bool(
+        instance
+        and instance.get("actual_status") == "running"
+        and instance.get("ssh_host")
+        and instance.get("ssh_port")
+    )
+
+
+def diff_states(
+    previous: Dict[int, Dict[str, Any]],
+    current: Dict[int, Dict[str, Any]],
+) -> List[FleetEvent]:
+    """Eventos que levam o estado `previous` ao `current`"""
+    events = []
+    for instance_id, instance in current.items():
+        old = previous.get(instance_id)
+        status = instance.get("actual_status")
+        old_status = old.get("actual_status") if old else None
+
+        if old is None or status != old_status:
+            if status == "running":
+                kind = EVENT_RUNNING
+            elif status in TERMINAL_STATUSES:
+                kind = EVENT_EXITED
+            else:
+                kind = EVENT_STATUS_CHANGED
+            events.append(FleetEvent(kind, instance_id, status, old_status, instance))
+
+        if _is_ssh_ready(instance) and not _is_ssh_ready(old):
+            events.append(FleetEvent(EVENT_SSH_READY, instance_id, status, old_status, instance))
+
+    for instance_id, old in previous.items():
+        if instance_id not in current:
+            events.append(FleetEvent(EVENT_GONE, instance_id, None, old.get("actual_status"), old))
+    return events
+
+
+class _Subscription:
+    """Fila de um assinante e os instance_ids que ele acompanha (None = todos)"""
+
+    def __init__(
+        self,
+        instance_ids: Optional[Iterable[int]],
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        interval: Optional[float] = None,
+    ):
+        self.instance_ids: Optional[Set[int]] = set(instance_ids) if instance_ids is not None else None
+        self.loop = loop
+        self.interval = interval
+        self.queue: Union[asyncio.Queue, queue.Queue] = asyncio.Queue() if loop else queue.Queue()
+
+    def wants(self, instance_id: int) -> bool:
+        return self.instance_ids is None or instance_id in self.instance_ids
+
+    def put(self, event: FleetEvent) -> bool:
+        """Entrega o evento; False se o loop do assinante ja foi fechado"""
+        if self.loop is None:
+            self.queue.put(event)
+            return True
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+            return True
+        except RuntimeError:
+            return False
+
+
+class FleetStateTracker:
+    """
+    Estado compartilhado das instancias de uma API key.
+
+    Uso (async):
+        tracker = get_fleet_tracker(api_key)
+        events = tracker.subscribe([instance_id])
+        try:
+            event = await events.get()
+        finally:
+            tracker.unsubscribe(events)
+
+    Uso (threads):
+        events = tracker.subscribe_sync([instance_id])
+        event = events.get(timeout=tracker.poll_interval)
+    """
+
+    def __init__(self, api_key: str, poll_interval: float = FLEET_POLL_INTERVAL):
+        self.client = get_vast_client(api_key)
+        self.poll_interval = poll_interval
+
+        self._instances: Dict[int, Dict[str, Any]] = {}
+        self._last_poll: float = 0.0
+        self._ticks = 0
+        self._subscriptions: List[_Subscription] = []
+        self._lock = threading.Lock()
+        # Um GET por vez: uma resposta antiga nao pode sobrescrever uma mais nova
+        self._poll_lock = threading.Lock()
+        self._tick_cond = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ==================== POLLING ====================
+
+    def poll_once(self) -> List[FleetEvent]:
+        """
+        Um tick: lista as instancias, calcula e publica os eventos.
+
+        Returns:
+            Eventos publicados (vazio se a chamada falhou)
+        """
+        with self._poll_lock:
+            return self._poll_locked()
+
+    def _poll_locked(self) -> List[FleetEvent]:
+        try:
+            resp = self.client.get("/instances/", params={"owner": "me"})
+            resp.raise_for_status()
+            data = resp.json()
+        except Exception as e:
+            logger.warning(f"Fleet poll failed: {e}")
+            return []
+
+        rows = data.get("instances", []) if isinstance(data, dict) else data
+        current = {row["id"]: row for row in rows if row.get("id") is not None}
+
+        with self._tick_cond:
+            events = diff_states(self._instances, current)
+            self._instances = current
+            self._last_poll = time.time()
+            self._ticks += 1
+            subscriptions = list(self._subscriptions)
+            self._tick_cond.notify_all()
+
+        dead = []
+        for event in events:
+            for sub in subscriptions:
+                if sub.wants(event.instance_id) and not sub.put(event):
+                    dead.append(sub)
+        for sub in dead:
+            self._remove(sub)
+
+        if events:
+            logger.debug(f"Fleet tick: {len(current)} instances, {len(events)} events")
+        return events
+
+    def _interval_locked(self) -> float:
+        """Menor intervalo pedido pelos assinantes atuais"""
+        return min(
+            (sub.interval if sub.interval is not None else self.poll_interval)
+            for sub in self._subscriptions
+        )
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            self.poll_once()
+            while True:
+                # Acordado por novas assinaturas, que podem pedir intervalo menor
+                self._wake.clear()
+                with self._lock:
+                    if not self._subscriptions:
+                        self._thread = None
+                        return
+                    remaining = self._interval_locked() - (time.monotonic() - started)
+                if remaining <= 0:
+                    break
+                self._wake.wait(remaining)
+
+    def _ensure_running(self):
+        with self._lock:
+            self._wake.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="fleet-tracker", daemon=True)
+                self._thread.start()
+
+    # ==================== SUBSCRIPTIONS ====================
+
+    def _add(self, sub: _Subscription, replay: bool) -> _Subscription:
+        with self._lock:
+            self._subscriptions.append(sub)
+            current = dict(self._instances) if self._last_poll else {}
+        if replay:
+            # Estado atual como eventos, para quem assina depois da transicao
+            for event in diff_states({}, current):
+                if sub.wants(event.instance_id):
+                    sub.put(event)
+        self._ensure_running()
+        return sub
+
+    def _remove(self, sub: _Subscription):
+        with self._lock:
+            if sub in self._subscriptions:
+                self._subscriptions.remove(sub)
+
+    def subscribe(
+        self,
+        instance_ids: Optional[Iterable[int]] = None,
+        replay: bool = True,
+        interval: Optional[float] = None,
+    ) -> asyncio.Queue:
+        """
+        Fila asyncio de FleetEvent para os instance_ids (None = todas).
+
+        Deve ser chamado dentro de um event loop. Com replay, o estado atual
+        ja conhecido e entregue primeiro. interval pede ticks menos frequentes
+        que poll_interval (vale enquanto nao houver assinante mais exigente).
+        """
+        sub = _Subscription(instance_ids, loop=asyncio.get_running_loop(), interval=interval)
+        return self._add(sub, replay).queue
+
+    def subscribe_sync(
+        self,
+        instance_ids: Optional[Iterable[int]] = None,
+        replay: bool = True,
+        interval: Optional[float] = None,
+    ) -> queue.Queue:
+        """Como subscribe(), mas com queue.Queue para consumidores em threads"""
+        return self._add(_Subscription(instance_ids, interval=interval), replay).queue
+
+    def unsubscribe(self, events_queue: Union[asyncio.Queue, queue.Queue]):
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s.queue is not events_queue]
+
+    def track(self, events_queue: Union[asyncio.Queue, queue.Queue], instance_id: int):
+        """Adiciona uma instancia a uma assinatura existente (ex: nova GPU apos failover)"""
+        with self._lock:
+            subs = [s for s in self._subscriptions if s.queue is events_queue]
+            for sub in subs:
+                if sub.instance_ids is not None:
+                    sub.instance_ids.add(instance_id)
+            instance = self._instances.get(instance_id)
+        if instance:
+            for sub in subs:
+                for event in diff_states({}, {instance_id: instance}):
+                    sub.put(event)
+
+    # ==================== STATE ====================
+
+    def get(self, instance_id: int) -> Optional[Dict[str, Any]]:
+        """Ultimo estado conhecido da instancia (None se ausente no ultimo tick)"""
+        with self._lock:
+            return self._instances.get(instance_id)
+
+    @property
+    def last_poll(self) -> float:
+        return self._last_poll
+
+    def list_instances(self, max_age: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Instancias do ultimo tick; faz um tick agora se o estado tiver mais de
+        max_age segundos (padrao: poll_interval).
+        """
+        max_age = self.poll_interval if max_age is None else max_age
+        if time.time() - self._last_poll > max_age:
+            with self._poll_lock:
+                # O tick que estava em andamento pode ja ter trazido estado novo
+                if time.time() - self._last_poll > max_age:
+                    self._poll_locked()
+        with self._lock:
+            return list(self._instances.values())
+
+    def wait_for_tick(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia ate o proximo tick concluido; False se estourou o timeout"""
+        with self._tick_cond:
+            tick = self._ticks
+            return self._tick_cond.wait_for(lambda: self._ticks > tick, timeout)
+
+
+_trackers: Dict[str, FleetStateTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_fleet_tracker(api_key: str) -> FleetStateTracker:
+    """Tracker compartilhado da API key (um poller por processo)"""
+    with _trackers_lock:
+        tracker = _trackers.get(api_key)
+        if tracker is None:
+            tracker = _trackers[api_key] = FleetStateTracker(api_key)
+        return tracker
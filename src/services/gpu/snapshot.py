@@ -7,6 +7,8 @@ import subprocess
 from datetime import datetime
 from typing import Optional, Dict, List
 
+from src.infrastructure.providers.ssh_pool import get_ssh_pool
+
 logger = logging.getLogger(__name__)
 
 class GPUSnapshotService:
@@ -1069,18 +1071,12 @@ print(json.dumps(stats))
         script_b64 = base64.b64encode(script.encode('utf-8')).decode('utf-8')
 
         # Pass B2 credentials as environment variables via SSH
-        cmd = [
-            "ssh",
-            "-p", str(port),
-            "-o", "StrictHostKeyChecking=no",
-            f"root@{host}",
-            f"B2_KEY_ID='{b2_key_id}' B2_APPLICATION_KEY='{b2_app_key}' bash -c \"echo {script_b64} | base64 -d | python3\""
-        ]
+        command = f"B2_KEY_ID='{b2_key_id}' B2_APPLICATION_KEY='{b2_app_key}' bash -c \"echo {script_b64} | base64 -d | python3\""
 
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
+        result = get_ssh_pool().run(
+            host,
+            port,
+            command,
             timeout=7200 # 2 hours
         )
         return {
@@ -9,6 +9,8 @@ from typing import Optional, List, Dict, Any
 from enum import Enum
 import time
 
+from src.infrastructure.providers.ssh_pool import get_ssh_pool
+
 
 class ProvisionStatus(str, Enum):
     """Status of a provisioning operation"""
@@ -207,29 +209,18 @@ class ProvisioningStrategy(ABC):
 
         Common utility for all strategies.
         """
-        import subprocess
-        import os
-
         # Use provided key or find default
         if ssh_key_path is None:
-            ssh_key_path = os.path.expanduser("~/.ssh/id_rsa")
+            ssh_key_path = "~/.ssh/id_rsa"
 
         try:
-            result = subprocess.run(
-                [
-                    "ssh",
-                    "-i", ssh_key_path,
-                    "-o", "StrictHostKeyChecking=no",
-                    "-o", "UserKnownHostsFile=/dev/null",
-                    "-o", f"ConnectTimeout={timeout}",
-                    "-o", "BatchMode=yes",
-                    "-p", str(ssh_port),
-                    f"root@{ssh_host}",
-                    "echo ok"
-                ],
-                capture_output=True,
-                text=True,
+            result = get_ssh_pool().run(
+                ssh_host,
+                ssh_port,
+                "echo ok",
+                key_path=ssh_key_path,
                 timeout=timeout + 2,
+                connect_timeout=timeout,
             )
             return result.returncode == 0 and "ok" in result.stdout
         except Exception:
@@ -15,6 +15,8 @@ from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from src.infrastructure.providers.ssh_pool import get_ssh_pool
+
 from .base import (
     ProvisioningStrategy,
     ProvisionConfig,
@@ -296,27 +298,14 @@ class ColdStartStrategy(ProvisioningStrategy):
         timeout: int,
     ) -> bool:
         """Verify SSH works with a real command"""
-        import subprocess
-        import os
-
-        ssh_key_path = os.path.expanduser("~/.ssh/id_rsa")
-
         try:
-            result = subprocess.run(
-                [
-                    "ssh",
-                    "-i", ssh_key_path,
-                    "-o", "StrictHostKeyChecking=no",
-                    "-o", "UserKnownHostsFile=/dev/null",
-                    "-o", f"ConnectTimeout={min(timeout, 10)}",
-                    "-o", "BatchMode=yes",
-                    "-p", str(ssh_port),
-                    f"root@{ssh_host}",
-                    "echo SSH_OK"
-                ],
-                capture_output=True,
-                text=True,
+            result = get_ssh_pool().run(
+                ssh_host,
+                ssh_port,
+                "echo SSH_OK",
+                key_path="~/.ssh/id_rsa",
                 timeout=timeout,
+                connect_timeout=min(timeout, 10),
             )
             return result.returncode == 0 and "SSH_OK" in result.stdout
 
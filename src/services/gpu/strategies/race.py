@@ -14,6 +14,7 @@ Improvements:
 - Failover: Configurable max_ssh_retries to try multiple machines
 """
 import time
+import queue
 import logging
 from typing import Optional, List, Dict, Any, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -25,6 +26,8 @@ from .base import (
     MachineCandidate,
     ProvisionStatus,
 )
+from ..fleet_tracker import get_fleet_tracker, EVENT_EXITED, EVENT_GONE, EVENT_SSH_READY
+from src.infrastructure.providers.ssh_pool import get_ssh_pool
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +43,8 @@ class RaceStrategy(ProvisioningStrategy):
     Algorithm:
     1. Search for available offers
     2. Create batch_size machines in parallel
-    3. Poll all machines for SSH readiness (every check_interval seconds)
+    3. Wait for fleet tracker events (one list call per tick for all
+       machines) and test SSH on machines that got an address
     4. First machine with SSH accessible wins
     5. Destroy all losers
     6. If no winner in batch_timeout, try next batch
@@ -291,6 +295,131 @@ class RaceStrategy(ProvisioningStrategy):
 
         Returns the winning candidate or None (only if all machines fail/destroyed).
         """
+        api_key = getattr(vast_service, "api_key", None)
+        if not isinstance(api_key, str) or not api_key:
+            return self._race_for_ready_polling(vast_service, candidates, config, progress_callback)
+
+        tracker = get_fleet_tracker(api_key)
+        by_id = {c.instance_id: (c, t) for c, t in candidates}
+        events = tracker.subscribe_sync(by_id)
+        race_start = time.time()
+        failed_ids = set()
+        ssh_pending = set()  # running with an SSH address, waiting for sshd
+
+        try:
+            while True:
+                batch = []
+                try:
+                    batch.append(events.get(timeout=max(config.check_interval, tracker.poll_interval)))
+                    while True:
+                        batch.append(events.get_nowait())
+                except queue.Empty:
+                    pass
+
+                for event in batch:
+                    if event.event in (EVENT_EXITED, EVENT_GONE):
+                        logger.warning(
+                            f"[RaceStrategy] Instance {event.instance_id} failed: {event.status or 'destroyed'}"
+                        )
+                        failed_ids.add(event.instance_id)
+                        ssh_pending.discard(event.instance_id)
+                    elif event.event == EVENT_SSH_READY:
+                        ssh_pending.add(event.instance_id)
+
+                if ssh_pending:
+                    winner = self._check_ssh_pending(tracker, ssh_pending, by_id, config)
+                    if winner:
+                        return winner
+
+                if len(failed_ids) >= len(candidates):
+                    logger.warning("[RaceStrategy] All machines failed")
+                    return None
+
+                if progress_callback:
+                    elapsed = int(time.time() - race_start)
+                    remaining = len(candidates) - len(failed_ids)
+                    progress_callback(
+                        "waiting",
+                        f"Waiting for SSH... ({elapsed}s, {remaining} machines loading)",
+                        min(50, elapsed),  # Cap at 50% for waiting phase
+                    )
+        finally:
+            tracker.unsubscribe(events)
+
+    def _check_ssh_pending(
+        self,
+        tracker: Any,
+        pending_ids: set,
+        by_id: Dict[int, Tuple[MachineCandidate, float]],
+        config: ProvisionConfig,
+    ) -> Optional[MachineCandidate]:
+        """Test SSH in parallel on candidates the tracker reports as running with an address"""
+        checks = [
+            (by_id[instance_id], tracker.get(instance_id))
+            for instance_id in pending_ids
+        ]
+        checks = [(ct, status) for ct, status in checks if status]
+        if not checks:
+            return None
+
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = [
+                executor.submit(self._try_candidate, c, t, status, config)
+                for (c, t), status in checks
+            ]
+            for future in as_completed(futures, timeout=15):
+                try:
+                    winner = future.result()
+                    if winner:
+                        return winner
+                except Exception:
+                    pass
+        return None
+
+    def _try_candidate(
+        self,
+        candidate: MachineCandidate,
+        start_time: float,
+        status: Dict[str, Any],
+        config: ProvisionConfig,
+    ) -> Optional[MachineCandidate]:
+        """Fill SSH/port info from an instance status and return the candidate if SSH answers"""
+        ssh_host = status.get("ssh_host")
+        ssh_port = status.get("ssh_port")
+        if not (ssh_host and ssh_port):
+            return None
+
+        candidate.ssh_host = ssh_host
+        candidate.ssh_port = int(ssh_port)
+        candidate.public_ip = status.get("public_ipaddr", ssh_host)
+
+        # Get port mappings
+        ports = status.get("ports") or {}
+        for port in config.ports:
+            mapped = self._get_mapped_port(ports, port)
+            if mapped:
+                candidate.port_mappings[port] = mapped
+
+        # Test SSH
+        if self._test_ssh_connection(ssh_host, int(ssh_port)):
+            candidate.connected = True
+            candidate.status = "ready"
+            candidate.ready_time = time.time() - start_time
+            logger.info(
+                f"[RaceStrategy] {candidate.gpu_name} ready in "
+                f"{candidate.ready_time:.1f}s at {ssh_host}:{ssh_port}"
+            )
+            return candidate
+        return None
+
+    def _race_for_ready_polling(
+        self,
+        vast_service: Any,
+        candidates: List[Tuple[MachineCandidate, float]],
+        config: ProvisionConfig,
+        progress_callback: Optional[callable] = None,
+    ) -> Optional[MachineCandidate]:
+        """Per-instance polling, for services without an API key to share a fleet tracker"""
         race_start = time.time()
         destroyed_ids = set()
         failed_ids = set()
@@ -363,31 +492,8 @@ class RaceStrategy(ProvisioningStrategy):
                     return (None, candidate.instance_id)
 
                 if actual_status == "running":
-                    ssh_host = status.get("ssh_host")
-                    ssh_port = status.get("ssh_port")
-
-                    if ssh_host and ssh_port:
-                        candidate.ssh_host = ssh_host
-                        candidate.ssh_port = int(ssh_port)
-                        candidate.public_ip = status.get("public_ipaddr", ssh_host)
-
-                        # Get port mappings
-                        ports = status.get("ports", {})
-                        for port in config.ports:
-                            mapped = self._get_mapped_port(ports, port)
-                            if mapped:
-                                candidate.port_mappings[port] = mapped
-
-                        # Test SSH
-                        if self._test_ssh_connection(ssh_host, int(ssh_port)):
-                            candidate.connected = True
-                            candidate.status = "ready"
-                            candidate.ready_time = time.time() - start_time
-                            logger.info(
-                                f"[RaceStrategy] {candidate.gpu_name} ready in "
-                                f"{candidate.ready_time:.1f}s at {ssh_host}:{ssh_port}"
-                            )
-                            return (candidate, None)
+                    if self._try_candidate(candidate, start_time, status, config):
+                        return (candidate, None)
 
                 # Still loading/waiting
                 return (None, None)
@@ -457,26 +563,16 @@ class RaceStrategy(ProvisioningStrategy):
         Some machines have SSH port open but fail to accept connections.
         """
         import subprocess
-        import os
-
-        ssh_key_path = os.path.expanduser("~/.ssh/id_rsa")
 
         try:
-            result = subprocess.run(
-                [
-                    "ssh",
-                    "-i", ssh_key_path,
-                    "-o", "StrictHostKeyChecking=no",
-                    "-o", "UserKnownHostsFile=/dev/null",
-                    "-o", f"ConnectTimeout={timeout}",
-                    "-o", "BatchMode=yes",
-                    "-p", str(candidate.ssh_port),
-                    f"root@{candidate.ssh_host}",
-                    "echo SSH_VERIFIED && hostname"
-                ],
-                capture_output=True,
-                text=True,
+            # O master aberto aqui é reaproveitado por quem usar a máquina vencedora
+            result = get_ssh_pool().run(
+                candidate.ssh_host,
+                candidate.ssh_port,
+                "echo SSH_VERIFIED && hostname",
+                key_path="~/.ssh/id_rsa",
                 timeout=timeout + 5,
+                connect_timeout=timeout,
             )
 
             if result.returncode == 0 and "SSH_VERIFIED" in result.stdout:
@@ -24,6 +24,7 @@ from src.domain.models.job import (
     Job, JobConfig, JobStatus, JobSource, JobCompletionReason
 )
 from src.services.gpu.vast import VastService
+from src.infrastructure.providers.ssh_pool import get_ssh_pool
 from src.services.deploy_wizard import (
     DeployWizardService, DeployConfig, SSH_INSTALL_SCRIPT, DOCKER_IMAGES
 )
@@ -301,15 +302,10 @@ class JobManager:
     def _test_ssh(self, host: str, port: int, timeout: int = 5) -> bool:
         """Test SSH connection"""
         try:
-            result = subprocess.run(
-                ["ssh", "-i", "/home/marcos/.ssh/id_rsa",
-                 "-o", "StrictHostKeyChecking=no",
-                 "-o", f"ConnectTimeout={timeout}",
-                 "-o", "BatchMode=yes",
-                 "-p", str(port),
-                 f"root@{host}",
-                 "echo ok"],
-                capture_output=True, timeout=timeout + 2, text=True
+            result = get_ssh_pool().run(
+                host, port, "echo ok",
+                key_path="/home/marcos/.ssh/id_rsa",
+                timeout=timeout + 2, connect_timeout=timeout
             )
             return result.returncode == 0 and "ok" in result.stdout
         except:
@@ -320,16 +316,10 @@ class JobManager:
         last_error = ""
         for attempt in range(retries):
             try:
-                result = subprocess.run(
-                    ["ssh", "-i", "/home/marcos/.ssh/id_rsa",
-                     "-o", "StrictHostKeyChecking=no",
-                     "-o", "ConnectTimeout=10",
-                     "-o", "ServerAliveInterval=5",
-                     "-o", "ServerAliveCountMax=3",
-                     "-p", str(job.ssh_port),
-                     f"root@{job.ssh_host}",
-                     command],
-                    capture_output=True, timeout=timeout, text=True
+                result = get_ssh_pool().run(
+                    job.ssh_host, job.ssh_port, command,
+                    key_path="/home/marcos/.ssh/id_rsa",
+                    timeout=timeout
                 )
                 output = result.stdout + result.stderr
                 if result.returncode == 0:
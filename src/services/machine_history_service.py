@@ -3,8 +3,15 @@ Machine History Service
 
 Serviço para rastrear histórico de tentativas em máquinas e gerenciar blacklist.
 Integra com o Wizard para filtrar máquinas problemáticas automaticamente.
+
+filter_offers/annotate_offers consultam um índice em memória (por processo)
+de stats e blacklist, carregado em bulk por provider, atualizado pelas
+escritas deste serviço e recarregado após RELIABILITY_INDEX_TTL.
 """
 import logging
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.orm import Session
@@ -37,6 +44,123 @@ BLACKLIST_CONFIG = {
     "recent_window_hours": 72,  # 3 dias
 }
 
+# Validade do índice de confiabilidade em memória (segundos). Escritas deste
+# processo atualizam o índice na hora; o TTL cobre escritas de outros processos.
+RELIABILITY_INDEX_TTL = 300
+
+
+@dataclass
+class MachineReliability:
+    """Entrada do índice de confiabilidade de uma máquina."""
+    stats: Optional[Dict[str, Any]] = None  # MachineStats.to_dict()
+    success_rate: Optional[float] = None
+    total_attempts: int = 0
+    reliability_status: str = "unknown"
+    avg_time_to_ready: Optional[float] = None
+
+    blacklisted: bool = False
+    blacklist_reason: Optional[str] = None
+    blacklist_type: Optional[str] = None
+    blacklist_expires_at: Optional[datetime] = None
+
+    @property
+    def is_blacklisted(self) -> bool:
+        """Blacklist ativo (considera expiração sem consultar o banco)."""
+        if not self.blacklisted:
+            return False
+        return self.blacklist_expires_at is None or datetime.utcnow() < self.blacklist_expires_at
+
+    def set_stats(self, stats: MachineStats):
+        self.stats = stats.to_dict()
+        self.success_rate = stats.success_rate
+        self.total_attempts = stats.total_attempts or 0
+        self.reliability_status = stats.reliability_status
+        self.avg_time_to_ready = stats.avg_time_to_ready
+
+    def set_blacklist(self, entry: Optional[MachineBlacklist]):
+        self.blacklisted = entry is not None
+        self.blacklist_reason = entry.reason if entry else None
+        self.blacklist_type = entry.blacklist_type if entry else None
+        self.blacklist_expires_at = entry.expires_at if entry else None
+
+
+class MachineReliabilityIndex:
+    """
+    Índice em memória (provider, machine_id) -> MachineReliability.
+
+    Cada provider é carregado com duas queries (stats e blacklist ativo) e
+    recarregado quando passa do TTL. Entre recargas, as escritas feitas por
+    MachineHistoryService atualizam as entradas diretamente.
+    """
+
+    def __init__(self, ttl: float = RELIABILITY_INDEX_TTL):
+        self.ttl = ttl
+        self._machines: Dict[str, Dict[str, MachineReliability]] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get_provider(self, db: Session, provider: str) -> Dict[str, MachineReliability]:
+        """Entradas do provider (carrega/recarrega se necessário)."""
+        loaded_at = self._loaded_at.get(provider)
+        if loaded_at is None or time.monotonic() - loaded_at > self.ttl:
+            self.load(db, provider)
+        return self._machines[provider]
+
+    def load(self, db: Session, provider: str):
+        """Carrega stats e blacklist ativo do provider em bulk."""
+        machines: Dict[str, MachineReliability] = {}
+
+        for stats in db.query(MachineStats).filter(MachineStats.provider == provider):
+            machines.setdefault(stats.machine_id, MachineReliability()).set_stats(stats)
+
+        blacklist = db.query(MachineBlacklist).filter(
+            MachineBlacklist.provider == provider,
+            or_(
+                MachineBlacklist.expires_at.is_(None),
+                MachineBlacklist.expires_at > datetime.utcnow()
+            )
+        )
+        for entry in blacklist:
+            machines.setdefault(entry.machine_id, MachineReliability()).set_blacklist(entry)
+
+        with self._lock:
+            self._machines[provider] = machines
+            self._loaded_at[provider] = time.monotonic()
+
+        logger.debug(f"Reliability index loaded for {provider}: {len(machines)} machines")
+
+    def _entry(self, provider: str, machine_id: str) -> Optional[MachineReliability]:
+        machines = self._machines.get(provider)
+        if machines is None:
+            # Provider ainda não carregado: a próxima leitura carrega do banco
+            return None
+        with self._lock:
+            return machines.setdefault(str(machine_id), MachineReliability())
+
+    def update_stats(self, stats: MachineStats):
+        """Atualiza a entrada a partir de um MachineStats recém-gravado."""
+        entry = self._entry(stats.provider, stats.machine_id)
+        if entry:
+            entry.set_stats(stats)
+
+    def update_blacklist(self, provider: str, machine_id: str, blacklist: Optional[MachineBlacklist]):
+        """Atualiza (ou remove, com None) o blacklist de uma máquina."""
+        entry = self._entry(provider, machine_id)
+        if entry:
+            entry.set_blacklist(blacklist)
+
+    def invalidate(self, provider: Optional[str] = None):
+        """Força recarga na próxima leitura."""
+        with self._lock:
+            if provider:
+                self._loaded_at.pop(provider, None)
+            else:
+                self._loaded_at.clear()
+
+
+# Índice compartilhado pelas instâncias do serviço no processo
+_reliability_index = MachineReliabilityIndex()
+
 
 class MachineHistoryService:
     """
@@ -58,6 +182,7 @@ class MachineHistoryService:
         """
         self._db = db
         self._config = BLACKLIST_CONFIG.copy()
+        self._index = _reliability_index
 
     @property
     def db(self) -> Session:
@@ -168,6 +293,7 @@ class MachineHistoryService:
             # Remover blacklist expirado
             self.db.delete(entry)
             self.db.commit()
+            self._index.update_blacklist(provider, machine_id, None)
             logger.info(f"Blacklist expired: {provider}:{machine_id}")
             return False
 
@@ -247,6 +373,8 @@ class MachineHistoryService:
             self.db.commit()
             self.db.refresh(entry)
 
+        self._index.update_blacklist(provider, machine_id, entry)
+
         # Atualizar flag nas stats
         self._update_blacklist_flag(provider, machine_id, True)
 
@@ -272,6 +400,7 @@ class MachineHistoryService:
         if entry:
             self.db.delete(entry)
             self.db.commit()
+            self._index.update_blacklist(provider, machine_id, None)
             self._update_blacklist_flag(provider, machine_id, False)
             logger.info(f"Removed from blacklist: {provider}:{machine_id}")
             return True
@@ -492,51 +621,49 @@ class MachineHistoryService:
         """
         filtered = []
         excluded = []
+        blacklisted_count = 0
 
-        # Cache de blacklist e stats
-        blacklisted_ids = set()
-        stats_cache = {}
-
-        if exclude_blacklisted:
-            blacklist = self.list_blacklist(provider=provider)
-            blacklisted_ids = {b.machine_id for b in blacklist}
-
-        if exclude_low_reliability:
-            problematic = self.db.query(MachineStats).filter(
-                MachineStats.provider == provider,
-                MachineStats.total_attempts >= self._config["min_attempts"],
-                MachineStats.success_rate < min_success_rate,
-            ).all()
-            stats_cache = {s.machine_id: s for s in problematic}
+        # Índice em memória: sem queries por oferta
+        machines = self._index.get_provider(self.db, provider)
+        min_attempts = self._config["min_attempts"]
 
         for offer in offers:
             machine_id = str(offer.get("machine_id") or offer.get("id"))
+            entry = machines.get(machine_id)
+
+            if entry is None:
+                filtered.append(offer)
+                continue
 
             # Verificar blacklist
-            if machine_id in blacklisted_ids:
+            if exclude_blacklisted and entry.is_blacklisted:
                 offer["_excluded_reason"] = "blacklisted"
                 excluded.append(offer)
+                blacklisted_count += 1
                 continue
 
             # Verificar baixa confiabilidade
-            if machine_id in stats_cache:
-                stats = stats_cache[machine_id]
-                offer["_excluded_reason"] = f"low_reliability ({stats.success_rate:.0%})"
-                offer["_success_rate"] = stats.success_rate
+            if (
+                exclude_low_reliability
+                and entry.success_rate is not None
+                and entry.total_attempts >= min_attempts
+                and entry.success_rate < min_success_rate
+            ):
+                offer["_excluded_reason"] = f"low_reliability ({entry.success_rate:.0%})"
+                offer["_success_rate"] = entry.success_rate
                 excluded.append(offer)
                 continue
 
             # Adicionar info de stats se disponível
-            machine_stats = self.get_machine_stats(provider, machine_id)
-            if machine_stats:
-                offer["_machine_stats"] = machine_stats
+            if entry.stats:
+                offer["_machine_stats"] = dict(entry.stats)
 
             filtered.append(offer)
 
         logger.info(
             f"Filtered offers for {provider}: "
             f"{len(filtered)} passed, {len(excluded)} excluded "
-            f"({len(blacklisted_ids)} blacklisted)"
+            f"({blacklisted_count} blacklisted)"
         )
 
         return filtered, excluded
@@ -558,39 +685,26 @@ class MachineHistoryService:
         - _total_attempts: int
         - _reliability_status: str (excellent, good, fair, poor, unknown)
         """
-        # Cache de dados
-        blacklist_map = {}
-        stats_map = {}
-
-        blacklist = self.list_blacklist(provider=provider)
-        for b in blacklist:
-            blacklist_map[b.machine_id] = b
-
-        all_stats = self.db.query(MachineStats).filter(
-            MachineStats.provider == provider
-        ).all()
-        for s in all_stats:
-            stats_map[s.machine_id] = s
+        machines = self._index.get_provider(self.db, provider)
 
         for offer in offers:
             machine_id = str(offer.get("machine_id") or offer.get("id"))
+            entry = machines.get(machine_id)
 
             # Blacklist info
-            if machine_id in blacklist_map:
-                b = blacklist_map[machine_id]
+            if entry and entry.is_blacklisted:
                 offer["_is_blacklisted"] = True
-                offer["_blacklist_reason"] = b.reason
-                offer["_blacklist_type"] = b.blacklist_type
+                offer["_blacklist_reason"] = entry.blacklist_reason
+                offer["_blacklist_type"] = entry.blacklist_type
             else:
                 offer["_is_blacklisted"] = False
 
             # Stats info
-            if machine_id in stats_map:
-                s = stats_map[machine_id]
-                offer["_success_rate"] = s.success_rate
-                offer["_total_attempts"] = s.total_attempts
-                offer["_reliability_status"] = s.reliability_status
-                offer["_avg_time_to_ready"] = s.avg_time_to_ready
+            if entry and entry.stats:
+                offer["_success_rate"] = entry.success_rate
+                offer["_total_attempts"] = entry.total_attempts
+                offer["_reliability_status"] = entry.reliability_status
+                offer["_avg_time_to_ready"] = entry.avg_time_to_ready
             else:
                 offer["_success_rate"] = None
                 offer["_total_attempts"] = 0
@@ -683,6 +797,7 @@ class MachineHistoryService:
             self.db.add(stats)
 
         self.db.commit()
+        self._index.update_stats(stats)
 
     def _check_auto_blacklist(self, provider: str, machine_id: str):
         """
@@ -781,6 +896,7 @@ class MachineHistoryService:
         if stats:
             stats.is_blacklisted = is_blacklisted
             self.db.commit()
+            self._index.update_stats(stats)
 
 
 # Singleton global
@@ -40,6 +40,7 @@ from src.models.metrics import (
     CostEfficiencyRanking,
 )
 from src.domain.models.gpu_offer import GpuOffer
+from src.modules.market.rollups import record_snapshots
 
 logger = logging.getLogger(__name__)
 
@@ -138,29 +139,20 @@ class MarketMonitorAgent(Agent):
         logger.info("Ciclo de monitoramento concluído")
 
     def _collect_market_data(self) -> Dict[str, List[GpuOffer]]:
-        """Coleta dados de todas as GPUs e tipos de máquina."""
-        all_offers = {}
+        """Coleta dados de todas as GPUs e tipos de máquina (queries largas em paralelo)."""
+        all_offers = self.vast_provider.fetch_all_market_data(
+            gpus_to_monitor=self.gpus_to_monitor,
+            machine_types=self.machine_types,
+            max_price=100.0,  # Alto para capturar todas
+            limit_per_query=200,
+        )
         total_collected = 0
 
-        for gpu_name in self.gpus_to_monitor:
-            for machine_type in self.machine_types:
-                key = f"{gpu_name}:{machine_type}"
-                try:
-                    offers = self.vast_provider.search_offers_by_type(
-                        machine_type=machine_type,
-                        gpu_name=gpu_name,
-                        max_price=100.0,  # Alto para capturar todas
-                        limit=200,
-                    )
-                    all_offers[key] = offers
-                    total_collected += len(offers)
-
-                    if offers:
-                        logger.debug(f"{key}: {len(offers)} ofertas, "
-                                     f"min=${min(o.dph_total for o in offers):.4f}/h")
-                except Exception as e:
-                    logger.warning(f"Falha ao coletar {key}: {e}")
-                    all_offers[key] = []
+        for key, offers in all_offers.items():
+            total_collected += len(offers)
+            if offers:
+                logger.debug(f"{key}: {len(offers)} ofertas, "
+                             f"min=${min(o.dph_total for o in offers):.4f}/h")
 
         logger.info(f"Total coletado: {total_collected} ofertas em "
                     f"{len([k for k, v in all_offers.items() if v])} combinações")
@@ -171,7 +163,7 @@ class MarketMonitorAgent(Agent):
         db = SessionLocal()
         try:
             timestamp = datetime.utcnow()
-            snapshots_saved = 0
+            snapshots = []
 
             for key, offers in all_offers.items():
                 if not offers:
@@ -202,11 +194,12 @@ class MarketMonitorAgent(Agent):
                     min_cost_per_gb_vram=stats.get('min_cost_per_gb_vram'),
                     region_distribution=stats.get('region_distribution'),
                 )
-                db.add(snapshot)
-                snapshots_saved += 1
+                snapshots.append(snapshot)
 
+            db.add_all(snapshots)
+            record_snapshots(db, snapshots)
             db.commit()
-            logger.info(f"Salvos {snapshots_saved} snapshots de mercado")
+            logger.info(f"Salvos {len(snapshots)} snapshots de mercado")
 
         except Exception as e:
             logger.error(f"Erro ao salvar snapshots: {e}")
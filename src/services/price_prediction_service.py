@@ -3,21 +3,130 @@ Serviço de previsão de preços usando ML.
 
 Usa dados históricos para prever melhores horários/dias para alugar GPUs.
 Utiliza Random Forest para capturar padrões sazonais.
+
+Treino incremental: cada GPU/tipo guarda somas e contagens de preço por hora
+(janela de days_of_history). Um novo treino lê só os snapshots posteriores
+ao último visto e reajusta o modelo sobre essas agregações (no máximo
+24 * dias amostras, ponderadas pela contagem). O primeiro treino de uma
+chave parte dos rollups horários (market_snapshot_rollups). Estado e modelo são
+persistidos com joblib, então as previsões ficam disponíveis logo após o boot.
 """
 
+import os
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import statistics
 from collections import defaultdict
 import math
 
 from src.config.database import SessionLocal
-from src.models.metrics import MarketSnapshot, PricePrediction
+from src.models.metrics import MarketSnapshot, MarketSnapshotRollup, PricePrediction
+from src.modules.market.rollups import RESOLUTION_HOUR
 
 logger = logging.getLogger(__name__)
 
 
+# Diretório dos modelos persistidos
+MODELS_DIR = os.getenv("PRICE_MODELS_DIR", os.path.expanduser("~/.cache/dumont/price_models"))
+
+# Ordem das features de _extract_features (persistida junto do modelo)
+FEATURE_SCHEMA = ["hour", "weekday", "hour_sin", "hour_cos", "day_sin", "day_cos", "weekend"]
+
+MIN_TRAINING_SAMPLES = 50
+
+
+def _extract_features(timestamp: datetime) -> List[float]:
+    """Extrai features de um timestamp (ordem de FEATURE_SCHEMA)."""
+    return [
+        timestamp.hour,                                    # 0-23
+        timestamp.weekday(),                               # 0-6 (Mon-Sun)
+        math.sin(2 * math.pi * timestamp.hour / 24),       # Hora cíclica (sin)
+        math.cos(2 * math.pi * timestamp.hour / 24),       # Hora cíclica (cos)
+        math.sin(2 * math.pi * timestamp.weekday() / 7),   # Dia cíclico (sin)
+        math.cos(2 * math.pi * timestamp.weekday() / 7),   # Dia cíclico (cos)
+        1 if timestamp.weekday() >= 5 else 0,              # Weekend flag
+    ]
+
+
+def _fit_key(
+    state: Optional[Dict[str, Any]],
+    rows: List[Tuple[datetime, float]],
+    days_of_history: int,
+    use_ml: bool,
+    seed: Optional[List[Tuple[datetime, float, int]]] = None,
+) -> Dict[str, Any]:
+    """
+    Atualiza o estado de uma GPU/tipo com novos snapshots e reajusta o modelo.
+
+    Função de módulo (sem banco) para rodar em processos do pool.
+
+    Args:
+        state: Estado anterior (None para o primeiro treino)
+        rows: Novos (timestamp, avg_price), posteriores a state['last_timestamp']
+        days_of_history: Janela de histórico mantida
+        use_ml: Treinar Random Forest (senão, médias por hora/dia)
+        seed: Buckets iniciais (hora, soma, contagem) vindos dos rollups
+
+    Returns:
+        Novo estado: buckets, last_timestamp, n_samples, model, scaler
+    """
+    state = dict(state or {'buckets': {}, 'last_timestamp': None})
+    buckets = dict(state['buckets'])
+
+    for hour, total, count in seed or []:
+        buckets[hour] = (total, count)
+
+    for timestamp, price in rows:
+        if price is None:
+            continue
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
+        total, count = buckets.get(hour, (0.0, 0))
+        buckets[hour] = (total + price, count + 1)
+        if state['last_timestamp'] is None or timestamp > state['last_timestamp']:
+            state['last_timestamp'] = timestamp
+
+    cutoff = datetime.utcnow() - timedelta(days=days_of_history)
+    buckets = {hour: agg for hour, agg in buckets.items() if hour >= cutoff}
+    n_samples = sum(count for _, count in buckets.values())
+
+    state.update(buckets=buckets, n_samples=n_samples, model=None, scaler=None)
+    if n_samples < MIN_TRAINING_SAMPLES:
+        return state
+
+    hours = sorted(buckets)
+    if use_ml:
+        import numpy as np
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+
+        X = np.array([_extract_features(hour) for hour in hours])
+        y = np.array([buckets[hour][0] / buckets[hour][1] for hour in hours])
+        weights = np.array([buckets[hour][1] for hour in hours], dtype=float)
+
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+        model = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42)
+        model.fit(X_scaled, y, sample_weight=weights)
+        state.update(model=model, scaler=scaler)
+    else:
+        hourly = defaultdict(lambda: [0.0, 0])
+        daily = defaultdict(lambda: [0.0, 0])
+        for hour, (total, count) in buckets.items():
+            for agg in (hourly[hour.hour], daily[hour.weekday()]):
+                agg[0] += total
+                agg[1] += count
+        state['model'] = {
+            'hourly': {h: total / count for h, (total, count) in hourly.items()},
+            'daily': {d: total / count for d, (total, count) in daily.items()},
+            'overall_avg': sum(total for total, _ in buckets.values()) / n_samples,
+        }
+
+    state['trained_at'] = datetime.utcnow()
+    return state
+
+
 class PricePredictionService:
     """
     Serviço de previsão de preços.
@@ -28,13 +137,20 @@ class PricePredictionService:
     - Tendência recente
     """
 
-    MODEL_VERSION = "simple_v1.0"
+    MODEL_VERSION = "incremental_v2.0"
 
-    def __init__(self):
+    def __init__(self, models_dir: Optional[str] = None):
+        """
+        Args:
+            models_dir: Diretório dos modelos persistidos (padrão: MODELS_DIR)
+        """
         self.models: Dict[str, any] = {}
         self.scalers: Dict[str, any] = {}
         self.last_trained: Dict[str, datetime] = {}
+        self.states: Dict[str, Dict[str, Any]] = {}
+        self.models_dir = models_dir or MODELS_DIR
         self._ml_available = self._check_ml_available()
+        self.load_models()
 
     def _check_ml_available(self) -> bool:
         """Verifica se sklearn está disponível."""
@@ -54,7 +170,7 @@ class PricePredictionService:
         days_of_history: int = 30,
     ) -> bool:
         """
-        Treina modelo de previsão para uma GPU/tipo.
+        Treina (incrementalmente) modelo de previsão para uma GPU/tipo.
 
         Args:
             gpu_name: Nome da GPU
@@ -62,120 +178,236 @@ class PricePredictionService:
             days_of_history: Dias de histórico para treino
 
         Returns:
-            True se treino foi bem sucedido
+            True se há modelo treinado
         """
-        key = f"{gpu_name}:{machine_type}"
-        db = SessionLocal()
+        return self.train_models([(gpu_name, machine_type)], days_of_history, workers=1) > 0
 
-        try:
-            # Buscar histórico
-            start_time = datetime.utcnow() - timedelta(days=days_of_history)
-            records = db.query(MarketSnapshot).filter(
-                MarketSnapshot.gpu_name == gpu_name,
-                MarketSnapshot.machine_type == machine_type,
-                MarketSnapshot.timestamp >= start_time,
-            ).order_by(MarketSnapshot.timestamp).all()
-
-            if len(records) < 50:  # Mínimo de dados
-                logger.warning(f"Dados insuficientes para treinar {key}: {len(records)} registros")
-                return False
-
-            if self._ml_available:
-                return self._train_ml_model(key, records)
-            else:
-                return self._train_simple_model(key, records)
+    def train_models(
+        self,
+        keys: List[Tuple[str, str]],
+        days_of_history: int = 30,
+        workers: Optional[int] = None,
+    ) -> int:
+        """
+        Treina incrementalmente várias GPUs/tipos.
 
-        except Exception as e:
-            logger.error(f"Erro ao treinar modelo para {key}: {e}")
-            return False
-        finally:
-            db.close()
+        Busca os snapshots novos de todas as chaves numa query só e ajusta
+        os modelos em paralelo (um processo por chave, até workers).
+
+        Args:
+            keys: Lista de (gpu_name, machine_type)
+            days_of_history: Dias de histórico mantidos
+            workers: Processos de treino (padrão: núcleos da CPU)
+
+        Returns:
+            Número de chaves com modelo treinado
+        """
+        if not keys:
+            return 0
 
-    def _train_ml_model(self, key: str, records: List[MarketSnapshot]) -> bool:
-        """Treina modelo usando scikit-learn."""
         try:
-            import numpy as np
-            from sklearn.ensemble import RandomForestRegressor
-            from sklearn.preprocessing import StandardScaler
+            new_rows, seeds = self._fetch_new_rows(keys, days_of_history)
+        except Exception as e:
+            logger.error(f"Erro ao buscar histórico para treino: {e}")
+            return 0
+
+        names = [f"{gpu}:{mtype}" for gpu, mtype in keys]
+        args = []
+        for key in names:
+            state = self.states.get(key)
+            if key in seeds:
+                boundary, seed = seeds[key]
+                # Snapshots brutos a partir da hora corrente (ainda aberta nos rollups)
+                state = {'buckets': {}, 'last_timestamp': boundary - timedelta(microseconds=1)}
+            else:
+                seed = None
+            args.append((state, new_rows.get(key, []), days_of_history, self._ml_available, seed))
+
+        workers = min(workers or os.cpu_count() or 1, len(names))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_fit_key, *a) for a in args]
+                results = []
+                for key, future in zip(names, futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        logger.error(f"Erro ao treinar modelo para {key}: {e}")
+                        results.append(None)
+        else:
+            results = []
+            for key, a in zip(names, args):
+                try:
+                    results.append(_fit_key(*a))
+                except Exception as e:
+                    logger.error(f"Erro ao treinar modelo para {key}: {e}")
+                    results.append(None)
+
+        trained = 0
+        for key, state in zip(names, results):
+            if state is None:
+                continue
+            self._apply_state(key, state)
+            self._save_state(key, state)
+            if state['model'] is not None:
+                trained += 1
+                logger.info(f"Modelo treinado para {key} com {state['n_samples']} amostras "
+                            f"({len(new_rows.get(key, []))} novas)")
+            else:
+                logger.warning(f"Dados insuficientes para treinar {key}: {state['n_samples']} registros")
+        return trained
 
-            # Preparar features
-            X = []
-            y = []
+    def _fetch_new_rows(
+        self,
+        keys: List[Tuple[str, str]],
+        days_of_history: int,
+    ) -> Tuple[Dict[str, List[Tuple[datetime, float]]], Dict[str, Tuple[datetime, List[Tuple[datetime, float, int]]]]]:
+        """
+        Dados novos para treino, com uma query por tabela (só colunas usadas).
 
-            for record in records:
-                features = self._extract_features(record.timestamp)
-                X.append(features)
-                y.append(record.avg_price)
+        Chaves já treinadas recebem os snapshots posteriores ao último visto.
+        Chaves novas partem dos rollups horários das horas fechadas e recebem
+        só os snapshots da hora corrente.
 
-            X = np.array(X)
-            y = np.array(y)
+        Returns:
+            (rows, seeds): rows = "gpu:tipo" -> [(timestamp, avg_price)];
+            seeds = "gpu:tipo" -> (início da hora corrente, [(hora, soma, contagem)])
+        """
+        now = datetime.utcnow()
+        window_start = now - timedelta(days=days_of_history)
+        boundary = now.replace(minute=0, second=0, microsecond=0)
+
+        since = {}
+        seeds = {}
+        for gpu, mtype in keys:
+            key = f"{gpu}:{mtype}"
+            last = (self.states.get(key) or {}).get('last_timestamp')
+            if last:
+                since[key] = max(last, window_start)
+            else:
+                since[key] = boundary - timedelta(microseconds=1)
+                seeds[key] = (boundary, [])
 
-            # Normalizar features
-            scaler = StandardScaler()
-            X_scaled = scaler.fit_transform(X)
+        gpus = {gpu for gpu, _ in keys}
+        mtypes = {mtype for _, mtype in keys}
 
-            # Treinar modelo
-            model = RandomForestRegressor(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42,
-            )
-            model.fit(X_scaled, y)
+        db = SessionLocal()
+        try:
+            if seeds:
+                rollups = db.query(
+                    MarketSnapshotRollup.gpu_name,
+                    MarketSnapshotRollup.machine_type,
+                    MarketSnapshotRollup.bucket_start,
+                    MarketSnapshotRollup.price_sum,
+                    MarketSnapshotRollup.sample_count,
+                ).filter(
+                    MarketSnapshotRollup.resolution == RESOLUTION_HOUR,
+                    MarketSnapshotRollup.gpu_name.in_(gpus),
+                    MarketSnapshotRollup.machine_type.in_(mtypes),
+                    MarketSnapshotRollup.bucket_start >= window_start,
+                    MarketSnapshotRollup.bucket_start < boundary,
+                )
+                for gpu, mtype, hour, total, count in rollups:
+                    key = f"{gpu}:{mtype}"
+                    if key in seeds and count:
+                        seeds[key][1].append((hour, total, count))
+
+            query = db.query(
+                MarketSnapshot.gpu_name,
+                MarketSnapshot.machine_type,
+                MarketSnapshot.timestamp,
+                MarketSnapshot.avg_price,
+            ).filter(
+                MarketSnapshot.gpu_name.in_(gpus),
+                MarketSnapshot.machine_type.in_(mtypes),
+                MarketSnapshot.timestamp > min(since.values()),
+            ).order_by(MarketSnapshot.timestamp)
+
+            rows = defaultdict(list)
+            for gpu, mtype, timestamp, price in query.yield_per(10000):
+                key = f"{gpu}:{mtype}"
+                if key in since and timestamp > since[key]:
+                    rows[key].append((timestamp, price))
+            return rows, seeds
+        finally:
+            db.close()
 
-            # Salvar modelo
-            self.models[key] = model
-            self.scalers[key] = scaler
-            self.last_trained[key] = datetime.utcnow()
+    def _apply_state(self, key: str, state: Dict[str, Any]):
+        """Publica o modelo de um estado treinado."""
+        self.states[key] = state
+        if state.get('model') is None:
+            return
+        self.models[key] = state['model']
+        if state.get('scaler') is not None:
+            self.scalers[key] = state['scaler']
+        else:
+            self.scalers.pop(key, None)
+        self.last_trained[key] = state.get('trained_at') or datetime.utcnow()
 
-            logger.info(f"Modelo ML treinado para {key} com {len(records)} amostras")
-            return True
+    def _model_path(self, key: str) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in key)
+        return os.path.join(self.models_dir, f"{safe}.joblib")
 
+    def _save_state(self, key: str, state: Dict[str, Any]):
+        """Persiste estado e modelo (joblib, escrita atômica)."""
+        try:
+            import joblib
+            os.makedirs(self.models_dir, exist_ok=True)
+            path = self._model_path(key)
+            tmp = f"{path}.tmp"
+            joblib.dump({
+                'key': key,
+                'model_version': self.MODEL_VERSION,
+                'feature_schema': FEATURE_SCHEMA,
+                'ml': state.get('scaler') is not None,
+                'state': state,
+            }, tmp)
+            os.replace(tmp, path)
         except Exception as e:
-            logger.error(f"Erro ao treinar modelo ML: {e}")
-            return False
+            logger.warning(f"Não foi possível persistir modelo {key}: {e}")
 
-    def _train_simple_model(self, key: str, records: List[MarketSnapshot]) -> bool:
-        """Treina modelo simples baseado em médias por hora/dia."""
-        try:
-            # Agrupar por hora
-            hourly_prices = defaultdict(list)
-            daily_prices = defaultdict(list)
-
-            for record in records:
-                hour = record.timestamp.hour
-                day = record.timestamp.weekday()
-                hourly_prices[hour].append(record.avg_price)
-                daily_prices[day].append(record.avg_price)
-
-            # Calcular médias
-            hourly_avg = {h: statistics.mean(prices) for h, prices in hourly_prices.items()}
-            daily_avg = {d: statistics.mean(prices) for d, prices in daily_prices.items()}
-
-            self.models[key] = {
-                'hourly': hourly_avg,
-                'daily': daily_avg,
-                'overall_avg': statistics.mean([r.avg_price for r in records]),
-            }
-            self.last_trained[key] = datetime.utcnow()
+    def load_models(self) -> int:
+        """
+        Carrega modelos persistidos.
 
-            logger.info(f"Modelo simples treinado para {key} com {len(records)} amostras")
-            return True
+        Arquivos de outra versão ou schema de features são ignorados (a chave
+        é retreinada do zero). Modelos ML são ignorados se o sklearn não
+        estiver disponível.
 
-        except Exception as e:
-            logger.error(f"Erro ao treinar modelo simples: {e}")
-            return False
+        Returns:
+            Número de modelos carregados
+        """
+        if not os.path.isdir(self.models_dir):
+            return 0
+        try:
+            import joblib
+        except ImportError:
+            return 0
+
+        loaded = 0
+        for fname in os.listdir(self.models_dir):
+            if not fname.endswith(".joblib"):
+                continue
+            try:
+                data = joblib.load(os.path.join(self.models_dir, fname))
+            except Exception as e:
+                logger.warning(f"Modelo inválido {fname}: {e}")
+                continue
+            if data.get('model_version') != self.MODEL_VERSION or data.get('feature_schema') != FEATURE_SCHEMA:
+                logger.info(f"Modelo {fname} de outra versão, será retreinado")
+                continue
+            if data.get('ml') != self._ml_available:
+                continue
+            self._apply_state(data['key'], data['state'])
+            loaded += 1
+
+        if loaded:
+            logger.info(f"Carregados {loaded} modelos de previsão de {self.models_dir}")
+        return loaded
 
     def _extract_features(self, timestamp: datetime) -> List[float]:
         """Extrai features de um timestamp."""
-        return [
-            timestamp.hour,                                    # 0-23
-            timestamp.weekday(),                               # 0-6 (Mon-Sun)
-            math.sin(2 * math.pi * timestamp.hour / 24),       # Hora cíclica (sin)
-            math.cos(2 * math.pi * timestamp.hour / 24),       # Hora cíclica (cos)
-            math.sin(2 * math.pi * timestamp.weekday() / 7),   # Dia cíclico (sin)
-            math.cos(2 * math.pi * timestamp.weekday() / 7),   # Dia cíclico (cos)
-            1 if timestamp.weekday() >= 5 else 0,              # Weekend flag
-        ]
+        return _extract_features(timestamp)
 
     def predict(
         self,
@@ -190,9 +422,10 @@ class PricePredictionService:
         """
         key = f"{gpu_name}:{machine_type}"
 
-        # Verificar se modelo precisa ser treinado
+        # Treinar só se a chave nunca foi vista (retreino incremental fica
+        # com generate_all_predictions/train_models)
         if key not in self.models:
-            if not self.train_model(gpu_name, machine_type):
+            if key in self.states or not self.train_model(gpu_name, machine_type):
                 return None
 
         if self._ml_available and key in self.scalers:
@@ -209,35 +442,28 @@ class PricePredictionService:
             scaler = self.scalers[key]
 
             now = datetime.utcnow()
-            hourly_predictions = {}
-
-            # Prever para cada hora das próximas 24h
-            for hour_offset in range(24):
-                future_time = now + timedelta(hours=hour_offset)
-                features = self._extract_features(future_time)
-                features_scaled = scaler.transform([features])
-                prediction = model.predict(features_scaled)[0]
-                hourly_predictions[str(future_time.hour)] = round(prediction, 4)
-
-            # Prever média por dia da semana
-            daily_predictions = {}
             day_names = ['monday', 'tuesday', 'wednesday', 'thursday',
                          'friday', 'saturday', 'sunday']
 
-            for day in range(7):
-                future_day = now + timedelta(days=day)
-                day_name = day_names[future_day.weekday()]
-
-                # Média das previsões desse dia
-                day_prices = []
-                for hour in range(24):
-                    future_time = future_day.replace(hour=hour, minute=0, second=0)
-                    features = self._extract_features(future_time)
-                    features_scaled = scaler.transform([features])
-                    prediction = model.predict(features_scaled)[0]
-                    day_prices.append(prediction)
+            # Próximas 24h + 24 horas de cada um dos próximos 7 dias, numa chamada só
+            hourly_times = [now + timedelta(hours=offset) for offset in range(24)]
+            daily_times = [
+                (now + timedelta(days=day)).replace(hour=hour, minute=0, second=0)
+                for day in range(7) for hour in range(24)
+            ]
+            features = np.array([self._extract_features(t) for t in hourly_times + daily_times])
+            predictions = model.predict(scaler.transform(features))
+
+            hourly_predictions = {
+                str(t.hour): round(float(p), 4)
+                for t, p in zip(hourly_times, predictions[:24])
+            }
 
-                daily_predictions[day_name] = round(statistics.mean(day_prices), 4)
+            # Média por dia da semana
+            daily_predictions = {}
+            for day, day_prices in enumerate(predictions[24:].reshape(7, 24)):
+                day_name = day_names[daily_times[day * 24].weekday()]
+                daily_predictions[day_name] = round(float(day_prices.mean()), 4)
 
             return self._build_prediction_result(
                 gpu_name, machine_type, hourly_predictions, daily_predictions
@@ -312,21 +538,24 @@ class PricePredictionService:
         gpu_name: str,
         machine_type: str
     ) -> float:
-        """Calcula confiança do modelo baseado em variância histórica."""
-        db = SessionLocal()
+        """
+        Calcula confiança do modelo baseado em variância histórica.
+
+        Usa as médias horárias dos últimos 7 dias já mantidas no estado do
+        modelo (sem consultar o banco).
+        """
         try:
-            # Últimos 7 dias
+            state = self.states.get(f"{gpu_name}:{machine_type}") or {}
             start_time = datetime.utcnow() - timedelta(days=7)
-            records = db.query(MarketSnapshot).filter(
-                MarketSnapshot.gpu_name == gpu_name,
-                MarketSnapshot.machine_type == machine_type,
-                MarketSnapshot.timestamp >= start_time,
-            ).all()
+            recent = [
+                (total, count) for hour, (total, count) in state.get('buckets', {}).items()
+                if hour >= start_time
+            ]
 
-            if len(records) < 10:
+            if sum(count for _, count in recent) < 10:
                 return 0.5
 
-            prices = [r.avg_price for r in records if r.avg_price > 0]
+            prices = [total / count for total, count in recent if total > 0]
             if not prices or len(prices) < 2:
                 return 0.5
 
@@ -344,8 +573,6 @@ class PricePredictionService:
         except Exception as e:
             logger.error(f"Erro ao calcular confiança: {e}")
             return 0.5
-        finally:
-            db.close()
 
     def save_prediction(self, prediction: Dict) -> bool:
         """Salva previsão no banco de dados."""
@@ -420,15 +647,28 @@ class PricePredictionService:
     def generate_all_predictions(
         self,
         gpus: List[str],
-        machine_types: List[str] = None
+        machine_types: List[str] = None,
+        workers: Optional[int] = None,
     ) -> int:
         """
         Gera previsões para todas as GPUs e tipos especificados.
 
+        Antes de prever, atualiza incrementalmente todos os modelos com os
+        snapshots novos (treino em paralelo, ver train_models).
+
+        Args:
+            gpus: GPUs a prever
+            machine_types: Tipos de máquina (padrão: on-demand e interruptible)
+            workers: Processos de treino (padrão: núcleos da CPU)
+
         Returns:
             Número de previsões geradas com sucesso
         """
         machine_types = machine_types or ["on-demand", "interruptible"]
+        self.train_models(
+            [(gpu_name, machine_type) for gpu_name in gpus for machine_type in machine_types],
+            workers=workers,
+        )
         count = 0
 
         for gpu_name in gpus:
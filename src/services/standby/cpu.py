@@ -14,7 +14,10 @@ Arquitetura:
 """
 import os
 import time
+import re
 import json
+import shlex
+import ipaddress
 import subprocess
 import threading
 import logging
@@ -24,12 +27,56 @@ from datetime import datetime
 from enum import Enum
 from requests.exceptions import RequestException
 
+from src.core.exceptions import SnapshotException
 from src.infrastructure.providers.gcp_provider import GCPProvider, GCPInstanceConfig
+from src.infrastructure.providers.restic_provider import ResticProvider
+from src.infrastructure.providers.ssh_pool import get_ssh_pool
 from src.services.gpu.vast import VastService
 from src.services.gpu.snapshot import GPUSnapshotService
 
 logger = logging.getLogger(__name__)
 
+# Chave privada de sync instalada na GPU (um par por CPU standby, gerado no
+# servidor de controle e trocado sempre que a GPU muda)
+GPU_SYNC_KEY_PATH = "/root/.ssh/dumont_sync"
+# Comentário das chaves de sync no authorized_keys da CPU (prefixo, para remoção)
+SYNC_KEY_COMMENT = "dumont-sync"
+# rrsync na CPU: a chave de sync só consegue rodar rsync dentro de sync_path
+CPU_RRSYNC_PATH = "/usr/local/bin/rrsync"
+# IP de saída da GPU (restrição from= da chave de sync)
+EGRESS_IP_URL = "https://checkip.amazonaws.com"
+
+# Diário de mudanças (inotify) usado pelo sync incremental, na GPU
+GPU_JOURNAL_SCRIPT_PATH = "/opt/dumont/dumont-sync-journal.sh"
+GPU_SYNC_JOURNAL = "/var/lib/dumont/sync-journal"
+
+# restic instalado na CPU standby (mesma versão do DumontAgent)
+RESTIC_VERSION = "0.17.3"
+
+# Código de saída do ciclo incremental quando o diário não está ativo
+# (fora da faixa usada pelo rsync, ssh e shell)
+JOURNAL_INACTIVE_EXIT = 97
+
+CHANGE_JOURNAL_SCRIPT = """#!/bin/bash
+# Diario de mudancas do workspace para o sync incremental com a CPU standby
+# Uso: dumont-sync-journal.sh <diretorio> <journal> [regex de exclusao]
+WATCH_DIR="$1"
+JOURNAL="$2"
+EXCLUDE="${3:-}"
+
+mkdir -p "$(dirname "$JOURNAL")"
+echo $$ > "$JOURNAL.pid"
+
+# Um path por linha; o arquivo e reaberto a cada linha para permitir rotacao com mv
+inotifywait -m -r -q \
+    -e close_write,create,delete,moved_from,moved_to,attrib \
+    ${EXCLUDE:+--exclude "$EXCLUDE"} \
+    --format '%w%f' "$WATCH_DIR" 2>>"$JOURNAL.err" |
+while IFS= read -r path; do
+    printf '%s\n' "$path" >> "$JOURNAL"
+done
+"""
+
 
 class StandbyState(Enum):
     """Estados do sistema de standby"""
@@ -54,6 +101,14 @@ class CPUStandbyConfig:
     # Sync Config
     sync_interval_seconds: int = 30  # Intervalo de sync GPU → CPU
     sync_path: str = "/workspace"  # Path a sincronizar
+    # "direct": a GPU faz rsync direto com a CPU (servidor só orquestra)
+    # "relay": GPU → servidor de controle → CPU (fallback)
+    sync_mode: str = "direct"
+    sync_key_dir: str = "~/.ssh/dumont_sync.d"  # Pares de chaves de sync, um por CPU standby
+    # Sync incremental (modo direct): diário inotify na GPU, envia só os paths alterados
+    sync_incremental: bool = True
+    incremental_sync_interval_seconds: int = 5
+    full_sync_interval_seconds: int = 600  # Reconciliação completa periódica
     sync_exclude: List[str] = field(default_factory=lambda: [
         ".git",
         "__pycache__",
@@ -83,6 +138,13 @@ class CPUStandbyConfig:
     r2_backup_interval: int = 300  # Backup para R2 a cada 5 min
     r2_endpoint: str = ""
     r2_bucket: str = ""
+    # Backup incremental via restic (só chunks novos, upload paralelo, sem arquivo temporário).
+    # Sem senha restic, cai para tar em streaming (pigz | s5cmd pipe) do workspace inteiro.
+    r2_access_key: str = field(default_factory=lambda: os.getenv("R2_ACCESS_KEY", ""))
+    r2_secret_key: str = field(default_factory=lambda: os.getenv("R2_SECRET_KEY", ""))
+    restic_password: str = field(default_factory=lambda: os.getenv("RESTIC_PASSWORD", ""))
+    r2_backup_connections: int = 16
+    r2_backup_keep_last: int = 10  # Snapshots "standby" mantidos no repositório
 
 
 class CPUStandbyService:
@@ -127,6 +189,17 @@ class CPUStandbyService:
         self._health_thread: Optional[threading.Thread] = None
         self._backup_thread: Optional[threading.Thread] = None
         self._running = False
+        # (gpu_host, gpu_port, cpu_ip) já preparado para sync direto
+        self._direct_sync_target: Optional[tuple] = None
+        # (gpu_host, gpu_port, cpu_ip) para o qual a chave de sync atual foi emitida
+        self._sync_key_pairing: Optional[tuple] = None
+        # Destino para o qual o diário de mudanças foi iniciado na GPU
+        self._journal_target: Optional[tuple] = None
+        self._last_full_sync = 0.0
+        # Um ciclo de sync ou um restore por vez; enquanto um restore não der certo
+        # o sync fica pausado (a GPU nova, vazia, apagaria a cópia da CPU com --delete)
+        self._sync_lock = threading.Lock()
+        self._sync_paused = False
 
         # Métricas
         self.last_sync_time: Optional[datetime] = None
@@ -143,6 +216,19 @@ class CPUStandbyService:
         else:
             self.snapshot_service = None
 
+        # Mesmo repositório restic dos backups das GPUs: chunks iguais não são reenviados
+        self.restic: Optional[ResticProvider] = None
+        if self.snapshot_service and self.config.restic_password:
+            self.restic = ResticProvider(
+                repo=f"s3:{self.config.r2_endpoint}/{self.config.r2_bucket}/restic",
+                password=self.config.restic_password,
+                access_key=self.config.r2_access_key,
+                secret_key=self.config.r2_secret_key,
+                connections=self.config.r2_backup_connections,
+            )
+        # IP da CPU onde restic já foi instalado e o repositório verificado
+        self._restic_ready_ip: Optional[str] = None
+
         logger.info("CPUStandbyService initialized")
 
     def provision_cpu_standby(self, name_suffix: str = "standby") -> Optional[str]:
@@ -303,21 +389,30 @@ class CPUStandbyService:
     def _sync_loop(self):
         """Loop de sincronização GPU → CPU"""
         while self._running:
-            try:
-                self._do_sync()
-                self.last_sync_time = datetime.now()
-            except Exception as e:
-                logger.error(f"Sync error: {e}")
-
-            time.sleep(self.config.sync_interval_seconds)
+            with self._sync_lock:
+                if not self._sync_paused:
+                    try:
+                        self._do_sync()
+                        self.last_sync_time = datetime.now()
+                    except Exception as e:
+                        logger.error(f"Sync error: {e}")
+
+            if self._journal_target is not None:
+                time.sleep(self.config.incremental_sync_interval_seconds)
+            else:
+                time.sleep(self.config.sync_interval_seconds)
 
     def _do_sync(self):
         """
         Executa sincronização GPU → CPU via rsync.
 
-        Como rsync não suporta cópia direta entre dois hosts remotos,
-        usamos um diretório local temporário como relay:
-        GPU → /tmp/dumont-sync/ → CPU
+        No modo "direct" o rsync roda na própria GPU e envia direto para a
+        CPU; o servidor de controle só dispara o comando via SSH. Se o
+        sync direto não puder ser preparado, cai para o relay.
+
+        Com sync_incremental, cada ciclo envia só os paths do diário de
+        mudanças da GPU; o rsync completo roda na primeira vez, a cada
+        full_sync_interval_seconds e sempre que o diário não estiver ativo.
         """
         if not self.cpu_instance or not self.gpu_ssh_host:
             return
@@ -326,6 +421,58 @@ class CPUStandbyService:
         if not cpu_ip:
             return
 
+        if self.config.sync_mode == "direct":
+            if self._setup_direct_sync(cpu_ip):
+                # _ensure_change_journal zera _last_full_sync quando (re)inicia o diário
+                if (self._ensure_change_journal()
+                        and time.time() - self._last_full_sync < self.config.full_sync_interval_seconds):
+                    if self._do_incremental_sync(cpu_ip):
+                        return
+                self._do_direct_sync(cpu_ip)
+                return
+            logger.warning("Direct sync unavailable, falling back to relay")
+
+        self._do_relay_sync(cpu_ip)
+
+    def _do_direct_sync(self, cpu_ip: str):
+        """GPU → CPU com rsync executado na GPU"""
+        command = self._direct_rsync_cmd(cpu_ip, push=True)
+        if self._journal_target is not None:
+            # O rsync completo cobre tudo que está no diário até aqui
+            journal = shlex.quote(GPU_SYNC_JOURNAL)
+            command = f"rm -f {journal} {journal}.sending {journal}.list && {command}"
+
+        try:
+            result = self._run_ssh(
+                self.gpu_ssh_host,
+                self.gpu_ssh_port,
+                command,
+                timeout=300
+            )
+
+            if result.returncode == 0:
+                self.sync_count += 1
+                self._last_full_sync = time.time()
+                logger.debug("Direct sync completed successfully")
+            else:
+                logger.warning(f"GPU→CPU direct sync failed: {result.stderr[:200]}")
+                # Chave pode ter sumido (GPU reiniciada, CPU recriada): preparar de novo
+                self._direct_sync_target = None
+                self._journal_target = None
+
+        except subprocess.TimeoutExpired:
+            logger.error("Sync timeout")
+        except Exception as e:
+            logger.error(f"Sync error: {e}")
+
+    def _do_relay_sync(self, cpu_ip: str):
+        """
+        GPU → CPU passando pelo servidor de controle.
+
+        Como rsync não suporta cópia direta entre dois hosts remotos,
+        usamos um diretório local temporário como relay:
+        GPU → /tmp/dumont-sync/ → CPU
+        """
         # Diretório temporário para relay
         local_sync_dir = "/tmp/dumont-sync-relay"
         os.makedirs(local_sync_dir, exist_ok=True)
@@ -335,14 +482,13 @@ class CPUStandbyService:
         for pattern in self.config.sync_exclude:
             exclude_args.extend(["--exclude", pattern])
 
-        ssh_key = os.path.expanduser("~/.ssh/id_rsa")
-        ssh_opts = f"ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null -i {ssh_key}"
+        pool = get_ssh_pool()
 
         try:
             # Step 1: GPU → Local
             rsync_gpu_local = [
                 "rsync", "-avz", "--delete",
-                "-e", f"{ssh_opts} -p {self.gpu_ssh_port}",
+                "-e", pool.ssh_command(self.gpu_ssh_host, self.gpu_ssh_port, key_path="~/.ssh/id_rsa"),
                 *exclude_args,
                 f"root@{self.gpu_ssh_host}:{self.config.sync_path}/",
                 f"{local_sync_dir}/"
@@ -363,7 +509,7 @@ class CPUStandbyService:
             # Step 2: Local → CPU
             rsync_local_cpu = [
                 "rsync", "-avz", "--delete",
-                "-e", f"{ssh_opts}",
+                "-e", pool.ssh_command(cpu_ip, 22, key_path="~/.ssh/id_rsa"),
                 *exclude_args,
                 f"{local_sync_dir}/",
                 f"root@{cpu_ip}:{self.config.sync_path}/"
@@ -388,6 +534,353 @@ class CPUStandbyService:
         except Exception as e:
             logger.error(f"Sync error: {e}")
 
+    # ==================== SYNC DIRETO ====================
+
+    def _run_ssh(
+        self,
+        host: str,
+        port: int,
+        command: str,
+        input: Optional[str] = None,
+        timeout: int = 60
+    ) -> subprocess.CompletedProcess:
+        """Executa um comando remoto como root usando a chave do servidor de controle"""
+        return get_ssh_pool().run(host, port, command, key_path="~/.ssh/id_rsa", input=input, timeout=timeout)
+
+    def _sync_key_path(self, cpu_ip: str) -> str:
+        """Chave privada de sync desta CPU standby (local, no servidor de controle)"""
+        name = (self.cpu_instance or {}).get('name') or cpu_ip
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        return os.path.join(os.path.expanduser(self.config.sync_key_dir), safe)
+
+    def _ensure_sync_keypair(self, cpu_ip: str) -> str:
+        """Gera (se preciso) o par de chaves de sync da CPU; retorna o caminho da privada"""
+        key_path = self._sync_key_path(cpu_ip)
+        if not os.path.exists(key_path):
+            os.makedirs(os.path.dirname(key_path), mode=0o700, exist_ok=True)
+            logger.info(f"Generating sync SSH key pair for {os.path.basename(key_path)}...")
+            subprocess.run(
+                ["ssh-keygen", "-t", "ed25519", "-f", key_path, "-N", "",
+                 "-C", f"{SYNC_KEY_COMMENT}:{os.path.basename(key_path)}"],
+                check=True,
+                capture_output=True
+            )
+        return key_path
+
+    def _delete_sync_keypair(self, cpu_ip: str):
+        """Descarta o par de chaves de sync local da CPU"""
+        key_path = self._sync_key_path(cpu_ip)
+        for path in (key_path, f"{key_path}.pub"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _gpu_egress_ip(self) -> Optional[str]:
+        """IP de saída da GPU, visto pela internet (a CPU só aceita a chave de sync dele)"""
+        candidates = []
+        try:
+            result = self._run_ssh(
+                self.gpu_ssh_host, self.gpu_ssh_port,
+                f"curl -fsS --max-time 10 {EGRESS_IP_URL} 2>/dev/null || wget -qO- -T 10 {EGRESS_IP_URL}",
+                timeout=30
+            )
+            if result.returncode == 0:
+                candidates.append(result.stdout.strip())
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.debug(f"Egress IP lookup on GPU failed: {e}")
+
+        if self.gpu_instance_id:
+            try:
+                candidates.append(self.vast_service.get_instance_status(self.gpu_instance_id).get('public_ipaddr'))
+            except Exception as e:
+                logger.debug(f"Egress IP lookup via Vast.ai failed: {e}")
+
+        for candidate in candidates:
+            try:
+                return str(ipaddress.ip_address((candidate or "").strip()))
+            except ValueError:
+                continue
+        return None
+
+    def _remove_cpu_sync_keys_cmd(self) -> str:
+        """Remove do authorized_keys da CPU todas as chaves de sync (atual e anteriores)"""
+        return (
+            f"touch ~/.ssh/authorized_keys && "
+            f"(grep -vE ' {SYNC_KEY_COMMENT}(:[^ ]*)?$' ~/.ssh/authorized_keys > ~/.ssh/authorized_keys.tmp || true) && "
+            f"chmod 600 ~/.ssh/authorized_keys.tmp && mv ~/.ssh/authorized_keys.tmp ~/.ssh/authorized_keys"
+        )
+
+    def _revoke_sync_key(self, pairing: tuple):
+        """
+        Revoga a chave de sync de um pareamento antigo (GPU trocada ou standby
+        desmontado): apaga a privada da GPU e a autorização na CPU (melhor
+        esforço, as máquinas podem já não existir) e descarta o par local.
+        """
+        gpu_host, gpu_port, cpu_ip = pairing
+        for host, port, command in (
+            (gpu_host, gpu_port, f"rm -f {GPU_SYNC_KEY_PATH}"),
+            (cpu_ip, 22, f"mkdir -p ~/.ssh && {self._remove_cpu_sync_keys_cmd()}"),
+        ):
+            try:
+                result = self._run_ssh(host, port, command, timeout=20)
+                if result.returncode != 0:
+                    logger.warning(f"Failed to revoke sync key on {host}:{port}: {result.stderr[:200]}")
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.warning(f"Failed to revoke sync key on {host}:{port}: {e}")
+
+        self._delete_sync_keypair(cpu_ip)
+        if self._sync_key_pairing == pairing:
+            self._sync_key_pairing = None
+        if self._direct_sync_target == pairing:
+            self._direct_sync_target = None
+        logger.info(f"Sync key revoked: {gpu_host}:{gpu_port} ↔ {cpu_ip}")
+
+    def _setup_direct_sync(self, cpu_ip: str) -> bool:
+        """
+        Prepara o sync direto GPU ↔ CPU.
+
+        Cada CPU standby tem seu próprio par de chaves. A privada vai para a
+        GPU; a pública é autorizada na CPU só a partir do IP de saída da GPU
+        e presa ao rrsync em sync_path (restrict,from=...,command=...). Quando
+        a GPU muda, a chave anterior é revogada nas duas pontas e o par é
+        trocado. Só é refeito quando a GPU ou a CPU mudam (ou após falha de sync).
+
+        Returns:
+            True se a GPU consegue falar direto com a CPU
+        """
+        target = (self.gpu_ssh_host, self.gpu_ssh_port, cpu_ip)
+        if self._direct_sync_target == target:
+            return True
+
+        if self._sync_key_pairing is not None and self._sync_key_pairing != target:
+            # A GPU anterior (host de terceiros) teve a privada: não reaproveitar
+            self._revoke_sync_key(self._sync_key_pairing)
+
+        try:
+            gpu_ip = self._gpu_egress_ip()
+            if not gpu_ip:
+                logger.warning("Could not determine GPU egress IP, direct sync disabled")
+                return False
+
+            key_path = self._ensure_sync_keypair(cpu_ip)
+            self._sync_key_pairing = target
+            with open(key_path) as f:
+                private_key = f.read()
+            with open(f"{key_path}.pub") as f:
+                public_key = f.read().strip()
+
+            # CPU: rrsync + chave de sync restrita à GPU e ao sync_path
+            entry = (
+                f'restrict,from="{gpu_ip}",'
+                f'command="{CPU_RRSYNC_PATH} {self.config.sync_path}" {public_key}'
+            )
+            rrsync = shlex.quote(CPU_RRSYNC_PATH)
+            result = self._run_ssh(
+                cpu_ip, 22,
+                f"(command -v rsync >/dev/null || "
+                f"(apt-get update -qq && apt-get install -y -qq rsync >/dev/null)) && "
+                f"if [ ! -x {rrsync} ]; then "
+                f"if command -v rrsync >/dev/null; then ln -sf \"$(command -v rrsync)\" {rrsync}; "
+                f"else gunzip -c /usr/share/doc/rsync/scripts/rrsync.gz > {rrsync} && chmod +x {rrsync}; fi; "
+                f"fi && "
+                f"mkdir -p {shlex.quote(self.config.sync_path)} && "
+                f"mkdir -p ~/.ssh && chmod 700 ~/.ssh && "
+                f"{self._remove_cpu_sync_keys_cmd()} && "
+                f"echo {shlex.quote(entry)} >> ~/.ssh/authorized_keys",
+                timeout=180
+            )
+            if result.returncode != 0:
+                logger.warning(f"Failed to authorize sync key on CPU: {result.stderr[:200]}")
+                return False
+
+            # GPU: chave privada (via stdin, nunca na linha de comando) + rsync
+            result = self._run_ssh(
+                self.gpu_ssh_host, self.gpu_ssh_port,
+                f"umask 077 && mkdir -p ~/.ssh && cat > {GPU_SYNC_KEY_PATH} && "
+                f"(command -v rsync >/dev/null || "
+                f"(apt-get update -qq && apt-get install -y -qq rsync >/dev/null))",
+                input=private_key,
+                timeout=180
+            )
+            if result.returncode != 0:
+                logger.warning(f"Failed to install sync key on GPU: {result.stderr[:200]}")
+                return False
+
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Failed to set up direct sync: {e}")
+            return False
+
+        self._direct_sync_target = target
+        logger.info(f"Direct sync ready: {self.gpu_ssh_host}:{self.gpu_ssh_port} ({gpu_ip}) ↔ {cpu_ip}")
+        return True
+
+    def _direct_rsync_cmd(self, cpu_ip: str, push: bool) -> str:
+        """
+        Comando rsync para rodar na GPU.
+
+        Args:
+            cpu_ip: IP da CPU standby
+            push: True = GPU → CPU (sync), False = CPU → GPU (restore)
+        """
+        ssh_opts = (
+            f"ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null "
+            f"-o BatchMode=yes -i {GPU_SYNC_KEY_PATH}"
+        )
+        local = f"{self.config.sync_path}/"
+        # rrsync na CPU já prende o destino em sync_path
+        remote = f"root@{cpu_ip}:./"
+
+        args = ["rsync", "-az", "--delete", "-e", ssh_opts]
+        if push:
+            for pattern in self.config.sync_exclude:
+                args.extend(["--exclude", pattern])
+            args.extend([local, remote])
+        else:
+            args.extend([remote, local])
+
+        cmd = " ".join(shlex.quote(arg) for arg in args)
+        return f"mkdir -p {shlex.quote(self.config.sync_path)} && {cmd}"
+
+    # ==================== SYNC INCREMENTAL ====================
+
+    def _journal_exclude_regex(self) -> str:
+        """sync_exclude (globs por componente) como regex POSIX para o inotifywait"""
+        parts = []
+        for pattern in self.config.sync_exclude:
+            component = re.escape(pattern).replace(r"\*", "[^/]*").replace(r"\?", "[^/]")
+            parts.append(component)
+        if not parts:
+            return ""
+        return f"(^|/)({'|'.join(parts)})(/|$)"
+
+    def _ensure_change_journal(self) -> bool:
+        """
+        Inicia o diário de mudanças na GPU (uma vez por GPU/CPU).
+
+        Instala inotify-tools se preciso e sobe o dumont-sync-journal.sh em
+        background. Um diário recém-iniciado não conhece as mudanças
+        anteriores, então o próximo ciclo é um sync completo.
+
+        Returns:
+            True se o diário está ativo
+        """
+        if not self.config.sync_incremental:
+            return False
+        if self._journal_target == self._direct_sync_target:
+            return True
+
+        script = shlex.quote(GPU_JOURNAL_SCRIPT_PATH)
+        journal = shlex.quote(GPU_SYNC_JOURNAL)
+        args = " ".join(shlex.quote(arg) for arg in (
+            GPU_JOURNAL_SCRIPT_PATH, self.config.sync_path, GPU_SYNC_JOURNAL, self._journal_exclude_regex()
+        ))
+        command = (
+            f"mkdir -p $(dirname {script}) $(dirname {journal}) && cat > {script} && chmod +x {script} && "
+            f"(command -v inotifywait >/dev/null || "
+            f"(apt-get update -qq && apt-get install -y -qq inotify-tools >/dev/null)) && "
+            f"(sysctl -qw fs.inotify.max_user_watches=1048576 >/dev/null 2>&1 || true) || exit 1; "
+            # Diário anterior (se houver): o processo e seus filhos (inotifywait, leitor)
+            f"if [ -f {journal}.pid ]; then pid=$(cat {journal}.pid); pkill -P $pid; kill $pid; fi 2>/dev/null; "
+            f"rm -f {journal} {journal}.sending {journal}.list {journal}.pid; "
+            f"mkdir -p {shlex.quote(self.config.sync_path)} && "
+            f"(setsid nohup {args} >/dev/null 2>&1 </dev/null &) && "
+            f"sleep 1 && kill -0 $(cat {journal}.pid)"
+        )
+
+        try:
+            result = self._run_ssh(
+                self.gpu_ssh_host, self.gpu_ssh_port, command,
+                input=CHANGE_JOURNAL_SCRIPT, timeout=180
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Failed to start change journal: {e}")
+            return False
+
+        if result.returncode != 0:
+            logger.warning(f"Change journal unavailable, using full sync: {result.stderr[:200]}")
+            return False
+
+        self._journal_target = self._direct_sync_target
+        self._last_full_sync = 0.0
+        logger.info(f"Change journal started on {self.gpu_ssh_host}:{self.gpu_ssh_port}")
+        return True
+
+    def _incremental_rsync_cmd(self, cpu_ip: str) -> str:
+        """
+        Ciclo incremental para rodar na GPU.
+
+        Rotaciona o diário, junta com um lote que tenha falhado antes e
+        envia só esses paths (rsync --files-from). Paths que não existem
+        mais são removidos na CPU (--delete-missing-args). Sai com
+        JOURNAL_INACTIVE_EXIT se o processo do diário morreu.
+        """
+        journal = shlex.quote(GPU_SYNC_JOURNAL)
+        ssh_opts = (
+            f"ssh -o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null "
+            f"-o BatchMode=yes -i {GPU_SYNC_KEY_PATH}"
+        )
+        args = [
+            # --force: diretório removido/movido na GPU sai da CPU mesmo não vazio
+            "rsync", "-az", "-r", f"--files-from={GPU_SYNC_JOURNAL}.list",
+            "--delete-missing-args", "--force", "-e", ssh_opts,
+        ]
+        for pattern in self.config.sync_exclude:
+            args.extend(["--exclude", pattern])
+        # rrsync na CPU prende o destino em sync_path: a lista vai relativa a ele
+        args.extend([f"{self.config.sync_path}/", f"root@{cpu_ip}:./"])
+        rsync_cmd = " ".join(shlex.quote(arg) for arg in args)
+        prefix = re.sub(r"([\\.\[\]*^$|])", r"\\\1", self.config.sync_path.rstrip("/") + "/")
+        strip_prefix = shlex.quote(f"s|^{prefix}||p")
+
+        return (
+            f"kill -0 $(cat {journal}.pid 2>/dev/null) 2>/dev/null || exit {JOURNAL_INACTIVE_EXIT}; "
+            f"if [ -f {journal} ]; then mv {journal} {journal}.new && "
+            f"cat {journal}.new >> {journal}.sending && rm -f {journal}.new; fi; "
+            f"[ -s {journal}.sending ] || exit 0; "
+            f"sed -n {strip_prefix} {journal}.sending | sort -u > {journal}.list; "
+            f"echo \"$(wc -l < {journal}.list) paths\"; "
+            f"{rsync_cmd}; rc=$?; "
+            # 24 = arquivos sumiram durante o envio (entram no próximo lote como remoção)
+            f"if [ $rc -eq 0 ] || [ $rc -eq 24 ]; then rm -f {journal}.sending {journal}.list; exit 0; fi; "
+            f"exit $rc"
+        )
+
+    def _do_incremental_sync(self, cpu_ip: str) -> bool:
+        """
+        Envia as mudanças do diário GPU → CPU.
+
+        Returns:
+            False se o sync completo deve rodar no lugar (diário inativo ou falha)
+        """
+        try:
+            result = self._run_ssh(
+                self.gpu_ssh_host,
+                self.gpu_ssh_port,
+                self._incremental_rsync_cmd(cpu_ip),
+                timeout=300
+            )
+        except subprocess.TimeoutExpired:
+            logger.error("Incremental sync timeout")
+            return False
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.error(f"Incremental sync error: {e}")
+            return False
+
+        if result.returncode == 0:
+            self.sync_count += 1
+            if result.stdout.strip():
+                logger.debug(f"Incremental sync completed: {result.stdout.strip()}")
+            return True
+
+        if result.returncode == JOURNAL_INACTIVE_EXIT:
+            logger.warning("Change journal not running on GPU, restarting it")
+            self._journal_target = None
+        else:
+            # Diário segue ativo: o lote pendente (.sending) vai no próximo ciclo
+            logger.warning(f"Incremental sync failed: {result.stderr[:200]}")
+        return False
+
     def _health_check_loop(self):
         """Loop de verificação de saúde da GPU"""
         while self._running:
@@ -443,7 +936,14 @@ class CPUStandbyService:
             time.sleep(self.config.r2_backup_interval)
 
     def _do_backup_to_r2(self):
-        """Executa backup da CPU para R2"""
+        """
+        Executa backup da CPU para R2.
+
+        Com restic configurado, o backup é incremental: só os chunks que
+        mudaram desde o último snapshot sobem, lidos direto do workspace em
+        paralelo. Sem restic, o workspace vai em streaming (tar | pigz |
+        s5cmd pipe) para standby/latest.tar.gz, sem arquivo temporário.
+        """
         if not self.snapshot_service or not self.cpu_instance:
             return
 
@@ -451,24 +951,113 @@ class CPUStandbyService:
         if not cpu_ip:
             return
 
+        if self.restic and self._ensure_restic_on_cpu(cpu_ip):
+            self._do_restic_backup(cpu_ip)
+        else:
+            self._do_streaming_backup(cpu_ip)
+
+    def _restic_env_exports(self) -> str:
+        env = {
+            "AWS_ACCESS_KEY_ID": self.restic.access_key,
+            "AWS_SECRET_ACCESS_KEY": self.restic.secret_key,
+            "RESTIC_PASSWORD": self.restic.password,
+            "RESTIC_REPOSITORY": self.restic.repo,
+        }
+        return " && ".join(f"export {key}={shlex.quote(value)}" for key, value in env.items())
+
+    def _ensure_restic_on_cpu(self, cpu_ip: str) -> bool:
+        """Instala restic na CPU (se preciso) e inicializa o repositório se ainda não existir"""
+        if self._restic_ready_ip == cpu_ip:
+            return True
+
+        url = (
+            f"https://github.com/restic/restic/releases/download/v{RESTIC_VERSION}/"
+            f"restic_{RESTIC_VERSION}_linux_amd64.bz2"
+        )
+        command = (
+            f"(command -v restic >/dev/null || "
+            f"(wget -q {url} -O /tmp/restic.bz2 && bunzip2 -f /tmp/restic.bz2 && "
+            f"chmod +x /tmp/restic && mv /tmp/restic /usr/local/bin/restic)) && "
+            f"{self._restic_env_exports()} && "
+            f"(restic cat config >/dev/null 2>&1 || restic init)"
+        )
+
+        try:
+            result = self._run_ssh(cpu_ip, 22, command, timeout=300)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Failed to set up restic on CPU standby: {e}")
+            return False
+
+        if result.returncode != 0:
+            logger.warning(f"restic unavailable on CPU standby, using streaming backup: {result.stderr[:200]}")
+            return False
+
+        self._restic_ready_ip = cpu_ip
+        return True
+
+    def _do_restic_backup(self, cpu_ip: str):
+        """Snapshot restic incremental do workspace da CPU"""
+        logger.info("Backing up CPU standby to R2 (restic)")
+
+        tags = ["standby"]
+        if self.gpu_instance_id:
+            tags.append(f"instance:{self.gpu_instance_id}")
+
+        try:
+            summary = self.restic.create_snapshot(
+                ssh_host=cpu_ip,
+                ssh_port=22,
+                source_path=self.config.sync_path,
+                tags=tags,
+            )
+        except SnapshotException as e:
+            logger.warning(f"Backup failed: {str(e)[:200]}")
+            # Pode ser CPU recriada sem restic: verificar de novo no próximo ciclo
+            self._restic_ready_ip = None
+            return
+
+        logger.info(
+            f"Backup to R2 completed: snapshot {summary['snapshot_id']}, "
+            f"{summary['files_new']} new / {summary['files_changed']} changed files, "
+            f"{summary['data_added']} bytes uploaded"
+        )
+
+        # Retenção só dos snapshots do standby (o repositório é compartilhado);
+        # --prune apaga os packs que ficaram sem referência
+        forget_cmd = (
+            f"{self._restic_env_exports()} && "
+            f"restic forget --tag standby --keep-last {self.config.r2_backup_keep_last} --prune --quiet"
+        )
+        try:
+            result = self._run_ssh(cpu_ip, 22, forget_cmd, timeout=1800)
+            if result.returncode != 0:
+                logger.warning(f"restic forget --prune failed: {result.stderr[:200]}")
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"restic forget --prune failed: {e}")
+
+    def _do_streaming_backup(self, cpu_ip: str):
+        """Workspace inteiro em streaming para standby/latest.tar.gz (sem restic)"""
         logger.info("Backing up CPU standby to R2")
 
-        # Usar s5cmd na CPU para fazer upload direto para R2
-        backup_cmd = f"""
-cd {self.config.sync_path} && \
-tar -czf /tmp/standby_backup.tar.gz . && \
-s5cmd --endpoint-url={self.config.r2_endpoint} cp /tmp/standby_backup.tar.gz s3://{self.config.r2_bucket}/standby/latest.tar.gz && \
-rm /tmp/standby_backup.tar.gz && \
-echo "Backup completed"
-"""
+        path = shlex.quote(self.config.sync_path)
+        target = shlex.quote(f"s3://{self.config.r2_bucket}/standby/latest.tar.gz")
+        endpoint = shlex.quote(self.config.r2_endpoint)
 
-        ssh_cmd = [
-            "ssh", "-o", "StrictHostKeyChecking=no",
-            f"root@{cpu_ip}",
-            backup_cmd
-        ]
+        # pigz: gzip multi-thread; s5cmd pipe: multipart upload direto do stdin
+        backup_cmd = (
+            f"set -o pipefail; "
+            f"(command -v pigz >/dev/null || apt-get install -y -qq pigz >/dev/null 2>&1 || true); "
+            f"if command -v pigz >/dev/null; then COMPRESS='pigz -c'; else COMPRESS='gzip -c'; fi; "
+            f"cd {path} && tar -cf - . | $COMPRESS | "
+            f"s5cmd --endpoint-url={endpoint} pipe {target} && "
+            f"echo 'Backup completed'"
+        )
 
-        result = subprocess.run(ssh_cmd, capture_output=True, text=True, timeout=600)
+        try:
+            result = self._run_ssh(cpu_ip, 22, backup_cmd, timeout=600)
+        except subprocess.TimeoutExpired:
+            logger.warning("Backup timeout")
+            return
 
         if result.returncode == 0:
             logger.info("Backup to R2 completed")
@@ -567,7 +1156,7 @@ echo "Backup completed"
 
                 # 4. Restaurar dados da CPU para nova GPU
                 restore_result = self.restore_to_gpu(new_instance_id)
-                if restore_result.get('error'):
+                if not restore_result.get('success'):
                     logger.error(f"Failed to restore: {restore_result}")
                     continue
 
@@ -657,12 +1246,38 @@ echo "Backup completed"
         if not self.cpu_instance:
             return {"error": "No CPU standby available"}
 
+        # Sync GPU → CPU pausado até o restore terminar bem (ver _restore_succeeded)
+        with self._sync_lock:
+            self._sync_paused = True
+            # Diário da GPU anterior não vale para a nova: reiniciado após o restore
+            self._journal_target = None
+            return self._restore_from_cpu(new_gpu_instance_id)
+
+    def _restore_from_cpu(self, new_gpu_instance_id: int) -> Dict[str, Any]:
+        """Sync reverso CPU → GPU (com o sync GPU → CPU pausado)"""
         # Registrar nova GPU
         if not self.register_gpu_instance(new_gpu_instance_id):
             return {"error": "Failed to register new GPU instance"}
 
         # Sync reverso: CPU → GPU
         cpu_ip = self.cpu_instance.get('external_ip')
+
+        if self.config.sync_mode == "direct" and self._setup_direct_sync(cpu_ip):
+            # A nova GPU puxa direto da CPU
+            logger.info(f"Restoring data directly from CPU standby to GPU {new_gpu_instance_id}...")
+            try:
+                result = self._run_ssh(
+                    self.gpu_ssh_host,
+                    self.gpu_ssh_port,
+                    self._direct_rsync_cmd(cpu_ip, push=False),
+                    timeout=600
+                )
+                if result.returncode == 0:
+                    return self._restore_succeeded(new_gpu_instance_id)
+                logger.warning(f"Direct restore failed, falling back to relay: {result.stderr[:200]}")
+            except subprocess.TimeoutExpired:
+                logger.warning("Direct restore timeout, falling back to relay")
+
         ssh_key = os.path.expanduser("~/.ssh/id_rsa")
 
         # Build SSH command for rsync (CPU → GPU)
@@ -672,7 +1287,7 @@ echo "Backup completed"
         # Step 1: Pull from CPU
         rsync_cmd_cpu = [
             "rsync", "-avz", "--delete",
-            "-e", f"ssh -o StrictHostKeyChecking=no -i {ssh_key}",
+            "-e", get_ssh_pool().ssh_command(cpu_ip, 22, key_path=ssh_key),
             f"root@{cpu_ip}:{self.config.sync_path}/",
             "/tmp/dumont-restore-relay/",
         ]
@@ -689,7 +1304,7 @@ echo "Backup completed"
             }
 
         # Step 2: Push to new GPU
-        ssh_opts = f"ssh -o StrictHostKeyChecking=no -i {ssh_key} -p {self.gpu_ssh_port}"
+        ssh_opts = get_ssh_pool().ssh_command(self.gpu_ssh_host, self.gpu_ssh_port, key_path=ssh_key)
         rsync_cmd_gpu = [
             "rsync", "-avz", "--delete",
             "-e", ssh_opts,
@@ -702,11 +1317,6 @@ echo "Backup completed"
         result = subprocess.run(rsync_cmd_gpu, capture_output=True, text=True, timeout=600)
 
         if result.returncode == 0:
-            self.state = StandbyState.SYNCING
-            self.failed_health_checks = 0
-
-            logger.info(f"✓ Data restored successfully to GPU {new_gpu_instance_id}")
-
             # Limparcache local de restore
             try:
                 import shutil
@@ -715,12 +1325,7 @@ echo "Backup completed"
             except (OSError, TypeError) as e:
                 logger.warning(f"Failed to cleanup restore cache: {e}")
 
-            return {
-                "success": True,
-                "message": "Restored to new GPU",
-                "gpu_instance_id": new_gpu_instance_id,
-                "timestamp": datetime.now().isoformat()
-            }
+            return self._restore_succeeded(new_gpu_instance_id)
         else:
             logger.error(f"✗ Restore failed: {result.stderr}")
             return {
@@ -729,6 +1334,20 @@ echo "Backup completed"
                 "timestamp": datetime.now().isoformat()
             }
 
+    def _restore_succeeded(self, new_gpu_instance_id: int) -> Dict[str, Any]:
+        self.state = StandbyState.SYNCING
+        self.failed_health_checks = 0
+        self._sync_paused = False
+
+        logger.info(f"✓ Data restored successfully to GPU {new_gpu_instance_id}")
+
+        return {
+            "success": True,
+            "message": "Restored to new GPU",
+            "gpu_instance_id": new_gpu_instance_id,
+            "timestamp": datetime.now().isoformat()
+        }
+
     def get_status(self) -> Dict[str, Any]:
         """Retorna status completo do sistema de standby"""
         return {
@@ -747,12 +1366,18 @@ echo "Backup completed"
             },
             "sync": {
                 "running": self._running,
+                "paused": self._sync_paused,
                 "count": self.sync_count,
                 "last_sync": self.last_sync_time.isoformat() if self.last_sync_time else None,
-                "interval_seconds": self.config.sync_interval_seconds
+                "interval_seconds": self.config.sync_interval_seconds,
+                "mode": self.config.sync_mode,
+                "direct_ready": self._direct_sync_target is not None,
+                "incremental": self._journal_target is not None,
+                "last_full_sync": datetime.fromtimestamp(self._last_full_sync).isoformat() if self._last_full_sync else None
             },
             "backup": {
                 "enabled": self.snapshot_service is not None,
+                "method": "restic" if self.restic else "stream",
                 "last_backup": self.last_backup_time.isoformat() if self.last_backup_time else None,
                 "interval_seconds": self.config.r2_backup_interval
             },
@@ -795,6 +1420,9 @@ echo "Backup completed"
 
         self.stop_sync()
 
+        if self._sync_key_pairing is not None:
+            self._revoke_sync_key(self._sync_key_pairing)
+
         if self.cpu_instance:
             name = self.cpu_instance.get('name')
             zone = self.cpu_instance.get('zone')
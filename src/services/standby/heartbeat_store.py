@@ -0,0 +1,327 @@
+"""
+Heartbeat Store - Ingestão em memória dos heartbeats do DumontAgent
+
+O endpoint /agent/status só atualiza um dict em memória (último estado por
+instância, idle_since calculado aqui) e responde na hora. Uma thread grava
+o estado acumulado em InstanceStatus/HibernationEvent a cada poucos segundos,
+num único SELECT ... IN + um commit por ciclo, independente do tamanho da
+frota.
+
+Estados alterados por outros componentes (hibernated, keep-alive, ...) são
+lidos de volta a cada flush; transições running <-> idle só são gravadas se
+o banco ainda estiver em running/idle. Instâncias sem heartbeat há mais de
+HEARTBEAT_STATE_TTL saem da memória após um flush bem-sucedido.
+"""
+
+import os
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+HEARTBEAT_FLUSH_INTERVAL = float(os.getenv("HEARTBEAT_FLUSH_INTERVAL", "5"))
+
+# Estado em memória de instâncias sem heartbeat há mais que isso é descartado
+HEARTBEAT_STATE_TTL = float(os.getenv("HEARTBEAT_STATE_TTL", "3600"))
+
+# Estados que o heartbeat pode alternar; os demais pertencem ao hibernation manager
+HEARTBEAT_STATUSES = ("running", "idle")
+
+
+@dataclass
+class HeartbeatState:
+    """Último heartbeat de uma instância e o estado idle derivado dele"""
+    instance_id: str
+    gpu_utilization: float
+    last_heartbeat: datetime
+    last_activity: Optional[datetime] = None
+    status: Optional[str] = None
+    idle_since: Optional[datetime] = None
+    # None até o primeiro flush carregar a linha do banco
+    gpu_usage_threshold: Optional[float] = None
+    # Incrementado a cada heartbeat; o flush só adota o estado do banco se não mudou
+    version: int = 0
+    dirty: bool = True
+    transitioned: bool = False
+
+    @property
+    def loaded(self) -> bool:
+        return self.gpu_usage_threshold is not None
+
+
+@dataclass
+class _PendingEvent:
+    instance_id: str
+    event_type: str
+    gpu_utilization: float
+    reason: str
+    timestamp: datetime = field(default_factory=datetime.utcnow)
+
+
+class HeartbeatStore:
+    """
+    Estado de heartbeat por instância, gravado em lote.
+
+    record() não toca o banco; flush() (thread própria, a cada flush_interval)
+    grava todas as instâncias alteradas numa transação.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = HEARTBEAT_FLUSH_INTERVAL,
+        session_factory=None,
+        state_ttl: float = HEARTBEAT_STATE_TTL,
+    ):
+        self.flush_interval = flush_interval
+        self.state_ttl = state_ttl
+        self._session_factory = session_factory
+        self._states: Dict[str, HeartbeatState] = {}
+        self._events: List[_PendingEvent] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _session(self):
+        if self._session_factory is None:
+            from src.config.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    # ==================== INGESTÃO ====================
+
+    def record(self, instance_id: str, gpu_utilization: float, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Registra um heartbeat em memória.
+
+        Returns:
+            Dict com status e idle_since atuais da instância
+        """
+        now = now or datetime.utcnow()
+        with self._lock:
+            state = self._states.get(instance_id)
+            if state is None:
+                state = self._states[instance_id] = HeartbeatState(
+                    instance_id=instance_id,
+                    gpu_utilization=gpu_utilization,
+                    last_heartbeat=now,
+                )
+            state.gpu_utilization = gpu_utilization
+            state.last_heartbeat = now
+            state.version += 1
+            state.dirty = True
+
+            if state.loaded:
+                self._apply_idle_rules(state, now)
+
+            result = {
+                "instance_id": instance_id,
+                "status": state.status,
+                "idle_since": state.idle_since.isoformat() if state.idle_since else None,
+            }
+
+        self._ensure_flusher()
+        return result
+
+    def _apply_idle_rules(self, state: HeartbeatState, now: datetime):
+        """Transições running <-> idle (mesmas regras do update_instance_status original)"""
+        is_idle = state.gpu_utilization < state.gpu_usage_threshold
+
+        if is_idle:
+            if state.status == "running":
+                # Primeira vez ociosa - marcar timestamp
+                state.status = "idle"
+                state.idle_since = now
+                state.transitioned = True
+                logger.info(f"Instância {state.instance_id} ficou ociosa ({state.gpu_utilization}%)")
+                self._events.append(_PendingEvent(
+                    instance_id=state.instance_id,
+                    event_type="idle_detected",
+                    gpu_utilization=state.gpu_utilization,
+                    reason=f"GPU utilização < {state.gpu_usage_threshold}%",
+                    timestamp=now,
+                ))
+        else:
+            if state.status == "idle":
+                # Voltou a ser usada
+                state.status = "running"
+                state.idle_since = None
+                state.transitioned = True
+                logger.info(f"Instância {state.instance_id} voltou a ser usada ({state.gpu_utilization}%)")
+            state.last_activity = now
+
+    def get(self, instance_id: str) -> Optional[HeartbeatState]:
+        with self._lock:
+            return self._states.get(instance_id)
+
+    # ==================== FLUSH ====================
+
+    def flush(self) -> int:
+        """
+        Grava as instâncias alteradas desde o último flush.
+
+        Returns:
+            Número de instâncias gravadas
+        """
+        from src.models.instance_status import InstanceStatus, HibernationEvent
+
+        with self._lock:
+            snapshot = {
+                iid: (s.version, s.gpu_utilization, s.last_heartbeat, s.last_activity,
+                      s.status, s.idle_since, s.transitioned, s.loaded)
+                for iid, s in self._states.items() if s.dirty
+            }
+            events, self._events = self._events, []
+
+        if not snapshot and not events:
+            self._prune()
+            return 0
+
+        db = self._session()
+        try:
+            rows = {
+                row.instance_id: row
+                for row in db.query(InstanceStatus).filter(
+                    InstanceStatus.instance_id.in_(list(snapshot))
+                ).all()
+            } if snapshot else {}
+
+            for instance_id, (_, util, heartbeat, activity, status, idle_since, transitioned, loaded) in snapshot.items():
+                row = rows.get(instance_id)
+                if row is None:
+                    # Criar nova instância no DB
+                    logger.info(f"Nova instância detectada: {instance_id}")
+                    row = rows[instance_id] = InstanceStatus(
+                        instance_id=instance_id,
+                        user_id="unknown",  # Será atualizado depois
+                        status="running",
+                        gpu_utilization=util,
+                        last_heartbeat=heartbeat,
+                        last_activity=heartbeat,
+                    )
+                    db.add(row)
+                    continue
+
+                row.gpu_utilization = util
+                row.last_heartbeat = heartbeat
+                if not loaded:
+                    # Primeiro heartbeat visto por este processo: regras aplicadas contra o banco
+                    self._apply_to_row(db, row, util, heartbeat, HibernationEvent)
+                    continue
+                if activity and (row.last_activity is None or activity > row.last_activity):
+                    row.last_activity = activity
+                if transitioned and row.status in HEARTBEAT_STATUSES:
+                    row.status = status
+                    row.idle_since = idle_since
+
+            # Linhas novas antes dos eventos (FK instance_id)
+            db.flush()
+            # Lido antes do commit para não expirar/recarregar cada linha
+            adopted = {
+                iid: (row.status, row.idle_since, row.gpu_usage_threshold or 5.0)
+                for iid, row in rows.items()
+            }
+            for event in events:
+                db.add(HibernationEvent(
+                    instance_id=event.instance_id,
+                    event_type=event.event_type,
+                    gpu_utilization=event.gpu_utilization,
+                    reason=event.reason,
+                    timestamp=event.timestamp,
+                ))
+            db.commit()
+        except Exception as e:
+            logger.error(f"Erro ao gravar heartbeats: {e}")
+            db.rollback()
+            with self._lock:
+                self._events = events + self._events
+            return 0
+        finally:
+            db.close()
+
+        with self._lock:
+            for instance_id, (status, idle_since, threshold) in adopted.items():
+                state = self._states.get(instance_id)
+                if state is None:
+                    continue
+                state.gpu_usage_threshold = threshold
+                if state.version == snapshot[instance_id][0]:
+                    # Nada novo desde o snapshot: o banco é a fonte (hibernated, keep-alive, ...)
+                    state.status = status
+                    state.idle_since = idle_since
+                    state.dirty = False
+                    state.transitioned = False
+                elif not snapshot[instance_id][7]:
+                    # Heartbeats chegaram durante o primeiro flush: reaplicar sobre o estado do banco
+                    state.status = status
+                    state.idle_since = idle_since
+                    self._apply_idle_rules(state, state.last_heartbeat)
+
+        self._prune()
+        logger.debug(f"Heartbeats gravados: {len(snapshot)} instâncias, {len(events)} eventos")
+        return len(snapshot)
+
+    def _prune(self):
+        """Descarta instâncias já gravadas e sem heartbeat desde state_ttl"""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.state_ttl)
+        with self._lock:
+            stale = [
+                iid for iid, s in self._states.items()
+                if not s.dirty and s.last_heartbeat < cutoff
+            ]
+            for iid in stale:
+                del self._states[iid]
+        if stale:
+            logger.debug(f"Heartbeats: {len(stale)} instâncias inativas removidas da memória")
+
+    @staticmethod
+    def _apply_to_row(db, row, gpu_utilization: float, now: datetime, event_model):
+        """Regras de idle aplicadas diretamente na linha (instância ainda não carregada)"""
+        is_idle = gpu_utilization < row.gpu_usage_threshold
+
+        if is_idle:
+            if row.status == "running":
+                row.status = "idle"
+                row.idle_since = now
+                logger.info(f"Instância {row.instance_id} ficou ociosa ({gpu_utilization}%)")
+                db.add(event_model(
+                    instance_id=row.instance_id,
+                    event_type="idle_detected",
+                    gpu_utilization=gpu_utilization,
+                    reason=f"GPU utilização < {row.gpu_usage_threshold}%",
+                ))
+        else:
+            if row.status == "idle":
+                row.status = "running"
+                row.idle_since = None
+                logger.info(f"Instância {row.instance_id} voltou a ser usada ({gpu_utilization}%)")
+            row.last_activity = now
+
+    # ==================== THREAD ====================
+
+    def _ensure_flusher(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._flush_loop, name="heartbeat-flush", daemon=True)
+                self._thread.start()
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erro no flush de heartbeats: {e}")
+
+    def stop(self):
+        """Para a thread e grava o que estiver pendente"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
@@ -20,6 +20,9 @@ from typing import Dict, List, Optional
 from src.services.agent_manager import Agent
 from src.services.gpu.snapshot import GPUSnapshotService
 from src.services.gpu.vast import VastService
+from src.services.gpu.fleet_tracker import get_fleet_tracker
+from src.services.standby.heartbeat_store import HeartbeatStore
+from src.infrastructure.providers.ssh_pool import get_ssh_pool
 from src.config.database import SessionLocal
 from src.models.instance_status import InstanceStatus, HibernationEvent
 from src.services.usage_service import UsageService
@@ -57,6 +60,10 @@ class AutoHibernationManager(Agent):
         super().__init__(name="AutoHibernation")
 
         self.vast_service = VastService(api_key=vast_api_key)
+        # Estado das instâncias compartilhado com race/warm pool (um GET por tick)
+        self.fleet = get_fleet_tracker(vast_api_key)
+        # Heartbeats do DumontAgent: memória + gravação em lote
+        self.heartbeats = HeartbeatStore()
         self.snapshot_service = GPUSnapshotService(r2_endpoint, r2_bucket)
         self.check_interval = check_interval
         
@@ -94,6 +101,11 @@ class AutoHibernationManager(Agent):
 
         logger.info("Loop de auto-hibernação finalizado")
 
+    def stop(self):
+        """Para o agente e grava os heartbeats pendentes."""
+        super().stop()
+        self.heartbeats.stop()
+
     def _check_all_instances(self):
         """Verifica status de todas as instâncias e aplica políticas de hibernação."""
         db = SessionLocal()
@@ -152,7 +164,7 @@ class AutoHibernationManager(Agent):
         PAUSED_DESTROY_HOURS = 24  # Horas pausada antes de destruir
 
         try:
-            vast_instances = self.vast_service.get_my_instances()
+            vast_instances = self.fleet.list_instances()
 
             if not vast_instances:
                 return
@@ -231,15 +243,10 @@ class AutoHibernationManager(Agent):
                             echo "GPU:$gpu_usage CPU:$cpu_usage"
                         """
 
-                        result = subprocess.run(
-                            ["ssh", "-i", "/home/marcos/.ssh/id_rsa",
-                             "-o", "StrictHostKeyChecking=no",
-                             "-o", "ConnectTimeout=5",
-                             "-o", "BatchMode=yes",
-                             "-p", str(ssh_port),
-                             f"root@{ssh_host}",
-                             check_cmd],
-                            capture_output=True, timeout=15, text=True
+                        result = get_ssh_pool().run(
+                            ssh_host, ssh_port, check_cmd,
+                            key_path="/home/marcos/.ssh/id_rsa",
+                            timeout=15, connect_timeout=5
                         )
 
                         gpu_usage = 0.0
@@ -514,23 +521,10 @@ class AutoHibernationManager(Agent):
 
     def _verify_ssh_connection(self, ssh_host: str, ssh_port: int, timeout: int = 10) -> bool:
         """Verifica se SSH está funcionando com comando real"""
-        import subprocess
-
         try:
-            result = subprocess.run(
-                [
-                    "ssh",
-                    "-o", "StrictHostKeyChecking=no",
-                    "-o", "UserKnownHostsFile=/dev/null",
-                    "-o", f"ConnectTimeout={timeout}",
-                    "-o", "BatchMode=yes",
-                    "-p", str(ssh_port),
-                    f"root@{ssh_host}",
-                    "echo SSH_OK"
-                ],
-                capture_output=True,
-                text=True,
-                timeout=timeout + 5,
+            result = get_ssh_pool().run(
+                ssh_host, ssh_port, "echo SSH_OK",
+                timeout=timeout + 5, connect_timeout=timeout
             )
             return result.returncode == 0 and "SSH_OK" in result.stdout
         except Exception as e:
@@ -718,7 +712,10 @@ class AutoHibernationManager(Agent):
                 
                 # Buscar preço da instância (estimativa se não disponível)
                 try:
-                    vast_info = self.vast_service.get_instance_status(instance.vast_instance_id)
+                    vast_info = (
+                        self.fleet.get(instance.vast_instance_id)
+                        or self.vast_service.get_instance_status(instance.vast_instance_id)
+                    )
                     if vast_info and 'dph_total' in vast_info:
                         dph_total = vast_info['dph_total']
                 except:
@@ -977,7 +974,6 @@ class AutoHibernationManager(Agent):
             }
         """
         from concurrent.futures import ThreadPoolExecutor, as_completed
-        import subprocess
 
         db = SessionLocal()
         try:
@@ -1054,20 +1050,8 @@ class AutoHibernationManager(Agent):
                             ssh_port = status['ssh_port']
 
                             # Verificar SSH com comando real
-                            result = subprocess.run(
-                                [
-                                    "ssh",
-                                    "-o", "StrictHostKeyChecking=no",
-                                    "-o", "UserKnownHostsFile=/dev/null",
-                                    "-o", "ConnectTimeout=10",
-                                    "-o", "BatchMode=yes",
-                                    "-p", str(ssh_port),
-                                    f"root@{ssh_host}",
-                                    "echo SSH_OK"
-                                ],
-                                capture_output=True,
-                                text=True,
-                                timeout=15,
+                            result = get_ssh_pool().run(
+                                ssh_host, ssh_port, "echo SSH_OK", timeout=15
                             )
 
                             if result.returncode == 0 and "SSH_OK" in result.stdout:
@@ -1208,70 +1192,18 @@ class AutoHibernationManager(Agent):
         """
         Atualiza status de uma instância baseado em heartbeat do DumontAgent.
 
+        Só atualiza memória (seguro para chamar do event loop); o estado vai
+        para o banco no próximo flush do HeartbeatStore.
+
         Args:
             instance_id: ID da instância
             gpu_utilization: Utilização da GPU em %
-            gpu_threshold: Threshold para considerar ociosa
-        """
-        db = SessionLocal()
-        try:
-            now = datetime.utcnow()
-
-            instance = db.query(InstanceStatus).filter(
-                InstanceStatus.instance_id == instance_id
-            ).first()
-
-            if not instance:
-                # Criar nova instância no DB
-                logger.info(f"Nova instância detectada: {instance_id}")
-                instance = InstanceStatus(
-                    instance_id=instance_id,
-                    user_id="unknown",  # Será atualizado depois
-                    status="running",
-                    gpu_utilization=gpu_utilization,
-                    last_heartbeat=now,
-                    last_activity=now
-                )
-                db.add(instance)
-            else:
-                # Atualizar instância existente
-                instance.gpu_utilization = gpu_utilization
-                instance.last_heartbeat = now
-
-                # Determinar se está ociosa
-                is_idle = gpu_utilization < instance.gpu_usage_threshold
-
-                if is_idle:
-                    if instance.status == "running":
-                        # Primeira vez ociosa - marcar timestamp
-                        instance.status = "idle"
-                        instance.idle_since = now
-                        logger.info(f"Instância {instance_id} ficou ociosa ({gpu_utilization}%)")
-
-                        # Registrar evento
-                        event = HibernationEvent(
-                            instance_id=instance_id,
-                            event_type="idle_detected",
-                            gpu_utilization=gpu_utilization,
-                            reason=f"GPU utilização < {instance.gpu_usage_threshold}%"
-                        )
-                        db.add(event)
-                else:
-                    if instance.status == "idle":
-                        # Voltou a ser usada
-                        instance.status = "running"
-                        instance.idle_since = None
-                        logger.info(f"Instância {instance_id} voltou a ser usada ({gpu_utilization}%)")
-
-                    instance.last_activity = now
+            gpu_threshold: Threshold para considerar ociosa (o da instância no banco prevalece)
 
-            db.commit()
-
-        except Exception as e:
-            logger.error(f"Erro ao atualizar status: {e}")
-            db.rollback()
-        finally:
-            db.close()
+        Returns:
+            Dict com status e idle_since atuais
+        """
+        return self.heartbeats.record(instance_id, gpu_utilization)
 
     def get_all_instance_status(self) -> List[Dict]:
         """Retorna status de todas as instâncias rastreadas."""
@@ -21,7 +21,8 @@ import subprocess
 from dataclasses import dataclass, field
 from typing import Optional, Dict, Any, List
 from enum import Enum
-import aiohttp
+
+from src.infrastructure.providers.vast_client import get_vast_client
 
 from .host_finder import HostFinder, GPUOffer
 
@@ -100,6 +101,7 @@ class CloudStorageFailover:
     ):
         self.api_key = vast_api_key
         self.api_url = "https://cloud.vast.ai/api/v0"
+        self.client = get_vast_client(vast_api_key, self.api_url)
         self.storage = storage_config
         self.host_finder = HostFinder(vast_api_key)
 
@@ -336,15 +338,8 @@ fi
             # Escapar aspas simples no script para o onstart
             mount_script_escaped = mount_script.replace("'", "'\\''")
 
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                # Criar script de setup
-                onstart_script = f'''
+            # Criar script de setup
+            onstart_script = f'''
 mkdir -p /opt/dumont
 cat > /opt/dumont/mount-storage.sh << 'MOUNTSCRIPT'
 {mount_script}
@@ -353,31 +348,28 @@ chmod +x /opt/dumont/mount-storage.sh
 /opt/dumont/mount-storage.sh > /var/log/mount-storage.log 2>&1 &
 '''
 
-                payload = {
-                    "client_id": "me",
-                    "image": docker_image,
-                    "disk": 20,
-                    "runtype": "ssh",
-                    "onstart": "echo 'GPU started' > /tmp/gpu-ready.txt",
-                }
-
-                async with session.put(
-                    f"{self.api_url}/asks/{offer_id}/",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status not in [200, 201]:
-                        text = await response.text()
-                        logger.error(f"Failed to provision GPU: {response.status} - {text}")
-                        return None
-
-                    data = await response.json()
-                    instance_id = data.get("new_contract")
+            payload = {
+                "client_id": "me",
+                "image": docker_image,
+                "disk": 20,
+                "runtype": "ssh",
+                "onstart": "echo 'GPU started' > /tmp/gpu-ready.txt",
+            }
+
+            response = await self.client.aput(f"/asks/{offer_id}/", json=payload)
+            if response.status not in [200, 201]:
+                logger.error(f"Failed to provision GPU: {response.status} - {response.text}")
+                return None
 
-                    return {
-                        "instance_id": instance_id,
-                        "mount_script": mount_script,
-                    }
+            # Oferta alugada: buscas em cache nao devem mais retorna-la
+            self.client.invalidate_offer(offer_id)
+            data = response.json()
+            instance_id = data.get("new_contract")
+
+            return {
+                "instance_id": instance_id,
+                "mount_script": mount_script,
+            }
 
         except Exception as e:
             logger.error(f"Failed to provision GPU: {e}")
@@ -393,32 +385,23 @@ chmod +x /opt/dumont/mount-storage.sh
 
         while time.time() - start_time < timeout_seconds:
             try:
-                async with aiohttp.ClientSession() as session:
-                    headers = {
-                        "Accept": "application/json",
-                        "Authorization": f"Bearer {self.api_key}"
-                    }
+                response = await self.client.aget(f"/instances/{instance_id}/")
+                if response.status != 200:
+                    await asyncio.sleep(5)
+                    continue
+
+                data = response.json()
+                status = data.get("actual_status", "")
 
-                    async with session.get(
-                        f"{self.api_url}/instances/{instance_id}/",
-                        headers=headers
-                    ) as response:
-                        if response.status != 200:
-                            await asyncio.sleep(5)
-                            continue
-
-                        data = await response.json()
-                        status = data.get("actual_status", "")
-
-                        if status == "running":
-                            return {
-                                "instance_id": instance_id,
-                                "status": status,
-                                "ssh_host": data.get("ssh_host"),
-                                "ssh_port": data.get("ssh_port"),
-                                "gpu_name": data.get("gpu_name"),
-                                "geolocation": data.get("geolocation"),
-                            }
+                if status == "running":
+                    return {
+                        "instance_id": instance_id,
+                        "status": status,
+                        "ssh_host": data.get("ssh_host"),
+                        "ssh_port": data.get("ssh_port"),
+                        "gpu_name": data.get("gpu_name"),
+                        "geolocation": data.get("geolocation"),
+                    }
 
             except Exception as e:
                 logger.warning(f"Error checking instance: {e}")
@@ -600,17 +583,8 @@ chmod +x /opt/dumont/mount-storage.sh
     async def _destroy_instance(self, instance_id: int) -> bool:
         """Destroi uma instancia"""
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.delete(
-                    f"{self.api_url}/instances/{instance_id}/",
-                    headers=headers
-                ) as response:
-                    return response.status in [200, 204]
+            response = await self.client.adelete(f"/instances/{instance_id}/")
+            return response.status in [200, 204]
 
         except Exception as e:
             logger.error(f"Failed to destroy instance: {e}")
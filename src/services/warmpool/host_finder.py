@@ -4,15 +4,66 @@ Host Finder - Busca hosts com multiplas GPUs disponiveis no VAST.ai.
 Permite encontrar hosts onde e possivel criar um GPU Warm Pool
 (requer minimo 2 GPUs disponiveis no mesmo host).
 """
+import json
 import logging
 import asyncio
 from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Any
-import aiohttp
+
+from src.infrastructure.providers.vast_client import get_vast_client
 
 logger = logging.getLogger(__name__)
 
 
+def build_offer_query(
+    gpu_names: Optional[List[str]] = None,
+    min_gpus: int = 1,
+    max_price: Optional[float] = None,
+    verified: bool = True,
+    min_reliability: float = 0.0,
+    geolocation: Optional[str] = None,
+    machine_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Monta os params de /bundles com os filtros no query JSON do VAST.ai.
+
+    A API aplica os filtros e devolve apenas as ofertas que interessam,
+    em vez do mercado on-demand inteiro para filtrar localmente.
+
+    Args:
+        gpu_names: Uma ou mais GPUs aceitas (None = qualquer)
+        verified: Se True, apenas hosts verificados; se False, qualquer host
+
+    Returns:
+        Params para GET /bundles/
+    """
+    query: Dict[str, Any] = {
+        "rentable": {"eq": True},
+        "num_gpus": {"gte": min_gpus},
+    }
+    names = [name for name in (gpu_names or []) if name]
+    if len(names) == 1:
+        query["gpu_name"] = {"eq": names[0]}
+    elif names:
+        query["gpu_name"] = {"in": names}
+    if max_price:
+        query["dph_total"] = {"lte": max_price}
+    if verified:
+        query["verified"] = {"eq": True}
+    if min_reliability > 0:
+        query["reliability2"] = {"gte": min_reliability}
+    if geolocation:
+        query["geolocation"] = {"eq": geolocation}
+    if machine_id is not None:
+        query["machine_id"] = {"eq": machine_id}
+
+    return {
+        "q": json.dumps(query),
+        "order": "dph_total",
+        "type": "on-demand",
+    }
+
+
 @dataclass
 class GPUOffer:
     """Representa uma oferta de GPU no VAST.ai"""
@@ -68,6 +119,7 @@ class HostFinder:
     def __init__(self, vast_api_key: str):
         self.api_key = vast_api_key
         self.api_url = "https://cloud.vast.ai/api/v0"
+        self.client = get_vast_client(vast_api_key, self.api_url)
 
     async def search_offers(
         self,
@@ -77,10 +129,14 @@ class HostFinder:
         verified: bool = True,
         min_reliability: float = 0.9,
         geolocation: Optional[str] = None,
+        gpu_names: Optional[List[str]] = None,
+        machine_id: Optional[int] = None,
     ) -> List[GPUOffer]:
         """
         Busca ofertas de GPU no VAST.ai.
 
+        Todos os filtros sao aplicados pela API (ver build_offer_query).
+
         Args:
             gpu_name: Nome da GPU (ex: "RTX_4090", "A100")
             min_gpus: Numero minimo de GPUs
@@ -88,79 +144,55 @@ class HostFinder:
             verified: Apenas hosts verificados
             min_reliability: Confiabilidade minima (0-1)
             geolocation: Codigo de pais (ex: "US", "DE")
+            gpu_names: Varias GPUs aceitas numa unica busca (alternativa a gpu_name)
+            machine_id: Apenas ofertas deste host
 
         Returns:
             Lista de ofertas de GPU
         """
         try:
-            # Construir params simples (VAST.ai usa params, não query JSON)
-            params = {
-                "order": "dph_total",
-                "type": "on-demand",
-                "verified": str(verified).lower(),
-                "rentable": "true",
-            }
-
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.get(
-                    f"{self.api_url}/bundles/",
-                    headers=headers,
-                    params=params
-                ) as response:
-                    if response.status != 200:
-                        text = await response.text()
-                        logger.error(f"VAST API error: {response.status} - {text}")
-                        return []
-
-                    data = await response.json()
-                    offers_data = data.get("offers", [])
-
-                    offers = []
-                    for offer_data in offers_data:
-                        try:
-                            # Aplicar filtros locais
-                            if gpu_name and offer_data.get("gpu_name", "") != gpu_name:
-                                continue
-                            if offer_data.get("num_gpus", 0) < min_gpus:
-                                continue
-                            if max_price and offer_data.get("dph_total", 999) > max_price:
-                                continue
-                            if offer_data.get("reliability2", 0) < min_reliability:
-                                continue
-                            if geolocation and offer_data.get("geolocation", "") != geolocation:
-                                continue
-
-                            offer = GPUOffer(
-                                offer_id=offer_data.get("id"),
-                                machine_id=offer_data.get("machine_id"),
-                                gpu_name=offer_data.get("gpu_name", ""),
-                                num_gpus=offer_data.get("num_gpus", 1),
-                                gpu_ram_mb=offer_data.get("gpu_ram", 0),
-                                cpu_cores=offer_data.get("cpu_cores", 0),
-                                ram_mb=offer_data.get("cpu_ram", 0),
-                                disk_space_gb=offer_data.get("disk_space", 0),
-                                price_per_hour=offer_data.get("dph_total", 0),
-                                reliability=offer_data.get("reliability2", 0),
-                                verified=offer_data.get("verified", False),
-                                static_ip=offer_data.get("static_ip", False),
-                                geolocation=offer_data.get("geolocation", ""),
-                                inet_up_bps=offer_data.get("inet_up_bps", 0),
-                                inet_down_bps=offer_data.get("inet_down_bps", 0),
-                                cuda_max_good=offer_data.get("cuda_max_good", ""),
-                                rentable=offer_data.get("rentable", False),
-                            )
-                            offers.append(offer)
-                        except Exception as e:
-                            logger.warning(f"Failed to parse offer: {e}")
-                            continue
-
-                    logger.info(f"Found {len(offers)} GPU offers (filtered from {len(offers_data)})")
-                    return offers
+            params = build_offer_query(
+                gpu_names=[gpu_name] if gpu_name else gpu_names,
+                min_gpus=min_gpus,
+                max_price=max_price,
+                verified=verified,
+                min_reliability=min_reliability,
+                geolocation=geolocation,
+                machine_id=machine_id,
+            )
+
+            # Cache curto compartilhado: buscas identicas concorrentes fazem uma so chamada
+            offers_data = await self.client.asearch_bundles(params)
+
+            offers = []
+            for offer_data in offers_data:
+                try:
+                    offer = GPUOffer(
+                        offer_id=offer_data.get("id"),
+                        machine_id=offer_data.get("machine_id"),
+                        gpu_name=offer_data.get("gpu_name", ""),
+                        num_gpus=offer_data.get("num_gpus", 1),
+                        gpu_ram_mb=offer_data.get("gpu_ram", 0),
+                        cpu_cores=offer_data.get("cpu_cores", 0),
+                        ram_mb=offer_data.get("cpu_ram", 0),
+                        disk_space_gb=offer_data.get("disk_space", 0),
+                        price_per_hour=offer_data.get("dph_total", 0),
+                        reliability=offer_data.get("reliability2", 0),
+                        verified=offer_data.get("verified", False),
+                        static_ip=offer_data.get("static_ip", False),
+                        geolocation=offer_data.get("geolocation", ""),
+                        inet_up_bps=offer_data.get("inet_up_bps", 0),
+                        inet_down_bps=offer_data.get("inet_down_bps", 0),
+                        cuda_max_good=offer_data.get("cuda_max_good", ""),
+                        rentable=offer_data.get("rentable", False),
+                    )
+                    offers.append(offer)
+                except Exception as e:
+                    logger.warning(f"Failed to parse offer: {e}")
+                    continue
+
+            logger.info(f"Found {len(offers)} GPU offers")
+            return offers
 
         except Exception as e:
             logger.error(f"Failed to search offers: {e}")
@@ -187,18 +219,14 @@ class HostFinder:
         Returns:
             Lista de hosts com multiplas GPUs
         """
-        # Se nao especificou GPU, buscar todas as preferidas
-        gpu_names_to_search = [gpu_name] if gpu_name else (preferred_gpu_names or [None])
-
-        all_offers = []
-        for gpu in gpu_names_to_search:
-            offers = await self.search_offers(
-                gpu_name=gpu,
-                min_gpus=1,  # Buscar todas, vamos agrupar depois
-                max_price=max_price,
-                verified=verified,
-            )
-            all_offers.extend(offers)
+        # Se nao especificou GPU, todas as preferidas numa unica busca (gpu_name "in")
+        all_offers = await self.search_offers(
+            gpu_name=gpu_name,
+            gpu_names=preferred_gpu_names,
+            min_gpus=1,  # Buscar todas, vamos agrupar depois
+            max_price=max_price,
+            verified=verified,
+        )
 
         # Agrupar por machine_id
         hosts_map: Dict[int, List[GPUOffer]] = {}
@@ -262,15 +290,12 @@ class HostFinder:
         try:
             # Buscar ofertas do mesmo machine_id
             # Tenta primeiro com os mesmos critérios do find_multi_gpu_hosts
-            all_offers = await self.search_offers(min_gpus=1, verified=verified)
-
-            host_offers = [o for o in all_offers if o.machine_id == machine_id]
+            host_offers = await self.search_offers(min_gpus=1, verified=verified, machine_id=machine_id)
 
             # Se não encontrou com verified=True, tenta sem filtro
             if not host_offers and verified:
                 logger.info(f"Host {machine_id} not found with verified=True, trying without filter")
-                all_offers = await self.search_offers(min_gpus=1, verified=False)
-                host_offers = [o for o in all_offers if o.machine_id == machine_id]
+                host_offers = await self.search_offers(min_gpus=1, verified=False, machine_id=machine_id)
 
             if not host_offers:
                 logger.warning(f"Host {machine_id} not found in any offers")
@@ -12,17 +12,19 @@ import os
 import json
 import logging
 import asyncio
+import time
 import threading
 from dataclasses import dataclass, field, asdict
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from enum import Enum
-import aiohttp
 
 from src.config.failover_settings import (
     FailoverSettings, MachineFailoverConfig, WarmPoolConfig,
     get_failover_settings_manager, FailoverStrategy
 )
+from src.infrastructure.providers.vast_client import get_vast_client
+from src.services.gpu.fleet_tracker import get_fleet_tracker, EVENT_EXITED, EVENT_GONE, EVENT_SSH_READY
 from .host_finder import HostFinder, MultiGPUHost, GPUOffer
 from .volume_service import VolumeService, Volume
 
@@ -83,6 +85,9 @@ class WarmPoolManager:
         self.machine_id = machine_id
         self.api_key = vast_api_key
         self.api_url = "https://cloud.vast.ai/api/v0"
+        self.client = get_vast_client(vast_api_key, self.api_url)
+        # Estado das instancias: um GET /instances/ por tick para todos os consumidores
+        self.fleet = get_fleet_tracker(vast_api_key)
 
         # Configuracao
         self.config = config or WarmPoolConfig()
@@ -411,41 +416,30 @@ class WarmPoolManager:
     ) -> Optional[Dict[str, Any]]:
         """Cria instancia no VAST.ai"""
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                payload = {
-                    "client_id": "me",
-                    "image": image,
-                    "disk": disk_size,
-                    "runtype": "ssh",
-                }
-
-                if volume_id:
-                    payload["volume_id"] = volume_id
-
-                if onstart_script:
-                    payload["onstart"] = onstart_script
-
-                if label:
-                    payload["label"] = label
-
-                async with session.put(
-                    f"{self.api_url}/asks/{offer_id}/",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status not in [200, 201]:
-                        text = await response.text()
-                        logger.error(f"Failed to create instance: {response.status} - {text}")
-                        return None
-
-                    data = await response.json()
-                    return data
+            payload = {
+                "client_id": "me",
+                "image": image,
+                "disk": disk_size,
+                "runtype": "ssh",
+            }
+
+            if volume_id:
+                payload["volume_id"] = volume_id
+
+            if onstart_script:
+                payload["onstart"] = onstart_script
+
+            if label:
+                payload["label"] = label
+
+            response = await self.client.aput(f"/asks/{offer_id}/", json=payload)
+            if response.status not in [200, 201]:
+                logger.error(f"Failed to create instance: {response.status} - {response.text}")
+                return None
+
+            # Oferta alugada: buscas em cache nao devem mais retorna-la
+            self.client.invalidate_offer(offer_id)
+            return response.json()
 
         except Exception as e:
             logger.error(f"Failed to create instance: {e}")
@@ -454,19 +448,8 @@ class WarmPoolManager:
     async def _start_instance(self, instance_id: int) -> bool:
         """Inicia instancia parada"""
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.put(
-                    f"{self.api_url}/instances/{instance_id}/",
-                    headers=headers,
-                    json={"state": "running"}
-                ) as response:
-                    return response.status == 200
+            response = await self.client.aput(f"/instances/{instance_id}/", json={"state": "running"})
+            return response.status == 200
 
         except Exception as e:
             logger.error(f"Failed to start instance {instance_id}: {e}")
@@ -475,19 +458,8 @@ class WarmPoolManager:
     async def _stop_instance(self, instance_id: int) -> bool:
         """Para instancia"""
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.put(
-                    f"{self.api_url}/instances/{instance_id}/",
-                    headers=headers,
-                    json={"state": "stopped"}
-                ) as response:
-                    return response.status == 200
+            response = await self.client.aput(f"/instances/{instance_id}/", json={"state": "stopped"})
+            return response.status == 200
 
         except Exception as e:
             logger.error(f"Failed to stop instance {instance_id}: {e}")
@@ -496,68 +468,45 @@ class WarmPoolManager:
     async def _destroy_instance(self, instance_id: int) -> bool:
         """Destroi instancia"""
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.delete(
-                    f"{self.api_url}/instances/{instance_id}/",
-                    headers=headers
-                ) as response:
-                    return response.status in [200, 204]
+            response = await self.client.adelete(f"/instances/{instance_id}/")
+            return response.status in [200, 204]
 
         except Exception as e:
             logger.error(f"Failed to destroy instance {instance_id}: {e}")
             return False
 
-    async def _get_instance(self, instance_id: int) -> Optional[Dict[str, Any]]:
-        """Obtem informacoes de uma instancia"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.get(
-                    f"{self.api_url}/instances/{instance_id}/",
-                    headers=headers
-                ) as response:
-                    if response.status != 200:
-                        return None
-                    return await response.json()
-
-        except Exception as e:
-            logger.error(f"Failed to get instance {instance_id}: {e}")
-            return None
-
     async def _wait_for_instance_ready(
         self,
         instance_id: int,
         timeout: int = 120
     ) -> Optional[Dict[str, Any]]:
         """Aguarda instancia ficar pronta (SSH disponivel)"""
-        start = datetime.now()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        events = self.fleet.subscribe([instance_id])
 
-        while (datetime.now() - start).total_seconds() < timeout:
-            instance = await self._get_instance(instance_id)
-
-            if instance:
-                status = instance.get('actual_status', '')
-                ssh_host = instance.get('ssh_host')
-                ssh_port = instance.get('ssh_port')
-
-                if status == 'running' and ssh_host and ssh_port:
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), timeout=max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+
+                if event.event == EVENT_SSH_READY:
+                    ssh_host = event.instance.get('ssh_host')
+                    ssh_port = event.instance.get('ssh_port')
                     logger.info(f"Instance {instance_id} ready: {ssh_host}:{ssh_port}")
                     return {
                         'ssh_host': ssh_host,
                         'ssh_port': ssh_port,
-                        'status': status
+                        'status': event.status
                     }
 
-            await asyncio.sleep(5)
+                if event.event in (EVENT_EXITED, EVENT_GONE):
+                    logger.warning(f"Instance {instance_id} {event.event} while waiting: {event.status}")
+                    return None
+        finally:
+            self.fleet.unsubscribe(events)
 
         logger.warning(f"Instance {instance_id} not ready after {timeout}s")
         return None
@@ -578,41 +527,96 @@ class WarmPoolManager:
             self._health_check_task = None
 
     async def _health_check_loop(self):
-        """Loop de health check"""
+        """
+        Loop de health check.
+
+        O estado vem do fleet tracker: GPU exited/destruida dispara failover
+        no tick em que e observada; a cada intervalo o ultimo estado conhecido
+        e verificado como antes (3 falhas seguidas -> failover). So assina o
+        tracker enquanto o pool esta ACTIVE, pedindo ticks no intervalo do
+        health check.
+        """
         consecutive_failures = 0
+        interval = self.config.health_check_interval_seconds
+        watched = None
+        events = None
 
-        while self._running:
-            try:
-                await asyncio.sleep(self.config.health_check_interval_seconds)
-
-                if self.status.state != WarmPoolState.ACTIVE:
-                    continue
-
-                # Verificar GPU principal
-                instance = await self._get_instance(self.status.primary_gpu_id)
-
-                if not instance:
-                    consecutive_failures += 1
-                    logger.warning(f"Health check failed ({consecutive_failures})")
-                else:
-                    status = instance.get('actual_status', '')
-                    if status != 'running':
-                        consecutive_failures += 1
-                        logger.warning(f"GPU not running: {status} ({consecutive_failures})")
-                    else:
+        try:
+            while self._running:
+                try:
+                    if self.status.state != WarmPoolState.ACTIVE or not self.status.primary_gpu_id:
+                        if events is not None:
+                            self.fleet.unsubscribe(events)
+                            events = None
+                        await asyncio.sleep(interval)
+                        continue
+
+                    primary = self.status.primary_gpu_id
+                    if events is None:
+                        events = self.fleet.subscribe([primary], replay=False, interval=interval)
+                        watched = primary
+                        consecutive_failures = 0
+                    elif primary != watched:
+                        # Failover trocou a GPU principal
+                        self.fleet.track(events, primary)
+                        watched = primary
                         consecutive_failures = 0
-                        self.status.last_health_check = datetime.now().isoformat()
 
-                # Acionar failover se necessario
-                if consecutive_failures >= 3:
-                    logger.error("GPU failed health check 3 times, triggering failover")
-                    await self.trigger_failover()
-                    consecutive_failures = 0
+                    try:
+                        event = await asyncio.wait_for(events.get(), timeout=interval)
+                    except asyncio.TimeoutError:
+                        event = None
+
+                    if self.status.state != WarmPoolState.ACTIVE or self.status.primary_gpu_id != watched:
+                        continue
+
+                    if event is not None:
+                        if event.instance_id == watched and event.event in (EVENT_EXITED, EVENT_GONE):
+                            logger.error(f"GPU {watched} {event.event} ({event.status}), triggering failover")
+                            await self.trigger_failover()
+                            consecutive_failures = 0
+                        continue
+
+                    consecutive_failures = await self._check_primary_health(consecutive_failures)
+                except asyncio.CancelledError:
+                    break
+                except Exception as e:
+                    logger.error(f"Health check error: {e}")
+        finally:
+            if events is not None:
+                self.fleet.unsubscribe(events)
+
+    async def _check_primary_health(self, consecutive_failures: int) -> int:
+        """
+        Verificacao periodica da GPU principal pelo ultimo tick do fleet tracker.
 
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Health check error: {e}")
+        Returns:
+            Falhas consecutivas atualizadas
+        """
+        interval = self.config.health_check_interval_seconds
+        instance = self.fleet.get(self.status.primary_gpu_id)
+        # Sem tick bem-sucedido no intervalo conta como falha (API inacessivel)
+        stale = time.time() - self.fleet.last_poll > max(interval, self.fleet.poll_interval) * 2
+
+        if not instance or stale:
+            consecutive_failures += 1
+            logger.warning(f"Health check failed ({consecutive_failures})")
+        else:
+            status = instance.get('actual_status', '')
+            if status != 'running':
+                consecutive_failures += 1
+                logger.warning(f"GPU not running: {status} ({consecutive_failures})")
+            else:
+                consecutive_failures = 0
+                self.status.last_health_check = datetime.now().isoformat()
+
+        # Acionar failover se necessario
+        if consecutive_failures >= 3:
+            logger.error("GPU failed health check 3 times, triggering failover")
+            await self.trigger_failover()
+            consecutive_failures = 0
+
+        return consecutive_failures
 
     def _save_status(self):
         """Salva status no disco"""
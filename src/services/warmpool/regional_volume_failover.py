@@ -15,7 +15,8 @@ import time
 from dataclasses import dataclass, field
 from typing import Optional, Dict, Any, List
 from enum import Enum
-import aiohttp
+
+from src.infrastructure.providers.vast_client import get_vast_client
 
 from .volume_service import VolumeService, Volume, VolumeState
 from .host_finder import HostFinder, GPUOffer
@@ -76,6 +77,7 @@ class RegionalVolumeFailover:
     def __init__(self, vast_api_key: str):
         self.api_key = vast_api_key
         self.api_url = "https://cloud.vast.ai/api/v0"
+        self.client = get_vast_client(vast_api_key, self.api_url)
         self.volume_service = VolumeService(vast_api_key)
         self.host_finder = HostFinder(vast_api_key)
 
@@ -99,43 +101,31 @@ class RegionalVolumeFailover:
         try:
             logger.info(f"Creating regional volume in {region} ({size_gb}GB)")
 
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                payload = {
-                    "size": size_gb,
-                    "region": region,
-                }
-
-                if name:
-                    payload["name"] = name
-
-                async with session.post(
-                    f"{self.api_url}/volumes/",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status not in [200, 201]:
-                        text = await response.text()
-                        logger.error(f"Failed to create volume: {response.status} - {text}")
-                        return None
-
-                    data = await response.json()
-
-                    volume_info = RegionalVolumeInfo(
-                        volume_id=data.get("id"),
-                        region=region,
-                        size_gb=size_gb,
-                        state=RegionalFailoverState.READY,
-                        created_at=data.get("created_at"),
-                    )
-
-                    logger.info(f"Created volume {volume_info.volume_id} in region {region}")
-                    return volume_info
+            payload = {
+                "size": size_gb,
+                "region": region,
+            }
+
+            if name:
+                payload["name"] = name
+
+            response = await self.client.apost("/volumes/", json=payload)
+            if response.status not in [200, 201]:
+                logger.error(f"Failed to create volume: {response.status} - {response.text}")
+                return None
+
+            data = response.json()
+
+            volume_info = RegionalVolumeInfo(
+                volume_id=data.get("id"),
+                region=region,
+                size_gb=size_gb,
+                state=RegionalFailoverState.READY,
+                created_at=data.get("created_at"),
+            )
+
+            logger.info(f"Created volume {volume_info.volume_id} in region {region}")
+            return volume_info
 
         except Exception as e:
             logger.error(f"Failed to create regional volume: {e}")
@@ -152,26 +142,16 @@ class RegionalVolumeFailover:
             Lista de ofertas de volumes
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                params = {
-                    "geolocation": region,
-                }
-
-                async with session.get(
-                    f"{self.api_url}/volumes/search/",
-                    headers=headers,
-                    params=params
-                ) as response:
-                    if response.status != 200:
-                        return []
-
-                    data = await response.json()
-                    return data.get("offers", [])
+            params = {
+                "geolocation": region,
+            }
+
+            response = await self.client.aget("/volumes/search/", params=params)
+            if response.status != 200:
+                return []
+
+            data = response.json()
+            return data.get("offers", [])
 
         except Exception as e:
             logger.error(f"Failed to search volumes: {e}")
@@ -264,45 +244,35 @@ class RegionalVolumeFailover:
         try:
             logger.info(f"Provisioning GPU offer {offer_id} with volume {volume_id}")
 
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                payload = {
-                    "client_id": "me",
-                    "image": docker_image,
-                    "disk": 20,
-                    "runtype": "ssh",
-                    "link_volume": volume_id,
-                    "onstart": f"mkdir -p {mount_path}",
-                }
-
-                if use_spot:
-                    payload["price"] = None  # Usar preco spot
-
-                async with session.put(
-                    f"{self.api_url}/asks/{offer_id}/",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status not in [200, 201]:
-                        text = await response.text()
-                        logger.error(f"Failed to provision GPU: {response.status} - {text}")
-                        return None
-
-                    data = await response.json()
-
-                    instance_id = data.get("new_contract")
-                    logger.info(f"Provisioned instance {instance_id} with volume {volume_id}")
+            payload = {
+                "client_id": "me",
+                "image": docker_image,
+                "disk": 20,
+                "runtype": "ssh",
+                "link_volume": volume_id,
+                "onstart": f"mkdir -p {mount_path}",
+            }
+
+            if use_spot:
+                payload["price"] = None  # Usar preco spot
+
+            response = await self.client.aput(f"/asks/{offer_id}/", json=payload)
+            if response.status not in [200, 201]:
+                logger.error(f"Failed to provision GPU: {response.status} - {response.text}")
+                return None
 
-                    return {
-                        "instance_id": instance_id,
-                        "volume_id": volume_id,
-                        "mount_path": mount_path,
-                    }
+            # Oferta alugada: buscas em cache nao devem mais retorna-la
+            self.client.invalidate_offer(offer_id)
+            data = response.json()
+
+            instance_id = data.get("new_contract")
+            logger.info(f"Provisioned instance {instance_id} with volume {volume_id}")
+
+            return {
+                "instance_id": instance_id,
+                "volume_id": volume_id,
+                "mount_path": mount_path,
+            }
 
         except Exception as e:
             logger.error(f"Failed to provision GPU with volume: {e}")
@@ -327,35 +297,26 @@ class RegionalVolumeFailover:
 
         while time.time() - start_time < timeout_seconds:
             try:
-                async with aiohttp.ClientSession() as session:
-                    headers = {
-                        "Accept": "application/json",
-                        "Authorization": f"Bearer {self.api_key}"
+                response = await self.client.aget(f"/instances/{instance_id}/")
+                if response.status != 200:
+                    await asyncio.sleep(5)
+                    continue
+
+                data = response.json()
+                status = data.get("actual_status", "")
+
+                if status == "running":
+                    return {
+                        "instance_id": instance_id,
+                        "status": status,
+                        "ssh_host": data.get("ssh_host"),
+                        "ssh_port": data.get("ssh_port"),
+                        "gpu_name": data.get("gpu_name"),
+                        "num_gpus": data.get("num_gpus"),
+                        "geolocation": data.get("geolocation"),
                     }
 
-                    async with session.get(
-                        f"{self.api_url}/instances/{instance_id}/",
-                        headers=headers
-                    ) as response:
-                        if response.status != 200:
-                            await asyncio.sleep(5)
-                            continue
-
-                        data = await response.json()
-                        status = data.get("actual_status", "")
-
-                        if status == "running":
-                            return {
-                                "instance_id": instance_id,
-                                "status": status,
-                                "ssh_host": data.get("ssh_host"),
-                                "ssh_port": data.get("ssh_port"),
-                                "gpu_name": data.get("gpu_name"),
-                                "num_gpus": data.get("num_gpus"),
-                                "geolocation": data.get("geolocation"),
-                            }
-
-                        logger.debug(f"Instance {instance_id} status: {status}")
+                logger.debug(f"Instance {instance_id} status: {status}")
 
             except Exception as e:
                 logger.warning(f"Error checking instance status: {e}")
@@ -488,20 +449,11 @@ class RegionalVolumeFailover:
     async def _destroy_instance(self, instance_id: int) -> bool:
         """Destroi uma instancia"""
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.delete(
-                    f"{self.api_url}/instances/{instance_id}/",
-                    headers=headers
-                ) as response:
-                    if response.status in [200, 204]:
-                        logger.info(f"Destroyed instance {instance_id}")
-                        return True
-                    return False
+            response = await self.client.adelete(f"/instances/{instance_id}/")
+            if response.status in [200, 204]:
+                logger.info(f"Destroyed instance {instance_id}")
+                return True
+            return False
 
         except Exception as e:
             logger.error(f"Failed to destroy instance: {e}")
@@ -518,20 +470,11 @@ class RegionalVolumeFailover:
             Informacoes do volume ou None
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.get(
-                    f"{self.api_url}/volumes/{volume_id}/",
-                    headers=headers
-                ) as response:
-                    if response.status != 200:
-                        return None
+            response = await self.client.aget(f"/volumes/{volume_id}/")
+            if response.status != 200:
+                return None
 
-                    return await response.json()
+            return response.json()
 
         except Exception as e:
             logger.error(f"Failed to get volume info: {e}")
@@ -545,21 +488,12 @@ class RegionalVolumeFailover:
             Lista de volumes
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.get(
-                    f"{self.api_url}/volumes/",
-                    headers=headers
-                ) as response:
-                    if response.status != 200:
-                        return []
-
-                    data = await response.json()
-                    return data.get("volumes", data) if isinstance(data, dict) else data
+            response = await self.client.aget("/volumes/")
+            if response.status != 200:
+                return []
+
+            data = response.json()
+            return data.get("volumes", data) if isinstance(data, dict) else data
 
         except Exception as e:
             logger.error(f"Failed to list volumes: {e}")
@@ -9,7 +9,8 @@ import asyncio
 from dataclasses import dataclass
 from typing import Optional, Dict, Any, List
 from enum import Enum
-import aiohttp
+
+from src.infrastructure.providers.vast_client import get_vast_client
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +49,7 @@ class VolumeService:
     def __init__(self, vast_api_key: str):
         self.api_key = vast_api_key
         self.api_url = "https://cloud.vast.ai/api/v0"
+        self.client = get_vast_client(vast_api_key, self.api_url)
 
     async def create_volume(
         self,
@@ -67,43 +69,31 @@ class VolumeService:
             Volume criado ou None se falhou
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                payload = {
-                    "machine_id": machine_id,
-                    "size": size_gb,
-                }
-
-                if name:
-                    payload["name"] = name
-
-                async with session.post(
-                    f"{self.api_url}/volumes/",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status not in [200, 201]:
-                        text = await response.text()
-                        logger.error(f"Failed to create volume: {response.status} - {text}")
-                        return None
-
-                    data = await response.json()
-
-                    volume = Volume(
-                        volume_id=data.get("id"),
-                        machine_id=machine_id,
-                        size_gb=size_gb,
-                        state=VolumeState.AVAILABLE,
-                        created_at=data.get("created_at"),
-                    )
-
-                    logger.info(f"Created volume {volume.volume_id} on machine {machine_id}")
-                    return volume
+            payload = {
+                "machine_id": machine_id,
+                "size": size_gb,
+            }
+
+            if name:
+                payload["name"] = name
+
+            response = await self.client.apost("/volumes/", json=payload)
+            if response.status not in [200, 201]:
+                logger.error(f"Failed to create volume: {response.status} - {response.text}")
+                return None
+
+            data = response.json()
+
+            volume = Volume(
+                volume_id=data.get("id"),
+                machine_id=machine_id,
+                size_gb=size_gb,
+                state=VolumeState.AVAILABLE,
+                created_at=data.get("created_at"),
+            )
+
+            logger.info(f"Created volume {volume.volume_id} on machine {machine_id}")
+            return volume
 
         except Exception as e:
             logger.error(f"Failed to create volume: {e}")
@@ -120,34 +110,25 @@ class VolumeService:
             Volume ou None se nao encontrado
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.get(
-                    f"{self.api_url}/volumes/{volume_id}/",
-                    headers=headers
-                ) as response:
-                    if response.status != 200:
-                        return None
-
-                    data = await response.json()
-
-                    # Determinar estado
-                    state = VolumeState.AVAILABLE
-                    if data.get("attached_instance"):
-                        state = VolumeState.IN_USE
-
-                    return Volume(
-                        volume_id=data.get("id"),
-                        machine_id=data.get("machine_id"),
-                        size_gb=data.get("size", 0),
-                        state=state,
-                        attached_instance_id=data.get("attached_instance"),
-                        created_at=data.get("created_at"),
-                    )
+            response = await self.client.aget(f"/volumes/{volume_id}/")
+            if response.status != 200:
+                return None
+
+            data = response.json()
+
+            # Determinar estado
+            state = VolumeState.AVAILABLE
+            if data.get("attached_instance"):
+                state = VolumeState.IN_USE
+
+            return Volume(
+                volume_id=data.get("id"),
+                machine_id=data.get("machine_id"),
+                size_gb=data.get("size", 0),
+                state=state,
+                attached_instance_id=data.get("attached_instance"),
+                created_at=data.get("created_at"),
+            )
 
         except Exception as e:
             logger.error(f"Failed to get volume {volume_id}: {e}")
@@ -161,38 +142,29 @@ class VolumeService:
             Lista de volumes
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.get(
-                    f"{self.api_url}/volumes/",
-                    headers=headers
-                ) as response:
-                    if response.status != 200:
-                        return []
-
-                    data = await response.json()
-                    volumes_data = data.get("volumes", [])
-
-                    volumes = []
-                    for vol_data in volumes_data:
-                        state = VolumeState.AVAILABLE
-                        if vol_data.get("attached_instance"):
-                            state = VolumeState.IN_USE
-
-                        volumes.append(Volume(
-                            volume_id=vol_data.get("id"),
-                            machine_id=vol_data.get("machine_id"),
-                            size_gb=vol_data.get("size", 0),
-                            state=state,
-                            attached_instance_id=vol_data.get("attached_instance"),
-                            created_at=vol_data.get("created_at"),
-                        ))
-
-                    return volumes
+            response = await self.client.aget("/volumes/")
+            if response.status != 200:
+                return []
+
+            data = response.json()
+            volumes_data = data.get("volumes", [])
+
+            volumes = []
+            for vol_data in volumes_data:
+                state = VolumeState.AVAILABLE
+                if vol_data.get("attached_instance"):
+                    state = VolumeState.IN_USE
+
+                volumes.append(Volume(
+                    volume_id=vol_data.get("id"),
+                    machine_id=vol_data.get("machine_id"),
+                    size_gb=vol_data.get("size", 0),
+                    state=state,
+                    attached_instance_id=vol_data.get("attached_instance"),
+                    created_at=vol_data.get("created_at"),
+                ))
+
+            return volumes
 
         except Exception as e:
             logger.error(f"Failed to list volumes: {e}")
@@ -211,23 +183,13 @@ class VolumeService:
             True se deletou com sucesso
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Accept": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                }
-
-                async with session.delete(
-                    f"{self.api_url}/volumes/{volume_id}/",
-                    headers=headers
-                ) as response:
-                    if response.status not in [200, 204]:
-                        text = await response.text()
-                        logger.error(f"Failed to delete volume: {response.status} - {text}")
-                        return False
-
-                    logger.info(f"Deleted volume {volume_id}")
-                    return True
+            response = await self.client.adelete(f"/volumes/{volume_id}/")
+            if response.status not in [200, 204]:
+                logger.error(f"Failed to delete volume: {response.status} - {response.text}")
+                return False
+
+            logger.info(f"Deleted volume {volume_id}")
+            return True
 
         except Exception as e:
             logger.error(f"Failed to delete volume {volume_id}: {e}")
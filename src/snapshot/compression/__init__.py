@@ -6,6 +6,8 @@ Provides:
 - DumontArchive: Read/write .dumont format with chunks
 - ChunkManager: Splits data into 64MB chunks
 - CompressionMethod: Named compression methods
+- ContentDefinedChunker: FastCDC-style chunking for deduplication
+- ChunkStore: Content-addressed chunk store (local dir or bucket)
 
 Methods:
 - hybrid_v1: Hybrid compression (LZ4 + ZipNN by file type)
@@ -16,6 +18,8 @@ Methods:
 from .hybrid_compressor import HybridCompressor, CompressionStrategy, FileCategory, Compressor
 from .dumont_format import DumontArchive, DumontHeader, ChunkInfo
 from .chunk_manager import ChunkManager
+from .cdc import ContentDefinedChunker
+from .chunk_store import ChunkStore, LocalChunkStore, RemoteChunkStore, hash_chunk
 from .methods import (
     CompressionMethod,
     CompressionMethodID,
@@ -35,6 +39,11 @@ __all__ = [
     'DumontHeader',
     'ChunkInfo',
     'ChunkManager',
+    'ContentDefinedChunker',
+    'ChunkStore',
+    'LocalChunkStore',
+    'RemoteChunkStore',
+    'hash_chunk',
     'CompressionMethod',
     'CompressionMethodID',
     'get_method',
@@ -0,0 +1,425 @@
+"""
+Compression Benchmark - Measures the registered compression methods
+
+For every method in COMPRESSION_METHODS, corpus and chunk size reports:
+- Compression / decompression throughput (MB/s)
+- Compression ratio (and integrity check)
+- Peak RSS of the measuring process
+- Per-core scaling (aggregate MB/s with 1..N worker processes)
+
+Corpora are generated (BF16 safetensors, GGUF, Python source, JSONL, media)
+or ingested from disk with --corpus name=path. Results are emitted as JSON
+for regression tracking and can refresh the expected_ratio of each method
+(stored in the DUMONT_MEASURED_RATIOS file, loaded by methods.py at import).
+
+Usage:
+    python -m src.snapshot.compression.benchmark --size 64 -o bench.json
+    python -m src.snapshot.compression.benchmark --methods lz4_fast,hybrid_v1 --chunk-sizes 16,64
+    python -m src.snapshot.compression.benchmark --corpus code=/workspace/src --update-ratios
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import struct
+import hashlib
+import argparse
+import platform
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from .hybrid_compressor import HybridCompressor, FileCategory, HAS_LZ4, HAS_ZIPNN
+from .methods import list_methods, get_method_by_name, update_expected_ratios, save_measured_ratios
+
+
+MB = 1024 * 1024
+
+# Corpus name -> file category it represents
+CORPUS_CATEGORIES = {
+    'bf16_safetensors': FileCategory.MODELS_FP16,
+    'gguf': FileCategory.MODELS_QUANTIZED,
+    'python': FileCategory.CODE,
+    'jsonl': FileCategory.DATA,
+    'media': FileCategory.MEDIA,
+}
+
+
+# =============================================================================
+# Corpora
+# =============================================================================
+
+def generate_bf16(size: int, seed: int = 0) -> bytes:
+    """BF16 weights ~ N(0, 0.02), like a transformer checkpoint, with a safetensors header"""
+    count = size // 2
+    if HAS_NUMPY:
+        rng = np.random.default_rng(seed)
+        fp32 = rng.normal(0, 0.02, count).astype(np.float32)
+        body = (fp32.view(np.uint32) >> 16).astype(np.uint16).tobytes()
+    else:
+        rnd = random.Random(seed)
+        body = b''.join(
+            struct.pack('<f', rnd.gauss(0, 0.02))[2:] for _ in range(count)
+        )
+    header = json.dumps({"weight": {"dtype": "BF16", "shape": [count], "data_offsets": [0, len(body)]}}).encode()
+    return (struct.pack('<Q', len(header)) + header + body)[:size]
+
+
+def generate_gguf(size: int, seed: int = 0) -> bytes:
+    """Q4-like quantized blocks: fp16 scale + 16 bytes of packed nibbles"""
+    rnd = random.Random(seed)
+    out = bytearray(b"GGUF" + struct.pack('<I', 3))
+    while len(out) < size:
+        out += struct.pack('<e', rnd.uniform(0.001, 0.05))
+        out += rnd.getrandbits(128).to_bytes(16, 'little')
+    return bytes(out[:size])
+
+
+def generate_python(size: int, seed: int = 0) -> bytes:
+    """Python source: the repo's own modules, repeated up to size"""
+    root = Path(__file__).resolve().parents[2]
+    sources = sorted(root.rglob('*.py'))
+    out = bytearray()
+    while len(out) < size and sources:
+        for path in sources:
+            try:
+                out += path.read_bytes()
+            except OSError:
+                continue
+            if len(out) >= size:
+                break
+    return bytes(out[:size])
+
+
+def generate_jsonl(size: int, seed: int = 0) -> bytes:
+    """Instruction-tuning style JSONL dataset"""
+    rnd = random.Random(seed)
+    words = ("the model gpu train loss token batch learning rate epoch data "
+             "eval prompt answer question context layer weight").split()
+    out = bytearray()
+    i = 0
+    while len(out) < size:
+        record = {
+            "id": i,
+            "instruction": " ".join(rnd.choice(words) for _ in range(rnd.randint(5, 20))),
+            "output": " ".join(rnd.choice(words) for _ in range(rnd.randint(20, 80))),
+            "score": round(rnd.random(), 4),
+        }
+        out += json.dumps(record).encode() + b"\n"
+        i += 1
+    return bytes(out[:size])
+
+
+def generate_media(size: int, seed: int = 0) -> bytes:
+    """Already-compressed media stand-in (JPEG header + high-entropy payload)"""
+    rnd = random.Random(seed)
+    return (b"\xff\xd8\xff\xe0" + rnd.getrandbits(8 * size).to_bytes(size, 'little'))[:size]
+
+
+GENERATORS = {
+    'bf16_safetensors': generate_bf16,
+    'gguf': generate_gguf,
+    'python': generate_python,
+    'jsonl': generate_jsonl,
+    'media': generate_media,
+}
+
+
+def ingest_corpus(path: str, size: int) -> bytes:
+    """Read up to size bytes from a file or a directory tree"""
+    source = Path(path)
+    files = [source] if source.is_file() else sorted(p for p in source.rglob('*') if p.is_file())
+    out = bytearray()
+    for fpath in files:
+        with open(fpath, 'rb') as f:
+            out += f.read(size - len(out))
+        if len(out) >= size:
+            break
+    return bytes(out)
+
+
+def category_for(corpus_name: str, path: Optional[str] = None) -> FileCategory:
+    """Category of a corpus: known names first, then the file extension"""
+    if corpus_name in CORPUS_CATEGORIES:
+        return CORPUS_CATEGORIES[corpus_name]
+    try:
+        return FileCategory(corpus_name)
+    except ValueError:
+        pass
+    if path:
+        return HybridCompressor().get_category(path)
+    return FileCategory.GENERIC
+
+
+# =============================================================================
+# Measurements
+# =============================================================================
+
+def _peak_rss_mb() -> float:
+    """Peak RSS of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / MB if sys.platform == 'darwin' else peak / 1024
+
+
+def _split(data: bytes, chunk_size: int) -> List[bytes]:
+    return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)] or [b'']
+
+
+def measure(method_name: str, category_value: str, data: bytes, chunk_size: int, repeat: int = 1) -> Dict:
+    """
+    Compress and decompress data chunk by chunk with one method.
+
+    Runs in a fresh worker process so peak RSS reflects this measurement.
+    """
+    method = get_method_by_name(method_name)
+    category = FileCategory(category_value)
+    strategy = method.strategies.get(category) or method.strategies[FileCategory.GENERIC]
+    compressor = HybridCompressor(strategies=method.strategies)
+    use_bf16 = category == FileCategory.MODELS_FP16
+    chunks = _split(data, chunk_size)
+    rss_before = _peak_rss_mb()
+
+    compress_time = decompress_time = float('inf')
+    compressed = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        compressed = [compressor.compress(c, strategy.compressor, strategy.level, use_bf16=use_bf16) for c in chunks]
+        compress_time = min(compress_time, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        restored = [compressor.decompress(c, strategy.compressor, use_bf16=use_bf16) for c in compressed]
+        decompress_time = min(decompress_time, time.perf_counter() - start)
+
+    integrity = hashlib.sha256(b''.join(restored)).digest() == hashlib.sha256(data).digest()
+    size_compressed = sum(len(c) for c in compressed)
+    size_mb = len(data) / MB
+
+    return {
+        'method': method_name,
+        'category': category_value,
+        'compressor': strategy.compressor.value,
+        'chunk_size': chunk_size,
+        'size_original': len(data),
+        'size_compressed': size_compressed,
+        'ratio': round(len(data) / max(1, size_compressed), 3),
+        'compress_mbps': round(size_mb / compress_time, 1) if compress_time > 0 else None,
+        'decompress_mbps': round(size_mb / decompress_time, 1) if decompress_time > 0 else None,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'peak_rss_delta_mb': round(_peak_rss_mb() - rss_before, 1),
+        'integrity': integrity,
+        'expected_ratio': strategy.expected_ratio,
+    }
+
+
+def _compress_chunks(method_name: str, category_value: str, chunks: List[bytes]) -> int:
+    """Worker for the scaling test: compress chunks, return compressed bytes"""
+    method = get_method_by_name(method_name)
+    category = FileCategory(category_value)
+    strategy = method.strategies.get(category) or method.strategies[FileCategory.GENERIC]
+    compressor = HybridCompressor(strategies=method.strategies)
+    use_bf16 = category == FileCategory.MODELS_FP16
+    return sum(len(compressor.compress(c, strategy.compressor, strategy.level, use_bf16=use_bf16)) for c in chunks)
+
+
+def measure_scaling(method_name: str, category_value: str, data: bytes, chunk_size: int,
+                    worker_counts: List[int]) -> List[Dict]:
+    """Aggregate compression throughput with 1..N processes (each compresses the corpus)"""
+    chunks = _split(data, chunk_size)
+    results = []
+    base = None
+    for workers in worker_counts:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Warm up the pool so process start-up is not timed
+            list(executor.map(_compress_chunks, [method_name] * workers, [category_value] * workers,
+                              [chunks[:1]] * workers))
+            start = time.perf_counter()
+            list(executor.map(_compress_chunks, [method_name] * workers, [category_value] * workers,
+                              [chunks] * workers))
+            elapsed = time.perf_counter() - start
+
+        mbps = (len(data) * workers / MB) / elapsed if elapsed > 0 else 0
+        base = base or mbps
+        results.append({
+            'method': method_name,
+            'category': category_value,
+            'chunk_size': chunk_size,
+            'workers': workers,
+            'compress_mbps': round(mbps, 1),
+            'speedup': round(mbps / base, 2) if base else None,
+            'efficiency': round(mbps / base / workers, 2) if base else None,
+        })
+    return results
+
+
+def run_benchmark(
+    corpora: Dict[str, bytes],
+    categories: Dict[str, FileCategory],
+    method_names: List[str],
+    chunk_sizes: List[int],
+    worker_counts: List[int],
+    repeat: int = 1,
+    progress=None,
+) -> Dict:
+    """
+    Run the full matrix (method x corpus x chunk size) plus scaling.
+
+    Returns:
+        JSON-serializable dict with 'meta', 'results' and 'scaling'
+    """
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    scaling = []
+
+    for corpus_name, data in corpora.items():
+        category = categories[corpus_name].value
+        for method_name in method_names:
+            for chunk_size in chunk_sizes:
+                if progress:
+                    progress(f"{corpus_name} / {method_name} / {chunk_size // MB} MB")
+                # Fresh process per measurement so peak RSS is not polluted
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                    row = executor.submit(measure, method_name, category, data, chunk_size, repeat).result()
+                row['corpus'] = corpus_name
+                results.append(row)
+
+            if len(worker_counts) > 1:
+                for row in measure_scaling(method_name, category, data, chunk_sizes[-1], worker_counts):
+                    row['corpus'] = corpus_name
+                    scaling.append(row)
+
+    return {
+        'meta': {
+            'timestamp': time.time(),
+            'host': platform.node(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'has_lz4': HAS_LZ4,
+            'has_zipnn': HAS_ZIPNN,
+            'corpora': {name: len(data) for name, data in corpora.items()},
+        },
+        'results': results,
+        'scaling': scaling,
+    }
+
+
+def measured_ratios(report: Dict) -> Dict[str, Dict[str, float]]:
+    """
+    Measured ratio per method and category, taken at the largest chunk size
+    (what snapshots use). Failed integrity checks are ignored.
+
+    Returns:
+        {method_name: {category_value: ratio}}
+    """
+    best: Dict[tuple, Dict] = {}
+    for row in report['results']:
+        if not row['integrity']:
+            continue
+        key = (row['method'], row['category'])
+        if key not in best or row['chunk_size'] > best[key]['chunk_size']:
+            best[key] = row
+
+    ratios: Dict[str, Dict[str, float]] = {}
+    for (method, category), row in best.items():
+        ratios.setdefault(method, {})[category] = round(row['ratio'], 2)
+    return ratios
+
+
+def print_report(report: Dict):
+    """Print results as a table"""
+    print(f"{'corpus':<18} {'method':<10} {'chunk':>6} {'ratio':>8} {'expected':>8} "
+          f"{'comp MB/s':>10} {'decomp MB/s':>11} {'RSS MB':>7} ok")
+    for row in report['results']:
+        print(f"{row['corpus']:<18} {row['method']:<10} {row['chunk_size'] // MB:>4}MB "
+              f"{row['ratio']:>8.2f} {row['expected_ratio']:>8.2f} "
+              f"{row['compress_mbps'] or 0:>10.1f} {row['decompress_mbps'] or 0:>11.1f} "
+              f"{row['peak_rss_mb']:>7.0f} {'✓' if row['integrity'] else '✗'}")
+
+    if report['scaling']:
+        print()
+        print(f"{'corpus':<18} {'method':<10} {'workers':>7} {'MB/s':>10} {'speedup':>8} {'eff':>5}")
+        for row in report['scaling']:
+            print(f"{row['corpus']:<18} {row['method']:<10} {row['workers']:>7} "
+                  f"{row['compress_mbps']:>10.1f} {row['speedup']:>8.2f} {row['efficiency']:>5.2f}")
+
+
+def _default_worker_counts() -> List[int]:
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark Dumont compression methods')
+    parser.add_argument('--methods', default=','.join(m.name for m in list_methods()),
+                        help='Comma-separated method names (default: all registered)')
+    parser.add_argument('--corpora', default=','.join(GENERATORS),
+                        help='Comma-separated generated corpora (default: all)')
+    parser.add_argument('--corpus', action='append', default=[], metavar='NAME=PATH',
+                        help='Ingest a corpus from a file or directory (repeatable). '
+                             'NAME may be a generator name or a FileCategory value')
+    parser.add_argument('--size', type=int, default=64, help='Corpus size in MB (default: 64)')
+    parser.add_argument('--chunk-sizes', default='16,64', help='Chunk sizes in MB (default: 16,64)')
+    parser.add_argument('--workers', default=None,
+                        help='Comma-separated worker counts for scaling (default: 1,2,4..cpus; "1" disables)')
+    parser.add_argument('--repeat', type=int, default=1, help='Repetitions, best time kept')
+    parser.add_argument('-o', '--output', help='Write JSON report to this path')
+    parser.add_argument('--update-ratios', action='store_true',
+                        help='Store measured ratios as expected_ratio (DUMONT_MEASURED_RATIOS file)')
+    args = parser.parse_args(argv)
+
+    size = args.size * MB
+    corpora: Dict[str, bytes] = {}
+    categories: Dict[str, FileCategory] = {}
+
+    for name in filter(None, args.corpora.split(',')):
+        if name not in GENERATORS:
+            parser.error(f"Unknown corpus: {name} (available: {', '.join(GENERATORS)})")
+        corpora[name] = GENERATORS[name](size)
+        categories[name] = category_for(name)
+
+    for spec in args.corpus:
+        name, _, path = spec.partition('=')
+        if not path:
+            parser.error(f"--corpus expects NAME=PATH, got: {spec}")
+        corpora[name] = ingest_corpus(path, size)
+        categories[name] = category_for(name, path)
+
+    method_names = [m for m in args.methods.split(',') if m]
+    chunk_sizes = sorted(int(c) * MB for c in args.chunk_sizes.split(','))
+    worker_counts = [int(w) for w in args.workers.split(',')] if args.workers else _default_worker_counts()
+
+    report = run_benchmark(
+        corpora, categories, method_names, chunk_sizes, worker_counts,
+        repeat=args.repeat, progress=lambda msg: print(f"  ... {msg}", file=sys.stderr),
+    )
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nJSON report: {args.output}")
+
+    if args.update_ratios:
+        ratios = measured_ratios(report)
+        updated = update_expected_ratios(ratios)
+        path = save_measured_ratios(ratios)
+        print(f"Updated {updated} expected_ratio values -> {path}")
+
+
+if __name__ == '__main__':
+    main()
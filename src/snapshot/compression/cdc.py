@@ -0,0 +1,192 @@
+"""
+Content-Defined Chunking (FastCDC-style)
+
+Splits byte streams at boundaries chosen by the content itself, so an
+insertion or edit only changes the chunks around it and every other chunk
+keeps the same hash across snapshots.
+
+Algorithm:
+- Rolling hash: sum of a 256-entry random table over a 64-byte window
+  (mod 2^32). It is a cumulative sum, so NumPy computes it for a whole
+  block in a couple of vectorized passes.
+- Normalized chunking: a strict mask before the average size and a loose
+  mask after it keeps chunk sizes tight around the average.
+- Hard min/max sizes bound the chunk size distribution.
+
+Boundaries depend only on bytes since the previous boundary (the window is
+smaller than min_size), so the result is independent of the read size and
+identical between the NumPy and pure-Python paths.
+"""
+
+import hashlib
+from typing import BinaryIO, Iterator, List
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+DEFAULT_MIN_SIZE = 256 * 1024        # 256 KB
+DEFAULT_AVG_SIZE = 1024 * 1024       # 1 MB
+DEFAULT_MAX_SIZE = 4 * 1024 * 1024   # 4 MB
+WINDOW_SIZE = 64
+READ_SIZE = 16 * 1024 * 1024         # Bytes read from the stream per block
+
+# Deterministic random table (must never change: it defines the boundaries)
+GEAR = [
+    int.from_bytes(hashlib.sha256(b"dumont-cdc-%d" % i).digest()[:4], "little")
+    for i in range(256)
+]
+_MASK32 = 0xFFFFFFFF
+
+
+class ContentDefinedChunker:
+    """
+    FastCDC-style content-defined chunker.
+
+    Usage:
+        chunker = ContentDefinedChunker(avg_size=1024 * 1024)
+
+        with open("model.safetensors", "rb") as f:
+            for chunk in chunker.iter_chunks(f):
+                store.put(chunk)
+    """
+
+    def __init__(
+        self,
+        min_size: int = DEFAULT_MIN_SIZE,
+        avg_size: int = DEFAULT_AVG_SIZE,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ):
+        """
+        Initialize chunker.
+
+        Args:
+            min_size: Minimum chunk size in bytes (must exceed the 64-byte window)
+            avg_size: Target average chunk size (power of two)
+            max_size: Maximum chunk size in bytes
+        """
+        if not (WINDOW_SIZE < min_size <= avg_size <= max_size):
+            raise ValueError(f"Invalid chunk sizes: min={min_size} avg={avg_size} max={max_size}")
+        if avg_size & (avg_size - 1):
+            raise ValueError(f"avg_size must be a power of two: {avg_size}")
+
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+
+        bits = avg_size.bit_length() - 1
+        self.mask_strict = (1 << min(bits + 2, 31)) - 1  # Harder to match before avg
+        self.mask_loose = (1 << max(bits - 2, 1)) - 1    # Easier to match after avg
+
+    def iter_chunks(self, stream: BinaryIO) -> Iterator[bytes]:
+        """
+        Split a binary stream into content-defined chunks.
+
+        Args:
+            stream: Binary stream to read from
+
+        Yields:
+            Chunk bytes, in order
+        """
+        buf = b''
+        while True:
+            block = stream.read(max(READ_SIZE, self.max_size))
+            eof = not block
+            buf = buf + block if buf else block
+
+            start = 0
+            for end in self.find_boundaries(buf, eof):
+                yield buf[start:end]
+                start = end
+            buf = buf[start:]
+
+            if eof:
+                break
+
+    def split_bytes(self, data: bytes) -> List[bytes]:
+        """Split an in-memory buffer into content-defined chunks"""
+        chunks = []
+        start = 0
+        for end in self.find_boundaries(data, eof=True):
+            chunks.append(data[start:end])
+            start = end
+        return chunks
+
+    def find_boundaries(self, buf: bytes, eof: bool) -> List[int]:
+        """
+        Find chunk end offsets in buf, which must start at a chunk boundary.
+
+        Without eof, stops once fewer than max_size bytes remain so the tail
+        can be completed with the next block.
+
+        Returns:
+            Sorted list of exclusive end offsets
+        """
+        n = len(buf)
+        strict, loose = self._candidates(buf)
+
+        boundaries = []
+        start = 0
+        si = li = 0
+        while start < n:
+            if not eof and n - start < self.max_size:
+                break
+            if n - start <= self.min_size:
+                boundaries.append(n)
+                break
+
+            lo = start + self.min_size - 1
+            mid = min(start + self.avg_size - 1, n)
+            hi = min(start + self.max_size - 1, n)
+
+            cut = None
+            si = self._first_at_least(strict, si, lo)
+            if si < len(strict) and strict[si] < mid:
+                cut = int(strict[si]) + 1
+            else:
+                li = self._first_at_least(loose, li, mid)
+                if li < len(loose) and loose[li] < hi:
+                    cut = int(loose[li]) + 1
+            if cut is None:
+                cut = min(start + self.max_size, n)
+
+            boundaries.append(cut)
+            start = cut
+
+        return boundaries
+
+    @staticmethod
+    def _first_at_least(positions, idx: int, value: int) -> int:
+        """Advance idx to the first position >= value (positions is sorted)"""
+        if HAS_NUMPY and not isinstance(positions, list):
+            return max(idx, int(np.searchsorted(positions, value)))
+        while idx < len(positions) and positions[idx] < value:
+            idx += 1
+        return idx
+
+    def _candidates(self, buf: bytes):
+        """Positions where the rolling hash matches the strict / loose masks"""
+        if HAS_NUMPY:
+            table = np.array(GEAR, dtype=np.uint32)
+            values = table[np.frombuffer(buf, dtype=np.uint8)]
+            sums = np.cumsum(values, dtype=np.uint32)
+            hashes = sums.copy()
+            hashes[WINDOW_SIZE:] -= sums[:-WINDOW_SIZE]
+            strict = np.flatnonzero((hashes & self.mask_strict) == 0)
+            loose = np.flatnonzero((hashes & self.mask_loose) == 0)
+            return strict, loose
+
+        strict, loose = [], []
+        h = 0
+        for i, byte in enumerate(buf):
+            h = (h + GEAR[byte]) & _MASK32
+            if i >= WINDOW_SIZE:
+                h = (h - GEAR[buf[i - WINDOW_SIZE]]) & _MASK32
+            if not h & self.mask_loose:
+                loose.append(i)
+                if not h & self.mask_strict:
+                    strict.append(i)
+        return strict, loose
@@ -0,0 +1,333 @@
+"""
+Content-Addressed Chunk Store
+
+Stores chunks keyed by the hash of their uncompressed content, so identical
+chunks (within a snapshot or across snapshots) are stored and uploaded once.
+A snapshot is just a manifest listing, per file, the hashes of its chunks.
+
+Layout (local directory or bucket prefix):
+    chunks/<algo>/<h[:2]>/<h>      Chunk blob: 1 byte compressor_id + payload
+    snapshots/<name>.json          Snapshot manifest
+
+Hash: BLAKE3 when the `blake3` package is installed, SHA-256 otherwise.
+Keys are namespaced by algorithm, so mixing hosts never produces a wrong
+match (only a missed dedup).
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    import blake3
+    HAS_BLAKE3 = True
+except ImportError:
+    HAS_BLAKE3 = False
+
+from .hybrid_compressor import HybridCompressor, Compressor, HAS_LZ4
+
+
+DEFAULT_HASH = "blake3" if HAS_BLAKE3 else "sha256"
+
+# Spooled bytes that trigger an upload while a snapshot is being created
+DEFAULT_FLUSH_MB = 256
+
+
+def hash_chunk(data: bytes, algorithm: str = DEFAULT_HASH) -> str:
+    """Hex digest of a chunk's uncompressed content"""
+    if algorithm == "blake3":
+        if not HAS_BLAKE3:
+            raise RuntimeError("BLAKE3 not installed. Run: pip install blake3")
+        return blake3.blake3(data).hexdigest()
+    if algorithm == "sha256":
+        return hashlib.sha256(data).hexdigest()
+    raise ValueError(f"Unknown hash algorithm: {algorithm}")
+
+
+class ChunkStore(ABC):
+    """
+    Base class for content-addressed chunk stores.
+
+    Subclasses implement the raw blob operations (_has_blob, _put_blob,
+    _get_blob; optionally _put_manifest, _get_manifest). This class handles hashing,
+    compression and the in-memory index of known keys.
+
+    Usage:
+        store = LocalChunkStore("/var/lib/dumont/chunks")
+
+        key, uploaded = store.put(data)
+        data = store.get(key)
+    """
+
+    def __init__(self, hash_algorithm: str = DEFAULT_HASH, compress: bool = True):
+        """
+        Initialize chunk store.
+
+        Args:
+            hash_algorithm: 'blake3' or 'sha256'
+            compress: LZ4-compress blobs (skipped when LZ4 is not installed)
+        """
+        self.hash_algorithm = hash_algorithm
+        self.compressor = HybridCompressor()
+        self.blob_compressor = Compressor.LZ4 if (compress and HAS_LZ4) else Compressor.NONE
+        self._known: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def chunk_path(self, key: str) -> str:
+        """Relative path of a chunk blob"""
+        return f"chunks/{self.hash_algorithm}/{key[:2]}/{key}"
+
+    def has(self, key: str) -> bool:
+        """Check if a chunk is already stored"""
+        with self._lock:
+            if key in self._known:
+                return True
+        if self._has_blob(self.chunk_path(key)):
+            with self._lock:
+                self._known.add(key)
+            return True
+        return False
+
+    def put(self, data: bytes) -> Tuple[str, bool]:
+        """
+        Store a chunk unless it is already present.
+
+        Returns:
+            Tuple of (key, stored) where stored is False for a dedup hit
+        """
+        key = hash_chunk(data, self.hash_algorithm)
+        if self.has(key):
+            return key, False
+
+        compressed = self.compressor.compress(data, self.blob_compressor)
+        compressor = self.blob_compressor
+        if len(compressed) >= len(data):
+            compressed, compressor = data, Compressor.NONE
+        blob = bytes([self.compressor.get_compressor_id(compressor)]) + compressed
+
+        self._put_blob(self.chunk_path(key), blob)
+        with self._lock:
+            self._known.add(key)
+        return key, True
+
+    def get(self, key: str) -> bytes:
+        """Fetch and decompress a chunk, verifying its hash"""
+        blob = self._get_blob(self.chunk_path(key))
+        compressor = self.compressor.get_compressor_from_id(blob[0])
+        data = self.compressor.decompress(blob[1:], compressor)
+        if hash_chunk(data, self.hash_algorithm) != key:
+            raise ValueError(f"Chunk {key} failed hash verification")
+        return data
+
+    def save_manifest(self, name: str, manifest: Dict):
+        """Store a snapshot manifest"""
+        self._put_manifest(f"snapshots/{name}.json", json.dumps(manifest).encode('utf-8'))
+
+    def load_manifest(self, name: str) -> Dict:
+        """Load a snapshot manifest"""
+        return json.loads(self._get_manifest(f"snapshots/{name}.json").decode('utf-8'))
+
+    def flush(self):
+        """Persist pending writes (no-op for stores that write through)"""
+
+    def prefetch(self, keys: List[str]):
+        """Fetch chunks about to be read in one batch (no-op for local stores)"""
+
+    def evict(self, keys: List[str]):
+        """Drop prefetched chunks that are no longer needed"""
+
+    @abstractmethod
+    def _has_blob(self, path: str) -> bool:
+        """Check if a blob exists"""
+        pass
+
+    @abstractmethod
+    def _put_blob(self, path: str, blob: bytes):
+        """Write a blob"""
+        pass
+
+    @abstractmethod
+    def _get_blob(self, path: str) -> bytes:
+        """Read a blob"""
+        pass
+
+    def _put_manifest(self, path: str, data: bytes):
+        self._put_blob(path, data)
+
+    def _get_manifest(self, path: str) -> bytes:
+        return self._get_blob(path)
+
+
+class LocalChunkStore(ChunkStore):
+    """Chunk store in a local directory (cache, NFS or test use)"""
+
+    def __init__(self, root: str, **kwargs):
+        super().__init__(**kwargs)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _has_blob(self, path: str) -> bool:
+        return (self.root / path).exists()
+
+    def _put_blob(self, path: str, blob: bytes):
+        target = self.root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so readers never see a partial blob
+        tmp = target.with_name(target.name + ".tmp")
+        with open(tmp, 'wb') as f:
+            f.write(blob)
+        os.replace(tmp, target)
+
+    def _get_blob(self, path: str) -> bytes:
+        with open(self.root / path, 'rb') as f:
+            return f.read()
+
+
+class RemoteChunkStore(ChunkStore):
+    """
+    Chunk store on an S3-compatible bucket through a StorageProvider.
+
+    The set of existing chunk keys is listed once up front, so dedup checks
+    cost no requests. New chunks are spooled to a local directory and sent
+    in one parallel upload whenever the spool reaches flush_mb, so local
+    disk use stays bounded and uploads overlap with chunking. Reads go
+    through prefetch(): one batched download per chunk list into a local
+    cache, instead of one request per chunk.
+    """
+
+    def __init__(
+        self,
+        provider,
+        prefix: str = "dedup",
+        spool_dir: Optional[str] = None,
+        flush_mb: int = DEFAULT_FLUSH_MB,
+        **kwargs,
+    ):
+        """
+        Args:
+            provider: src.storage.StorageProvider instance
+            prefix: Key prefix inside the bucket
+            spool_dir: Local staging directory for new chunks (default: temp dir)
+            flush_mb: Upload spooled chunks once they reach this size
+        """
+        super().__init__(**kwargs)
+        self.provider = provider
+        self.prefix = prefix.strip('/')
+        self.spool = Path(spool_dir or tempfile.mkdtemp(prefix="dumont-chunks-"))
+        self.spool.mkdir(parents=True, exist_ok=True)
+        self.cache = self.spool / "cache"
+        self.flush_bytes = flush_mb * 1024 * 1024
+        self._spooled: List[str] = []
+        self._spooled_bytes = 0
+        self._flush_lock = threading.Lock()
+        self._load_index()
+
+    def _remote(self, path: str) -> str:
+        return f"{self.prefix}/{path}"
+
+    def _load_index(self):
+        """List existing chunk keys once (wildcard makes s5cmd list recursively)"""
+        listing = self.provider.list_files(self._remote(f"chunks/{self.hash_algorithm}/*"))
+        self._known.update(os.path.basename(p) for p in listing if p)
+
+    def _has_blob(self, path: str) -> bool:
+        # Index was loaded at startup; anything not in it is treated as missing
+        return False
+
+    def _put_blob(self, path: str, blob: bytes):
+        target = self.spool / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(blob)
+        with self._lock:
+            self._spooled.append(path)
+            self._spooled_bytes += len(blob)
+            due = self._spooled_bytes >= self.flush_bytes
+        if due:
+            self.flush()
+
+    def _get_blob(self, path: str) -> bytes:
+        for local in (self.cache / path, self.spool / path):
+            try:
+                with open(local, 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                pass
+        # Not prefetched (or evicted by another reader): single download
+        self._download([path])
+        with open(self.cache / path, 'rb') as f:
+            return f.read()
+
+    def _download(self, paths: List[str]):
+        pairs = []
+        for path in paths:
+            local = self.cache / path
+            local.parent.mkdir(parents=True, exist_ok=True)
+            pairs.append((self._remote(path), str(local)))
+
+        if hasattr(self.provider, "download_files"):
+            ok = self.provider.download_files(pairs)
+        else:
+            ok = all(self.provider.download_file(remote, local) for remote, local in pairs)
+        if not ok:
+            raise FileNotFoundError(f"Failed to download {len(pairs)} chunks from {self.prefix}")
+
+    def prefetch(self, keys: List[str]):
+        """Download the chunks not yet cached in one batch"""
+        paths = []
+        for key in dict.fromkeys(keys):
+            path = self.chunk_path(key)
+            if not (self.cache / path).exists() and not (self.spool / path).exists():
+                paths.append(path)
+        if paths:
+            self._download(paths)
+
+    def evict(self, keys: List[str]):
+        """Remove cached chunks"""
+        for key in keys:
+            (self.cache / self.chunk_path(key)).unlink(missing_ok=True)
+
+    def _put_manifest(self, path: str, data: bytes):
+        # Chunks must be durable before the manifest that references them
+        self.flush()
+        self._put_blob(path, data)
+        self.flush()
+
+    def _get_manifest(self, path: str) -> bytes:
+        data = self._get_blob(path)
+        (self.cache / path).unlink(missing_ok=True)
+        return data
+
+    def flush(self):
+        """Upload spooled blobs and clear them from the spool"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._spooled = self._spooled, []
+                self._spooled_bytes = 0
+            if not pending:
+                return
+
+            pairs = [(str(self.spool / p), self._remote(p)) for p in pending]
+            if hasattr(self.provider, "upload_files"):
+                ok = self.provider.upload_files(pairs)
+            else:
+                ok = all(self.provider.upload_file(local, remote) for local, remote in pairs)
+            if not ok:
+                with self._lock:
+                    self._spooled = pending + self._spooled
+                    self._spooled_bytes += sum((self.spool / p).stat().st_size for p in pending)
+                raise RuntimeError(f"Failed to upload {len(pending)} chunks to {self.prefix}")
+
+            for path in pending:
+                (self.spool / path).unlink(missing_ok=True)
+
+    def close(self):
+        """Flush and remove the spool directory"""
+        self.flush()
+        shutil.rmtree(self.spool, ignore_errors=True)
@@ -9,14 +9,47 @@ Binary format optimized for:
 
 Structure:
     [Header 512 bytes]
+    [Chunk Data...]
     [Chunk Index]
     [File Manifest (LZ4 compressed)]
-    [Chunk Data...]
+
+The writer streams: chunks are compressed and written while the directory
+is walked, the chunk index and manifest are appended as a trailer and the
+header is back-patched at the end. Archives with the index right after the
+header (index_offset == 0) are still readable.
+
+Local archives are memory-mapped: chunk reads are memoryview slices of the
+map handed straight to the CRC check and the decompressor, with one
+HybridCompressor per thread.
+
+Archives can be opened from an http(s):// URL: header, index, manifest and
+chunks are then fetched with HTTP range requests, so extract_paths() only
+downloads the chunks of the selected files.
+
+Versions:
+    v1: Each file was compressed as a whole and the compressed stream sliced
+        into chunks, so a chunk of a multi-chunk file cannot be decompressed
+        on its own and size_original is only an estimate. Read-only.
+    v2: Every chunk is an independently compressed block. The chunk index
+        records the exact original size and the chunk's offset in the
+        original file (29 bytes per entry).
+
+With adaptive=True the writer samples every chunk and picks its compressor
+from the content (HybridCompressor.choose_strategy) instead of the file
+extension alone. Each chunk records its compressor in the chunk index and
+each file its first chunk's compressor in the manifest. ZipNN in BF16 mode
+(weights, whether chosen by extension or by sampling) is recorded as its own
+compressor id (4), so readers pass use_bf16 when decompressing those chunks.
 """
 
 import struct
 import json
 import os
+import fnmatch
+import mmap
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional, BinaryIO, Iterator, Tuple
 from pathlib import Path
@@ -28,15 +61,29 @@ try:
 except ImportError:
     HAS_LZ4 = False
 
-from .hybrid_compressor import Compressor
+try:
+    import requests
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+from .hybrid_compressor import Compressor, FileCategory, HybridCompressor, sample_blocks
 
 
 # Constants
 MAGIC = b"DUMONT01"
-VERSION = 1
+VERSION = 2
 HEADER_SIZE = 512
 DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024  # 64 MB
 
+DEFAULT_PACK_THRESHOLD = 1 * 1024 * 1024  # Files below 1 MB share chunks
+
+# Compressed chunks allowed in flight per worker before the writer drains
+INFLIGHT_PER_WORKER = 2
+
+# Header flags
+FLAG_INDEPENDENT_CHUNKS = 0x1  # Each chunk is compressed on its own (implied by v2)
+
 
 @dataclass
 class ChunkInfo:
@@ -45,12 +92,13 @@ class ChunkInfo:
     offset: int              # Offset in file
     size_compressed: int     # Size after compression
     size_original: int       # Size before compression
-    compressor_id: int       # 0=none, 1=lz4, 2=lz4_hc, 3=zipnn
+    compressor_id: int       # 0=none, 1=lz4, 2=lz4_hc, 3=zipnn, 4=zipnn (bf16)
     checksum: int            # CRC32 of compressed data
+    original_offset: int = 0  # Offset of the chunk in the original file (v2)
 
-    def to_bytes(self) -> bytes:
-        """Serialize to bytes (21 bytes total)"""
-        return struct.pack(
+    def to_bytes(self, version: int = VERSION) -> bytes:
+        """Serialize to bytes (21 bytes for v1, 29 bytes for v2)"""
+        data = struct.pack(
             "<QIIBI",
             self.offset,
             self.size_compressed,
@@ -58,13 +106,17 @@ class ChunkInfo:
             self.compressor_id,
             self.checksum,
         )
+        if version >= 2:
+            data += struct.pack("<Q", self.original_offset)
+        return data
 
     @classmethod
-    def from_bytes(cls, data: bytes, index: int) -> 'ChunkInfo':
+    def from_bytes(cls, data: bytes, index: int, version: int = VERSION) -> 'ChunkInfo':
         """Deserialize from bytes"""
         offset, size_compressed, size_original, compressor_id, checksum = struct.unpack(
             "<QIIBI", data[:21]
         )
+        original_offset = struct.unpack("<Q", data[21:29])[0] if version >= 2 else 0
         return cls(
             index=index,
             offset=offset,
@@ -72,9 +124,16 @@ class ChunkInfo:
             size_original=size_original,
             compressor_id=compressor_id,
             checksum=checksum,
+            original_offset=original_offset,
         )
 
+    @staticmethod
+    def struct_size(version: int = VERSION) -> int:
+        """Size of one chunk index entry for a format version"""
+        return ChunkInfo.STRUCT_SIZE_V2 if version >= 2 else ChunkInfo.STRUCT_SIZE
+
     STRUCT_SIZE = 21
+    STRUCT_SIZE_V2 = 29
 
 
 @dataclass
@@ -87,6 +146,7 @@ class FileEntry:
     chunk_start: int        # First chunk index
     chunk_end: int          # Last chunk index (exclusive)
     compressor_id: int      # Compressor used
+    pack_offset: Optional[int] = None  # Offset inside a shared (packed) chunk
 
 
 @dataclass
@@ -103,14 +163,15 @@ class DumontHeader:
     chunk_size: int = DEFAULT_CHUNK_SIZE
     manifest_offset: int = 0
     manifest_size: int = 0
+    index_offset: int = 0  # 0 = chunk index follows the header
 
     def to_bytes(self) -> bytes:
         """Serialize header to 512 bytes"""
         # Format: magic(8) version(2) flags(2) num_chunks(4) num_files(4)
         #         compressed(8) original(8) checksum_type(1) pad(3) chunk_size(4)
-        #         manifest_offset(8) manifest_size(4)
+        #         manifest_offset(8) manifest_size(4) index_offset(8)
         header = struct.pack(
-            "<8sHHIIQQBxxxIQI",
+            "<8sHHIIQQBxxxIQIQ",
             self.magic,
             self.version,
             self.flags,
@@ -122,6 +183,7 @@ class DumontHeader:
             self.chunk_size,
             self.manifest_offset,
             self.manifest_size,
+            self.index_offset,
         )
         # Pad to 512 bytes
         return header.ljust(HEADER_SIZE, b'\x00')
@@ -134,12 +196,14 @@ class DumontHeader:
 
         # Same format as to_bytes
         magic, version, flags, num_chunks, num_files, total_compressed, total_original, \
-            checksum_type, chunk_size, manifest_offset, manifest_size = struct.unpack(
-                "<8sHHIIQQBxxxIQI", data[:56]
+            checksum_type, chunk_size, manifest_offset, manifest_size, index_offset = struct.unpack(
+                "<8sHHIIQQBxxxIQIQ", data[:64]
             )
 
         if magic != MAGIC:
             raise ValueError(f"Invalid magic: {magic}")
+        if version > VERSION:
+            raise ValueError(f"Unsupported archive version: {version} > {VERSION}")
 
         return cls(
             magic=magic,
@@ -153,7 +217,63 @@ class DumontHeader:
             chunk_size=chunk_size,
             manifest_offset=manifest_offset,
             manifest_size=manifest_size,
+            index_offset=index_offset,
+        )
+
+
+class HttpRangeReader:
+    """Positional reads over HTTP range requests (one keep-alive session per thread)"""
+
+    def __init__(self, url: str, timeout: int = 60):
+        if not HAS_REQUESTS:
+            raise RuntimeError("requests not installed. Run: pip install requests")
+        self.url = url
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def pread(self, size: int, offset: int) -> bytes:
+        """Read size bytes at offset"""
+        if size == 0:
+            return b''
+        response = self._session().get(
+            self.url,
+            headers={'Range': f'bytes={offset}-{offset + size - 1}'},
+            timeout=self.timeout,
         )
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise IOError(f"Server ignored range request for {self.url}")
+        return response.content
+
+    def close(self):
+        session = getattr(self._local, 'session', None)
+        if session is not None:
+            session.close()
+
+
+_worker_compressor = None
+
+
+def _compress_chunk(data: bytes, compressor: Compressor, level: int, use_bf16: bool) -> bytes:
+    """Compress one chunk inside a pool worker (compressor reused per process)"""
+    global _worker_compressor
+    if _worker_compressor is None:
+        _worker_compressor = HybridCompressor()
+    return _worker_compressor.compress(data, compressor, level, use_bf16=use_bf16)
+
+
+def _completed(result) -> Future:
+    """Wrap an inline result so it can sit in the same queue as pool futures"""
+    future = Future()
+    future.set_result(result)
+    return future
 
 
 class DumontArchive:
@@ -172,68 +292,133 @@ class DumontArchive:
             archive.extract_all("/workspace")
     """
 
-    def __init__(self, path: str, mode: str = 'r'):
+    def __init__(self, path: str, mode: str = 'r', workers: int = 1, pack_threshold: int = 0,
+                 adaptive: bool = False):
         self.path = path
         self.mode = mode
+        self.workers = max(1, workers)
+        self.pack_threshold = pack_threshold
+        self.adaptive = adaptive
         self.header: Optional[DumontHeader] = None
         self.chunks: List[ChunkInfo] = []
         self.files: List[FileEntry] = []
         self._file: Optional[BinaryIO] = None
+        self._remote: Optional[HttpRangeReader] = None
+        self._map: Optional[mmap.mmap] = None
+        self._local = threading.local()
         self._compressor = None
+        self._split_chunks = set()
 
     def __enter__(self):
         if self.mode == 'r':
-            self._file = open(self.path, 'rb')
+            if self.is_remote:
+                self._remote = HttpRangeReader(self.path)
+            else:
+                self._file = open(self.path, 'rb')
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
             self._read_header()
         elif self.mode == 'w':
             self._file = open(self.path, 'wb')
-            self.header = DumontHeader()
+            if self.header is None:
+                self.header = DumontHeader()
             # Initialize compressor for writing
-            from .hybrid_compressor import HybridCompressor
             self._compressor = HybridCompressor()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._map:
+            try:
+                self._map.close()
+            except BufferError:
+                # A view is still referenced (e.g. by a traceback); GC unmaps it
+                pass
         if self._file:
             self._file.close()
+        if self._remote:
+            self._remote.close()
+
+    @property
+    def is_remote(self) -> bool:
+        """True if the archive is read from an http(s) URL"""
+        return self.path.startswith(('http://', 'https://'))
+
+    def _read_at(self, offset: int, size: int):
+        """
+        Positional read, safe to call from several threads.
+
+        Returns a zero-copy memoryview into the map for local archives and
+        bytes for remote ones; views must not outlive the archive.
+        """
+        if self._remote:
+            return self._remote.pread(size, offset)
+        if self._map is not None:
+            if offset + size > len(self._map):
+                raise ValueError(f"Read past end of archive: {offset}+{size} > {len(self._map)}")
+            return memoryview(self._map)[offset:offset + size]
+        return os.pread(self._file.fileno(), size, offset)
+
+    def _decompressor(self) -> HybridCompressor:
+        """HybridCompressor for the current thread (ZipNN setup is not free)"""
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            compressor = HybridCompressor()
+            self._local.compressor = compressor
+        return compressor
 
     @classmethod
-    def create(cls, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'DumontArchive':
-        """Create a new archive for writing"""
-        archive = cls(path, 'w')
+    def create(
+        cls,
+        path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        workers: int = 1,
+        pack_threshold: int = 0,
+        adaptive: bool = False,
+    ) -> 'DumontArchive':
+        """
+        Create a new archive for writing.
+
+        Args:
+            path: Output .dumont path
+            chunk_size: Chunk size in bytes
+            workers: Compression processes (1 = compress inline)
+            pack_threshold: Files smaller than this are packed together into
+                shared chunks (0 = every file gets its own chunks)
+            adaptive: Choose each chunk's compressor from a sample of its
+                content instead of the file extension alone
+        """
+        archive = cls(path, 'w', workers=workers, pack_threshold=pack_threshold, adaptive=adaptive)
         archive.header = DumontHeader(chunk_size=chunk_size)
         return archive
 
     @classmethod
     def open(cls, path: str) -> 'DumontArchive':
-        """Open an existing archive for reading"""
+        """Open an existing archive for reading (local path or http(s) URL)"""
         return cls(path, 'r')
 
     def _read_header(self):
         """Read and parse archive header"""
-        self._file.seek(0)
-        header_data = self._file.read(HEADER_SIZE)
+        header_data = self._read_at(0, HEADER_SIZE)
         self.header = DumontHeader.from_bytes(header_data)
 
-        # Read chunk index
-        chunk_index_size = self.header.num_chunks * ChunkInfo.STRUCT_SIZE
-        chunk_data = self._file.read(chunk_index_size)
+        # Read chunk index (trailer in streamed archives, after header in old ones)
+        index_offset = self.header.index_offset or HEADER_SIZE
+        entry_size = ChunkInfo.struct_size(self.header.version)
+        chunk_data = self._read_at(index_offset, self.header.num_chunks * entry_size)
 
         self.chunks = []
         for i in range(self.header.num_chunks):
-            offset = i * ChunkInfo.STRUCT_SIZE
-            chunk = ChunkInfo.from_bytes(chunk_data[offset:offset + ChunkInfo.STRUCT_SIZE], i)
+            offset = i * entry_size
+            chunk = ChunkInfo.from_bytes(chunk_data[offset:offset + entry_size], i, self.header.version)
             self.chunks.append(chunk)
 
         # Read manifest
-        self._file.seek(self.header.manifest_offset)
-        manifest_compressed = self._file.read(self.header.manifest_size)
+        manifest_compressed = self._read_at(self.header.manifest_offset, self.header.manifest_size)
 
         if HAS_LZ4:
             manifest_data = lz4.frame.decompress(manifest_compressed)
         else:
             # Fallback: assume uncompressed
-            manifest_data = manifest_compressed
+            manifest_data = bytes(manifest_compressed)
 
         manifest = json.loads(manifest_data.decode('utf-8'))
         self.files = [
@@ -245,81 +430,253 @@ class DumontArchive:
                 chunk_start=f['chunk_start'],
                 chunk_end=f['chunk_end'],
                 compressor_id=f['compressor_id'],
+                pack_offset=f.get('pack_offset'),
             )
             for f in manifest['files']
         ]
 
-    def read_chunk(self, chunk_index: int) -> bytes:
-        """Read and decompress a single chunk"""
-        if chunk_index >= len(self.chunks):
-            raise IndexError(f"Chunk {chunk_index} out of range")
+        # v1 chunks that are slices of a larger compressed stream
+        self._split_chunks = set()
+        if not self.independent_chunks:
+            for f in self.files:
+                if f.chunk_end - f.chunk_start > 1:
+                    self._split_chunks.update(range(f.chunk_start, f.chunk_end))
+
+    @property
+    def independent_chunks(self) -> bool:
+        """True if every chunk can be decompressed on its own"""
+        return self.header.version >= 2 or bool(self.header.flags & FLAG_INDEPENDENT_CHUNKS)
 
+    def _read_raw_chunk(self, chunk_index: int):
+        """Read a chunk's compressed bytes (memoryview when mapped) and verify its CRC"""
         chunk = self.chunks[chunk_index]
-        self._file.seek(chunk.offset)
-        compressed_data = self._file.read(chunk.size_compressed)
+        compressed_data = self._read_at(chunk.offset, chunk.size_compressed)
 
-        # Verify checksum
         actual_crc = zlib.crc32(compressed_data) & 0xFFFFFFFF
         if actual_crc != chunk.checksum:
             raise ValueError(f"Chunk {chunk_index} checksum mismatch: {actual_crc} != {chunk.checksum}")
+        return compressed_data
+
+    def read_chunk(self, chunk_index: int) -> bytes:
+        """Read and decompress a single chunk"""
+        data = self._read_chunk_view(chunk_index)
+        return data.tobytes() if isinstance(data, memoryview) else data
+
+    def _read_chunk_view(self, chunk_index: int):
+        """Like read_chunk, but passthrough chunks stay zero-copy views into the map"""
+        if chunk_index >= len(self.chunks):
+            raise IndexError(f"Chunk {chunk_index} out of range")
+
+        if chunk_index in self._split_chunks:
+            raise ValueError(
+                f"Chunk {chunk_index} is a slice of a v1 whole-file stream and cannot be "
+                f"decompressed on its own; use read_file()"
+            )
+
+        chunk = self.chunks[chunk_index]
+        compressed_data = self._read_raw_chunk(chunk_index)
 
         # Decompress
-        from .hybrid_compressor import HybridCompressor, Compressor
-        compressor = HybridCompressor()
+        compressor = self._decompressor()
         comp_enum = compressor.get_compressor_from_id(chunk.compressor_id)
-        return compressor.decompress(compressed_data, comp_enum)
+        return compressor.decompress(
+            compressed_data, comp_enum, use_bf16=compressor.is_bf16_id(chunk.compressor_id)
+        )
+
+    def read_file(self, file_entry: FileEntry) -> bytes:
+        """Read and decompress one whole file (works for v1 and v2 archives)"""
+        if file_entry.pack_offset is not None:
+            data = self.read_chunk(file_entry.chunk_start)
+            return data[file_entry.pack_offset:file_entry.pack_offset + file_entry.size]
+
+        if self.independent_chunks:
+            data = b''.join(
+                self._read_chunk_view(i) for i in range(file_entry.chunk_start, file_entry.chunk_end)
+            )
+            return data[:file_entry.size]
+
+        # v1: concatenate the compressed slices and decompress the whole stream
+        compressed = b''.join(
+            self._read_raw_chunk(i) for i in range(file_entry.chunk_start, file_entry.chunk_end)
+        )
+        if not compressed:
+            return b''
+        compressor = self._decompressor()
+        comp_enum = compressor.get_compressor_from_id(file_entry.compressor_id)
+        use_bf16 = compressor.is_bf16_id(file_entry.compressor_id)
+        return compressor.decompress(compressed, comp_enum, use_bf16=use_bf16)[:file_entry.size]
 
     def iter_chunks(self) -> Iterator[Tuple[int, bytes]]:
         """Iterate over all chunks, yielding (index, data)"""
         for i in range(len(self.chunks)):
             yield i, self.read_chunk(i)
 
-    def extract_all(self, target_dir: str, progress_callback=None):
+    def extract_all(self, target_dir: str, progress_callback=None, workers: int = 1):
         """
         Extract all files to target directory.
 
+        Target files are preallocated and every chunk is decompressed and
+        written straight to its offset with os.pwrite, then dropped. With
+        workers > 1 chunks are restored concurrently in a thread pool
+        (LZ4/ZipNN release the GIL while decompressing).
+
+        Args:
+            target_dir: Directory to extract to
+            progress_callback: Optional callback(chunks_done, total_chunks)
+            workers: Decompression threads
+        """
+        self._extract_entries(self.files, Path(target_dir), progress_callback, workers)
+
+    def match_files(self, patterns: List[str]) -> List[FileEntry]:
+        """
+        Select files by glob pattern or directory prefix.
+
+        Args:
+            patterns: e.g. ["models/llama/*.safetensors", "src/", "config.json"]
+
+        Returns:
+            Matching FileEntry list, in archive order
+        """
+        prefixes = [p.rstrip('/') + '/' for p in patterns]
+        return [
+            f for f in self.files
+            if any(fnmatch.fnmatchcase(f.path, p) for p in patterns)
+            or any(f.path.startswith(prefix) for prefix in prefixes)
+        ]
+
+    def extract_paths(self, patterns: List[str], target_dir: str, progress_callback=None,
+                      workers: int = 1) -> List[FileEntry]:
+        """
+        Extract only files matching patterns, reading only the chunks they use.
+
         Args:
+            patterns: Glob patterns or directory prefixes (see match_files)
             target_dir: Directory to extract to
-            progress_callback: Optional callback(chunk_index, total_chunks)
+            progress_callback: Optional callback(chunks_done, total_chunks)
+            workers: Decompression threads (also parallel range requests when remote)
+
+        Returns:
+            The extracted FileEntry list
         """
-        target = Path(target_dir)
+        entries = self.match_files(patterns)
+        self._extract_entries(entries, Path(target_dir), progress_callback, workers)
+        return entries
+
+    def _extract_entries(self, entries: List[FileEntry], target: Path, progress_callback=None,
+                         workers: int = 1):
+        """Restore the given files, touching only the chunks they reference"""
         target.mkdir(parents=True, exist_ok=True)
 
-        # Build chunk -> file mapping
-        chunk_data = {}
-        for i, data in self.iter_chunks():
-            chunk_data[i] = data
-            if progress_callback:
-                progress_callback(i, len(self.chunks))
+        if not self.independent_chunks:
+            self._extract_sequential(entries, target, progress_callback)
+            return
 
-        # Reconstruct files
-        for file_entry in self.files:
+        # Preallocate files and plan, per chunk, the (path, file_offset,
+        # chunk_offset, length) slices it holds. Packed chunks hold many files.
+        targets: Dict[int, List[Tuple[Path, int, int, int]]] = {}
+        for file_entry in entries:
             file_path = target / file_entry.path
             file_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(file_path, 'wb') as f:
+                f.truncate(file_entry.size)
 
-            # Combine chunks for this file
-            file_bytes = b''
-            for chunk_idx in range(file_entry.chunk_start, file_entry.chunk_end):
-                file_bytes += chunk_data[chunk_idx]
+            if file_entry.pack_offset is not None:
+                targets.setdefault(file_entry.chunk_start, []).append(
+                    (file_path, 0, file_entry.pack_offset, file_entry.size)
+                )
+                continue
 
-            # Truncate to actual file size
-            file_bytes = file_bytes[:file_entry.size]
+            for chunk_idx in range(file_entry.chunk_start, file_entry.chunk_end):
+                chunk = self.chunks[chunk_idx]
+                targets[chunk_idx] = [(file_path, chunk.original_offset, 0, chunk.size_original)]
+
+        tasks = sorted(targets.items())
+        total = len(tasks)
+        done = 0
+
+        if workers <= 1:
+            for task in tasks:
+                self._restore_chunk(*task)
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+        else:
+            max_inflight = workers * 2
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                inflight = set()
+                for task in tasks:
+                    if len(inflight) >= max_inflight:
+                        finished, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            future.result()
+                            done += 1
+                            if progress_callback:
+                                progress_callback(done, total)
+                    inflight.add(executor.submit(self._restore_chunk, *task))
+                for future in inflight:
+                    future.result()
+                    done += 1
+                    if progress_callback:
+                        progress_callback(done, total)
+
+        for file_entry in entries:
+            self._restore_metadata(target / file_entry.path, file_entry)
+
+    def _restore_chunk(self, chunk_index: int, slices: List[Tuple[Path, int, int, int]]):
+        """Decompress one chunk and pwrite each slice at its offset in the target file"""
+        data = memoryview(self._read_chunk_view(chunk_index))
+        for file_path, offset, start, length in slices:
+            fd = os.open(file_path, os.O_WRONLY)
+            try:
+                view = data[start:start + length]
+                while view:
+                    written = os.pwrite(fd, view, offset)
+                    view = view[written:]
+                    offset += written
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def _restore_metadata(file_path: Path, file_entry: FileEntry):
+        """Restore permissions and mtime"""
+        os.chmod(file_path, file_entry.mode)
+        os.utime(file_path, (file_entry.mtime, file_entry.mtime))
+
+    def _extract_sequential(self, entries: List[FileEntry], target: Path, progress_callback=None):
+        """Extract v1 archives, whose chunks are not independently compressed"""
+        total = len(self.chunks)
+        for file_entry in entries:
+            file_path = target / file_entry.path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
 
-            # Write file
             with open(file_path, 'wb') as f:
-                f.write(file_bytes)
+                f.write(self.read_file(file_entry))
 
-            # Restore permissions and mtime
-            os.chmod(file_path, file_entry.mode)
-            os.utime(file_path, (file_entry.mtime, file_entry.mtime))
+            self._restore_metadata(file_path, file_entry)
+            if progress_callback and file_entry.chunk_end > file_entry.chunk_start:
+                progress_callback(file_entry.chunk_end, total)
 
-    def add_directory(self, source_dir: str, progress_callback=None):
+    def add_directory(self, source_dir: str, progress_callback=None, chunk_callback=None):
         """
         Add all files from a directory to the archive.
 
+        Files are read one chunk at a time and written as soon as each chunk
+        is compressed. With workers > 1 the chunks are compressed in a process
+        pool while the main thread keeps reading and writes results back in
+        order; at most workers * INFLIGHT_PER_WORKER chunks are held in
+        memory at once, regardless of workspace size.
+
+        Files smaller than pack_threshold are concatenated into shared chunks
+        compressed as one block; their manifest entries carry pack_offset.
+
+        In adaptive mode each chunk (packed or not) is sampled and its
+        compressor chosen from the content, skipping incompressible data.
+
         Args:
             source_dir: Directory to archive
             progress_callback: Optional callback(file_path, file_index, total_files)
+            chunk_callback: Optional callback(ChunkInfo), called once the chunk
+                bytes are on disk (lets uploaders start before the walk ends)
         """
         if self.mode != 'w':
             raise RuntimeError("Archive not opened for writing")
@@ -328,7 +685,149 @@ class DumontArchive:
         if not source.exists():
             raise FileNotFoundError(f"Source directory not found: {source_dir}")
 
-        # Collect all files
+        all_files = self._collect_files(source)
+        total_files = len(all_files)
+
+        # Placeholder header, back-patched in _write_trailer()
+        self._file.seek(0)
+        self._file.write(b'\x00' * HEADER_SIZE)
+        self.header.flags |= FLAG_INDEPENDENT_CHUNKS
+
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        max_inflight = self.workers * INFLIGHT_PER_WORKER
+
+        # Ordered pipeline: ('start', entries) / ('chunk', future, size, id, offset) / ('end', entries)
+        pending = deque()
+        inflight = 0
+
+        # Shared chunk for small files
+        pack_strategy = self._compressor.strategies.get(FileCategory.GENERIC)
+        pack_compressor_id = self._compressor_id(pack_strategy)
+        pack = bytearray()
+        pack_entries: List[FileEntry] = []
+
+        def drain(limit: int):
+            nonlocal inflight
+            while pending and (inflight > limit or pending[0][0] != 'chunk'):
+                item = pending.popleft()
+                if item[0] == 'start':
+                    for entry in item[1]:
+                        entry.chunk_start = len(self.chunks)
+                elif item[0] == 'end':
+                    for entry in item[1]:
+                        entry.chunk_end = len(self.chunks)
+                        self.files.append(entry)
+                else:
+                    _, future, size_original, compressor_id, original_offset = item
+                    chunk = self._write_chunk(future.result(), compressor_id, size_original, original_offset)
+                    inflight -= 1
+                    if chunk_callback:
+                        chunk_callback(chunk)
+
+        def submit(piece: bytes, strategy, compressor_id: int, original_offset: int = 0):
+            nonlocal inflight
+            use_bf16 = strategy.category == FileCategory.MODELS_FP16
+            if executor and strategy.compressor != Compressor.NONE:
+                future = executor.submit(
+                    _compress_chunk, piece, strategy.compressor, strategy.level, use_bf16
+                )
+            else:
+                future = _completed(self._compressor.compress(
+                    piece, strategy.compressor, strategy.level, use_bf16=use_bf16
+                ))
+            pending.append(('chunk', future, len(piece), compressor_id, original_offset))
+            inflight += 1
+            drain(max_inflight - 1)
+
+        def choose(piece: bytes, strategy):
+            if self.adaptive:
+                strategy = self._compressor.choose_strategy(sample_blocks(piece), strategy)
+            return strategy, self._compressor_id(strategy)
+
+        def flush_pack():
+            nonlocal pack, pack_entries
+            if not pack_entries:
+                return
+            strategy, compressor_id = choose(pack, pack_strategy)
+            for entry in pack_entries:
+                entry.compressor_id = compressor_id
+            pending.append(('start', pack_entries))
+            submit(bytes(pack), strategy, compressor_id)
+            pending.append(('end', pack_entries))
+            pack = bytearray()
+            pack_entries = []
+
+        try:
+            for file_idx, fpath in enumerate(all_files):
+                if progress_callback:
+                    progress_callback(str(fpath), file_idx, total_files)
+
+                stat = fpath.stat()
+                rel_path = str(fpath.relative_to(source))
+
+                if 0 < stat.st_size < self.pack_threshold:
+                    with open(fpath, 'rb') as f:
+                        data = f.read()
+                    if pack and len(pack) + len(data) > self.header.chunk_size:
+                        flush_pack()
+                    pack_entries.append(FileEntry(
+                        path=rel_path,
+                        size=len(data),
+                        mode=stat.st_mode,
+                        mtime=stat.st_mtime,
+                        chunk_start=0,
+                        chunk_end=0,
+                        compressor_id=pack_compressor_id,
+                        pack_offset=len(pack),
+                    ))
+                    pack += data
+                    continue
+
+                # Determine compression strategy
+                strategy = self._compressor.get_strategy(str(fpath))
+                compressor_id = self._compressor_id(strategy)
+
+                entry = FileEntry(
+                    path=rel_path,
+                    size=0,
+                    mode=stat.st_mode,
+                    mtime=stat.st_mtime,
+                    chunk_start=0,
+                    chunk_end=0,
+                    compressor_id=compressor_id,
+                )
+                pending.append(('start', [entry]))
+
+                with open(fpath, 'rb') as f:
+                    while True:
+                        piece = f.read(self.header.chunk_size)
+                        if not piece:
+                            break
+                        piece_strategy, piece_compressor_id = choose(piece, strategy)
+                        if entry.size == 0:
+                            entry.compressor_id = piece_compressor_id
+                        submit(piece, piece_strategy, piece_compressor_id, entry.size)
+                        entry.size += len(piece)
+
+                pending.append(('end', [entry]))
+                drain(max_inflight - 1)
+
+            flush_pack()
+            drain(-1)
+        finally:
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        self._write_trailer()
+
+    def _compressor_id(self, strategy) -> int:
+        """Compressor id recorded for data compressed with strategy (see submit)"""
+        use_bf16 = strategy.category == FileCategory.MODELS_FP16
+        return self._compressor.get_compressor_id(strategy.compressor, use_bf16=use_bf16)
+
+    @staticmethod
+    def _collect_files(source: Path) -> List[Path]:
+        """Walk source and return regular files, skipping hidden entries"""
         all_files = []
         for root, dirs, files in os.walk(source):
             # Skip hidden directories
@@ -339,100 +838,33 @@ class DumontArchive:
                 fpath = Path(root) / fname
                 if fpath.is_file():
                     all_files.append(fpath)
-
-        total_files = len(all_files)
-        total_original = 0
-        total_compressed = 0
-
-        # First pass: compress all files and collect chunk data in memory
-        all_chunk_data = []  # List of (compressed_bytes, compressor_id, original_size)
-
-        for file_idx, fpath in enumerate(all_files):
-            if progress_callback:
-                progress_callback(str(fpath), file_idx, total_files)
-
-            # Read file
-            with open(fpath, 'rb') as f:
-                file_data = f.read()
-
-            # Get file info
-            stat = fpath.stat()
-            rel_path = str(fpath.relative_to(source))
-
-            # Determine compression strategy
-            compressed_data, strategy = self._compressor.compress_file(file_data, str(fpath))
-            compressor_id = self._compressor.get_compressor_id(strategy.compressor)
-
-            # Track chunk indices for this file
-            chunk_start = len(all_chunk_data)
-
-            # Split into chunks
-            offset = 0
-            while offset < len(compressed_data):
-                chunk_bytes = compressed_data[offset:offset + self.header.chunk_size]
-
-                # Calculate original size for this chunk
-                if strategy.compressor != Compressor.NONE and len(compressed_data) > 0:
-                    ratio = len(file_data) / len(compressed_data)
-                    orig_chunk_size = int(len(chunk_bytes) * ratio)
-                else:
-                    orig_chunk_size = len(chunk_bytes)
-
-                all_chunk_data.append((chunk_bytes, compressor_id, orig_chunk_size))
-                total_compressed += len(chunk_bytes)
-                offset += len(chunk_bytes)
-
-            chunk_end = len(all_chunk_data)
-            total_original += len(file_data)
-
-            # Create file entry
-            file_entry = FileEntry(
-                path=rel_path,
-                size=len(file_data),
-                mode=stat.st_mode,
-                mtime=stat.st_mtime,
-                chunk_start=chunk_start,
-                chunk_end=chunk_end,
-                compressor_id=compressor_id,
-            )
-            self.files.append(file_entry)
-
-        # Now write everything in correct order:
-        # [Header 512b] [Chunk Index] [Chunk Data...] [Manifest]
-
-        num_chunks = len(all_chunk_data)
-        chunk_index_size = num_chunks * ChunkInfo.STRUCT_SIZE
-
-        # Calculate where chunk data starts
-        chunk_data_start = HEADER_SIZE + chunk_index_size
-
-        # Build chunk info with correct offsets
-        current_offset = chunk_data_start
-        for i, (chunk_bytes, compressor_id, orig_size) in enumerate(all_chunk_data):
-            checksum = zlib.crc32(chunk_bytes) & 0xFFFFFFFF
-            chunk_info = ChunkInfo(
-                index=i,
-                offset=current_offset,
-                size_compressed=len(chunk_bytes),
-                size_original=orig_size,
-                compressor_id=compressor_id,
-                checksum=checksum,
-            )
-            self.chunks.append(chunk_info)
-            current_offset += len(chunk_bytes)
-
-        # Write header (placeholder, will rewrite at end)
-        self._file.write(b'\x00' * HEADER_SIZE)
-
-        # Write chunk index
+        return all_files
+
+    def _write_chunk(
+        self, data: bytes, compressor_id: int, size_original: int, original_offset: int = 0
+    ) -> ChunkInfo:
+        """Append one compressed chunk at the current position"""
+        chunk = ChunkInfo(
+            index=len(self.chunks),
+            offset=self._file.tell(),
+            size_compressed=len(data),
+            size_original=size_original,
+            compressor_id=compressor_id,
+            checksum=zlib.crc32(data) & 0xFFFFFFFF,
+            original_offset=original_offset,
+        )
+        self._file.write(data)
+        self.chunks.append(chunk)
+        self.header.total_size_compressed += chunk.size_compressed
+        self.header.total_size_original += chunk.size_original
+        return chunk
+
+    def _write_trailer(self):
+        """Write chunk index and manifest after the data, then patch the header"""
+        index_offset = self._file.tell()
         for chunk in self.chunks:
-            self._file.write(chunk.to_bytes())
-
-        # Write chunk data
-        for chunk_bytes, _, _ in all_chunk_data:
-            self._file.write(chunk_bytes)
+            self._file.write(chunk.to_bytes(self.header.version))
 
-        # Write manifest
         manifest = {
             'files': [
                 {
@@ -443,9 +875,11 @@ class DumontArchive:
                     'chunk_start': f.chunk_start,
                     'chunk_end': f.chunk_end,
                     'compressor_id': f.compressor_id,
+                    **({'pack_offset': f.pack_offset} if f.pack_offset is not None else {}),
                 }
                 for f in self.files
-            ]
+            ],
+            **({'adaptive': True} if self.adaptive else {}),
         }
         manifest_json = json.dumps(manifest).encode('utf-8')
         if HAS_LZ4:
@@ -457,19 +891,20 @@ class DumontArchive:
         self._file.write(manifest_compressed)
 
         # Update and write header at beginning
-        self.header.num_chunks = num_chunks
+        self.header.num_chunks = len(self.chunks)
         self.header.num_files = len(self.files)
-        self.header.total_size_compressed = total_compressed
-        self.header.total_size_original = total_original
+        self.header.index_offset = index_offset
         self.header.manifest_offset = manifest_offset
         self.header.manifest_size = len(manifest_compressed)
 
         self._file.seek(0)
         self._file.write(self.header.to_bytes())
+        self._file.flush()
 
     def get_stats(self) -> dict:
         """Get archive statistics"""
         return {
+            'version': self.header.version,
             'num_files': self.header.num_files,
             'num_chunks': self.header.num_chunks,
             'total_original': self.header.total_size_original,
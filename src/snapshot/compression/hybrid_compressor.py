@@ -5,9 +5,15 @@ For ML workspaces:
 - LZ4 for code/text (GPU-friendly, fast decompression)
 - ZipNN for FP16/BF16 models (neural network specific)
 - Passthrough for already-compressed files (GGUF, media)
+
+Adaptive mode (choose_strategy) samples the data instead of trusting the
+extension: incompressible samples are stored as-is, 16-bit float weights
+go to ZipNN, and compressible data with a passthrough extension gets LZ4.
 """
 
 import os
+import math
+from collections import Counter
 from enum import Enum
 from dataclasses import dataclass
 from typing import Optional, Tuple, Callable
@@ -19,6 +25,12 @@ try:
 except ImportError:
     HAS_LZ4 = False
 
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
 try:
     from zipnn import ZipNN
     HAS_ZIPNN = True
@@ -55,6 +67,51 @@ class CompressionStrategy:
     expected_ratio: float = 1.0  # Expected compression ratio
 
 
+# Adaptive selection (choose_strategy)
+SAMPLE_BLOCKS = 4                  # Blocks sampled per file / chunk
+SAMPLE_BLOCK_SIZE = 64 * 1024      # 64 KB per block
+MIN_USEFUL_RATIO = 1.05            # Below this, compression is wasted CPU
+INCOMPRESSIBLE_ENTROPY = 7.9       # Bits/byte; used when LZ4 is unavailable
+FLOAT16_ENTROPY_GAP = 1.5          # High-byte vs low-byte entropy gap of FP16/BF16 weights
+
+# File format id of ZipNN compressed with bytearray_dtype="bfloat16" (see get_compressor_id)
+ZIPNN_BF16_ID = 4
+
+
+def byte_entropy(data: bytes) -> float:
+    """Shannon entropy of a byte string in bits per byte (0.0 - 8.0)"""
+    if not data:
+        return 0.0
+    if HAS_NUMPY:
+        counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+        probs = counts[counts > 0] / len(data)
+        return float(-(probs * np.log2(probs)).sum())
+    total = len(data)
+    return -sum(c / total * math.log2(c / total) for c in Counter(data).values())
+
+
+def sample_blocks(data: bytes, blocks: int = SAMPLE_BLOCKS, block_size: int = SAMPLE_BLOCK_SIZE) -> bytes:
+    """Concatenate evenly spaced blocks of data (all of it when small)"""
+    if len(data) <= blocks * block_size:
+        return bytes(data)
+    if blocks <= 1:
+        return bytes(data[:block_size])
+    step = (len(data) - block_size) // (blocks - 1) // 8 * 8  # Keep element alignment
+    return b''.join(bytes(data[i * step:i * step + block_size]) for i in range(blocks))
+
+
+def sample_file(filepath: str, blocks: int = SAMPLE_BLOCKS, block_size: int = SAMPLE_BLOCK_SIZE) -> bytes:
+    """Read evenly spaced blocks of a file without loading it"""
+    size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as f:
+        if size <= blocks * block_size:
+            return f.read()
+        if blocks <= 1:
+            return f.read(block_size)
+        step = (size - block_size) // (blocks - 1) // 8 * 8
+        return b''.join(os.pread(f.fileno(), block_size, i * step) for i in range(blocks))
+
+
 # Extension to category mapping
 EXTENSION_MAP = {
     # ML Models (FP16/BF16)
@@ -228,6 +285,73 @@ class HybridCompressor:
         category = self.get_category(filepath)
         return self.strategies.get(category, self.strategies[FileCategory.GENERIC])
 
+    def choose_strategy(self, sample: bytes, strategy: CompressionStrategy) -> CompressionStrategy:
+        """
+        Adapt a strategy to what a sample of the data looks like.
+
+        - Incompressible sample (trial LZ4 ratio, or entropy without LZ4) -> NONE
+        - FP16/BF16-looking sample (even/odd byte entropy gap) -> ZipNN
+        - Compressible sample whose strategy is NONE (or ZipNN on non-weights) -> LZ4
+        - Otherwise the extension-based strategy is kept
+
+        Args:
+            sample: Bytes sampled from the file or chunk (see sample_blocks)
+            strategy: Strategy chosen from the file extension
+
+        Returns:
+            The strategy to use (strategy itself when nothing changes)
+        """
+        if not sample:
+            return strategy
+
+        if HAS_ZIPNN and len(sample) % 2 == 0:
+            # Sign/exponent bytes repeat far more than mantissa bytes
+            even, odd = byte_entropy(sample[0::2]), byte_entropy(sample[1::2])
+            if abs(even - odd) >= FLOAT16_ENTROPY_GAP:
+                return self._adapted(strategy, FileCategory.MODELS_FP16, Compressor.ZIPNN)
+
+        if HAS_LZ4:
+            ratio = len(sample) / max(1, len(lz4.frame.compress(sample)))
+            compressible = ratio >= MIN_USEFUL_RATIO
+        else:
+            compressible = byte_entropy(sample) < INCOMPRESSIBLE_ENTROPY
+
+        if not compressible:
+            return self._adapted(strategy, strategy.category, Compressor.NONE)
+        if strategy.compressor == Compressor.NONE:
+            return self._adapted(strategy, FileCategory.GENERIC, Compressor.LZ4)
+        if strategy.compressor == Compressor.ZIPNN:
+            # Named like weights but not shaped like them
+            return self._adapted(strategy, FileCategory.GENERIC, Compressor.LZ4)
+        return strategy
+
+    def _adapted(self, strategy: CompressionStrategy, category: FileCategory,
+                 compressor: Compressor) -> CompressionStrategy:
+        """Strategy for category/compressor, reusing the configured one when it matches"""
+        if strategy.compressor == compressor:
+            return strategy
+        configured = self.strategies.get(category)
+        if configured is not None and configured.compressor == compressor:
+            return configured
+        return CompressionStrategy(
+            category=category,
+            compressor=compressor,
+            gpu_decompress=compressor in (Compressor.LZ4, Compressor.LZ4_HC),
+            expected_ratio=1.0 if compressor == Compressor.NONE else strategy.expected_ratio,
+        )
+
+    def get_adaptive_strategy(self, filepath: str) -> CompressionStrategy:
+        """
+        Get compression strategy for a file from its extension and a sample of its content.
+
+        Args:
+            filepath: Path to file
+
+        Returns:
+            CompressionStrategy for this file's content
+        """
+        return self.choose_strategy(sample_file(filepath), self.get_strategy(filepath))
+
     def compress(self, data: bytes, compressor: Compressor, level: int = 0, use_bf16: bool = False) -> bytes:
         """
         Compress data using specified algorithm.
@@ -272,7 +396,7 @@ class HybridCompressor:
         Decompress data using specified algorithm.
 
         Args:
-            data: Compressed bytes
+            data: Compressed bytes (any bytes-like object, e.g. a memoryview)
             compressor: Algorithm used for compression
             use_bf16: Use BF16-optimized ZipNN (must match compression)
 
@@ -296,6 +420,8 @@ class HybridCompressor:
                     except:
                         pass
                 raise RuntimeError("ZipNN not installed. Run: pip install zipnn")
+            if isinstance(data, memoryview):
+                data = data.tobytes()  # ZipNN expects bytes
             # Use BF16-optimized decompressor if data was compressed with it
             if use_bf16 and self._zipnn_bf16:
                 return self._zipnn_bf16.decompress(data)
@@ -334,8 +460,10 @@ class HybridCompressor:
             data = f.read()
         return self.compress_file(data, filepath)
 
-    def get_compressor_id(self, compressor: Compressor) -> int:
-        """Get numeric ID for compressor (for file format)"""
+    def get_compressor_id(self, compressor: Compressor, use_bf16: bool = False) -> int:
+        """Get numeric ID for compressor (for file format); BF16 ZipNN has its own ID"""
+        if compressor == Compressor.ZIPNN and use_bf16:
+            return ZIPNN_BF16_ID
         mapping = {
             Compressor.NONE: 0,
             Compressor.LZ4: 1,
@@ -351,9 +479,15 @@ class HybridCompressor:
             1: Compressor.LZ4,
             2: Compressor.LZ4_HC,
             3: Compressor.ZIPNN,
+            ZIPNN_BF16_ID: Compressor.ZIPNN,
         }
         return mapping.get(compressor_id, Compressor.NONE)
 
+    @staticmethod
+    def is_bf16_id(compressor_id: int) -> bool:
+        """True if data with this compressor ID must be decompressed with use_bf16"""
+        return compressor_id == ZIPNN_BF16_ID
+
     @staticmethod
     def get_compression_stats(original_size: int, compressed_size: int) -> dict:
         """
@@ -9,9 +9,18 @@ Methods:
 - lz4_fast: Fast LZ4 compression (GPU-friendly)
 - zipnn_models: ZipNN for neural network weights
 - none: No compression (passthrough)
+
+expected_ratio values can be refreshed from benchmark measurements
+(see benchmark.py --update-ratios), stored in a JSON overrides file
+(DUMONT_MEASURED_RATIOS, default ~/.dumont/measured_ratios.json) and
+applied at import.
 """
 
+import os
+import json
+import logging
 from enum import Enum
+from pathlib import Path
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional
 
@@ -23,6 +32,8 @@ from .hybrid_compressor import (
     DEFAULT_STRATEGIES,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class CompressionMethodID(Enum):
     """Numeric IDs for compression methods (stored in file format)"""
@@ -48,6 +59,11 @@ class CompressionMethod:
         return HybridCompressor(strategies=self.strategies if self.strategies else None)
 
 
+# Measured expected_ratio overrides: {method_name: {category: ratio}}
+MEASURED_RATIOS_PATH = Path(os.path.expanduser(
+    os.getenv("DUMONT_MEASURED_RATIOS", "~/.dumont/measured_ratios.json")
+))
+
 # Registry of all available methods
 COMPRESSION_METHODS: Dict[CompressionMethodID, CompressionMethod] = {}
 
@@ -192,3 +208,56 @@ def describe_methods() -> str:
         lines.append(f"       GPU decompression: {gpu}")
         lines.append("")
     return "\n".join(lines)
+
+
+def update_expected_ratios(ratios: Dict[str, Dict[str, float]]) -> int:
+    """
+    Apply measured compression ratios to the registered methods.
+
+    Args:
+        ratios: {method_name: {category_value: ratio}}; unknown methods or
+            categories are ignored
+
+    Returns:
+        Number of strategies updated
+    """
+    updated = 0
+    for method in list_methods():
+        for category_value, ratio in ratios.get(method.name, {}).items():
+            try:
+                strategy = method.strategies.get(FileCategory(category_value))
+            except ValueError:
+                continue
+            if strategy is not None and ratio > 0:
+                strategy.expected_ratio = float(ratio)
+                updated += 1
+    return updated
+
+
+def save_measured_ratios(ratios: Dict[str, Dict[str, float]], path: Optional[Path] = None) -> Path:
+    """Merge measured ratios into the overrides file"""
+    path = Path(path or MEASURED_RATIOS_PATH)
+    merged = load_measured_ratios(path, apply=False)
+    for method_name, by_category in ratios.items():
+        merged.setdefault(method_name, {}).update(by_category)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(merged, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_measured_ratios(path: Optional[Path] = None, apply: bool = True) -> Dict[str, Dict[str, float]]:
+    """Load measured ratio overrides (and apply them to the registry)"""
+    path = Path(path or MEASURED_RATIOS_PATH)
+    try:
+        with open(path) as f:
+            ratios = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if apply:
+        updated = update_expected_ratios(ratios)
+        logger.info(f"Applied {updated} measured expected_ratio overrides from {path}")
+    return ratios
+
+
+load_measured_ratios()
@@ -4,6 +4,7 @@ Snapshot Service - High-level API for workspace snapshots
 Provides:
 - Create snapshot from workspace directory
 - Restore snapshot to directory
+- Deduplicated snapshots (content-defined chunks in a ChunkStore)
 - Upload/download to/from R2
 - GPU-accelerated decompression
 """
@@ -12,10 +13,19 @@ import os
 import time
 import hashlib
 from pathlib import Path
-from typing import Optional, Callable, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Dict, Any, List
 from dataclasses import dataclass
 
-from .compression import DumontArchive, HybridCompressor, ChunkManager
+from .compression import (
+    DumontArchive,
+    HybridCompressor,
+    ChunkManager,
+    ChunkInfo,
+    ChunkStore,
+    ContentDefinedChunker,
+)
+from .compression.dumont_format import DEFAULT_PACK_THRESHOLD
 
 
 @dataclass
@@ -57,14 +67,26 @@ class SnapshotService:
         service.restore_snapshot("snapshot.dumont", "/workspace", use_gpu=True)
     """
 
-    def __init__(self, chunk_size: int = 64 * 1024 * 1024):
+    def __init__(
+        self,
+        chunk_size: int = 64 * 1024 * 1024,
+        workers: Optional[int] = None,
+        pack_threshold: int = DEFAULT_PACK_THRESHOLD,
+        adaptive: bool = False,
+    ):
         """
         Initialize snapshot service.
 
         Args:
             chunk_size: Size of chunks in bytes (default 64 MB)
+            workers: Compression processes / restore threads (default: all cores)
+            pack_threshold: Files below this size share chunks (0 disables packing)
+            adaptive: Pick each chunk's compressor by sampling its content
         """
         self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.pack_threshold = pack_threshold
+        self.adaptive = adaptive
         self.compressor = HybridCompressor()
 
     def create_snapshot(
@@ -72,6 +94,7 @@ class SnapshotService:
         source_dir: str,
         output_path: str,
         progress_callback: Optional[Callable[[str, int, int], None]] = None,
+        chunk_callback: Optional[Callable[[ChunkInfo], None]] = None,
     ) -> SnapshotInfo:
         """
         Create a snapshot from a directory.
@@ -80,6 +103,8 @@ class SnapshotService:
             source_dir: Directory to snapshot
             output_path: Path for output .dumont file
             progress_callback: Optional callback(filepath, file_index, total_files)
+            chunk_callback: Optional callback(ChunkInfo) per chunk written, so
+                an uploader can ship byte ranges while the walk continues
 
         Returns:
             SnapshotInfo with details about the snapshot
@@ -87,8 +112,14 @@ class SnapshotService:
         start_time = time.time()
 
         # Create archive
-        with DumontArchive.create(output_path, chunk_size=self.chunk_size) as archive:
-            archive.add_directory(source_dir, progress_callback)
+        with DumontArchive.create(
+            output_path,
+            chunk_size=self.chunk_size,
+            workers=self.workers,
+            pack_threshold=self.pack_threshold,
+            adaptive=self.adaptive,
+        ) as archive:
+            archive.add_directory(source_dir, progress_callback, chunk_callback)
 
         # Read back stats
         with DumontArchive.open(output_path) as archive:
@@ -113,6 +144,146 @@ class SnapshotService:
             created_at=time.time(),
         )
 
+    def create_dedup_snapshot(
+        self,
+        source_dir: str,
+        store: ChunkStore,
+        name: str,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None,
+        chunker: Optional[ContentDefinedChunker] = None,
+    ) -> Dict[str, Any]:
+        """
+        Create a deduplicated snapshot: content-defined chunks go to the
+        store (only unseen ones are written/uploaded) and the snapshot itself
+        is a manifest of chunk hashes per file. Remote stores upload as their
+        spool fills, so uploads run while the tree is still being read.
+
+        Args:
+            source_dir: Directory to snapshot
+            store: ChunkStore holding chunks across snapshots
+            name: Snapshot name (manifest key in the store)
+            progress_callback: Optional callback(filepath, file_index, total_files)
+            chunker: Chunker to use (default: 1 MB average chunks)
+
+        Returns:
+            The manifest, including dedup statistics under 'stats'
+        """
+        start_time = time.time()
+        chunker = chunker or ContentDefinedChunker()
+        source = Path(source_dir)
+        if not source.exists():
+            raise FileNotFoundError(f"Source directory not found: {source_dir}")
+
+        all_files = DumontArchive._collect_files(source)
+        files = []
+        total_original = 0
+        chunks_total = 0
+        chunks_new = 0
+        bytes_new = 0
+
+        for file_idx, fpath in enumerate(all_files):
+            if progress_callback:
+                progress_callback(str(fpath), file_idx, len(all_files))
+
+            stat = fpath.stat()
+            chunk_refs = []
+            size = 0
+            with open(fpath, 'rb') as f:
+                for chunk in chunker.iter_chunks(f):
+                    key, stored = store.put(chunk)
+                    chunk_refs.append([key, len(chunk)])
+                    size += len(chunk)
+                    chunks_total += 1
+                    if stored:
+                        chunks_new += 1
+                        bytes_new += len(chunk)
+
+            total_original += size
+            files.append({
+                'path': str(fpath.relative_to(source)),
+                'size': size,
+                'mode': stat.st_mode,
+                'mtime': stat.st_mtime,
+                'chunks': chunk_refs,
+            })
+
+        manifest = {
+            'format': 'dumont-dedup',
+            'version': 1,
+            'name': name,
+            'hash': store.hash_algorithm,
+            'chunker': {
+                'min_size': chunker.min_size,
+                'avg_size': chunker.avg_size,
+                'max_size': chunker.max_size,
+            },
+            'created_at': time.time(),
+            'files': files,
+            'stats': {
+                'num_files': len(files),
+                'total_original': total_original,
+                'chunks_total': chunks_total,
+                'chunks_new': chunks_new,
+                'bytes_new': bytes_new,
+                'dedup_ratio': round(total_original / max(1, bytes_new), 2),
+                'elapsed_seconds': time.time() - start_time,
+            },
+        }
+        store.flush()
+        store.save_manifest(name, manifest)
+        return manifest
+
+    def restore_dedup_snapshot(
+        self,
+        name: str,
+        store: ChunkStore,
+        target_dir: str,
+        workers: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Restore a deduplicated snapshot from its manifest.
+
+        Args:
+            name: Snapshot name in the store
+            store: ChunkStore holding the chunks
+            target_dir: Directory to restore to
+            workers: Files restored concurrently (default: self.workers)
+
+        Returns:
+            Dict with restore statistics
+        """
+        start_time = time.time()
+        manifest = store.load_manifest(name)
+        target = Path(target_dir)
+
+        def restore_file(entry: Dict):
+            file_path = target / entry['path']
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            keys = [key for key, _ in entry['chunks']]
+            # One batched download per file instead of one request per chunk
+            store.prefetch(keys)
+            try:
+                with open(file_path, 'wb') as f:
+                    for key in keys:
+                        f.write(store.get(key))
+            finally:
+                store.evict(keys)
+            os.chmod(file_path, entry['mode'])
+            os.utime(file_path, (entry['mtime'], entry['mtime']))
+
+        with ThreadPoolExecutor(max_workers=workers or self.workers) as executor:
+            list(executor.map(restore_file, manifest['files']))
+
+        elapsed = time.time() - start_time
+        total = manifest['stats']['total_original']
+        return {
+            'success': True,
+            'files_restored': len(manifest['files']),
+            'bytes_original': total,
+            'elapsed_seconds': elapsed,
+            'throughput_mbps': (total / 1024 / 1024) / elapsed if elapsed > 0 else 0,
+        }
+
     @staticmethod
     def detect_gpu() -> bool:
         """
@@ -149,6 +320,7 @@ class SnapshotService:
         target_dir: str,
         use_gpu: Optional[bool] = None,
         progress_callback: Optional[Callable[[RestoreProgress], None]] = None,
+        workers: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Restore a snapshot to a directory.
@@ -158,6 +330,7 @@ class SnapshotService:
             target_dir: Directory to restore to
             use_gpu: Use GPU for decompression. If None, auto-detect.
             progress_callback: Optional callback(RestoreProgress)
+            workers: Decompression threads (default: self.workers)
 
         Returns:
             Dict with restore statistics
@@ -165,6 +338,8 @@ class SnapshotService:
         start_time = time.time()
         bytes_processed = 0
 
+        workers = workers or self.workers
+
         # Auto-detect GPU if not specified
         if use_gpu is None:
             use_gpu = self.detect_gpu()
@@ -201,9 +376,9 @@ class SnapshotService:
 
             # Extract (GPU decompression would be integrated here)
             if use_gpu:
-                self._restore_with_gpu(archive, target_dir, _progress)
+                self._restore_with_gpu(archive, target_dir, _progress, workers)
             else:
-                archive.extract_all(target_dir, _progress)
+                archive.extract_all(target_dir, _progress, workers=workers)
 
         elapsed = time.time() - start_time
 
@@ -216,10 +391,60 @@ class SnapshotService:
             'elapsed_seconds': elapsed,
             'throughput_mbps': (stats['total_original'] / 1024 / 1024) / elapsed if elapsed > 0 else 0,
             'used_gpu': use_gpu,
+            'workers': workers,
             'gpu_detected': self.detect_gpu(),
         }
 
-    def _restore_with_gpu(self, archive: DumontArchive, target_dir: str, progress_callback):
+    def restore_paths(
+        self,
+        snapshot_path: str,
+        patterns: List[str],
+        target_dir: str,
+        workers: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Restore only the files matching patterns, reading only their chunks.
+
+        With an http(s):// snapshot_path the header, manifest and needed
+        chunks are fetched with range requests, so e.g. code and config can
+        come back in seconds and large weights can be restored afterwards.
+
+        Args:
+            snapshot_path: Path or URL of the .dumont file
+            patterns: Glob patterns or directory prefixes, e.g. ["src/", "models/llama/*.safetensors"]
+            target_dir: Directory to restore to
+            workers: Decompression threads / parallel range requests (default: self.workers)
+
+        Returns:
+            Dict with restore statistics
+        """
+        start_time = time.time()
+        workers = workers or self.workers
+
+        with DumontArchive.open(snapshot_path) as archive:
+            entries = archive.extract_paths(patterns, target_dir, workers=workers)
+            chunk_ids = set()
+            for entry in entries:
+                chunk_ids.update(range(entry.chunk_start, entry.chunk_end))
+            bytes_read = sum(archive.chunks[i].size_compressed for i in chunk_ids)
+            total_chunks = len(archive.chunks)
+
+        elapsed = time.time() - start_time
+        bytes_original = sum(e.size for e in entries)
+
+        return {
+            'success': True,
+            'files_restored': len(entries),
+            'chunks_processed': len(chunk_ids),
+            'chunks_total': total_chunks,
+            'bytes_original': bytes_original,
+            'bytes_read': bytes_read,
+            'elapsed_seconds': elapsed,
+            'throughput_mbps': (bytes_original / 1024 / 1024) / elapsed if elapsed > 0 else 0,
+            'workers': workers,
+        }
+
+    def _restore_with_gpu(self, archive: DumontArchive, target_dir: str, progress_callback, workers: int = 1):
         """
         Restore using GPU-accelerated decompression.
 
@@ -232,7 +457,7 @@ class SnapshotService:
             raise ImportError("nvCOMP not implemented yet")
         except ImportError:
             # Fall back to CPU (GPU detected but nvCOMP not installed)
-            archive.extract_all(target_dir, progress_callback)
+            archive.extract_all(target_dir, progress_callback, workers=workers)
 
     def get_snapshot_info(self, snapshot_path: str) -> SnapshotInfo:
         """
@@ -270,7 +495,7 @@ class SnapshotService:
         List files in a snapshot without extracting.
 
         Args:
-            snapshot_path: Path to .dumont file
+            snapshot_path: Path or http(s) URL of the .dumont file
 
         Returns:
             List of file paths
@@ -3,9 +3,11 @@ Storage Provider Abstraction Layer
 Supports multiple cloud storage backends (R2, B2, S3, Wasabi, etc.)
 """
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from dataclasses import dataclass
 import subprocess
+import tempfile
+import shlex
 import os
 
 
@@ -123,6 +125,40 @@ class S5cmdProvider(StorageProvider):
         
         return files
     
+    def upload_dir(self, local_dir: str, remote_prefix: str, num_workers: int = 64) -> bool:
+        """Upload entire directory (structure preserved) with parallelism"""
+        s3_path = f"s3://{self.config.bucket}/{remote_prefix}/"
+        result = self._run_s5cmd([
+            "--numworkers", str(num_workers),
+            "cp", local_dir.rstrip("/") + "/*", s3_path
+        ])
+        return result.returncode == 0
+
+    def _run_batch(self, commands: List[str], num_workers: int) -> bool:
+        """Run many s5cmd commands in one process (s5cmd run <file>)"""
+        with tempfile.NamedTemporaryFile('w', suffix='.s5cmd', delete=False) as f:
+            f.write("\n".join(commands) + "\n")
+            run_file = f.name
+        try:
+            result = self._run_s5cmd(["--numworkers", str(num_workers), "run", run_file])
+            return result.returncode == 0
+        finally:
+            os.unlink(run_file)
+
+    def upload_files(self, pairs: List[Tuple[str, str]], num_workers: int = 64) -> bool:
+        """Upload (local_path, remote_path) pairs in one parallel batch"""
+        return self._run_batch([
+            f"cp {shlex.quote(local)} {shlex.quote(f's3://{self.config.bucket}/{remote}')}"
+            for local, remote in pairs
+        ], num_workers)
+
+    def download_files(self, pairs: List[Tuple[str, str]], num_workers: int = 64) -> bool:
+        """Download (remote_path, local_path) pairs in one parallel batch"""
+        return self._run_batch([
+            f"cp {shlex.quote(f's3://{self.config.bucket}/{remote}')} {shlex.quote(local)}"
+            for remote, local in pairs
+        ], num_workers)
+
     def download_dir(self, remote_prefix: str, local_dir: str, num_workers: int = 64) -> bool:
         """Download entire directory with parallelism"""
         s3_path = f"s3://{self.config.bucket}/{remote_prefix}/*"
@@ -0,0 +1,272 @@
+"""
+Tests for Infrastructure - Vast.ai offer cache
+
+Tests for OfferCache key normalization, single-flight loads and invalidation.
+"""
+
+import os
+import json
+import asyncio
+import time
+import threading
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.infrastructure.providers import vast_client
+from src.infrastructure.providers.vast_client import OfferCache
+
+
+OFFERS = [{"id": 1, "dph_total": 0.2}, {"id": 2, "dph_total": 0.3}, {"id": 3, "dph_total": 0.4}]
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(vast_client.time, "monotonic", lambda: now[0])
+    return now
+
+
+class TestMakeKey:
+    """OfferCache.make_key normalization"""
+
+    def test_ignores_trailing_slash_param_order_and_json_key_order(self):
+        a = OfferCache.make_key("/bundles/", {
+            "q": json.dumps({"gpu_name": {"eq": "RTX 4090"}, "rentable": {"eq": True}}),
+            "order": "dph_total",
+            "limit": 50,
+        })
+        b = OfferCache.make_key("/bundles", {
+            "limit": 50,
+            "order": "dph_total",
+            "q": json.dumps({"rentable": {"eq": True}, "gpu_name": {"eq": "RTX 4090"}}),
+        })
+        assert a == b
+
+    def test_different_queries_differ(self):
+        base = {"q": json.dumps({"gpu_name": {"eq": "RTX 4090"}}), "limit": 50}
+        assert OfferCache.make_key("/bundles/", base) != OfferCache.make_key("/bundles/", {**base, "limit": 51})
+        assert OfferCache.make_key("/bundles/", base) != OfferCache.make_key("/bundles/", {
+            **base, "q": json.dumps({"gpu_name": {"eq": "A100"}}),
+        })
+
+    def test_non_json_q_is_kept_as_string(self):
+        assert OfferCache.make_key("/bundles/", {"q": "not json"}) == OfferCache.make_key("/bundles", {"q": "not json"})
+        assert OfferCache.make_key("/bundles/", None) == "/bundles?{}"
+
+
+class TestSingleFlight:
+    """Coalescing of identical in-flight queries"""
+
+    def test_concurrent_sync_loads_share_one_call(self):
+        cache = OfferCache(ttl=10)
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            release.wait(5)
+            return OFFERS
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        _wait_for(lambda: cache.get_stats()["coalesced"] >= 4)
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        assert len(calls) == 1
+        assert results == [OFFERS] * 5
+        assert cache.get_stats() == {"entries": 1, "inflight": 0, "hits": 0, "misses": 1, "coalesced": 4}
+
+    def test_concurrent_async_loads_share_one_call(self):
+        cache = OfferCache(ttl=10)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return OFFERS
+
+        async def main():
+            return await asyncio.gather(*(cache.aget_or_load("k", loader) for _ in range(5)))
+
+        assert asyncio.run(main()) == [OFFERS] * 5
+        assert len(calls) == 1
+
+    def test_cancelled_leader_hands_load_to_waiter(self):
+        cache = OfferCache(ttl=10)
+        calls = []
+
+        async def hanging():
+            calls.append("leader")
+            await asyncio.sleep(60)
+
+        async def loader():
+            calls.append("waiter")
+            return OFFERS
+
+        async def main():
+            leader = asyncio.create_task(cache.aget_or_load("k", hanging))
+            while cache.get_stats()["inflight"] == 0:
+                await asyncio.sleep(0.001)
+            waiter = asyncio.create_task(cache.aget_or_load("k", loader))
+            while cache.get_stats()["coalesced"] == 0:
+                await asyncio.sleep(0.001)
+
+            # e.g. wait_for() timing out the first search in a race
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await asyncio.wait_for(waiter, 5)
+
+        assert asyncio.run(main()) == OFFERS
+        assert calls == ["leader", "waiter"]
+        assert cache.get_stats()["inflight"] == 0
+        assert cache.get_or_load("k", lambda: []) == OFFERS
+
+    def test_cancelled_waiter_does_not_cancel_shared_load(self):
+        cache = OfferCache(ttl=10)
+
+        async def loader():
+            await asyncio.sleep(0.05)
+            return OFFERS
+
+        async def main():
+            leader = asyncio.create_task(cache.aget_or_load("k", loader))
+            waiters = [asyncio.create_task(cache.aget_or_load("k", loader)) for _ in range(2)]
+            while cache.get_stats()["coalesced"] < 2:
+                await asyncio.sleep(0.001)
+            waiters[0].cancel()
+            return await asyncio.gather(leader, waiters[1])
+
+        assert asyncio.run(main()) == [OFFERS, OFFERS]
+
+    def test_interrupted_sync_leader_hands_load_to_waiter(self):
+        cache = OfferCache(ttl=10)
+        release = threading.Event()
+        results = []
+
+        def interrupted():
+            release.wait(5)
+            raise KeyboardInterrupt
+
+        def leader():
+            try:
+                cache.get_or_load("k", interrupted)
+            except KeyboardInterrupt:
+                results.append("interrupted")
+
+        t1 = threading.Thread(target=leader)
+        t1.start()
+        _wait_for(lambda: cache.get_stats()["inflight"] >= 1)
+        t2 = threading.Thread(target=lambda: results.append(cache.get_or_load("k", lambda: OFFERS)))
+        t2.start()
+        _wait_for(lambda: cache.get_stats()["coalesced"] >= 1)
+        release.set()
+        t1.join(5)
+        t2.join(5)
+
+        assert results == ["interrupted", OFFERS]
+
+    def test_errors_reach_waiters_and_are_not_cached(self):
+        cache = OfferCache(ttl=10)
+        release = threading.Event()
+        errors = []
+
+        def failing():
+            release.wait(5)
+            raise RuntimeError("429")
+
+        def search():
+            try:
+                cache.get_or_load("k", failing)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=search) for _ in range(3)]
+        for t in threads:
+            t.start()
+        _wait_for(lambda: cache.get_stats()["coalesced"] >= 2)
+        release.set()
+        for t in threads:
+            t.join(5)
+
+        assert errors == ["429"] * 3
+        assert cache.get_or_load("k", lambda: OFFERS) == OFFERS
+
+    def test_cached_until_ttl(self, clock):
+        cache = OfferCache(ttl=5)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return OFFERS
+
+        cache.get_or_load("k", loader)
+        clock[0] += 4.9
+        cache.get_or_load("k", loader)
+        assert len(calls) == 1
+        clock[0] += 0.2
+        cache.get_or_load("k", loader)
+        assert len(calls) == 2
+
+
+class TestInvalidateOffer:
+    """invalidate_offer on cached and in-flight results"""
+
+    def test_drops_offer_from_cached_results(self, clock):
+        cache = OfferCache(ttl=10)
+        cache.get_or_load("a", lambda: OFFERS)
+        cache.get_or_load("b", lambda: OFFERS[1:])
+
+        cache.invalidate_offer(2)
+
+        assert [o["id"] for o in cache.get_or_load("a", lambda: [])] == [1, 3]
+        assert [o["id"] for o in cache.get_or_load("b", lambda: [])] == [3]
+
+    def test_filters_results_already_in_flight(self, clock):
+        cache = OfferCache(ttl=10)
+        release = threading.Event()
+        leader, follower = [], []
+
+        def loader():
+            release.wait(5)
+            return OFFERS
+
+        t1 = threading.Thread(target=lambda: leader.extend(cache.get_or_load("k", loader)))
+        t1.start()
+        _wait_for(lambda: cache.get_stats()["inflight"] >= 1)
+        t2 = threading.Thread(target=lambda: follower.extend(cache.get_or_load("k", loader)))
+        t2.start()
+        _wait_for(lambda: cache.get_stats()["coalesced"] >= 1)
+
+        # Offer rented while the search was still running
+        cache.invalidate_offer(1)
+        release.set()
+        t1.join(5)
+        t2.join(5)
+
+        assert [o["id"] for o in leader] == [2, 3]
+        assert [o["id"] for o in follower] == [2, 3]
+        assert [o["id"] for o in cache.get_or_load("k", loader)] == [2, 3]
+
+    def test_invalidation_expires_after_ttl(self, clock):
+        cache = OfferCache(ttl=5)
+        cache.invalidate_offer(1)
+        assert [o["id"] for o in cache.get_or_load("k", lambda: OFFERS)] == [2, 3]
+
+        clock[0] += 6
+        cache.invalidate_offer(99)  # prunes expired entries
+        assert [o["id"] for o in cache.get_or_load("k2", lambda: OFFERS)] == [1, 2, 3]
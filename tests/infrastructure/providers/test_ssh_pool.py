@@ -0,0 +1,308 @@
+"""
+Tests for Infrastructure - SSH connection pool
+
+Tests for SSHPool master handling, rsync -e commands, idle eviction,
+concurrency limits and async cancellation, with ssh replaced by a stub
+(no network).
+"""
+
+import os
+import asyncio
+import shlex
+import subprocess
+import threading
+import time
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.infrastructure.providers import ssh_pool
+from src.infrastructure.providers.ssh_pool import SSHPool, MASTER_RETRY_BACKOFF, MASTER_CHECK_INTERVAL
+
+
+def _option(args, name):
+    """Value of `-o Name=value` in an ssh argv, or None"""
+    for i, arg in enumerate(args[:-1]):
+        if arg == "-o" and args[i + 1].startswith(f"{name}="):
+            return args[i + 1].split("=", 1)[1]
+    return None
+
+
+class FakeSSH:
+    """subprocess.run stand-in for ssh: masters are files at their ControlPath"""
+
+    def __init__(self):
+        self.master_rc = 0
+        self.command_rc = 0
+        self.calls = []
+
+    def kinds(self):
+        return [kind for kind, _ in self.calls]
+
+    def run(self, args, **kwargs):
+        control_path = _option(args, "ControlPath")
+        if "-M" in args:
+            self.calls.append(("open", args))
+            if self.master_rc == 0:
+                open(control_path, "w").close()
+            return subprocess.CompletedProcess(args, self.master_rc)
+        if "-O" in args:
+            operation = args[args.index("-O") + 1]
+            self.calls.append((operation, args))
+            if operation == "exit" and os.path.exists(control_path):
+                os.unlink(control_path)
+            return subprocess.CompletedProcess(args, 0 if os.path.exists(control_path) else 255)
+        self.calls.append(("command", args))
+        return subprocess.CompletedProcess(args, self.command_rc, "ok\n", "")
+
+
+class FakeProcess:
+    """asyncio subprocess whose command never finishes on its own"""
+
+    def __init__(self):
+        self.returncode = None
+        self.killed = False
+        self.reaped = False
+        self._exited = asyncio.Event()
+
+    async def communicate(self, data=None):
+        await self._exited.wait()
+        return b"", b""
+
+    def kill(self):
+        self.killed = True
+        self.returncode = -9
+        self._exited.set()
+
+    async def wait(self):
+        await self._exited.wait()
+        self.reaped = True
+        return self.returncode
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ssh_pool.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def ssh(monkeypatch):
+    fake = FakeSSH()
+    monkeypatch.setattr(ssh_pool.subprocess, "run", fake.run)
+    return fake
+
+
+@pytest.fixture
+def pool(tmp_path, clock, ssh):
+    return SSHPool(control_dir=str(tmp_path), idle_timeout=300)
+
+
+class TestMasters:
+    """Opening, reusing and re-checking master connections"""
+
+    def test_commands_share_one_master(self, pool, ssh):
+        first = pool.run("10.0.0.1", 22, "uptime")
+        second = pool.run("10.0.0.1", 22, "uptime")
+
+        assert first.returncode == second.returncode == 0
+        assert ssh.kinds() == ["open", "command", "command"]
+        control_path = _option(ssh.calls[0][1], "ControlPath")
+        assert all(_option(args, "ControlPath") == control_path for _, args in ssh.calls[1:])
+        assert pool.get_stats()["masters_opened"] == 1
+
+    def test_failed_open_falls_back_to_direct_connection(self, pool, ssh):
+        ssh.master_rc = 255
+
+        result = pool.run("10.0.0.1", 22, "uptime")
+
+        assert result.returncode == 0
+        assert ssh.kinds() == ["open", "command"]
+        assert _option(ssh.calls[-1][1], "ControlPath") is None
+        assert pool.get_stats()["direct"] == 1
+
+    def test_backoff_connects_directly_then_retries_master(self, pool, ssh, clock):
+        ssh.master_rc = 255
+        pool.run("10.0.0.1", 22, "uptime")
+
+        clock[0] += MASTER_RETRY_BACKOFF - 1
+        pool.run("10.0.0.1", 22, "uptime")
+        assert ssh.kinds() == ["open", "command", "command"]
+        assert _option(ssh.calls[-1][1], "ControlPath") is None
+        assert pool.get_stats()["direct"] == 2
+
+        ssh.master_rc = 0
+        clock[0] += 2
+        pool.run("10.0.0.1", 22, "uptime")
+        assert ssh.kinds() == ["open", "command", "command", "open", "command"]
+        assert _option(ssh.calls[-1][1], "ControlPath") is not None
+
+    def test_dead_master_is_reopened_after_check_interval(self, pool, ssh, clock, monkeypatch):
+        pool.run("10.0.0.1", 22, "uptime")
+
+        clock[0] += MASTER_CHECK_INTERVAL - 1
+        pool.run("10.0.0.1", 22, "uptime")
+        assert ssh.kinds() == ["open", "command", "command"]
+
+        # Socket file still there, master process gone
+        ssh.calls.clear()
+        real_run = ssh.run
+
+        def dead_master(args, **kwargs):
+            if "-O" in args and args[args.index("-O") + 1] == "check":
+                ssh.calls.append(("check", args))
+                return subprocess.CompletedProcess(args, 255)
+            return real_run(args, **kwargs)
+
+        monkeypatch.setattr(ssh_pool.subprocess, "run", dead_master)
+        clock[0] += 2
+        pool.run("10.0.0.1", 22, "uptime")
+
+        assert ssh.kinds() == ["check", "exit", "open", "command"]
+
+
+class TestSSHCommand:
+    """ssh_command() strings for rsync -e"""
+
+    def test_round_trips_through_shell_quoting(self, pool, tmp_path):
+        key_path = str(tmp_path / "my keys" / "id_ed25519")
+
+        command = pool.ssh_command("10.0.0.1", 2222, key_path=key_path)
+        args = shlex.split(command)
+
+        assert args[0] == "ssh"
+        assert args[args.index("-p") + 1] == "2222"
+        assert args[args.index("-i") + 1] == key_path
+        assert os.path.exists(_option(args, "ControlPath"))
+        assert _option(args, "ControlMaster") == "no"
+
+    def test_no_control_path_while_master_unavailable(self, pool, ssh):
+        ssh.master_rc = 255
+
+        args = shlex.split(pool.ssh_command("10.0.0.1", 22))
+
+        assert _option(args, "ControlPath") is None
+        assert "10.0.0.1" not in args  # rsync appends the destination itself
+
+
+class TestEvictIdle:
+    """evict_idle() drops and closes masters without recent commands"""
+
+    def test_evicts_only_idle_masters(self, pool, ssh, clock):
+        pool.run("10.0.0.1", 22, "uptime")
+        clock[0] += 200
+        pool.run("10.0.0.2", 22, "uptime")
+        clock[0] += 150
+
+        assert pool.evict_idle() == 1
+
+        assert pool.get_stats()["hosts"] == 1
+        exits = [args for kind, args in ssh.calls if kind == "exit"]
+        assert len(exits) == 1 and exits[0][-1] == "root@10.0.0.1"
+
+    def test_busy_master_is_kept(self, pool, clock):
+        pool.run("10.0.0.1", 22, "uptime")
+        master = pool._master(SSHPool.make_key("10.0.0.1", 22))
+        master.active = 1
+        clock[0] += 1000
+
+        assert pool.evict_idle() == 0
+        master.active = 0
+        assert pool.evict_idle(max_idle=10) == 1
+        assert pool.get_stats()["hosts"] == 0
+
+
+class TestAsyncRun:
+    """arun(): cleanup, limits shared with run(), sweeps off the event loop"""
+
+    @pytest.fixture
+    def pool(self, tmp_path, ssh):
+        # Real clock: the event loop times wait_for() with time.monotonic
+        return SSHPool(control_dir=str(tmp_path), idle_timeout=300, max_total=1)
+
+    @pytest.fixture
+    def processes(self, monkeypatch):
+        processes = []
+
+        async def create_subprocess_exec(*args, **kwargs):
+            processes.append(FakeProcess())
+            return processes[-1]
+
+        monkeypatch.setattr(ssh_pool.asyncio, "create_subprocess_exec", create_subprocess_exec)
+        return processes
+
+    def test_cancelled_command_is_killed_and_reaped(self, pool, processes):
+        async def main():
+            task = asyncio.create_task(pool.arun("10.0.0.1", 22, "sleep 600"))
+            while not processes:
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(main())
+
+        assert processes[0].killed and processes[0].reaped
+        assert pool.get_stats()["active_commands"] == 0
+
+    def test_timeout_kills_and_raises_timeout_expired(self, pool, processes):
+        with pytest.raises(subprocess.TimeoutExpired):
+            asyncio.run(pool.arun("10.0.0.1", 22, "sleep 600", timeout=0.01))
+
+        assert processes[0].killed and processes[0].reaped
+        assert pool.get_stats()["active_commands"] == 0
+
+    def test_total_limit_is_shared_with_threads(self, pool, processes):
+        async def main():
+            pool._total_slots.acquire()  # a thread's run() holding the only slot
+            task = asyncio.create_task(pool.arun("10.0.0.1", 22, "uptime"))
+            await asyncio.sleep(0.05)
+            assert processes == []
+
+            await asyncio.get_running_loop().run_in_executor(None, pool._total_slots.release)
+            while not processes:
+                await asyncio.sleep(0.001)
+            processes[0].kill()
+            await task
+
+        asyncio.run(main())
+        assert pool._total_slots.in_use == 0
+
+    def test_thread_waits_for_async_command(self, pool, processes, ssh):
+        finished = []
+
+        async def main():
+            task = asyncio.create_task(pool.arun("10.0.0.1", 22, "sleep 600"))
+            while not processes:
+                await asyncio.sleep(0.001)
+            thread = threading.Thread(target=lambda: finished.append(pool.run("10.0.0.2", 22, "uptime")))
+            thread.start()
+            await asyncio.sleep(0.05)
+            assert finished == []
+
+            processes[0].kill()
+            await task
+            await asyncio.get_running_loop().run_in_executor(None, thread.join, 5)
+
+        asyncio.run(main())
+        assert [result.returncode for result in finished] == [0]
+
+    def test_idle_sweep_runs_off_the_event_loop(self, pool, processes, monkeypatch):
+        sweeps = []
+        monkeypatch.setattr(pool, "evict_idle", lambda: sweeps.append(threading.get_ident()))
+        pool._last_sweep = time.monotonic() - ssh_pool.SWEEP_INTERVAL - 1
+
+        async def main():
+            task = asyncio.create_task(pool.arun("10.0.0.1", 22, "uptime"))
+            while not processes:
+                await asyncio.sleep(0.001)
+            processes[0].kill()
+            await task
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(main())
+
+        assert len(sweeps) == 1 and sweeps[0] != loop_thread
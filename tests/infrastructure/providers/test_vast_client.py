@@ -0,0 +1,329 @@
+"""
+Tests for Infrastructure - Vast.ai HTTP client
+
+Tests for VastClient retries (full-jitter backoff, Retry-After), the
+token-bucket RateLimiter and session reuse, with the HTTP transport
+replaced by a stub (no network).
+"""
+
+import os
+import asyncio
+import time
+import threading
+
+import pytest
+import requests
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.infrastructure.providers import vast_client
+from src.infrastructure.providers.vast_client import (
+    BACKOFF_BASE,
+    BACKOFF_CAP,
+    RateLimiter,
+    VastClient,
+    backoff_delay,
+    get_vast_client,
+)
+
+
+def _response(status, headers=None, body=b"{}"):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers.update(headers or {})
+    resp._content = body
+    return resp
+
+
+class FakeSession:
+    """requests.Session stand-in replaying scripted responses (or raising exceptions)"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        item = self.script.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+class FakeAsyncResponse:
+    def __init__(self, status, headers=None, text="{}"):
+        self.status = status
+        self.headers = headers or {}
+        self._text = text
+
+    async def text(self):
+        return self._text
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeAsyncSession:
+    """aiohttp.ClientSession stand-in replaying scripted responses"""
+
+    closed = False
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        return self.script.pop(0)
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+    async def acquire_async(self):
+        self.acquired += 1
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(vast_client.time, "sleep", slept.append)
+    return slept
+
+
+@pytest.fixture
+def client():
+    return VastClient("test-key", api_url="https://vast.test/api/v0/", rate_limiter=CountingLimiter())
+
+
+class TestBackoffDelay:
+    """backoff_delay(): full jitter, exponential window, Retry-After"""
+
+    def test_window_doubles_up_to_cap(self, monkeypatch):
+        monkeypatch.setattr(vast_client.random, "uniform", lambda low, high: (low, high))
+
+        assert backoff_delay(0) == (0, BACKOFF_BASE)
+        assert backoff_delay(1) == (0, BACKOFF_BASE * 2)
+        assert backoff_delay(3) == (0, BACKOFF_BASE * 8)
+        assert backoff_delay(20) == (0, BACKOFF_CAP)
+
+    def test_jitter_stays_inside_window(self):
+        delays = [backoff_delay(2) for _ in range(200)]
+
+        assert all(0 <= d <= BACKOFF_BASE * 4 for d in delays)
+        assert len(set(delays)) > 1
+
+    def test_retry_after_wins_and_is_capped(self):
+        assert backoff_delay(0, "7") == 7.0
+        assert backoff_delay(5, "3600") == BACKOFF_CAP
+
+    def test_unparseable_retry_after_falls_back_to_jitter(self, monkeypatch):
+        monkeypatch.setattr(vast_client.random, "uniform", lambda low, high: high)
+
+        assert backoff_delay(1, "Wed, 21 Oct 2026 07:28:00 GMT") == BACKOFF_BASE * 2
+
+
+class TestRetries:
+    """request(): which failures are retried and how long it waits"""
+
+    def test_5xx_on_get_is_retried_with_backoff(self, client, sleeps, monkeypatch):
+        monkeypatch.setattr(vast_client.random, "uniform", lambda low, high: high)
+        client._session = FakeSession(_response(503), _response(502), _response(200))
+
+        resp = client.get("/instances/")
+
+        assert resp.status_code == 200
+        assert sleeps == [BACKOFF_BASE, BACKOFF_BASE * 2]
+        assert client.rate_limiter.acquired == 3
+        metrics = client.get_metrics()["GET /instances"]
+        assert (metrics["requests"], metrics["retries"], metrics["errors"]) == (3, 2, 2)
+
+    def test_429_honors_retry_after_for_any_method(self, client, sleeps):
+        client._session = FakeSession(_response(429, {"Retry-After": "4"}), _response(200))
+
+        resp = client.post("/asks/123/", json={})
+
+        assert resp.status_code == 200
+        assert sleeps == [4.0]
+        assert client.get_metrics()["POST /asks/{id}"]["rate_limited"] == 1
+
+    def test_5xx_on_post_is_not_retried(self, client, sleeps):
+        client._session = FakeSession(_response(503))
+
+        assert client.post("/asks/123/").status_code == 503
+        assert sleeps == []
+
+    def test_last_response_returned_when_budget_runs_out(self, client, sleeps):
+        client._session = FakeSession(*[_response(503) for _ in range(3)])
+
+        assert client.get("/instances/", retries=2).status_code == 503
+        assert len(client._session.calls) == 3
+        assert len(sleeps) == 2
+
+    def test_connection_errors_retried_then_raised(self, client, sleeps):
+        client._session = FakeSession(*[requests.ConnectionError("reset") for _ in range(3)])
+
+        with pytest.raises(requests.ConnectionError):
+            client.get("/instances/", retries=2)
+        assert len(client._session.calls) == 3
+        assert client.get_metrics()["GET /instances"]["errors"] == 3
+
+    def test_connection_error_on_post_raises_immediately(self, client, sleeps):
+        client._session = FakeSession(requests.Timeout("slow"), _response(200))
+
+        with pytest.raises(requests.Timeout):
+            client.post("/asks/123/")
+        assert sleeps == []
+
+    def test_async_retry_uses_same_policy(self, client):
+        session = FakeAsyncSession(
+            FakeAsyncResponse(429, {"Retry-After": "0"}),
+            FakeAsyncResponse(200, text='{"offers": []}'),
+        )
+
+        async def main():
+            client._async_sessions[asyncio.get_running_loop()] = session
+            return await client.aget("/bundles/")
+
+        result = asyncio.run(main())
+
+        assert result.status == 200 and result.json() == {"offers": []}
+        assert session.calls == [("GET", "https://vast.test/api/v0/bundles/")] * 2
+        assert client.get_metrics()["GET /bundles"]["retries"] == 1
+
+
+class TestRateLimiter:
+    """Token bucket shared by sync and async callers"""
+
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(vast_client.time, "monotonic", lambda: now[0])
+        return now
+
+    def test_burst_then_one_token_per_interval(self, clock, sleeps):
+        limiter = RateLimiter(rate=4, burst=2)
+
+        limiter.acquire()
+        limiter.acquire()
+        assert sleeps == []
+
+        limiter.acquire()
+        limiter.acquire()
+        assert sleeps == [pytest.approx(0.25), pytest.approx(0.5)]
+
+    def test_refill_is_capped_at_burst(self, clock, sleeps):
+        limiter = RateLimiter(rate=4, burst=2)
+        limiter.acquire()
+        limiter.acquire()
+
+        clock[0] += 60
+        for _ in range(3):
+            limiter.acquire()
+
+        assert sleeps == [pytest.approx(0.25)]
+
+    def test_threads_share_the_bucket(self, clock):
+        limiter = RateLimiter(rate=1, burst=5)
+        waits = []
+        lock = threading.Lock()
+
+        def reserve():
+            wait = limiter._reserve()
+            with lock:
+                waits.append(wait)
+
+        threads = [threading.Thread(target=reserve) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        assert sorted(waits) == [0.0] * 5 + [pytest.approx(1.0), pytest.approx(2.0), pytest.approx(3.0)]
+
+    def test_async_acquire_waits_without_blocking_the_loop(self):
+        # Real clock: the event loop times asyncio.sleep with time.monotonic
+        limiter = RateLimiter(rate=20, burst=1)
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(1)
+                await asyncio.sleep(0.005)
+
+        async def main():
+            start = time.perf_counter()
+            await asyncio.gather(limiter.acquire_async(), limiter.acquire_async(), limiter.acquire_async(), ticker())
+            return time.perf_counter() - start
+
+        assert asyncio.run(main()) >= 0.09
+        assert len(ticks) == 5
+
+
+class TestSessionReuse:
+    """One keep-alive pool per client (and per event loop for aiohttp)"""
+
+    def test_sync_session_created_once(self, client):
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(client.session)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        assert len({id(s) for s in sessions}) == 1
+        assert sessions[0].headers["Authorization"] == "Bearer test-key"
+        assert sessions[0].get_adapter("https://vast.test")._pool_maxsize == vast_client.VAST_POOL_SIZE
+
+    def test_requests_go_through_the_shared_session(self, client, sleeps):
+        client._session = FakeSession(_response(200), _response(200))
+
+        client.get("/instances/")
+        client.delete("/instances/42/")
+
+        assert client._session.calls == [
+            ("GET", "https://vast.test/api/v0/instances/"),
+            ("DELETE", "https://vast.test/api/v0/instances/42/"),
+        ]
+
+    def test_one_client_per_api_key(self, monkeypatch):
+        monkeypatch.setattr(vast_client, "_clients", {})
+
+        a = get_vast_client("key-a")
+        assert get_vast_client("key-a") is a
+        assert get_vast_client("key-a", api_url=a.api_url + "/") is a
+        assert get_vast_client("key-b") is not a
+
+    def test_async_session_per_loop(self, client):
+        async def sessions():
+            first = client._get_async_session()
+            second = client._get_async_session()
+            await client.aclose()
+            return first, second
+
+        first, second = asyncio.run(sessions())
+        other, _ = asyncio.run(sessions())
+
+        assert first is second
+        assert other is not first
+        assert first.closed and other.closed
+        assert client._async_sessions == {}
+
+    def test_closed_async_session_is_replaced(self, client):
+        async def main():
+            first = client._get_async_session()
+            await first.close()
+            second = client._get_async_session()
+            await client.aclose()
+            return first, second
+
+        first, second = asyncio.run(main())
+        assert first is not second
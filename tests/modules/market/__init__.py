@@ -0,0 +1 @@
+"""Tests for Market Module"""
@@ -0,0 +1,190 @@
+"""
+Tests for Market Module - Collector bulk writes
+
+Testes do upsert de provedores e da atualização em massa de estabilidade
+de ofertas (máquinas novas, existentes, que sumiram e ainda disponíveis).
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import src.config.database as database
+from src.config.database import Base
+from src.domain.models.gpu_offer import GpuOffer
+from src.models.metrics import ProviderReliability
+from src.models.machine_history import OfferStability
+from src.modules.market import collector as collector_module
+from src.modules.market.collector import MarketCollector
+
+
+def _offer(machine_id, price=0.5, gpu_name="RTX 4090", offer_id=None, hostname="host-a"):
+    return GpuOffer(
+        id=offer_id or machine_id * 10,
+        gpu_name=gpu_name, num_gpus=1, gpu_ram=24, cpu_cores=16, cpu_ram=64,
+        disk_space=200, inet_down=1000, inet_up=1000, dph_total=price,
+        geolocation="Sweden, SE", reliability=0.99, cuda_version="12.2",
+        verified=True, static_ip=False, machine_id=machine_id, hostname=hostname,
+        total_flops=82.0, dlperf=40.0,
+    )
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[ProviderReliability.__table__, OfferStability.__table__])
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine, monkeypatch):
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", factory)
+    return factory
+
+
+@pytest.fixture
+def collector(session_factory):
+    return MarketCollector(vast_api_key="test-key")
+
+
+def _providers(session_factory):
+    with session_factory() as db:
+        return {p.machine_id: p for p in db.query(ProviderReliability).all()}
+
+
+def _stability(session_factory):
+    with session_factory() as db:
+        return {s.machine_id: s for s in db.query(OfferStability).all()}
+
+
+class TestUpdateProviderData:
+    """Upsert de ProviderReliability por machine_id"""
+
+    def test_new_machines_are_inserted(self, collector, session_factory):
+        collector._update_provider_data({"RTX 4090:on-demand": [_offer(1, 0.4), _offer(2, 0.6)]})
+
+        providers = _providers(session_factory)
+        assert sorted(providers) == [1, 2]
+        assert providers[1].total_observations == 1
+        assert providers[1].times_available == 1
+        assert providers[1].min_price_seen == providers[1].max_price_seen == pytest.approx(0.4)
+        assert providers[1].reliability_score is not None
+
+    def test_existing_machines_are_updated_in_place(self, collector, session_factory):
+        collector._update_provider_data({"RTX 4090:on-demand": [_offer(1, 0.4)]})
+        first_seen = _providers(session_factory)[1].first_seen
+
+        collector._update_provider_data({
+            "RTX 4090:on-demand": [_offer(1, 0.3, hostname="host-b")],
+            "A100:on-demand": [_offer(3, 1.2, gpu_name="A100")],
+        })
+
+        providers = _providers(session_factory)
+        assert sorted(providers) == [1, 3]
+        assert providers[1].total_observations == 2
+        assert providers[1].hostname == "host-b"
+        assert providers[1].min_price_seen == pytest.approx(0.3)
+        assert providers[1].max_price_seen == pytest.approx(0.4)
+        assert providers[1].avg_price == pytest.approx(0.4 * 0.9 + 0.3 * 0.1)
+        assert providers[1].first_seen == first_seen
+
+    def test_generic_dialect_uses_bulk_mappings(self, collector, session_factory, engine, monkeypatch):
+        collector._update_provider_data({"RTX 4090:on-demand": [_offer(1, 0.4)]})
+        monkeypatch.setattr(engine.dialect, "name", "mysql")
+
+        collector._update_provider_data({"RTX 4090:on-demand": [_offer(1, 0.3), _offer(2, 0.5)]})
+
+        providers = _providers(session_factory)
+        assert sorted(providers) == [1, 2]
+        assert providers[1].total_observations == 2
+        assert providers[2].total_observations == 1
+
+    def test_postgresql_statement_keeps_first_seen(self, monkeypatch):
+        """INSERT ... ON CONFLICT (machine_id) sem sobrescrever first_seen"""
+        executed = []
+
+        class Bind:
+            dialect = postgresql.dialect()
+
+        class FakeSession:
+            def get_bind(self):
+                return Bind()
+
+            def execute(self, stmt):
+                executed.append(stmt)
+
+        rows = [{"machine_id": 1, "first_seen": datetime(2024, 1, 1), "hostname": "h", "total_observations": 1}]
+        collector_module._upsert(FakeSession(), ProviderReliability, rows, "machine_id", {}, keep=("first_seen",))
+
+        sql = str(executed[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (machine_id) DO UPDATE SET" in sql
+        update_clause = sql.split("DO UPDATE SET", 1)[1]
+        assert "hostname = excluded.hostname" in update_clause
+        assert "first_seen" not in update_clause and "machine_id =" not in update_clause
+
+    def test_sqlite_batches_stay_under_variable_limit(self, collector, session_factory, monkeypatch):
+        monkeypatch.setattr(collector_module, "SQLITE_MAX_VARIABLES", 60)
+
+        collector._update_provider_data({"RTX 4090:on-demand": [_offer(i) for i in range(1, 11)]})
+
+        assert len(_providers(session_factory)) == 10
+
+
+class TestUpdateOfferStability:
+    """Aparições, desaparecimentos e máquinas ainda disponíveis"""
+
+    def test_new_machines_are_created_available(self, collector, session_factory):
+        collector._update_offer_stability({"RTX 4090:on-demand": [_offer(1, 0.4), _offer(2, 0.6)]})
+
+        rows = _stability(session_factory)
+        assert sorted(rows) == ["1", "2"]
+        assert all(r.is_available and r.times_appeared == 1 for r in rows.values())
+        assert rows["1"].price_per_hour == pytest.approx(0.4)
+        assert rows["1"].provider == "vast"
+
+    def test_disappeared_machines_are_closed(self, collector, session_factory):
+        collector._update_offer_stability({"RTX 4090:on-demand": [_offer(1), _offer(2)]})
+
+        collector._update_offer_stability({"RTX 4090:on-demand": [_offer(1)]})
+
+        rows = _stability(session_factory)
+        assert rows["2"].is_available is False
+        assert rows["2"].times_disappeared == 1
+        assert rows["1"].is_available and rows["1"].times_disappeared == 0
+
+    def test_still_available_machines_refresh_price_and_last_seen(self, collector, session_factory):
+        collector._update_offer_stability({"RTX 4090:on-demand": [_offer(1, 0.4)]})
+        before = _stability(session_factory)["1"]
+
+        collector._update_offer_stability({"RTX 4090:on-demand": [_offer(1, 0.35)]})
+
+        row = _stability(session_factory)["1"]
+        assert row.times_appeared == 1
+        assert row.price_per_hour == pytest.approx(0.35)
+        assert row.last_seen_at >= before.last_seen_at
+        assert row.id == before.id
+
+    def test_existing_machine_reappears_without_duplicate(self, collector, session_factory):
+        collector._update_offer_stability({"RTX 4090:on-demand": [_offer(1)]})
+        collector._update_offer_stability({"RTX 4090:on-demand": []})
+
+        collector._update_offer_stability({"RTX 4090:on-demand": [_offer(1, 0.7)]})
+
+        with session_factory() as db:
+            assert db.query(OfferStability).count() == 1
+        row = _stability(session_factory)["1"]
+        assert row.is_available
+        assert (row.times_appeared, row.times_disappeared) == (2, 1)
+        assert row.price_per_hour == pytest.approx(0.7)
@@ -0,0 +1,120 @@
+"""
+Tests for Market Module - Wide market queries
+
+Testes da divisão completo/backfill das queries largas de /bundles.
+"""
+
+import os
+import json
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.infrastructure.providers.vast_provider import VastProvider
+
+
+def _offers(gpu_name, count, base_price):
+    return [
+        {"id": hash((gpu_name, i)) & 0xFFFFFF, "gpu_name": gpu_name, "num_gpus": 1, "dph_total": base_price + i * 0.01}
+        for i in range(count)
+    ]
+
+
+class FakeMarket:
+    """/bundles ordenado por preço, com teto de resultados do lado do servidor"""
+
+    def __init__(self, offers_by_gpu, server_cap):
+        self.offers = sorted(
+            (offer for offers in offers_by_gpu.values() for offer in offers),
+            key=lambda offer: offer["dph_total"],
+        )
+        self.server_cap = server_cap
+        self.queries = []
+        self.backfilled = []
+
+    def get_bundles(self, params):
+        names = set(json.loads(params["q"])["gpu_name"]["in"])
+        self.queries.append((params["type"], sorted(names), params["limit"]))
+        matching = [offer for offer in self.offers if offer["gpu_name"] in names]
+        return matching[:min(params["limit"], self.server_cap)]
+
+    def search_offers_by_type(self, machine_type, gpu_name, max_price, limit):
+        self.backfilled.append((gpu_name, machine_type))
+        return []
+
+
+@pytest.fixture
+def provider():
+    return VastProvider(api_key="test-key")
+
+
+def _install(provider, monkeypatch, market):
+    monkeypatch.setattr(provider, "_get_bundles", market.get_bundles)
+    monkeypatch.setattr(provider, "search_offers_by_type", market.search_offers_by_type)
+
+
+class TestWideMarketQueries:
+    """Testes de fetch_all_market_data"""
+
+    def test_gpus_split_into_groups_under_max_limit(self, provider, monkeypatch):
+        """30 GPUs x 200 viram grupos cuja query nunca passa do teto"""
+        gpus = [f"GPU {i}" for i in range(30)]
+        market = FakeMarket({name: _offers(name, 3, 1.0) for name in gpus}, server_cap=10_000)
+        _install(provider, monkeypatch, market)
+
+        provider.fetch_all_market_data(gpus, machine_types=["on-demand"], limit_per_query=200)
+
+        assert all(limit <= VastProvider.MARKET_QUERY_MAX_LIMIT for _, _, limit in market.queries)
+        assert sorted(name for _, names, _ in market.queries for name in names) == sorted(gpus)
+        assert len(market.queries) == 6
+        assert market.backfilled == []
+
+    def test_truncated_response_backfills_expensive_gpus(self, provider, monkeypatch):
+        """Resposta que bate no teto: GPUs caras sem ofertas suficientes vão para backfill"""
+        monkeypatch.setattr(VastProvider, "MARKET_QUERY_MAX_LIMIT", 40)
+        market = FakeMarket({
+            "RTX 3090": _offers("RTX 3090", 50, 0.2),
+            "H100": _offers("H100", 5, 2.5),
+        }, server_cap=40)
+        _install(provider, monkeypatch, market)
+
+        result = provider.fetch_all_market_data(
+            ["RTX 3090", "H100"], machine_types=["interruptible"], limit_per_query=20,
+        )
+
+        assert market.queries == [("interruptible", ["H100", "RTX 3090"], 40)]
+        assert len(result["RTX 3090:interruptible"]) == 20
+        assert market.backfilled == [("H100", "interruptible")]
+
+    def test_short_response_is_complete(self, provider, monkeypatch):
+        """Resposta menor que o limite cobre todas as GPUs, sem backfill"""
+        market = FakeMarket({
+            "RTX 4090": _offers("RTX 4090", 7, 0.4),
+            "A100": _offers("A100", 2, 1.5),
+        }, server_cap=10_000)
+        _install(provider, monkeypatch, market)
+
+        result = provider.fetch_all_market_data(["RTX 4090", "A100"], machine_types=["bid"], limit_per_query=20)
+
+        assert len(result["RTX 4090:bid"]) == 7
+        assert len(result["A100:bid"]) == 2
+        assert market.backfilled == []
+
+    def test_failed_query_backfills_its_group(self, provider, monkeypatch):
+        """Falha numa query larga só manda o próprio grupo para backfill"""
+        monkeypatch.setattr(VastProvider, "MARKET_QUERY_MAX_LIMIT", 20)
+        market = FakeMarket({name: _offers(name, 1, 1.0) for name in ("A", "B", "C")}, server_cap=10_000)
+        _install(provider, monkeypatch, market)
+        original = market.get_bundles
+
+        def flaky(params):
+            if "C" in json.loads(params["q"])["gpu_name"]["in"]:
+                raise RuntimeError("boom")
+            return original(params)
+
+        monkeypatch.setattr(provider, "_get_bundles", flaky)
+        provider.fetch_all_market_data(["A", "B", "C"], machine_types=["on-demand"], limit_per_query=10)
+
+        assert market.backfilled == [("C", "on-demand")]
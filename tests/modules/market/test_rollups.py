@@ -0,0 +1,117 @@
+"""
+Tests for Market Module - Rollups
+
+Testes dos rollups horários/diários de MarketSnapshot e da retenção.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.config.database import Base
+from src.models.metrics import MarketSnapshot, MarketSnapshotRollup
+from src.modules.market import rollups
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[MarketSnapshot.__table__, MarketSnapshotRollup.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _snapshot(timestamp, avg_price, min_price=None, max_price=None, gpu_name="RTX 4090"):
+    return MarketSnapshot(
+        timestamp=timestamp,
+        gpu_name=gpu_name,
+        machine_type="interruptible",
+        min_price=min_price if min_price is not None else avg_price,
+        max_price=max_price if max_price is not None else avg_price,
+        avg_price=avg_price,
+        median_price=avg_price,
+        percentile_25=avg_price,
+        percentile_75=avg_price,
+        total_offers=10,
+        available_gpus=20,
+        avg_reliability=0.9,
+    )
+
+
+def _save(db, snapshots):
+    db.add_all(snapshots)
+    rollups.record_snapshots(db, snapshots)
+    db.commit()
+
+
+class TestRollups:
+    """Testes da manutenção incremental dos rollups"""
+
+    def test_incremental_merge(self, db):
+        """Ciclos sucessivos somam contagens e atualizam min/max do mesmo bucket"""
+        hour = datetime(2026, 1, 5, 10)
+        _save(db, [_snapshot(hour + timedelta(minutes=5), 1.0, min_price=0.5, max_price=1.5)])
+        _save(db, [_snapshot(hour + timedelta(minutes=10), 2.0, min_price=0.4, max_price=3.0)])
+        _save(db, [_snapshot(hour + timedelta(hours=1), 4.0)])
+
+        hourly = db.query(MarketSnapshotRollup).filter_by(resolution="1h").order_by(
+            MarketSnapshotRollup.bucket_start).all()
+        assert [(r.bucket_start, r.sample_count) for r in hourly] == [(hour, 2), (hour + timedelta(hours=1), 1)]
+        assert (hourly[0].min_price, hourly[0].max_price, hourly[0].avg_price) == (0.4, 3.0, 1.5)
+
+        daily = db.query(MarketSnapshotRollup).filter_by(resolution="1d").one()
+        assert daily.bucket_start == datetime(2026, 1, 5)
+        assert daily.sample_count == 3
+        assert daily.avg_price == pytest.approx(7.0 / 3)
+
+    def test_backfill_matches_incremental(self, db):
+        """Backfill a partir dos snapshots brutos reproduz os rollups incrementais"""
+        start = datetime.utcnow() - timedelta(days=2)
+        for i in range(0, 48 * 12, 7):
+            _save(db, [_snapshot(start + timedelta(minutes=5 * i), 1.0 + (i % 13) / 10)])
+
+        def dump():
+            return sorted(
+                (r.resolution, r.bucket_start, r.sample_count, round(r.price_sum, 6), r.min_price, r.max_price)
+                for r in db.query(MarketSnapshotRollup).all()
+            )
+
+        incremental = dump()
+        rollups.backfill_rollups(db, start)
+        db.commit()
+        assert dump() == incremental
+
+
+class TestResolutionAndRetention:
+    """Testes da escolha de resolução e da retenção de snapshots brutos"""
+
+    def test_choose_resolution(self):
+        """Intervalos longos usam resoluções mais grossas"""
+        now = datetime.utcnow()
+        assert rollups.choose_resolution(now - timedelta(hours=24)) == rollups.RESOLUTION_RAW
+        assert rollups.choose_resolution(now - timedelta(days=7)) == rollups.RESOLUTION_HOUR
+        assert rollups.choose_resolution(now - timedelta(days=90)) == rollups.RESOLUTION_DAY
+
+    def test_retention_keeps_rollups(self, db):
+        """Snapshots antigos são apagados e o histórico continua nos rollups diários"""
+        now = datetime.utcnow()
+        _save(db, [_snapshot(now - timedelta(days=60), 1.0), _snapshot(now - timedelta(hours=1), 2.0)])
+
+        deleted = rollups.apply_retention(db, raw_days=14)
+        db.commit()
+
+        assert deleted["snapshots"] == 1
+        assert db.query(MarketSnapshot).count() == 1
+        points = rollups.query_price_series(db, now - timedelta(days=90), gpu_name="RTX 4090")
+        assert [p["resolution"] for p in points] == ["1d", "1d"]
+        assert [p["avg_price"] for p in points] == [2.0, 1.0]
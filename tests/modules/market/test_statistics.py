@@ -0,0 +1,77 @@
+"""
+Tests for Market Module - Statistics
+
+Testes do cálculo vetorizado (OfferBatch) contra o cálculo por oferta.
+"""
+
+import os
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+pytest.importorskip("numpy")
+
+from src.modules.market.statistics import OfferBatch, StatisticsCalculator
+
+
+def _offer(rnd):
+    price = rnd.choice([0, round(rnd.uniform(0.05, 4.0), 4)])
+    flops = rnd.choice([0, None, rnd.uniform(5, 150)])
+    return SimpleNamespace(
+        dph_total=price,
+        total_flops=flops,
+        dlperf=rnd.choice([None, rnd.uniform(1, 200)]),
+        gpu_ram=rnd.choice([24, 48, 80]),
+        gpu_mem_bw=rnd.choice([None, rnd.uniform(500, 3000)]),
+        reliability=rnd.choice([None, 0, rnd.uniform(0.5, 1.0)]),
+        cost_per_tflops=price / flops if price and flops else None,
+        cost_per_gb_vram=rnd.choice([None, rnd.uniform(0.001, 0.1)]),
+        num_gpus=rnd.choice([1, 2, 4]),
+        verified=rnd.random() > 0.5,
+        geolocation=rnd.choice(["US", "Germany, DE", "Japan", "Brazil", "", None]),
+    )
+
+
+@pytest.fixture
+def grouped_offers():
+    rnd = random.Random(7)
+    return {
+        f"GPU{g}:{t}": [_offer(rnd) for _ in range(rnd.randint(0, 40))]
+        for g in range(6)
+        for t in ("on-demand", "bid")
+    }
+
+
+class TestOfferBatch:
+    """Testes das estatísticas vetorizadas"""
+
+    def test_batch_stats_match_per_group(self, grouped_offers):
+        """calculate_batch_stats reproduz calculate_market_stats por grupo"""
+        batch = OfferBatch.from_offers(grouped_offers)
+        by_group = StatisticsCalculator.calculate_batch_stats(batch)
+
+        assert set(by_group) == {k for k, v in grouped_offers.items() if v}
+        for key, result in by_group.items():
+            expected = StatisticsCalculator.calculate_market_stats(grouped_offers[key])
+            for field, value in vars(expected).items():
+                if isinstance(value, float):
+                    assert getattr(result, field) == pytest.approx(value), (key, field)
+                else:
+                    assert getattr(result, field) == value, (key, field)
+
+    def test_efficiency_scores_match(self, grouped_offers):
+        """Scores vetorizados iguais ao score por oferta"""
+        batch = OfferBatch.from_offers(grouped_offers)
+        scores = StatisticsCalculator.calculate_efficiency_scores(batch)
+        expected = [StatisticsCalculator.calculate_efficiency_score(o) for o in batch.offers]
+        assert scores.tolist() == pytest.approx(expected)
+
+    def test_empty_batch(self):
+        """Lote vazio não gera estatísticas"""
+        batch = OfferBatch.from_offers({"RTX 4090:bid": []})
+        assert StatisticsCalculator.calculate_batch_stats(batch) == {}
+        assert len(StatisticsCalculator.calculate_efficiency_scores(batch)) == 0
@@ -0,0 +1 @@
+"""Tests for Snapshot Module"""
@@ -0,0 +1,172 @@
+"""
+Tests for Snapshot Module - Content-Defined Chunking
+
+Testes do chunker CDC e do chunk store com deduplicação.
+"""
+
+import io
+import os
+import random
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from src.snapshot import SnapshotService
+from src.snapshot.compression import ContentDefinedChunker, LocalChunkStore, RemoteChunkStore
+from src.snapshot.compression import cdc
+
+
+class FakeBucket:
+    """StorageProvider em memória que registra cada lote enviado/baixado"""
+
+    def __init__(self):
+        self.objects = {}
+        self.upload_batches = []
+        self.download_batches = []
+
+    def list_files(self, prefix=""):
+        prefix = prefix.rstrip("*")
+        return [k for k in self.objects if k.startswith(prefix)]
+
+    def upload_files(self, pairs):
+        self.upload_batches.append(len(pairs))
+        for local, remote in pairs:
+            with open(local, 'rb') as f:
+                self.objects[remote] = f.read()
+        return True
+
+    def download_files(self, pairs):
+        self.download_batches.append(len(pairs))
+        for remote, local in pairs:
+            if remote not in self.objects:
+                return False
+            with open(local, 'wb') as f:
+                f.write(self.objects[remote])
+        return True
+
+
+@pytest.fixture
+def chunker():
+    return ContentDefinedChunker(min_size=1024, avg_size=4096, max_size=16384)
+
+
+@pytest.fixture
+def data():
+    rnd = random.Random(42)
+    return bytes(rnd.getrandbits(8) for _ in range(200_000))
+
+
+class TestContentDefinedChunker:
+    """Testes do ContentDefinedChunker"""
+
+    def test_chunks_reassemble_within_bounds(self, chunker, data):
+        """Chunks concatenados reproduzem a entrada e respeitam min/max"""
+        chunks = chunker.split_bytes(data)
+        assert b''.join(chunks) == data
+        assert all(len(c) <= chunker.max_size for c in chunks)
+        assert all(len(c) >= chunker.min_size for c in chunks[:-1])
+
+    def test_boundaries_independent_of_read_size(self, chunker, data, monkeypatch):
+        """Fronteiras não dependem do tamanho do bloco lido"""
+        expected = chunker.split_bytes(data)
+        monkeypatch.setattr(cdc, "READ_SIZE", 17_000)
+        assert list(chunker.iter_chunks(io.BytesIO(data))) == expected
+
+    def test_insertion_keeps_other_chunks(self, chunker, data):
+        """Inserção no meio só altera os chunks vizinhos"""
+        original = chunker.split_bytes(data)
+        edited = chunker.split_bytes(data[:100_000] + b"EDIT" + data[100_000:])
+        assert len(set(original) - set(edited)) <= 2
+
+    def test_invalid_sizes(self):
+        """Tamanhos inválidos são rejeitados"""
+        with pytest.raises(ValueError):
+            ContentDefinedChunker(min_size=1024, avg_size=3000, max_size=8192)
+        with pytest.raises(ValueError):
+            ContentDefinedChunker(min_size=8192, avg_size=4096, max_size=16384)
+
+
+class TestDedupSnapshots:
+    """Testes de snapshots deduplicados"""
+
+    def test_second_snapshot_stores_only_changes(self, chunker, data, tmp_path):
+        """Segundo snapshot só grava os chunks alterados e restaura correto"""
+        workspace = tmp_path / "workspace"
+        workspace.mkdir()
+        (workspace / "weights.bin").write_bytes(data)
+        (workspace / "train.py").write_text("print('train')\n")
+
+        store = LocalChunkStore(str(tmp_path / "store"))
+        service = SnapshotService(workers=2)
+
+        first = service.create_dedup_snapshot(str(workspace), store, "s1", chunker=chunker)
+        assert first['stats']['bytes_new'] == first['stats']['total_original']
+
+        edited = data[:50_000] + b"EDIT" + data[50_000:]
+        (workspace / "weights.bin").write_bytes(edited)
+        second = service.create_dedup_snapshot(str(workspace), store, "s2", chunker=chunker)
+        assert second['stats']['bytes_new'] < len(edited) // 4
+
+        target = tmp_path / "restored"
+        service.restore_dedup_snapshot("s2", store, str(target))
+        assert (target / "weights.bin").read_bytes() == edited
+        assert (target / "train.py").read_text() == "print('train')\n"
+
+
+class TestRemoteChunkStore:
+    """Testes do RemoteChunkStore (upload/download em lote)"""
+
+    def test_chunk_store_is_abstract(self):
+        """ChunkStore sem as operações de blob não pode ser instanciado"""
+        from src.snapshot.compression import ChunkStore
+        with pytest.raises(TypeError):
+            ChunkStore()
+
+    def test_spool_flushes_while_creating(self, chunker, data, tmp_path):
+        """Spool é enviado ao atingir flush_mb, antes do fim do snapshot"""
+        workspace = tmp_path / "workspace"
+        workspace.mkdir()
+        for i in range(4):
+            (workspace / f"part{i}.bin").write_bytes(data[i * 50_000:(i + 1) * 50_000] * 6)
+
+        bucket = FakeBucket()
+        store = RemoteChunkStore(bucket, spool_dir=str(tmp_path / "spool"), compress=False)
+        store.flush_bytes = 64 * 1024
+        uploaded = []
+
+        def progress(path, index, total):
+            uploaded.append(sum(bucket.upload_batches))
+
+        SnapshotService(workers=2).create_dedup_snapshot(
+            str(workspace), store, "s1", chunker=chunker, progress_callback=progress)
+
+        # Chunks do primeiro arquivo já estavam no bucket antes do último arquivo
+        assert uploaded[-1] > 0
+        assert len(bucket.upload_batches) > 2
+        spooled = [p for p in (tmp_path / "spool").rglob("*") if p.is_file()]
+        assert spooled == []
+
+    def test_restore_downloads_one_batch_per_file(self, chunker, data, tmp_path):
+        """Restore baixa os chunks de cada arquivo num único lote"""
+        workspace = tmp_path / "workspace"
+        workspace.mkdir()
+        (workspace / "a.bin").write_bytes(data)
+        (workspace / "b.bin").write_bytes(data[::-1])
+
+        bucket = FakeBucket()
+        store = RemoteChunkStore(bucket, spool_dir=str(tmp_path / "spool1"))
+        SnapshotService().create_dedup_snapshot(str(workspace), store, "s1", chunker=chunker)
+        store.close()
+
+        reader = RemoteChunkStore(bucket, spool_dir=str(tmp_path / "spool2"))
+        target = tmp_path / "restored"
+        SnapshotService(workers=1).restore_dedup_snapshot("s1", reader, str(target))
+
+        assert (target / "a.bin").read_bytes() == data
+        assert (target / "b.bin").read_bytes() == data[::-1]
+        # Manifesto + um lote por arquivo
+        assert len(bucket.download_batches) == 3
+        assert max(bucket.download_batches) > 1
+        assert [p for p in (tmp_path / "spool2" / "cache").rglob("*") if p.is_file()] == []
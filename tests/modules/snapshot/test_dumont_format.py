@@ -0,0 +1,439 @@
+"""
+Tests for Snapshot Module - Dumont Format
+
+Testes de escrita/leitura do formato .dumont.
+"""
+
+import os
+import random
+import hashlib
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+pytest.importorskip("lz4")
+
+from src.snapshot.compression.dumont_format import (
+    ChunkInfo,
+    DumontArchive,
+    DumontHeader,
+    HEADER_SIZE,
+    VERSION,
+    FLAG_INDEPENDENT_CHUNKS,
+)
+from src.snapshot.compression import hybrid_compressor
+from src.snapshot.compression.hybrid_compressor import ZIPNN_BF16_ID, sample_blocks
+
+
+CHUNK_SIZE = 4096
+
+
+def _tree_digest(root):
+    digests = {}
+    for dirpath, _, files in os.walk(root):
+        for fname in files:
+            fpath = os.path.join(dirpath, fname)
+            with open(fpath, 'rb') as f:
+                digests[os.path.relpath(fpath, root)] = hashlib.sha256(f.read()).hexdigest()
+    return digests
+
+
+class FakeZipNN:
+    """ZipNN stand-in: o modo BF16 separa bytes altos e baixos, então misturar os modos corrompe"""
+
+    def __init__(self, bytearray_dtype="float32"):
+        self.bf16 = bytearray_dtype == "bfloat16"
+
+    def compress(self, data):
+        data = bytes(data)
+        return data[0::2] + data[1::2] if self.bf16 else b"Z" + data
+
+    def decompress(self, data):
+        if not self.bf16:
+            assert data[:1] == b"Z", "dados BF16 lidos sem use_bf16"
+            return data[1:]
+        half = (len(data) + 1) // 2
+        out = bytearray(len(data))
+        out[0::2], out[1::2] = data[:half], data[half:]
+        return bytes(out)
+
+
+def _bf16_weights(count):
+    """Pesos BF16 little-endian: mantissa aleatória, sinal/expoente quase constantes"""
+    rng = random.Random(0)
+    return b"".join(bytes([rng.randrange(256), rng.choice((0x3c, 0x3d, 0xbc, 0xbd))]) for _ in range(count))
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """Workspace com arquivos pequenos, vazios e maiores que um chunk"""
+    root = tmp_path / "workspace"
+    (root / "src").mkdir(parents=True)
+    (root / "models").mkdir()
+    (root / "src" / "train.py").write_text("import torch\n" * 500)
+    (root / "src" / "empty.txt").write_bytes(b"")
+    (root / "models" / "weights.bin").write_bytes(os.urandom(CHUNK_SIZE * 3 + 17))
+    (root / "config.json").write_text('{"lr": 0.001}')
+    return root
+
+
+class TestStreamingWriter:
+    """Testes do writer em streaming"""
+
+    def test_roundtrip(self, workspace, tmp_path):
+        """Arquivo criado em streaming restaura byte a byte"""
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE) as archive:
+            archive.add_directory(str(workspace))
+
+        target = tmp_path / "restored"
+        with DumontArchive.open(str(archive_path)) as archive:
+            archive.extract_all(str(target))
+
+        assert _tree_digest(workspace) == _tree_digest(target)
+
+    def test_index_written_as_trailer(self, workspace, tmp_path):
+        """Índice de chunks vem depois dos dados e o header é reescrito"""
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE) as archive:
+            archive.add_directory(str(workspace))
+
+        with open(archive_path, 'rb') as f:
+            header = DumontHeader.from_bytes(f.read(HEADER_SIZE))
+
+        assert header.flags & FLAG_INDEPENDENT_CHUNKS
+        assert header.chunk_size == CHUNK_SIZE
+        assert header.index_offset > HEADER_SIZE
+        assert header.manifest_offset > header.index_offset
+
+    def test_chunk_callback_and_exact_sizes(self, workspace, tmp_path):
+        """Callback recebe cada chunk e size_original é exato"""
+        archive_path = tmp_path / "snap.dumont"
+        seen = []
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE) as archive:
+            archive.add_directory(str(workspace), chunk_callback=seen.append)
+
+        with DumontArchive.open(str(archive_path)) as archive:
+            assert [c.offset for c in seen] == [c.offset for c in archive.chunks]
+            assert all(c.size_original <= CHUNK_SIZE for c in archive.chunks)
+            assert sum(c.size_original for c in archive.chunks) == archive.header.total_size_original
+            for i, chunk in enumerate(archive.chunks):
+                assert len(archive.read_chunk(i)) == chunk.size_original
+
+
+class TestParallelCompression:
+    """Testes do pipeline de compressão em processos"""
+
+    def test_parallel_matches_serial(self, workspace, tmp_path):
+        """Pool de workers gera o mesmo arquivo que o modo serial"""
+        serial = tmp_path / "serial.dumont"
+        parallel = tmp_path / "parallel.dumont"
+        with DumontArchive.create(str(serial), chunk_size=CHUNK_SIZE) as archive:
+            archive.add_directory(str(workspace))
+        with DumontArchive.create(str(parallel), chunk_size=CHUNK_SIZE, workers=3) as archive:
+            archive.add_directory(str(workspace))
+
+        with DumontArchive.open(str(serial)) as a, DumontArchive.open(str(parallel)) as b:
+            assert [(f.path, f.size, f.chunk_start, f.chunk_end) for f in a.files] == \
+                [(f.path, f.size, f.chunk_start, f.chunk_end) for f in b.files]
+            assert [c.checksum for c in a.chunks] == [c.checksum for c in b.chunks]
+
+
+class TestParallelRestore:
+    """Testes da restauração paralela com pwrite"""
+
+    def test_threaded_extract(self, workspace, tmp_path):
+        """Extração com vários threads restaura conteúdo e metadados"""
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE) as archive:
+            archive.add_directory(str(workspace))
+
+        target = tmp_path / "restored"
+        progress = []
+        with DumontArchive.open(str(archive_path)) as archive:
+            archive.extract_all(str(target), lambda done, total: progress.append((done, total)), workers=4)
+
+        assert _tree_digest(workspace) == _tree_digest(target)
+        assert progress[-1][0] == progress[-1][1]
+        src_stat = (workspace / "models" / "weights.bin").stat()
+        dst_stat = (target / "models" / "weights.bin").stat()
+        assert int(src_stat.st_mtime) == int(dst_stat.st_mtime)
+
+
+class TestSmallFilePacking:
+    """Testes do empacotamento de arquivos pequenos"""
+
+    def test_small_files_share_chunk(self, workspace, tmp_path):
+        """Arquivos pequenos vão para um chunk compartilhado e restauram"""
+        for i in range(50):
+            (workspace / "src" / f"mod_{i}.py").write_text(f"x = {i}\n")
+
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE, pack_threshold=1024) as archive:
+            archive.add_directory(str(workspace))
+
+        target = tmp_path / "restored"
+        with DumontArchive.open(str(archive_path)) as archive:
+            packed = [f for f in archive.files if f.pack_offset is not None]
+            assert len(packed) >= 50
+            assert len({f.chunk_start for f in packed}) < len(packed)
+            archive.extract_all(str(target), workers=2)
+
+        assert _tree_digest(workspace) == _tree_digest(target)
+
+
+def _write_v1_archive(path, files, chunk_size):
+    """Escreve um arquivo no layout v1 (arquivo inteiro comprimido e fatiado)"""
+    import json
+    import zlib
+    import lz4.frame
+
+    chunks, entries, blobs = [], [], []
+    for rel_path, data in files.items():
+        compressed = lz4.frame.compress(data)
+        start = len(chunks)
+        for i in range(0, len(compressed), chunk_size):
+            piece = compressed[i:i + chunk_size]
+            chunks.append(ChunkInfo(
+                index=len(chunks), offset=0, size_compressed=len(piece),
+                size_original=len(piece), compressor_id=1,
+                checksum=zlib.crc32(piece) & 0xFFFFFFFF,
+            ))
+            blobs.append(piece)
+        entries.append({
+            'path': rel_path, 'size': len(data), 'mode': 0o100644, 'mtime': 0.0,
+            'chunk_start': start, 'chunk_end': len(chunks), 'compressor_id': 1,
+        })
+
+    offset = HEADER_SIZE + len(chunks) * ChunkInfo.STRUCT_SIZE
+    for chunk, blob in zip(chunks, blobs):
+        chunk.offset = offset
+        offset += len(blob)
+    manifest = lz4.frame.compress(json.dumps({'files': entries}).encode())
+    header = DumontHeader(
+        version=1, num_chunks=len(chunks), num_files=len(entries),
+        chunk_size=chunk_size, manifest_offset=offset, manifest_size=len(manifest),
+    )
+    with open(path, 'wb') as f:
+        f.write(header.to_bytes())
+        for chunk in chunks:
+            f.write(chunk.to_bytes(version=1))
+        for blob in blobs:
+            f.write(blob)
+        f.write(manifest)
+
+
+class TestFormatVersions:
+    """Testes do formato v2 e compatibilidade de leitura v1"""
+
+    def test_v2_chunks_are_independent(self, workspace, tmp_path):
+        """Cada chunk v2 descomprime sozinho com offset e tamanho exatos"""
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE) as archive:
+            archive.add_directory(str(workspace))
+
+        weights = (workspace / "models" / "weights.bin").read_bytes()
+        with DumontArchive.open(str(archive_path)) as archive:
+            assert archive.header.version == VERSION == 2
+            entry = next(f for f in archive.files if f.path.endswith("weights.bin"))
+            for i in range(entry.chunk_start, entry.chunk_end):
+                chunk = archive.chunks[i]
+                data = archive.read_chunk(i)
+                assert data == weights[chunk.original_offset:chunk.original_offset + chunk.size_original]
+
+    def test_v1_archive_still_readable(self, tmp_path):
+        """Arquivos v1 continuam restauráveis; chunks fatiados não são lidos isolados"""
+        files = {
+            "big.bin": os.urandom(2000) + b"\0" * 1000,
+            "small.txt": b"tiny",
+        }
+        archive_path = tmp_path / "legacy.dumont"
+        _write_v1_archive(str(archive_path), files, chunk_size=256)
+
+        target = tmp_path / "restored"
+        with DumontArchive.open(str(archive_path)) as archive:
+            assert archive.header.version == 1
+            assert not archive.independent_chunks
+            big = next(f for f in archive.files if f.path == "big.bin")
+            assert big.chunk_end - big.chunk_start > 1
+            with pytest.raises(ValueError):
+                archive.read_chunk(big.chunk_start)
+            archive.extract_all(str(target), workers=4)
+
+        for rel_path, data in files.items():
+            assert (target / rel_path).read_bytes() == data
+
+
+class TestMappedReads:
+    """Leitura pelo mmap: memoryviews sem cópia até o descompressor"""
+
+    def test_every_file_round_trips(self, workspace, tmp_path):
+        """read_file de cada arquivo (grande, pequeno, empacotado e vazio) bate com o original"""
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE, pack_threshold=1024) as archive:
+            archive.add_directory(str(workspace))
+
+        with DumontArchive.open(str(archive_path)) as archive:
+            assert isinstance(archive._read_at(0, HEADER_SIZE), memoryview)
+            for entry in archive.files:
+                data = archive.read_file(entry)
+                assert isinstance(data, bytes)
+                assert data == (workspace / entry.path).read_bytes(), entry.path
+            empty = next(f for f in archive.files if f.path == "src/empty.txt")
+            assert empty.size == 0 and empty.chunk_start == empty.chunk_end
+            assert all(isinstance(archive.read_chunk(i), bytes) for i in range(len(archive.chunks)))
+
+    def test_passthrough_chunks_are_views_into_the_map(self, workspace, tmp_path):
+        """Chunks sem compressão saem como memoryview somente leitura do próprio arquivo"""
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE, adaptive=True) as archive:
+            archive.add_directory(str(workspace))
+
+        weights = (workspace / "models" / "weights.bin").read_bytes()
+        with DumontArchive.open(str(archive_path)) as archive:
+            entry = next(f for f in archive.files if f.path == "models/weights.bin")
+            for i in range(entry.chunk_start, entry.chunk_end):
+                chunk = archive.chunks[i]
+                assert chunk.compressor_id == 0
+                view = archive._read_chunk_view(i)
+                assert isinstance(view, memoryview) and view.readonly
+                assert view == weights[chunk.original_offset:chunk.original_offset + chunk.size_original]
+                del view
+
+            target = tmp_path / "restored"
+            archive.extract_all(str(target), workers=2)
+
+        assert _tree_digest(workspace) == _tree_digest(target)
+
+    def test_close_with_view_still_referenced(self, workspace, tmp_path):
+        """Fechar o arquivo com uma view viva não levanta BufferError"""
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE) as archive:
+            archive.add_directory(str(workspace))
+
+        with DumontArchive.open(str(archive_path)) as archive:
+            view = archive._read_raw_chunk(0)
+        assert len(view) == archive.chunks[0].size_compressed
+
+    def test_empty_directory(self, tmp_path):
+        """Snapshot de diretório vazio abre e extrai sem arquivos"""
+        source = tmp_path / "empty"
+        source.mkdir()
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE) as archive:
+            archive.add_directory(str(source))
+
+        with DumontArchive.open(str(archive_path)) as archive:
+            assert archive.files == [] and archive.chunks == []
+            archive.extract_all(str(tmp_path / "restored"))
+
+        assert os.listdir(tmp_path / "restored") == []
+
+    def test_v1_files_round_trip(self, tmp_path):
+        """v1 pelo mmap: arquivos fatiados, de um chunk só e vazios"""
+        files = {
+            "big.bin": os.urandom(3000),
+            "small.txt": b"tiny",
+            "empty.txt": b"",
+        }
+        archive_path = tmp_path / "legacy.dumont"
+        _write_v1_archive(str(archive_path), files, chunk_size=256)
+
+        with DumontArchive.open(str(archive_path)) as archive:
+            assert isinstance(archive._read_raw_chunk(0), memoryview)
+            for entry in archive.files:
+                assert archive.read_file(entry) == files[entry.path], entry.path
+            small = next(f for f in archive.files if f.path == "small.txt")
+            assert archive.read_chunk(small.chunk_start) == b"tiny"
+
+            # Entrada v1 sem nenhum chunk
+            empty = next(f for f in archive.files if f.path == "empty.txt")
+            empty.chunk_end = empty.chunk_start
+            assert archive.read_file(empty) == b""
+
+
+class TestSelectiveRestore:
+    """Testes de restauração seletiva"""
+
+    def test_extract_paths_reads_only_matching(self, workspace, tmp_path):
+        """Só os arquivos selecionados são restaurados"""
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE, pack_threshold=1024) as archive:
+            archive.add_directory(str(workspace))
+
+        target = tmp_path / "restored"
+        with DumontArchive.open(str(archive_path)) as archive:
+            entries = archive.extract_paths(["src/", "*.json"], str(target), workers=2)
+
+        assert sorted(e.path for e in entries) == ["config.json", "src/empty.txt", "src/train.py"]
+        assert (target / "src" / "train.py").read_text() == (workspace / "src" / "train.py").read_text()
+        assert (target / "config.json").exists()
+        assert not (target / "models").exists()
+
+    def test_glob_pattern(self, workspace, tmp_path):
+        """Padrões glob selecionam arquivos grandes individualmente"""
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE) as archive:
+            archive.add_directory(str(workspace))
+
+        target = tmp_path / "restored"
+        with DumontArchive.open(str(archive_path)) as archive:
+            archive.extract_paths(["models/*.bin"], str(target))
+
+        assert (target / "models" / "weights.bin").read_bytes() == \
+            (workspace / "models" / "weights.bin").read_bytes()
+        assert not (target / "src").exists()
+
+
+class TestAdaptiveCompression:
+    """Testes da escolha de compressor por amostragem do conteúdo"""
+
+    def test_choice_follows_content(self, workspace, tmp_path):
+        """Dados aleatórios ficam sem compressão e extensões enganosas são corrigidas"""
+        (workspace / "photo.jpg").write_bytes(b"text that compresses well\n" * 400)
+
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE, adaptive=True) as archive:
+            archive.add_directory(str(workspace))
+
+        target = tmp_path / "restored"
+        with DumontArchive.open(str(archive_path)) as archive:
+            by_path = {f.path: f for f in archive.files}
+            weights = by_path["models/weights.bin"]
+            assert {archive.chunks[i].compressor_id for i in range(weights.chunk_start, weights.chunk_end)} == {0}
+            assert by_path["photo.jpg"].compressor_id != 0
+            assert archive.get_stats()['ratio'] > 1
+            archive.extract_all(str(target))
+
+        assert _tree_digest(workspace) == _tree_digest(target)
+
+    def test_adaptive_bf16_chunks_round_trip(self, workspace, tmp_path, monkeypatch):
+        """Chunks com cara de pesos BF16 vão para o ZipNN BF16 e são lidos com use_bf16"""
+        monkeypatch.setattr(hybrid_compressor, "HAS_ZIPNN", True)
+        monkeypatch.setattr(hybrid_compressor, "ZipNN", FakeZipNN, raising=False)
+        weights = _bf16_weights(CHUNK_SIZE * 2)
+        (workspace / "models" / "layer.dat").write_bytes(weights)
+
+        archive_path = tmp_path / "snap.dumont"
+        with DumontArchive.create(str(archive_path), chunk_size=CHUNK_SIZE, adaptive=True) as archive:
+            archive.add_directory(str(workspace))
+
+        target = tmp_path / "restored"
+        with DumontArchive.open(str(archive_path)) as archive:
+            entry = next(f for f in archive.files if f.path == "models/layer.dat")
+            ids = {archive.chunks[i].compressor_id for i in range(entry.chunk_start, entry.chunk_end)}
+            assert ids == {ZIPNN_BF16_ID}
+            assert entry.compressor_id == ZIPNN_BF16_ID
+            assert archive.read_file(entry) == weights
+            archive.extract_all(str(target))
+
+        assert _tree_digest(workspace) == _tree_digest(target)
+
+    def test_single_block_sample(self):
+        """blocks=1 amostra um bloco a partir do offset 0"""
+        data = bytes(range(256)) * 64
+
+        assert sample_blocks(data, blocks=1, block_size=1024) == data[:1024]
+        assert sample_blocks(data[:512], blocks=1, block_size=1024) == data[:512]
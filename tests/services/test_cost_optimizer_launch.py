@@ -0,0 +1,62 @@
+"""
+Tests for Services - Cost Optimizer launcher
+
+Sobe o daemon com bin/start-cost-optimizer.sh (sem providers configurados
+ele só valida os imports e sai).
+"""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LAUNCHER = os.path.join(PROJECT_DIR, "bin", "start-cost-optimizer.sh")
+
+PROVIDER_KEYS = ("VAST_API_KEY", "TENSORDOCK_API_KEY", "TENSORDOCK_API_TOKEN", "GCP_PROJECT_ID")
+
+
+def _run_launcher(script=LAUNCHER, **env_overrides):
+    env = {key: value for key, value in os.environ.items() if key not in PROVIDER_KEYS + ("PYTHONPATH",)}
+    env.update(env_overrides)
+    return subprocess.run(
+        ["bash", script], cwd="/", env=env,
+        capture_output=True, text=True, timeout=60,
+    )
+
+
+@pytest.fixture
+def project_copy(tmp_path):
+    """Cópia mínima do projeto (launcher, daemon e src) sem .env local"""
+    for name in ("bin", "services"):
+        (tmp_path / name).mkdir()
+    shutil.copy(LAUNCHER, tmp_path / "bin")
+    shutil.copy(os.path.join(PROJECT_DIR, "services", "cost_optimizer.py"), tmp_path / "services")
+    os.symlink(os.path.join(PROJECT_DIR, "src"), tmp_path / "src")
+    return tmp_path
+
+
+class TestLauncher:
+    """Daemon inicia com o comando do launcher"""
+
+    def test_starts_without_providers(self, project_copy):
+        result = _run_launcher(str(project_copy / "bin" / "start-cost-optimizer.sh"))
+
+        assert result.returncode == 0, result.stderr
+        assert "No providers configured" in result.stderr
+
+    def test_ssh_pool_importable_from_launcher_environment(self, project_copy):
+        """Métricas via SSH importam src.* sob o PYTHONPATH exportado pelo launcher"""
+        launcher = project_copy / "bin" / "start-cost-optimizer.sh"
+        probe = project_copy / "services" / "cost_optimizer.py"
+        probe.write_text(
+            "import sys\n"
+            "from src.infrastructure.providers.ssh_pool import get_ssh_pool\n"
+            "sys.stderr.write('ssh pool ok\\n')\n"
+        )
+
+        result = _run_launcher(str(launcher))
+
+        assert result.returncode == 0, result.stderr
+        assert "ssh pool ok" in result.stderr
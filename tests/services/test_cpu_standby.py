@@ -0,0 +1,409 @@
+"""
+Tests for Services - CPU Standby sync
+
+Testes do provisionamento da chave de sync (rrsync + from=), dos comandos
+rsync/restic gerados e das transições incremental → completo, com o SSH
+substituído por respostas roteirizadas (sem rede).
+"""
+
+import os
+import shlex
+import subprocess
+from dataclasses import dataclass
+from typing import Optional
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.services.standby import cpu as cpu_module
+from src.services.standby.cpu import (
+    CPUStandbyService,
+    CPUStandbyConfig,
+    GPU_SYNC_KEY_PATH,
+    CPU_RRSYNC_PATH,
+    JOURNAL_INACTIVE_EXIT,
+)
+from src.infrastructure.providers.restic_provider import ResticProvider
+
+CPU_IP = "34.1.2.3"
+GPU_HOST, GPU_PORT = "ssh4.vast.ai", 12345
+GPU_EGRESS_IP = "198.51.100.7"
+
+
+@dataclass
+class Call:
+    host: str
+    port: int
+    command: str
+    input: Optional[str]
+    sync_locked: bool
+
+
+class FakeRemote:
+    """_run_ssh roteirizado: a última regra cujo trecho aparece no comando responde"""
+
+    def __init__(self, service):
+        self.service = service
+        self.calls = []
+        self.rules = []
+
+    def respond(self, fragment, returncode=0, stdout="", stderr=""):
+        self.rules.append((fragment, returncode, stdout, stderr))
+
+    def __call__(self, host, port, command, input=None, timeout=60):
+        self.calls.append(Call(host, port, command, input, self.service._sync_lock.locked()))
+        for fragment, returncode, stdout, stderr in reversed(self.rules):
+            if fragment in command:
+                return subprocess.CompletedProcess(command, returncode, stdout, stderr)
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+    def find(self, fragment, host=None):
+        return [c for c in self.calls if fragment in c.command and (host is None or c.host == host)]
+
+    def kinds(self):
+        """Etapas do ciclo de sync, na ordem em que rodaram"""
+        kinds = []
+        for call in self.calls:
+            if "authorized_keys" in call.command and call.host == CPU_IP:
+                kinds.append("authorize")
+            elif "dumont-sync-journal.sh" in call.command:
+                kinds.append("journal")
+            elif "--files-from" in call.command:
+                kinds.append("incremental")
+            elif "rsync -az --delete" in call.command:
+                kinds.append("full")
+        return kinds
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    service = CPUStandbyService(
+        vast_api_key="test-key",
+        gcp_credentials={},
+        config=CPUStandbyConfig(sync_key_dir=str(tmp_path / "keys")),
+    )
+    service.cpu_instance = {"name": "dumont-standby-1", "zone": "europe-west1-b", "external_ip": CPU_IP}
+    service.gpu_instance_id = 77
+    service.gpu_ssh_host, service.gpu_ssh_port = GPU_HOST, GPU_PORT
+    monkeypatch.setattr(service.vast_service, "get_instance_status", lambda instance_id: {
+        "status": "running", "ssh_host": GPU_HOST, "ssh_port": GPU_PORT, "public_ipaddr": "203.0.113.9",
+    })
+    return service
+
+
+@pytest.fixture
+def remote(service, monkeypatch):
+    remote = FakeRemote(service)
+    remote.respond("checkip", stdout=f"{GPU_EGRESS_IP}\n")
+    monkeypatch.setattr(service, "_run_ssh", remote)
+    return remote
+
+
+def _authorized_entry(remote):
+    """Linha que o comando da CPU acrescenta ao authorized_keys"""
+    (call,) = remote.find("authorized_keys", host=CPU_IP)
+    return next(token for token in shlex.split(call.command) if token.startswith("restrict,"))
+
+
+def _public_key(service):
+    with open(service._sync_key_path(CPU_IP) + ".pub") as f:
+        return f.read().strip()
+
+
+class TestSyncKeyProvisioning:
+    """Chave de sync por CPU, restrita ao IP da GPU e ao rrsync em sync_path"""
+
+    def test_authorized_keys_entry_is_restricted(self, service, remote):
+        assert service._setup_direct_sync(CPU_IP)
+
+        public_key = _public_key(service)
+        assert _authorized_entry(remote) == (
+            f'restrict,from="{GPU_EGRESS_IP}",command="{CPU_RRSYNC_PATH} /workspace" {public_key}'
+        )
+        assert public_key.endswith(" dumont-sync:dumont-standby-1")
+        assert os.path.basename(service._sync_key_path(CPU_IP)) == "dumont-standby-1"
+
+    def test_private_key_goes_to_gpu_over_stdin(self, service, remote):
+        service._setup_direct_sync(CPU_IP)
+
+        (call,) = remote.find(f"cat > {GPU_SYNC_KEY_PATH}", host=GPU_HOST)
+        with open(service._sync_key_path(CPU_IP)) as f:
+            assert call.input == f.read()
+        assert "PRIVATE KEY" not in call.command
+
+    def test_previous_sync_entries_are_removed_before_adding(self, service, remote):
+        service._setup_direct_sync(CPU_IP)
+
+        (call,) = remote.find("authorized_keys", host=CPU_IP)
+        assert "grep -vE ' dumont-sync(:[^ ]*)?$'" in call.command
+        assert call.command.index("grep -vE") < call.command.index("echo ")
+
+    def test_egress_ip_falls_back_to_vast_status(self, service, remote):
+        remote.respond("checkip", returncode=1)
+
+        assert service._setup_direct_sync(CPU_IP)
+        assert _authorized_entry(remote).startswith('restrict,from="203.0.113.9",')
+
+    def test_unknown_egress_ip_disables_direct_sync(self, service, remote, monkeypatch):
+        remote.respond("checkip", returncode=0, stdout="<html>captive portal</html>")
+        monkeypatch.setattr(service.vast_service, "get_instance_status", lambda instance_id: {})
+
+        assert not service._setup_direct_sync(CPU_IP)
+        assert remote.find("authorized_keys") == []
+
+    def test_set_up_once_per_pairing(self, service, remote):
+        assert service._setup_direct_sync(CPU_IP)
+        calls = len(remote.calls)
+
+        assert service._setup_direct_sync(CPU_IP)
+        assert len(remote.calls) == calls
+
+    def test_gpu_change_revokes_old_key_and_rotates(self, service, remote):
+        service._setup_direct_sync(CPU_IP)
+        old_key = _public_key(service)
+        remote.calls.clear()
+
+        service.gpu_ssh_host, service.gpu_ssh_port = "ssh9.vast.ai", 2222
+        assert service._setup_direct_sync(CPU_IP)
+
+        assert remote.find(f"rm -f {GPU_SYNC_KEY_PATH}", host=GPU_HOST)
+        revoke, authorize = remote.find("authorized_keys", host=CPU_IP)
+        assert "echo " not in revoke.command
+        assert _public_key(service) != old_key
+        assert old_key not in authorize.command
+        assert remote.find(f"cat > {GPU_SYNC_KEY_PATH}", host="ssh9.vast.ai")
+
+    def test_cleanup_revokes_key_on_both_ends(self, service, remote, monkeypatch):
+        deleted = []
+        monkeypatch.setattr(service.gcp_provider, "delete_instance", lambda name, zone: deleted.append(name))
+        service._setup_direct_sync(CPU_IP)
+        key_path = service._sync_key_path(CPU_IP)
+        remote.calls.clear()
+
+        service.cleanup()
+
+        assert remote.find(f"rm -f {GPU_SYNC_KEY_PATH}", host=GPU_HOST)
+        assert remote.find("grep -vE", host=CPU_IP)
+        assert not os.path.exists(key_path) and not os.path.exists(key_path + ".pub")
+        assert deleted == ["dumont-standby-1"]
+
+
+class TestRsyncCommands:
+    """Comandos rsync executados na GPU"""
+
+    def test_full_sync_is_relative_to_rrsync_root(self, service):
+        push = shlex.split(service._direct_rsync_cmd(CPU_IP, push=True).split(" && ", 1)[1])
+        pull = shlex.split(service._direct_rsync_cmd(CPU_IP, push=False).split(" && ", 1)[1])
+
+        assert push[-2:] == ["/workspace/", f"root@{CPU_IP}:./"]
+        assert pull[-2:] == [f"root@{CPU_IP}:./", "/workspace/"]
+        assert f"-i {GPU_SYNC_KEY_PATH}" in push[push.index("-e") + 1]
+        assert "--exclude" in push and "--exclude" not in pull
+
+    def test_incremental_sends_journal_paths_relative_to_sync_path(self, service):
+        command = service._incremental_rsync_cmd(CPU_IP)
+
+        rsync = next(part for part in command.split("; ") if part.startswith("rsync "))
+        args = shlex.split(rsync)
+        assert "--files-from=/var/lib/dumont/sync-journal.list" in args
+        assert "--delete-missing-args" in args and "--force" in args
+        assert args[-2:] == ["/workspace/", f"root@{CPU_IP}:./"]
+        assert f"|| exit {JOURNAL_INACTIVE_EXIT};" in command
+        assert "[ $rc -eq 24 ]" in command
+
+    def test_journal_paths_outside_sync_path_are_dropped(self, service):
+        service.config.sync_path = "/data/my.ws"
+        command = service._incremental_rsync_cmd(CPU_IP)
+        sed = next(part for part in command.split("; ") if part.startswith("sed -n "))
+        script = shlex.split(sed)[2]
+
+        journal = "/data/my.ws/a/b.txt\n/data/myXws/c\n/etc/passwd\n/data/my.ws/a/b.txt\n"
+        result = subprocess.run(["sed", "-n", script], input=journal, capture_output=True, text=True)
+
+        assert result.stdout.splitlines() == ["a/b.txt", "a/b.txt"]
+
+
+class TestIncrementalFallback:
+    """Transições entre sync incremental (diário) e completo"""
+
+    def test_first_cycle_starts_journal_then_full_sync(self, service, remote):
+        service._do_sync()
+        assert remote.kinds() == ["authorize", "journal", "full"]
+        assert service._journal_target == service._direct_sync_target
+
+        remote.calls.clear()
+        service._do_sync()
+        assert remote.kinds() == ["incremental"]
+
+    def test_full_sync_clears_pending_journal(self, service, remote):
+        service._do_sync()
+
+        (full,) = remote.find("rsync -az --delete")
+        assert full.command.startswith("rm -f /var/lib/dumont/sync-journal ")
+
+    def test_inactive_journal_is_restarted(self, service, remote):
+        service._do_sync()
+        remote.respond("--files-from", returncode=JOURNAL_INACTIVE_EXIT)
+        remote.calls.clear()
+
+        service._do_sync()
+        assert remote.kinds() == ["incremental", "full"]
+        assert service._journal_target is None
+
+        remote.respond("--files-from", returncode=0)
+        remote.calls.clear()
+        service._do_sync()
+        assert remote.kinds() == ["journal", "full"]
+
+    def test_failed_batch_keeps_running_journal(self, service, remote):
+        service._do_sync()
+        remote.respond("--files-from", returncode=23, stderr="rsync error")
+        remote.calls.clear()
+
+        service._do_sync()
+        assert remote.kinds() == ["incremental", "full"]
+        assert service._journal_target is not None
+
+        remote.respond("--files-from", returncode=0)
+        remote.calls.clear()
+        service._do_sync()
+        assert remote.kinds() == ["incremental"]
+
+    def test_periodic_full_reconciliation(self, service, remote):
+        service._do_sync()
+        service._last_full_sync -= service.config.full_sync_interval_seconds + 1
+        remote.calls.clear()
+
+        service._do_sync()
+        assert remote.kinds() == ["full"]
+
+    def test_journal_unavailable_means_full_sync_every_cycle(self, service, remote):
+        remote.respond("dumont-sync-journal.sh", returncode=1, stderr="no inotify")
+
+        service._do_sync()
+        service._do_sync()
+
+        assert remote.kinds() == ["authorize", "journal", "full", "journal", "full"]
+
+    def test_failed_full_sync_sets_up_again(self, service, remote):
+        service._do_sync()
+        remote.respond("rsync -az --delete", returncode=12, stderr="Permission denied")
+        service._last_full_sync = 0.0
+        service._do_sync()
+        assert service._direct_sync_target is None and service._journal_target is None
+
+        remote.respond("rsync -az --delete", returncode=0)
+        remote.calls.clear()
+        service._do_sync()
+        assert remote.kinds() == ["authorize", "journal", "full"]
+
+
+class TestRestore:
+    """Restore CPU → GPU pausa o sync GPU → CPU"""
+
+    @pytest.fixture
+    def relay(self, monkeypatch):
+        """rsync via servidor de controle (fallback): sempre falha, sem rede"""
+        class Pool:
+            def ssh_command(self, *args, **kwargs):
+                return "ssh"
+
+        real_run = subprocess.run
+        relayed = []
+
+        def run(args, *a, **kwargs):
+            if args[0] == "rsync":
+                relayed.append(args)
+                return subprocess.CompletedProcess(args, 12, "", "relay failed")
+            return real_run(args, *a, **kwargs)
+
+        monkeypatch.setattr(cpu_module, "get_ssh_pool", lambda: Pool())
+        monkeypatch.setattr(cpu_module.subprocess, "run", run)
+        return relayed
+
+    def test_restore_runs_with_sync_locked(self, service, remote):
+        result = service.restore_to_gpu(78)
+
+        assert result["success"]
+        (pull,) = remote.find(f"root@{CPU_IP}:./ /workspace/")
+        assert pull.sync_locked
+        assert not service._sync_paused
+
+    def test_failed_restore_keeps_sync_paused(self, service, remote, relay):
+        remote.respond(f"root@{CPU_IP}:./ /workspace/", returncode=12)
+
+        result = service.restore_to_gpu(78)
+
+        assert not result["success"] and relay
+        assert service._sync_paused
+        assert service.get_status()["sync"]["paused"]
+
+    def test_restore_restarts_journal_afterwards(self, service, remote):
+        service._do_sync()
+
+        service.restore_to_gpu(78)
+        remote.calls.clear()
+        service._do_sync()
+
+        assert remote.kinds() == ["journal", "full"]
+
+
+class TestResticBackup:
+    """Comandos restic executados na CPU"""
+
+    @pytest.fixture
+    def restic(self, service, monkeypatch):
+        service.snapshot_service = object()
+        service.restic = ResticProvider(
+            repo="s3:https://r2.example.com/bucket/restic",
+            password="pa$$ 'word'",
+            access_key="AKID",
+            secret_key="secret",
+        )
+        snapshots = []
+
+        def create_snapshot(**kwargs):
+            snapshots.append(kwargs)
+            return {"snapshot_id": "abc123", "files_new": 1, "files_changed": 2, "data_added": 1024}
+
+        monkeypatch.setattr(service.restic, "create_snapshot", create_snapshot)
+        return snapshots
+
+    def test_forget_prunes_standby_snapshots(self, service, remote, restic):
+        service._do_backup_to_r2()
+
+        (forget,) = remote.find("restic forget")
+        assert "restic forget --tag standby --keep-last 10 --prune --quiet" in forget.command
+        assert restic == [{
+            "ssh_host": CPU_IP, "ssh_port": 22, "source_path": "/workspace",
+            "tags": ["standby", "instance:77"],
+        }]
+
+    def test_credentials_are_shell_quoted(self, service, remote, restic):
+        service._do_backup_to_r2()
+
+        (forget,) = remote.find("restic forget")
+        exports = shlex.split(forget.command.split(" && restic forget")[0])
+        assert "RESTIC_PASSWORD=pa$$ 'word'" in exports
+        assert "RESTIC_REPOSITORY=s3:https://r2.example.com/bucket/restic" in exports
+
+    def test_repository_set_up_once_per_cpu(self, service, remote, restic):
+        service._do_backup_to_r2()
+        service._do_backup_to_r2()
+
+        (setup,) = remote.find("restic cat config")
+        assert "|| restic init" in setup.command
+        assert len(restic) == 2
+
+    def test_failed_setup_falls_back_to_streaming(self, service, remote, restic):
+        service.config.r2_bucket = "bucket"
+        remote.respond("restic cat config", returncode=1, stderr="wget: not found")
+
+        service._do_backup_to_r2()
+
+        (stream,) = remote.find("s5cmd")
+        assert "tar -cf - . | $COMPRESS | s5cmd" in stream.command
+        assert "pipe s3://bucket/standby/latest.tar.gz" in stream.command
+        assert restic == [] and remote.find("restic forget") == []
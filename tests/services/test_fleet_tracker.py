@@ -0,0 +1,245 @@
+"""
+Tests for Services - Fleet State Tracker
+
+Testes de diff_states, replay, track() e do intervalo de polling por assinante.
+"""
+
+import os
+import queue
+import asyncio
+import threading
+import time
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.services.gpu.fleet_tracker import (
+    FleetStateTracker,
+    diff_states,
+    EVENT_RUNNING,
+    EVENT_SSH_READY,
+    EVENT_EXITED,
+    EVENT_GONE,
+    EVENT_STATUS_CHANGED,
+)
+
+
+def _instance(instance_id, status, ssh=True):
+    row = {"id": instance_id, "actual_status": status}
+    if ssh:
+        row.update(ssh_host="ssh1.vast.ai", ssh_port=20000 + instance_id)
+    return row
+
+
+def _kinds(events):
+    return [(e.event, e.instance_id) for e in events]
+
+
+class FakeResponse:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"instances": self._rows}
+
+
+class FakeClient:
+    """GET /instances/ devolvendo a frota atual"""
+
+    def __init__(self):
+        self.rows = []
+        self.calls = 0
+
+    def get(self, path, params=None):
+        self.calls += 1
+        return FakeResponse(list(self.rows))
+
+
+@pytest.fixture
+def tracker():
+    tracker = FleetStateTracker("test-key", poll_interval=2)
+    tracker.client = FakeClient()
+    # Sem thread de polling: os testes chamam poll_once() diretamente
+    tracker._ensure_running = lambda: None
+    return tracker
+
+
+class TestDiffStates:
+    """Testes de diff_states"""
+
+    def test_new_instances(self):
+        events = diff_states({}, {
+            1: _instance(1, "loading", ssh=False),
+            2: _instance(2, "running"),
+            3: _instance(3, "exited"),
+        })
+        assert _kinds(events) == [
+            (EVENT_STATUS_CHANGED, 1),
+            (EVENT_RUNNING, 2),
+            (EVENT_SSH_READY, 2),
+            (EVENT_EXITED, 3),
+        ]
+
+    def test_unchanged_state_has_no_events(self):
+        state = {1: _instance(1, "running")}
+        assert diff_states(state, dict(state)) == []
+
+    def test_ssh_ready_after_running(self):
+        """Endereço SSH que chega depois do running gera só ssh_ready"""
+        events = diff_states({1: _instance(1, "running", ssh=False)}, {1: _instance(1, "running")})
+        assert _kinds(events) == [(EVENT_SSH_READY, 1)]
+        assert events[0].previous_status == "running"
+
+    def test_exited_and_gone(self):
+        events = diff_states(
+            {1: _instance(1, "running"), 2: _instance(2, "running")},
+            {1: _instance(1, "exited")},
+        )
+        assert _kinds(events) == [(EVENT_EXITED, 1), (EVENT_GONE, 2)]
+        assert events[1].previous_status == "running"
+        assert events[1].status is None
+
+
+class TestSubscriptions:
+    """Testes de poll_once, replay e track()"""
+
+    def test_events_filtered_by_instance(self, tracker):
+        events = tracker.subscribe_sync([1])
+        tracker.client.rows = [_instance(1, "running"), _instance(2, "running")]
+        tracker.poll_once()
+        assert _kinds(_drain(events)) == [(EVENT_RUNNING, 1), (EVENT_SSH_READY, 1)]
+
+    def test_replay_delivers_known_state(self, tracker):
+        tracker.client.rows = [_instance(1, "running"), _instance(2, "loading", ssh=False)]
+        tracker.poll_once()
+
+        late = tracker.subscribe_sync([1])
+        assert _kinds(_drain(late)) == [(EVENT_RUNNING, 1), (EVENT_SSH_READY, 1)]
+
+        quiet = tracker.subscribe_sync([1], replay=False)
+        assert _drain(quiet) == []
+
+    def test_no_replay_before_first_tick(self, tracker):
+        assert _drain(tracker.subscribe_sync()) == []
+
+    def test_track_adds_instance_and_replays_it(self, tracker):
+        tracker.client.rows = [_instance(1, "running"), _instance(2, "running")]
+        tracker.poll_once()
+        events = tracker.subscribe_sync([1], replay=False)
+
+        tracker.track(events, 2)
+        assert _kinds(_drain(events)) == [(EVENT_RUNNING, 2), (EVENT_SSH_READY, 2)]
+
+        tracker.client.rows = [_instance(1, "running")]
+        tracker.poll_once()
+        assert _kinds(_drain(events)) == [(EVENT_GONE, 2)]
+
+    def test_async_subscription(self, tracker):
+        async def main():
+            events = tracker.subscribe([1])
+            tracker.client.rows = [_instance(1, "exited")]
+            tracker.poll_once()
+            return await asyncio.wait_for(events.get(), timeout=1)
+
+        event = asyncio.run(main())
+        assert (event.event, event.instance_id) == (EVENT_EXITED, 1)
+
+    def test_unsubscribe_stops_delivery(self, tracker):
+        events = tracker.subscribe_sync([1])
+        tracker.unsubscribe(events)
+        tracker.client.rows = [_instance(1, "running")]
+        tracker.poll_once()
+        assert _drain(events) == []
+
+
+class TestPollInterval:
+    """Intervalo efetivo = menor intervalo pedido pelos assinantes"""
+
+    def test_slow_subscriber_alone_sets_interval(self, tracker):
+        tracker.subscribe_sync([1], interval=10)
+        assert tracker._interval_locked() == 10
+
+    def test_default_subscriber_wins(self, tracker):
+        tracker.subscribe_sync([1], interval=10)
+        fast = tracker.subscribe_sync([2])
+        assert tracker._interval_locked() == 2
+        tracker.unsubscribe(fast)
+        assert tracker._interval_locked() == 10
+
+
+class SlowClient(FakeClient):
+    """Primeiro GET lê a frota e só responde quando release for setado"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def get(self, path, params=None):
+        self.calls += 1
+        rows = list(self.rows)
+        if self.calls == 1:
+            self.release.wait(5)
+        return FakeResponse(rows)
+
+
+class TestConcurrentPolls:
+    """poll_once() em paralelo com o poller (ex: list_instances do AutoHibernationManager)"""
+
+    @pytest.fixture
+    def client(self, tracker):
+        tracker.client = SlowClient()
+        return tracker.client
+
+    def _wait_calls(self, client, calls):
+        for _ in range(5000):
+            if client.calls >= calls:
+                return
+            time.sleep(0.001)
+        raise AssertionError("timed out")
+
+    def test_older_response_does_not_overwrite_newer(self, tracker, client):
+        client.rows = [_instance(1, "running")]
+        poller = threading.Thread(target=tracker.poll_once)
+        poller.start()
+        self._wait_calls(client, 1)
+
+        client.rows = [_instance(1, "exited")]
+        other = threading.Thread(target=tracker.poll_once)
+        other.start()
+        other.join(0.1)
+        client.release.set()
+        poller.join(5)
+        other.join(5)
+
+        assert tracker.get(1)["actual_status"] == "exited"
+
+    def test_list_instances_reuses_tick_in_progress(self, tracker, client):
+        client.rows = [_instance(1, "running")]
+        poller = threading.Thread(target=tracker.poll_once)
+        poller.start()
+        self._wait_calls(client, 1)
+
+        result = []
+        reader = threading.Thread(target=lambda: result.extend(tracker.list_instances()))
+        reader.start()
+        reader.join(0.1)
+        client.release.set()
+        poller.join(5)
+        reader.join(5)
+
+        assert [row["id"] for row in result] == [1]
+        assert client.calls == 1
+
+
+def _drain(events):
+    drained = []
+    while True:
+        try:
+            drained.append(events.get_nowait())
+        except (queue.Empty, asyncio.QueueEmpty):
+            return drained
@@ -0,0 +1,214 @@
+"""
+Tests for Services - Heartbeat Store
+
+Testes da ingestão em memória e da reconciliação com o banco no flush.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.config.database import Base
+from src.models.instance_status import InstanceStatus, HibernationEvent
+from src.services.standby.heartbeat_store import HeartbeatStore
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[InstanceStatus.__table__, HibernationEvent.__table__])
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def store(session_factory):
+    store = HeartbeatStore(flush_interval=1000, session_factory=session_factory)
+    # Flush manual nos testes
+    store._ensure_flusher = lambda: None
+    return store
+
+
+def _row(session_factory, instance_id="i-1"):
+    db = session_factory()
+    try:
+        row = db.query(InstanceStatus).filter_by(instance_id=instance_id).one()
+        return {"status": row.status, "idle_since": row.idle_since, "gpu_utilization": row.gpu_utilization}
+    finally:
+        db.close()
+
+
+def _events(session_factory):
+    db = session_factory()
+    try:
+        return [(e.instance_id, e.event_type) for e in db.query(HibernationEvent).order_by(HibernationEvent.id)]
+    finally:
+        db.close()
+
+
+def _set_status(session_factory, status, instance_id="i-1"):
+    db = session_factory()
+    db.query(InstanceStatus).filter_by(instance_id=instance_id).update({"status": status})
+    db.commit()
+    db.close()
+
+
+def _seed(session_factory, status="running", instance_id="i-1"):
+    db = session_factory()
+    db.add(InstanceStatus(instance_id=instance_id, user_id="u", status=status, gpu_usage_threshold=5.0))
+    db.commit()
+    db.close()
+
+
+class TestFlush:
+    """Gravação em lote e transições running <-> idle"""
+
+    def test_new_instance_then_idle_transition(self, store, session_factory):
+        """Primeiro heartbeat cria a linha; ociosidade gera evento no flush seguinte"""
+        assert store.record("i-1", 50)["status"] is None
+        assert store.flush() == 1
+        assert _row(session_factory)["status"] == "running"
+
+        result = store.record("i-1", 1)
+        assert result["status"] == "idle"
+        assert _row(session_factory)["status"] == "running"  # nada gravado antes do flush
+
+        store.flush()
+        assert _row(session_factory)["status"] == "idle"
+        assert _events(session_factory) == [("i-1", "idle_detected")]
+
+    def test_nothing_dirty_does_not_open_session(self, store, session_factory):
+        store.record("i-1", 50)
+        store.flush()
+
+        def no_session():
+            raise AssertionError("flush without changes should not touch the database")
+
+        store._session_factory = no_session
+        assert store.flush() == 0
+
+    def test_first_flush_applies_rules_against_database(self, store, session_factory):
+        """Instância já no banco: o primeiro heartbeat é aplicado direto na linha"""
+        _seed(session_factory, "running")
+        store.record("i-1", 1)
+        store.flush()
+
+        assert _row(session_factory)["status"] == "idle"
+        assert _events(session_factory) == [("i-1", "idle_detected")]
+        assert store.get("i-1").status == "idle"
+        assert store.get("i-1").gpu_usage_threshold == 5.0
+        assert not store.get("i-1").dirty
+
+    def test_database_owned_status_wins(self, store, session_factory):
+        """Status definido por outro componente (hibernated) não é sobrescrito"""
+        store.record("i-1", 50)
+        store.flush()
+        store.record("i-1", 1)
+        store.flush()
+        _set_status(session_factory, "hibernated")
+
+        store.record("i-1", 80)
+        store.flush()
+
+        assert _row(session_factory)["status"] == "hibernated"
+        assert _row(session_factory)["gpu_utilization"] == 80
+        assert store.get("i-1").status == "hibernated"
+
+
+class TestReconciliation:
+    """Heartbeats concorrentes com o flush e falhas de commit"""
+
+    def test_heartbeat_during_flush_keeps_state_dirty(self, store, session_factory):
+        """Versão mudou durante o flush: estado do banco não é adotado"""
+        store.record("i-1", 50)
+        store.flush()
+
+        def racing_session():
+            db = session_factory()
+            commit = db.commit
+
+            def commit_then_heartbeat():
+                commit()
+                store.record("i-1", 1)
+
+            db.commit = commit_then_heartbeat
+            return db
+
+        store._session_factory = racing_session
+        store.record("i-1", 60)
+        store.flush()
+
+        state = store.get("i-1")
+        assert state.dirty
+        assert state.status == "idle"
+
+        store._session_factory = session_factory
+        store.flush()
+        assert _row(session_factory)["status"] == "idle"
+        assert not store.get("i-1").dirty
+
+    def test_failed_commit_requeues_events(self, store, session_factory):
+        """Commit falho devolve eventos à fila e mantém o estado pendente"""
+        store.record("i-1", 50)
+        store.flush()
+
+        def failing_session():
+            db = session_factory()
+
+            def fail():
+                raise RuntimeError("db down")
+
+            db.commit = fail
+            return db
+
+        store.record("i-1", 1)
+        store._session_factory = failing_session
+        assert store.flush() == 0
+        assert _events(session_factory) == []
+        assert store.get("i-1").dirty
+
+        store._session_factory = session_factory
+        assert store.flush() == 1
+        assert _events(session_factory) == [("i-1", "idle_detected")]
+        assert _row(session_factory)["status"] == "idle"
+
+
+class TestPruning:
+    """Instâncias sem heartbeat saem da memória"""
+
+    def test_stale_instances_dropped_after_flush(self, store, session_factory):
+        old = datetime.utcnow() - timedelta(seconds=store.state_ttl + 60)
+        store.record("i-old", 50, now=old)
+        store.record("i-new", 50)
+        store.flush()
+
+        assert store.get("i-old") is None
+        assert store.get("i-new") is not None
+        # A linha continua no banco
+        assert _row(session_factory, "i-old")["status"] == "running"
+
+    def test_unflushed_stale_instance_is_kept(self, store, session_factory):
+        old = datetime.utcnow() - timedelta(seconds=store.state_ttl + 60)
+        store.record("i-old", 50, now=old)
+
+        def failing_session():
+            db = session_factory()
+
+            def fail():
+                raise RuntimeError("db down")
+
+            db.commit = fail
+            return db
+
+        store._session_factory = failing_session
+        assert store.flush() == 0
+        assert store.get("i-old") is not None
@@ -0,0 +1,69 @@
+"""
+Tests for Services - Warm Pool Host Finder
+
+Testes do query JSON de /bundles montado por build_offer_query.
+"""
+
+import os
+import json
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.services.warmpool.host_finder import build_offer_query
+
+
+def _query(**kwargs):
+    return json.loads(build_offer_query(**kwargs)["q"])
+
+
+class TestBuildOfferQuery:
+    """Filtros aplicados pela API em vez de localmente"""
+
+    def test_defaults(self):
+        params = build_offer_query()
+
+        assert params["order"] == "dph_total"
+        assert params["type"] == "on-demand"
+        assert json.loads(params["q"]) == {
+            "rentable": {"eq": True},
+            "num_gpus": {"gte": 1},
+            "verified": {"eq": True},
+        }
+
+    def test_single_gpu_name_uses_eq(self):
+        assert _query(gpu_names=["RTX 4090"])["gpu_name"] == {"eq": "RTX 4090"}
+
+    def test_several_gpu_names_use_in(self):
+        query = _query(gpu_names=["RTX 4090", "RTX 3090"], min_gpus=2)
+
+        assert query["gpu_name"] == {"in": ["RTX 4090", "RTX 3090"]}
+        assert query["num_gpus"] == {"gte": 2}
+
+    def test_empty_gpu_names_are_ignored(self):
+        assert "gpu_name" not in _query(gpu_names=[])
+        assert "gpu_name" not in _query(gpu_names=[""])
+        assert _query(gpu_names=["", "A100"])["gpu_name"] == {"eq": "A100"}
+
+    def test_max_price(self):
+        assert _query(max_price=0.75)["dph_total"] == {"lte": 0.75}
+        assert "dph_total" not in _query(max_price=None)
+
+    def test_min_reliability(self):
+        assert _query(min_reliability=0.95)["reliability2"] == {"gte": 0.95}
+        assert "reliability2" not in _query(min_reliability=0.0)
+
+    def test_machine_id(self):
+        assert _query(machine_id=4321)["machine_id"] == {"eq": 4321}
+        assert _query(machine_id=0)["machine_id"] == {"eq": 0}
+        assert "machine_id" not in _query()
+
+    def test_unverified_means_any_host(self):
+        query = _query(verified=False)
+
+        # Sem filtro: {"eq": False} excluiria os hosts verificados
+        assert "verified" not in query
+
+    def test_geolocation(self):
+        assert _query(geolocation="US")["geolocation"] == {"eq": "US"}
+        assert "geolocation" not in _query()
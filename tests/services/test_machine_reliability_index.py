@@ -0,0 +1,190 @@
+"""
+Tests for Services - Machine Reliability Index
+
+Testes do índice em memória usado por filter_offers/annotate_offers.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.config.database import Base
+from src.models.machine_history import MachineAttempt, MachineBlacklist, MachineStats
+from src.services import machine_history_service as mhs
+from src.services.machine_history_service import MachineHistoryService, MachineReliabilityIndex
+
+
+PROVIDER = "vast"
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        MachineAttempt.__table__, MachineBlacklist.__table__, MachineStats.__table__,
+    ])
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.monotonic controlável do módulo (TTL do índice)"""
+    now = [1000.0]
+    monkeypatch.setattr(mhs.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def service(db, clock):
+    service = MachineHistoryService(db=db)
+    service._index = MachineReliabilityIndex(ttl=300)
+    return service
+
+
+def _offers(*machine_ids):
+    return [{"id": i, "machine_id": machine_id} for i, machine_id in enumerate(machine_ids)]
+
+
+def _stats(machine_id, total, successful):
+    return MachineStats(
+        provider=PROVIDER, machine_id=machine_id, total_attempts=total,
+        successful_attempts=successful, failed_attempts=total - successful,
+        success_rate=successful / total,
+    )
+
+
+class TestWarmIndex:
+    """Índice quente não consulta o banco"""
+
+    def test_filter_and_annotate_issue_no_queries_once_warm(self, service, db, engine):
+        """Só a primeira leitura carrega; as seguintes não fazem queries"""
+        db.add_all([_stats("good", 10, 9), _stats("bad", 10, 1)])
+        db.add(MachineBlacklist(provider=PROVIDER, machine_id="banned", blacklist_type="manual", reason="x"))
+        db.commit()
+
+        counter = QueryCounter(engine)
+        filtered, excluded = service.filter_offers(_offers("good", "bad", "banned", "new"), PROVIDER)
+        assert counter.count == 2  # stats + blacklist
+        assert [o["machine_id"] for o in filtered] == ["good", "new"]
+        assert {o["machine_id"]: o["_excluded_reason"] for o in excluded} == {
+            "bad": "low_reliability (10%)",
+            "banned": "blacklisted",
+        }
+
+        counter.count = 0
+        service.filter_offers(_offers("good", "bad", "banned", "new") * 50, PROVIDER)
+        annotated = service.annotate_offers(_offers("good", "banned"), PROVIDER)
+        assert counter.count == 0
+        assert annotated[0]["_success_rate"] == 0.9
+        assert annotated[1]["_is_blacklisted"] is True
+
+
+class TestIndexUpdates:
+    """Escritas do serviço atualizam o índice sem recarga"""
+
+    def test_record_attempt_updates_entry_in_place(self, service, engine):
+        """record_attempt reflete nas anotações sem recarregar o provider"""
+        service.annotate_offers(_offers("m1"), PROVIDER)
+        service.record_attempt(PROVIDER, "m1", success=True, time_to_ready_seconds=30)
+        service.record_attempt(PROVIDER, "m1", success=False, failure_stage="connecting")
+
+        counter = QueryCounter(engine)
+        offer = service.annotate_offers(_offers("m1"), PROVIDER)[0]
+        assert counter.count == 0
+        assert offer["_total_attempts"] == 2
+        assert offer["_success_rate"] == 0.5
+        assert offer["_avg_time_to_ready"] == 30
+
+    def test_auto_blacklist_after_consecutive_failures(self, service):
+        """Falhas consecutivas colocam a máquina no blacklist do índice"""
+        service.filter_offers(_offers("m1"), PROVIDER)
+        for _ in range(3):
+            service.record_attempt(PROVIDER, "m1", success=False, failure_stage="loading")
+
+        filtered, excluded = service.filter_offers(_offers("m1"), PROVIDER)
+        assert filtered == []
+        assert excluded[0]["_excluded_reason"] == "blacklisted"
+
+    def test_blacklist_add_and_remove(self, service):
+        """add/remove_from_blacklist alteram o filtro imediatamente"""
+        service.filter_offers(_offers("m1"), PROVIDER)
+
+        service.add_to_blacklist(PROVIDER, "m1", reason="manual")
+        assert service.filter_offers(_offers("m1"), PROVIDER)[0] == []
+
+        assert service.remove_from_blacklist(PROVIDER, "m1") is True
+        assert len(service.filter_offers(_offers("m1"), PROVIDER)[0]) == 1
+
+    def test_blacklist_expiry_without_query(self, service, engine):
+        """Blacklist temporário expira pelo expires_at em memória"""
+        service.add_to_blacklist(PROVIDER, "m1", reason="temp", duration_hours=1)
+        service.filter_offers(_offers("m1"), PROVIDER)
+        entry = service._index.get_provider(service.db, PROVIDER)["m1"]
+        assert entry.is_blacklisted
+
+        entry.blacklist_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        counter = QueryCounter(engine)
+        filtered, _ = service.filter_offers(_offers("m1"), PROVIDER)
+        assert counter.count == 0
+        assert len(filtered) == 1
+
+    def test_load_skips_expired_blacklist(self, service, db):
+        """Entradas já expiradas no banco não entram no índice"""
+        db.add(MachineBlacklist(
+            provider=PROVIDER, machine_id="m1", blacklist_type="temporary", reason="old",
+            expires_at=datetime.utcnow() - timedelta(hours=1),
+        ))
+        db.commit()
+        assert len(service.filter_offers(_offers("m1"), PROVIDER)[0]) == 1
+
+
+class TestTTL:
+    """Recarga do índice após o TTL"""
+
+    def test_external_writes_visible_after_ttl(self, service, db, clock):
+        """Escrita de outro processo só aparece após o TTL"""
+        service.filter_offers(_offers("m1"), PROVIDER)
+        db.add(MachineBlacklist(provider=PROVIDER, machine_id="m1", blacklist_type="manual", reason="elsewhere"))
+        db.commit()
+
+        clock[0] += 299
+        assert len(service.filter_offers(_offers("m1"), PROVIDER)[0]) == 1
+
+        clock[0] += 2
+        assert service.filter_offers(_offers("m1"), PROVIDER)[0] == []
+
+    def test_invalidate_forces_reload(self, service, db):
+        """invalidate() recarrega na próxima leitura"""
+        service.filter_offers(_offers("m1"), PROVIDER)
+        db.add(_stats("m1", 10, 0))
+        db.commit()
+
+        service._index.invalidate(PROVIDER)
+        filtered, excluded = service.filter_offers(_offers("m1"), PROVIDER)
+        assert filtered == []
+        assert excluded[0]["_excluded_reason"] == "low_reliability (0%)"
@@ -0,0 +1,165 @@
+"""
+Tests for Services - Price Prediction
+
+Testes do treino incremental e da persistência (joblib) dos modelos de preço.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("joblib")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.config.database import Base
+from src.models.metrics import MarketSnapshot, MarketSnapshotRollup
+from src.modules.market.rollups import RESOLUTION_HOUR
+from src.services import price_prediction_service as pps
+from src.services.price_prediction_service import PricePredictionService, _fit_key, MIN_TRAINING_SAMPLES
+
+
+GPU = "RTX 4090"
+MTYPE = "interruptible"
+KEY = f"{GPU}:{MTYPE}"
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    path = tmp_path / "price_models"
+    monkeypatch.setattr(pps, "MODELS_DIR", str(path))
+    return path
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[MarketSnapshot.__table__, MarketSnapshotRollup.__table__])
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(pps, "SessionLocal", factory)
+    return factory
+
+
+def _snapshot(timestamp, price):
+    return MarketSnapshot(
+        timestamp=timestamp, gpu_name=GPU, machine_type=MTYPE,
+        min_price=price, max_price=price, avg_price=price, median_price=price,
+        total_offers=10, available_gpus=10,
+    )
+
+
+def _rollup(hour, price, count):
+    return MarketSnapshotRollup(
+        resolution=RESOLUTION_HOUR, bucket_start=hour, gpu_name=GPU, machine_type=MTYPE,
+        sample_count=count, min_price=price, max_price=price, price_sum=price * count,
+    )
+
+
+def _current_hour():
+    return datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+
+class TestFitKey:
+    """Testes de _fit_key (agregação incremental, sem banco)"""
+
+    def test_accumulates_into_hour_buckets(self):
+        """Novos snapshots somam nos buckets existentes"""
+        hour = _current_hour() - timedelta(hours=2)
+        state = _fit_key(None, [(hour, 1.0), (hour + timedelta(minutes=10), 3.0)], 30, use_ml=False)
+        assert state['buckets'][hour] == (4.0, 2)
+        assert state['model'] is None  # abaixo de MIN_TRAINING_SAMPLES
+
+        state = _fit_key(state, [(hour + timedelta(minutes=20), 2.0)], 30, use_ml=False)
+        assert state['buckets'][hour] == (6.0, 3)
+        assert state['last_timestamp'] == hour + timedelta(minutes=20)
+
+    def test_drops_buckets_outside_window(self):
+        """Buckets mais antigos que days_of_history saem do estado"""
+        old = _current_hour() - timedelta(days=10)
+        recent = _current_hour() - timedelta(hours=1)
+        state = _fit_key(None, [(old, 1.0), (recent, 2.0)], 7, use_ml=False)
+        assert list(state['buckets']) == [recent]
+        assert state['n_samples'] == 1
+
+    def test_trains_once_enough_samples(self):
+        """Com amostras suficientes o modelo é ajustado sobre as agregações"""
+        start = _current_hour() - timedelta(hours=MIN_TRAINING_SAMPLES)
+        rows = [(start + timedelta(hours=i), 1.0 + (i % 24) / 100) for i in range(MIN_TRAINING_SAMPLES)]
+        state = _fit_key(None, rows, 30, use_ml=False)
+        assert state['n_samples'] == MIN_TRAINING_SAMPLES
+        assert set(state['model']) == {'hourly', 'daily', 'overall_avg'}
+
+
+class TestIncrementalTraining:
+    """Testes de train_models contra o banco"""
+
+    def test_first_train_seeds_from_rollups_then_reads_only_new_rows(self, models_dir, session_factory):
+        """Primeiro treino parte dos rollups; o seguinte só lê snapshots novos"""
+        now_hour = _current_hour()
+        db = session_factory()
+        db.add_all([_rollup(now_hour - timedelta(hours=h), 1.0 + h / 100, 2) for h in range(1, 31)])
+        db.add(_snapshot(now_hour + timedelta(seconds=1), 1.5))
+        # Snapshot bruto de hora já fechada: coberto pelo rollup, não pode contar de novo
+        db.add(_snapshot(now_hour - timedelta(hours=3), 9.9))
+        db.commit()
+
+        service = PricePredictionService()
+        assert service.train_models([(GPU, MTYPE)], workers=1) == 1
+        assert service.states[KEY]['n_samples'] == 61
+
+        db.add(_snapshot(now_hour + timedelta(seconds=2), 1.6))
+        db.commit()
+        db.close()
+
+        service.train_models([(GPU, MTYPE)], workers=1)
+        assert service.states[KEY]['n_samples'] == 62
+        assert service.states[KEY]['buckets'][now_hour] == (pytest.approx(3.1), 2)
+
+
+class TestPersistence:
+    """Testes de save/load dos modelos com joblib"""
+
+    def _trained_service(self, session_factory):
+        start = _current_hour() - timedelta(hours=MIN_TRAINING_SAMPLES + 1)
+        db = session_factory()
+        db.add_all([_rollup(start + timedelta(hours=i), 1.0 + (i % 24) / 100, 1) for i in range(MIN_TRAINING_SAMPLES)])
+        db.commit()
+        db.close()
+        service = PricePredictionService()
+        assert service.train_models([(GPU, MTYPE)], workers=1) == 1
+        return service
+
+    def test_saved_model_loads_without_database(self, models_dir, session_factory, monkeypatch):
+        """Modelo persistido responde previsões logo após o boot, sem retreinar"""
+        service = self._trained_service(session_factory)
+        assert (models_dir / "RTX_4090_interruptible.joblib").exists()
+
+        def no_db():
+            raise AssertionError("load/predict should not query the database")
+
+        monkeypatch.setattr(pps, "SessionLocal", no_db)
+        reloaded = PricePredictionService()
+        assert KEY in reloaded.models
+        assert reloaded.states[KEY]['n_samples'] == service.states[KEY]['n_samples']
+        assert reloaded.predict(GPU, MTYPE) is not None
+
+    def test_discards_other_model_version(self, models_dir, session_factory, monkeypatch):
+        """Arquivo de outra MODEL_VERSION é ignorado"""
+        self._trained_service(session_factory)
+        monkeypatch.setattr(PricePredictionService, "MODEL_VERSION", "incremental_v99")
+        reloaded = PricePredictionService()
+        assert reloaded.models == {}
+        assert KEY not in reloaded.states
+
+    def test_discards_other_feature_schema(self, models_dir, session_factory, monkeypatch):
+        """Arquivo com outro schema de features é ignorado"""
+        self._trained_service(session_factory)
+        monkeypatch.setattr(pps, "FEATURE_SCHEMA", pps.FEATURE_SCHEMA + ["month"])
+        assert PricePredictionService().models == {}